@@ -4,18 +4,39 @@
 """
 from flask import Flask
 from flask_cors import CORS
-from src import config, auth_bp, order_bp, invite_bp, common_bp, preferences_bp
+from src import config, auth_bp, order_bp, invite_bp, common_bp, preferences_bp, analytics_bp, events_bp, batch_bp, metrics_bp
+from src.utils.json_provider import init_json_provider
+from src.utils.compression import init_compression
+from src.storage import get_storage
+from src.utils.log import init_logging
+from src.utils.metrics import init_metrics
 
 def create_app():
     """应用工厂函数"""
     app = Flask(__name__)
     
+    # 日志写入队列，由后台线程格式化输出
+    init_logging()
+    
+    # 初始化当前进程的存储（预加载启动时fork出的工作进程会丢弃并重新创建）
+    get_storage()
+    
+    # 记录每个请求的耗时和状态码（最先注册，耗时包含其他钩子）
+    init_metrics(app)
+    
+    # 使用高性能JSON编解码（未安装orjson时回退到标准库）
+    init_json_provider(app)
+    
+    # 按Accept-Encoding压缩响应
+    init_compression(app)
+    
     # 配置CORS
     CORS(app, resources={
         r"/*": {
             "origins": config.CORS_ORIGINS,
-            "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-            "allow_headers": ["Content-Type", "Authorization"],
+            "methods": config.CORS_METHODS,
+            "allow_headers": config.CORS_ALLOW_HEADERS,
+            "expose_headers": config.CORS_EXPOSE_HEADERS,
             "supports_credentials": True
         }
     })
@@ -26,6 +47,10 @@ def create_app():
     app.register_blueprint(invite_bp)
     app.register_blueprint(common_bp)
     app.register_blueprint(preferences_bp)
+    app.register_blueprint(analytics_bp)
+    app.register_blueprint(events_bp)
+    app.register_blueprint(batch_bp)
+    app.register_blueprint(metrics_bp)
     
     return app
 
@@ -38,7 +63,7 @@ def main():
     print("🌐 CORS已配置，支持以下源：")
     for origin in config.CORS_ORIGINS:
         print(f"   - {origin}")
-    print("📡 API服务启动中...")
+    print("📡 API服务启动中...（开发服务器；生产环境使用 ./start_api.sh 或 gunicorn -c gunicorn.conf.py）")
     print(f"🔗 测试连接: http://localhost:{config.API_PORT}/health")
     print("📋 API路由:")
     print("   认证相关:")
@@ -48,8 +73,12 @@ def main():
     print("   订单相关:")
     print("     POST /create-order")
     print("     POST /submit-order")
+    print("     POST /quick-order  (按保存的偏好创建并提交)")
+    print("     POST /orders/transitions")
     print("     POST /order-feedback")
-    print("     GET  /orders/<user_id>")
+    print("     GET  /orders/search?order_number=&phone_suffix=&start_date=&end_date=&status=&address=")
+    print("     GET  /orders/<user_id>?limit=&cursor=  (热表+归档分页)")
+    print("     GET  /orders/export")
     print("   邀请相关:")
     print("     GET  /get-user-invite-stats")
     print("     GET  /get-invite-progress")
@@ -62,8 +91,18 @@ def main():
     print("     DELETE /preferences/<user_id>")
     print("     GET  /preferences/<user_id>/complete")
     print("     GET  /preferences/<user_id>/form-data")
+    print("   分析相关:")
+    print("     GET  /analytics/orders/rollup")
+    print("     GET  /analytics/orders/budget")
+    print("     GET  /analytics/orders/tags")
+    print("     GET  /analytics/users/cohort?allergy=&preference=")
+    print("   事件推送:")
+    print("     GET  /events/<user_id>  (SSE)")
     print("   通用:")
     print("     GET  /health")
+    print("     GET  /addresses/suggest?q=")
+    print("     POST /batch  (一次请求执行多个子请求)")
+    print("     GET  /metrics  (Prometheus指标)")
     
     app.run(
         host=config.API_HOST, 
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+订单归档任务
+建议通过cron在低峰期定时执行，例如每天凌晨:
+    0 4 * * * cd /path/to/jwt && python archive_orders.py
+"""
+import argparse
+import sys
+import os
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.config import config
+from src.services import archive_service
+
+def main():
+    parser = argparse.ArgumentParser(description="把旧订单和已删除订单移入归档表")
+    parser.add_argument('--days', type=int, default=config.ORDER_ARCHIVE_AFTER_DAYS,
+                        help="已完成/已取消订单在热表中保留的天数（不能小于ORDER_ARCHIVE_AFTER_DAYS）")
+    parser.add_argument('--batch-size', type=int, default=config.ORDER_ARCHIVE_BATCH_SIZE,
+                        help="每批移动的订单数")
+    parser.add_argument('--max-batches', type=int, default=None, help="本次最多执行的批次数")
+    parser.add_argument('--pause', type=float, default=0.1, help="批次之间的暂停秒数")
+    args = parser.parse_args()
+    
+    result = archive_service.archive_orders(args.days, args.batch_size, args.max_batches, args.pause)
+    sys.exit(0 if result['success'] else 1)
+
+if __name__ == '__main__':
+    main()
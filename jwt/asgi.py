@@ -0,0 +1,36 @@
+"""
+ASGI服务入口
+与app.py使用同一套路由接口；热点路由为异步处理，等待存储和短信服务时不占用线程。
+运行: python asgi.py  或  uvicorn asgi:app --loop uvloop --port 5001
+"""
+from app import create_app
+from src import config
+from src.asgi import create_asgi_app
+
+app = create_asgi_app(create_app())
+
+def main():
+    """主函数"""
+    import uvicorn
+    try:
+        import uvloop  # noqa: F401
+        loop = 'uvloop'
+    except ImportError:
+        loop = 'asyncio'
+    
+    print("=== 手机验证码登录API服务 (ASGI) ===")
+    print(f"🔧 开发模式: {config.is_development_mode}")
+    print(f"⚡ 事件循环: {loop}")
+    print(f"🔗 测试连接: http://localhost:{config.API_PORT}/health")
+    print("📋 异步路由:")
+    print("     POST /send-verification-code")
+    print("     GET  /orders/<user_id>")
+    print("     GET  /preferences/<user_id>/complete")
+    print("     GET  /preferences/<user_id>/form-data")
+    print("     GET  /events/<user_id>  (SSE)")
+    print(f"   其他路由由Flask处理（{config.ASGI_WSGI_THREADS} 个线程）")
+    
+    uvicorn.run(app, host=config.API_HOST, port=config.API_PORT, loop=loop)
+
+if __name__ == '__main__':
+    main()
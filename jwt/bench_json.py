@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+JSON序列化基准测试
+用接近真实的订单列表比较标准库json与当前JSON提供者的吞吐量
+用法: python bench_json.py [订单数] [轮数]
+"""
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from app import create_app
+from src.utils.json_provider import ORJSON_AVAILABLE, dumps_bytes, loads
+
+ADDRESSES = [
+    '上海市浦东新区张江镇博云路2号浦软大厦5楼',
+    '北京市海淀区中关村大街1号海龙大厦B座1208室',
+    '广东省深圳市南山区粤海街道科技园南区高新南一道9号',
+    '浙江省杭州市西湖区文三路478号华星时代广场A座',
+]
+ALLERGIES = [[], ['花生'], ['海鲜', '乳制品'], ['麸质', '鸡蛋', '坚果']]
+PREFERENCES = [[], ['川菜'], ['粤菜', '清淡'], ['日料', '辣', '素食']]
+
+def build_orders(count: int):
+    """构建订单列表（字段与/orders/<user_id>返回的一致）"""
+    base = datetime(2025, 1, 1, 12, 0, 0)
+    orders = []
+    for i in range(count):
+        created_at = base + timedelta(minutes=i)
+        orders.append({
+            'id': str(uuid.uuid4()),
+            'order_number': f"ORD{created_at.strftime('%Y%m%d')}{i:06d}",
+            'user_id': str(uuid.uuid4()),
+            'phone_number': f"138{i:08d}",
+            'status': 'submitted' if i % 3 else 'completed',
+            'order_date': created_at.date().isoformat(),
+            'created_at': created_at.isoformat(),
+            'submitted_at': (created_at + timedelta(seconds=30)).isoformat(),
+            'delivery_address': ADDRESSES[i % len(ADDRESSES)],
+            'dietary_restrictions': ALLERGIES[i % len(ALLERGIES)],
+            'food_preferences': PREFERENCES[i % len(PREFERENCES)],
+            'budget_amount': 30 + (i % 50),
+            'budget_currency': 'CNY',
+            'user_rating': i % 5 + 1 if i % 2 else None,
+            'user_feedback': '味道不错，送餐很快，下次还会再点' if i % 4 == 0 else None,
+            'user_sequence': i + 1,
+            'is_deleted': False,
+        })
+    return orders
+
+def measure(label: str, func, rounds: int, size_bytes: int):
+    """运行若干轮并打印耗时与吞吐量"""
+    func()  # 预热
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    elapsed = (time.perf_counter() - start) / rounds
+    print(f"   {label:<32} {elapsed * 1000:8.2f} ms/次  {size_bytes / elapsed / 1024 / 1024:8.1f} MB/s")
+    return elapsed
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    app = create_app()
+    orders = build_orders(count)
+    payload = {'success': True, 'orders': orders, 'count': len(orders), 'next_cursor': None}
+
+    escaped = json.dumps(payload).encode('utf-8')
+    compact = dumps_bytes(payload)
+
+    print(f"=== JSON序列化基准 ({count} 个订单, {rounds} 轮) ===")
+    print(f"📦 响应大小: 标准库默认 {len(escaped)} 字节, UTF-8紧凑 {len(compact)} 字节")
+    print(f"⚡ 当前编解码: {'orjson' if ORJSON_AVAILABLE else '标准库json'}")
+
+    print("📤 序列化:")
+    baseline = measure('json.dumps (ensure_ascii=True)',
+                       lambda: json.dumps(payload).encode('utf-8'), rounds, len(compact))
+    measure('json.dumps (ensure_ascii=False)',
+            lambda: json.dumps(payload, ensure_ascii=False).encode('utf-8'), rounds, len(compact))
+    fast = measure('dumps_bytes', lambda: dumps_bytes(payload), rounds, len(compact))
+
+    with app.test_request_context():
+        measure('jsonify (app.json.response)', lambda: app.json.response(payload).get_data(), rounds, len(compact))
+
+    print("📥 反序列化:")
+    text = compact.decode('utf-8')
+    measure('json.loads', lambda: json.loads(text), rounds, len(compact))
+    measure('loads', lambda: loads(compact), rounds, len(compact))
+
+    print(f"🚀 dumps_bytes 相比标准库默认: {baseline / fast:.1f}x")
+
+if __name__ == '__main__':
+    main()
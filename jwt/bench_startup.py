@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+启动耗时基准
+1. 用 python -X importtime 统计导入app时各模块的耗时，列出最慢的模块
+2. 在新进程中多次测量从启动到第一个请求返回的时间（导入 + create_app + 首个请求）
+用法: python bench_startup.py [轮数] [列出的模块数]
+"""
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# 在子进程中执行：从解释器启动计时到第一个请求返回
+FIRST_REQUEST_SCRIPT = """
+import time
+start = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+response = app.test_client().get('/health')
+assert response.status_code == 200
+done = time.perf_counter()
+print(f"{imported - start} {created - imported} {done - created}")
+"""
+
+def import_profile(module: str = 'app'):
+    """解析 -X importtime 的输出，返回 [(累计微秒, 自身微秒, 模块名)]"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+    return rows
+
+def first_request_times(rounds: int):
+    """每轮启动一个新进程，返回 [(导入, create_app, 首个请求)] 秒"""
+    samples = []
+    for _ in range(rounds):
+        result = subprocess.run(
+            [sys.executable, '-c', FIRST_REQUEST_SCRIPT],
+            cwd=ROOT, capture_output=True, text=True, check=True
+        )
+        samples.append(tuple(float(value) for value in result.stdout.split()[-3:]))
+    return samples
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    top = int(sys.argv[2]) if len(sys.argv) > 2 else 15
+
+    rows = import_profile()
+    total = next(cumulative for cumulative, _, name in rows if name.strip() == 'app')
+    print(f"=== 导入耗时 (import app: {total / 1000:.1f} ms) ===")
+    print(f"   {'累计 ms':>9} {'自身 ms':>9}  模块")
+    for cumulative, self_us, name in sorted(rows, reverse=True)[:top]:
+        print(f"   {cumulative / 1000:9.1f} {self_us / 1000:9.1f}  {name}")
+
+    own = [(cumulative, name.strip()) for cumulative, _, name in rows if name.strip().startswith('src')]
+    print("📦 项目模块:")
+    for cumulative, name in sorted(own, reverse=True)[:top]:
+        print(f"   {cumulative / 1000:9.1f}  {name}")
+
+    # 开发模式和测试不应加载的客户端库
+    heavy = ['supabase', 'postgrest', 'httpx', 'requests']
+    loaded = [name for name in heavy if any(row[2].strip() == name for row in rows)]
+    print(f"🔌 导入时加载的客户端库: {', '.join(loaded) if loaded else '无'}")
+
+    samples = first_request_times(rounds)
+    print(f"=== 首个请求耗时 ({rounds} 轮中位数) ===")
+    for index, label in enumerate(['导入', 'create_app', '首个请求']):
+        print(f"   {label:<12} {statistics.median(sample[index] for sample in samples) * 1000:8.1f} ms")
+    print(f"🚀 合计: {statistics.median(sum(sample) for sample in samples) * 1000:.1f} ms")
+
+if __name__ == '__main__':
+    main()
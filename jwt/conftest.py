@@ -0,0 +1,22 @@
+"""
+pytest共享夹具
+
+各测试脚本单独运行时每次都是新进程；pytest在同一进程中收集所有脚本，
+这里在每个测试前换一个新的开发存储并清空内存索引，避免测试之间互相看到对方的数据。
+"""
+import pytest
+
+from src.storage.factory import _reset_storage
+from src.services import search_service, analytics_service, address_service
+from src.utils.cache import user_sequence_cache, preferences_read_models, compressed_responses
+
+@pytest.fixture(autouse=True)
+def isolated_state():
+    """每个测试使用新的存储实例，清空由存储派生的缓存和检索/分析/地址索引"""
+    _reset_storage()
+    for cache in (user_sequence_cache, preferences_read_models, compressed_responses):
+        cache.clear()
+    search_service.reset()
+    analytics_service.reset()
+    address_service.reset()
+    yield
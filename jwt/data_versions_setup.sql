@@ -0,0 +1,17 @@
+-- 用户数据版本号表：订单或偏好写入时递增，用于生成ETag
+-- 条件GET只需按主键读取一个整数，未变化时直接返回304，不读取也不序列化数据行
+CREATE TABLE IF NOT EXISTS user_data_versions (
+    user_id VARCHAR(50) NOT NULL,
+    scope VARCHAR(20) NOT NULL CHECK (scope IN ('orders', 'preferences')),
+    version BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, scope)
+);
+
+-- 原子递增版本号（不存在时创建），返回新版本号
+CREATE OR REPLACE FUNCTION bump_user_data_version(p_user_id VARCHAR, p_scope VARCHAR)
+RETURNS BIGINT AS $$
+    INSERT INTO user_data_versions AS v (user_id, scope, version)
+    VALUES (p_user_id, p_scope, 1)
+    ON CONFLICT (user_id, scope) DO UPDATE SET version = v.version + 1
+    RETURNING v.version;
+$$ LANGUAGE sql;
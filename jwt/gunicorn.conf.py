@@ -0,0 +1,121 @@
+"""
+生产环境启动配置（gunicorn）
+主进程预加载create_app()后再fork工作进程，代码和只读数据以写时复制方式共享。
+
+启动:   gunicorn -c gunicorn.conf.py       （start_api.sh 默认使用）
+平滑重载: ./reload_api.sh                    （USR2启动新主进程，就绪后TERM旧主进程）
+停止:   kill -TERM $(cat gunicorn.pid)     （停止接收新请求，等待进行中的请求完成）
+
+环境变量:
+    API_SERVER_MODE   wsgi（默认，gthread工作进程）或 asgi（uvicorn工作进程）
+    API_BIND          监听地址，默认 0.0.0.0:5001
+    WEB_CONCURRENCY   工作进程数，默认按CPU核数计算
+    API_THREADS       wsgi模式每个工作进程的线程数，默认按CPU核数计算
+    SSE_MAX_SUBSCRIBERS  每个工作进程的SSE连接上限，wsgi模式下不超过线程数的1/4；
+                      单进程需要承载成千上万个SSE连接时必须使用asgi模式
+    API_MAX_REQUESTS  工作进程处理多少个请求后重启，默认50000（0表示不重启）
+    API_GRACEFUL_TIMEOUT  停止/重载时等待进行中请求的秒数，默认30
+    METRICS_DIR       工作进程写入指标快照的目录，默认在临时目录下按端口区分
+    EVENTS_DATABASE_URL  Postgres连接串，用于在工作进程之间转发SSE事件（多进程时需要设置）
+"""
+import logging
+import multiprocessing
+import os
+import tempfile
+import time
+
+cpu_count = multiprocessing.cpu_count()
+server_mode = os.getenv("API_SERVER_MODE", "wsgi").lower()
+
+bind = os.getenv("API_BIND", "0.0.0.0:5001")
+pidfile = os.getenv("API_PIDFILE", "gunicorn.pid")
+
+# 各工作进程定期写入指标快照，任一进程的 /metrics 汇总所有进程（需在加载应用前设置）
+os.environ.setdefault("METRICS_DIR", os.path.join(tempfile.gettempdir(), f"api-metrics-{bind.rsplit(':', 1)[-1]}"))
+
+# 预加载应用：fork前完成导入和初始化
+preload_app = True
+
+if server_mode == "asgi":
+    # 事件循环工作进程：每个核一个进程即可，并发由协程承担
+    wsgi_app = "asgi:app"
+    worker_class = "uvicorn.workers.UvicornWorker"
+    workers = int(os.getenv("WEB_CONCURRENCY", str(cpu_count)))
+else:
+    # 线程工作进程：请求主要在等待Supabase和短信服务，线程数按核数放大；
+    # 退出前先停止accept，已accept的连接和SSE连接处理完再退出（见gunicorn_workers.py）
+    wsgi_app = "app:create_app()"
+    worker_class = "src.utils.gunicorn_workers.DrainingThreadWorker"
+    workers = int(os.getenv("WEB_CONCURRENCY", str(cpu_count * 2 + 1)))
+    threads = int(os.getenv("API_THREADS", str(min(max(cpu_count * 2, 4), 16))))
+    # gthread下每个SSE连接独占一个线程直到断开：单进程的SSE连接数不超过线程数的1/4，
+    # 其余线程留给普通请求（需在加载应用前设置）；大量SSE连接请使用asgi模式
+    sse_limit = max(threads // 4, 1)
+    os.environ["SSE_MAX_SUBSCRIBERS"] = str(min(int(os.getenv("SSE_MAX_SUBSCRIBERS", str(sse_limit))), sse_limit))
+
+# 工作进程处理一定数量的请求后重启，限制内存缓慢增长；加抖动避免同时重启。
+# 新工作进程继承主进程预热的索引，只需增量同步，但重启仍有代价，上限不宜过小
+max_requests = int(os.getenv("API_MAX_REQUESTS", "50000"))
+max_requests_jitter = max(max_requests // 10, 0)
+
+# 停止和重载时等待进行中请求的时间；超过timeout无响应的工作进程会被重启
+graceful_timeout = int(os.getenv("API_GRACEFUL_TIMEOUT", "30"))
+timeout = 60
+keepalive = 5
+
+accesslog = "-"
+errorlog = "-"
+
+# 钩子日志走项目日志（src下的logger，异步队列写出）
+logger = logging.getLogger("src.gunicorn")
+
+def refresh_indexes(stage):
+    """同步检索、分析和地址索引
+
+    主进程预加载后全量构建一次，工作进程以写时复制方式共享；
+    工作进程（包括达到max_requests后重启的）fork后只增量追上主进程构建以来的变更，再开始接收请求。
+    失败时不影响启动，首次请求时再同步。
+    """
+    from src.services import search_service, analytics_service, address_service
+    start = time.perf_counter()
+    try:
+        rows = search_service.refresh(force=True) + address_service.refresh()
+        if analytics_service.store is not None:
+            rows += analytics_service.refresh(force=True) + analytics_service.refresh_user_tags(force=True)
+    except Exception as e:
+        logger.warning("⚠️  %s索引同步失败，首次请求时再同步: %s", stage, e)
+        return
+    logger.info("🔥 %s索引已同步: %s 行，耗时 %.2f 秒", stage, rows, time.perf_counter() - start)
+
+def on_starting(server):
+    """主进程启动"""
+    from src.utils.log import init_logging
+    from src.utils.metrics import mark_dead_processes
+    init_logging()
+    # 上次运行留下的快照并入归档，计数保持单调递增
+    mark_dead_processes()
+    refresh_indexes("主进程")
+    logger.info("🚀 生产模式启动: %s, %s 个工作进程, 监听 %s", server_mode, workers, bind)
+    if workers > 1 and not os.getenv("EVENTS_DATABASE_URL"):
+        logger.warning("⚠️  未设置EVENTS_DATABASE_URL：SSE只能收到同一工作进程内发布的事件")
+
+def post_fork(server, worker):
+    """工作进程fork后：创建本进程的存储和数据库客户端，不使用主进程的连接；启动跨进程事件转发"""
+    from src.storage import get_storage
+    from src.utils.event_bridge import init_event_bridge
+    get_storage()
+    init_event_bridge()
+    refresh_indexes(f"工作进程 {worker.pid} ")
+
+def worker_exit(server, worker):
+    """工作进程退出：写出最后一次指标快照和队列中剩余的日志"""
+    from src.utils.log import flush_logging
+    from src.utils.metrics import flush
+    flush()
+    logger.info("👋 工作进程 %s 已退出", worker.pid)
+    flush_logging()
+
+def child_exit(server, worker):
+    """主进程回收工作进程后，把它的指标快照并入归档"""
+    from src.utils.metrics import mark_process_dead
+    mark_process_dead(worker.pid)
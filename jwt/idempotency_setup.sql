@@ -0,0 +1,25 @@
+-- 幂等键表：所有worker共享，用于重放重试请求的响应
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key VARCHAR(400) PRIMARY KEY, -- 请求方法 + 路径 + 调用方 + Idempotency-Key
+    fingerprint VARCHAR(64) NOT NULL, -- 请求体的SHA-256摘要
+    status VARCHAR(20) NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'completed')),
+    status_code INTEGER,
+    response_body TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL -- pending为短租约，completed为响应保存期限
+);
+
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires_at ON idempotency_keys(expires_at);
+
+-- 清理过期的幂等键，建议通过pg_cron定期执行：
+-- SELECT cron.schedule('purge-idempotency-keys', '*/10 * * * *', 'SELECT purge_expired_idempotency_keys()');
+CREATE OR REPLACE FUNCTION purge_expired_idempotency_keys()
+RETURNS INTEGER AS $$
+DECLARE
+    purged INTEGER;
+BEGIN
+    DELETE FROM idempotency_keys WHERE expires_at < NOW();
+    GET DIAGNOSTICS purged = ROW_COUNT;
+    RETURN purged;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,23 @@
+-- 把订单的忌口/偏好字段从TEXT改为JSONB数组
+-- 应用直接写入数组，读取时不再需要二次解析
+-- 需在 orders_archive_setup.sql 和 tag_masks_setup.sql 之后执行
+-- （后者的回填语句按TEXT解析旧数据，并定义了 safe_tag_list_jsonb：先直接转JSONB，再按单引号列表解析）
+ALTER TABLE orders
+    ALTER COLUMN dietary_restrictions TYPE JSONB USING (
+        COALESCE(safe_tag_list_jsonb(dietary_restrictions), '[]'::jsonb)
+    ),
+    ALTER COLUMN food_preferences TYPE JSONB USING (
+        COALESCE(safe_tag_list_jsonb(food_preferences), '[]'::jsonb)
+    );
+
+ALTER TABLE orders ALTER COLUMN dietary_restrictions SET DEFAULT '[]'::jsonb;
+ALTER TABLE orders ALTER COLUMN food_preferences SET DEFAULT '[]'::jsonb;
+
+-- 归档表保持与热表相同的列类型
+ALTER TABLE orders_archive
+    ALTER COLUMN dietary_restrictions TYPE JSONB USING (
+        COALESCE(safe_tag_list_jsonb(dietary_restrictions), '[]'::jsonb)
+    ),
+    ALTER COLUMN food_preferences TYPE JSONB USING (
+        COALESCE(safe_tag_list_jsonb(food_preferences), '[]'::jsonb)
+    );
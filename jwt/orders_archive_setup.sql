@@ -0,0 +1,49 @@
+-- 订单归档（冷数据）表：已软删除的订单，以及超过保留期的已完成/已取消订单
+-- 从orders批量移入此表，使热表的行数和索引深度只与活跃订单量相关
+-- 需在 orders_setup.sql 和 user_sequence_setup.sql 之后执行
+CREATE TABLE IF NOT EXISTS orders_archive (
+    LIKE orders,
+    archived_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (id)
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_orders_archive_order_number ON orders_archive(order_number);
+
+-- 用户订单列表的键集分页索引（热表和归档表相同）
+CREATE INDEX IF NOT EXISTS idx_orders_user_created ON orders(user_id, created_at DESC, id DESC) WHERE is_deleted = FALSE;
+CREATE INDEX IF NOT EXISTS idx_orders_archive_user_created ON orders_archive(user_id, created_at DESC, id DESC) WHERE is_deleted = FALSE;
+
+-- 可归档订单的部分索引，归档任务按created_at顺序取批次
+CREATE INDEX IF NOT EXISTS idx_orders_archivable ON orders(created_at)
+    WHERE is_deleted = TRUE OR status IN ('completed', 'cancelled');
+
+-- 批量归档：在一条语句内 DELETE ... RETURNING 并写入归档表
+-- 按列名映射（jsonb_populate_record），orders后续新增列不会错位
+-- SKIP LOCKED 避免与正在更新的订单互相等待，可多次调用直到返回0
+CREATE OR REPLACE FUNCTION archive_orders(p_cutoff TIMESTAMP WITH TIME ZONE, p_batch_size INTEGER)
+RETURNS TABLE (archived_count INTEGER, user_ids TEXT[]) AS $$
+    WITH batch AS (
+        SELECT id FROM orders
+        WHERE is_deleted = TRUE
+           OR (status IN ('completed', 'cancelled') AND created_at < p_cutoff)
+        ORDER BY created_at
+        LIMIT p_batch_size
+        FOR UPDATE SKIP LOCKED
+    ),
+    moved AS (
+        DELETE FROM orders o USING batch b
+        WHERE o.id = b.id
+        RETURNING o.*
+    ),
+    inserted AS (
+        INSERT INTO orders_archive
+        SELECT (jsonb_populate_record(NULL::orders_archive, to_jsonb(moved) || jsonb_build_object('archived_at', NOW()))).*
+        FROM moved
+        RETURNING user_id
+    )
+    SELECT COUNT(*)::INTEGER, COALESCE(ARRAY_AGG(DISTINCT user_id), '{}')
+    FROM inserted;
+$$ LANGUAGE sql;
+
+-- 检索/分析/地址索引按 (archived_at, id) 增量读取新归档的订单
+CREATE INDEX IF NOT EXISTS idx_orders_archive_archived ON orders_archive(archived_at, id);
@@ -41,36 +41,38 @@ CREATE TABLE orders (
     deleted_at TIMESTAMP WITH TIME ZONE
 );
 
+-- 创建按天的订单号计数器表（每天一行，分配时原子自增）
+CREATE TABLE order_number_counters (
+    order_date DATE PRIMARY KEY,
+    last_value INTEGER NOT NULL DEFAULT 0
+);
+
 -- 创建订单号生成函数
+-- 每次只对当天计数器做一次原子自增，O(1)，不扫描orders表，并发插入也不会撞号
 CREATE OR REPLACE FUNCTION generate_order_number() 
 RETURNS VARCHAR(50) AS $$
 DECLARE
-    order_date TEXT;
-    daily_count INTEGER;
-    new_order_number VARCHAR(50);
+    next_value INTEGER;
 BEGIN
-    -- 获取当前日期，格式: YYYYMMDD
-    order_date := TO_CHAR(CURRENT_DATE, 'YYYYMMDD');
-    
-    -- 获取当天已有订单数量
-    SELECT COUNT(*) + 1 INTO daily_count
-    FROM orders 
-    WHERE order_date = CURRENT_DATE 
-    AND is_deleted = FALSE;
-    
-    -- 生成订单号: ORD + 日期 + 3位序号
-    new_order_number := 'ORD' || order_date || LPAD(daily_count::TEXT, 3, '0');
+    INSERT INTO order_number_counters AS c (order_date, last_value)
+    VALUES (CURRENT_DATE, 1)
+    ON CONFLICT (order_date) DO UPDATE SET last_value = c.last_value + 1
+    RETURNING c.last_value INTO next_value;
     
-    -- 检查是否已存在，如果存在则递增序号
-    WHILE EXISTS (SELECT 1 FROM orders WHERE order_number = new_order_number) LOOP
-        daily_count := daily_count + 1;
-        new_order_number := 'ORD' || order_date || LPAD(daily_count::TEXT, 3, '0');
-    END LOOP;
-    
-    RETURN new_order_number;
+    -- 生成订单号: ORD + 日期 + 固定6位序号（补零，同一天内按字典序即按下单顺序）
+    RETURN 'ORD' || TO_CHAR(CURRENT_DATE, 'YYYYMMDD') || LPAD(next_value::TEXT, 6, '0');
 END;
 $$ LANGUAGE plpgsql;
 
+-- 已有订单数据时，用每天已存在的最大序号初始化计数器
+INSERT INTO order_number_counters (order_date, last_value)
+SELECT order_date, MAX(SUBSTRING(order_number FROM 12)::INTEGER)
+FROM orders
+WHERE order_number ~ '^ORD[0-9]{11,}$'
+GROUP BY order_date
+ON CONFLICT (order_date) DO UPDATE
+SET last_value = GREATEST(order_number_counters.last_value, EXCLUDED.last_value);
+
 -- 创建触发器自动生成订单号
 CREATE OR REPLACE FUNCTION set_order_number_trigger() 
 RETURNS TRIGGER AS $$
@@ -117,6 +119,55 @@ CREATE INDEX idx_orders_is_deleted ON orders(is_deleted);
 CREATE INDEX idx_orders_user_date ON orders(user_id, order_date DESC);
 CREATE INDEX idx_orders_status_date ON orders(status, created_at DESC);
 
+-- 创建批量订单状态转换函数
+-- 每项只在订单未删除且当前状态属于from_statuses时更新，一次调用完成N个订单的校验和更新
+-- 返回每个订单的结果（顺序与输入一致）；订单不存在时status为NULL
+CREATE OR REPLACE FUNCTION transition_orders(transitions JSONB)
+RETURNS TABLE (
+    order_id TEXT,
+    success BOOLEAN,
+    status VARCHAR(20),
+    order_number VARCHAR(50),
+    is_deleted BOOLEAN,
+    user_id VARCHAR(50)
+) AS $$
+    -- 请求中的订单ID先转换为整数再与主键比较（o.id::TEXT 会使主键索引失效）；
+    -- 无法转换的ID视为订单不存在，不会让整批请求报错
+    WITH requested AS (
+        SELECT
+            t.order_id,
+            CASE WHEN t.order_id ~ '^[0-9]{1,9}$' THEN t.order_id::INTEGER END AS order_key,
+            t.from_statuses, t.patch, t.ordinality
+        FROM ROWS FROM (
+            jsonb_to_recordset(transitions) AS (order_id TEXT, from_statuses TEXT[], patch JSONB)
+        ) WITH ORDINALITY AS t(order_id, from_statuses, patch, ordinality)
+    ),
+    updated AS (
+        UPDATE orders o SET
+            status = COALESCE(r.patch->>'status', o.status),
+            submitted_at = COALESCE((r.patch->>'submitted_at')::TIMESTAMPTZ, o.submitted_at),
+            is_deleted = COALESCE((r.patch->>'is_deleted')::BOOLEAN, o.is_deleted),
+            deleted_at = COALESCE((r.patch->>'deleted_at')::TIMESTAMPTZ, o.deleted_at)
+        FROM requested r
+        WHERE o.id = r.order_key
+        AND o.is_deleted = FALSE
+        AND o.status = ANY(r.from_statuses)
+        RETURNING o.id AS order_key, o.status, o.order_number, o.is_deleted
+    )
+    -- orders在这里读取的是更新前的快照，用于给失败的订单报告当前状态
+    SELECT
+        r.order_id,
+        u.order_key IS NOT NULL,
+        COALESCE(u.status, o.status),
+        COALESCE(u.order_number, o.order_number),
+        COALESCE(u.is_deleted, o.is_deleted),
+        o.user_id
+    FROM requested r
+    LEFT JOIN updated u ON u.order_key = r.order_key
+    LEFT JOIN orders o ON o.id = r.order_key
+    ORDER BY r.ordinality;
+$$ LANGUAGE sql;
+
 -- 插入一些示例数据来测试
 INSERT INTO orders (
     user_id, 
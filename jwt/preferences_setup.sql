@@ -0,0 +1,113 @@
+-- 用户偏好表（Postgres）：version为行版本号，用于乐观并发控制
+-- 行版本号与 user_data_versions 中 preferences 的版本号保持一致，偏好的ETag即行版本号
+-- 需在 data_versions_setup.sql 之后执行
+CREATE TABLE IF NOT EXISTS user_preferences (
+    id BIGSERIAL PRIMARY KEY,
+    user_id VARCHAR(50) NOT NULL UNIQUE,
+    default_address TEXT NOT NULL DEFAULT '',
+    default_food_type JSONB DEFAULT '[]',
+    default_allergies JSONB DEFAULT '[]',
+    default_preferences JSONB DEFAULT '[]',
+    default_budget TEXT DEFAULT '',
+    other_allergy_text TEXT DEFAULT '',
+    other_preference_text TEXT DEFAULT '',
+    address_suggestion JSONB,
+    allergy_mask SMALLINT NOT NULL DEFAULT 0, -- 忌口位掩码，见 tag_masks_setup.sql
+    preference_mask SMALLINT NOT NULL DEFAULT 0, -- 口味偏好位掩码
+    version BIGINT NOT NULL DEFAULT 0,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- 已有的偏好表补充行版本号
+ALTER TABLE user_preferences ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 0;
+
+-- JSON Merge Patch（RFC 7386）：null删除键，对象递归合并，其他值直接替换
+CREATE OR REPLACE FUNCTION jsonb_merge_patch(target JSONB, patch JSONB)
+RETURNS JSONB AS $$
+DECLARE
+    result JSONB;
+    patch_key TEXT;
+    patch_value JSONB;
+BEGIN
+    IF patch IS NULL OR jsonb_typeof(patch) <> 'object' THEN
+        RETURN patch;
+    END IF;
+
+    result := CASE WHEN jsonb_typeof(target) = 'object' THEN target ELSE '{}'::jsonb END;
+    FOR patch_key, patch_value IN SELECT * FROM jsonb_each(patch) LOOP
+        IF jsonb_typeof(patch_value) = 'null' THEN
+            result := result - patch_key;
+        ELSE
+            result := jsonb_set(result, ARRAY[patch_key], jsonb_merge_patch(result -> patch_key, patch_value));
+        END IF;
+    END LOOP;
+    RETURN result;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+-- 带版本条件的偏好写入（一次往返）
+-- p_if_version不为空且与当前版本不一致时不写入，返回 status=conflict 和当前偏好
+-- p_replace为真时整体替换偏好字段（保存），否则按merge-patch合并（更新）；created_at始终保留
+CREATE OR REPLACE FUNCTION merge_user_preferences(
+    p_user_id VARCHAR,
+    p_patch JSONB,
+    p_if_version BIGINT DEFAULT NULL,
+    p_replace BOOLEAN DEFAULT FALSE
+)
+RETURNS JSONB AS $$
+DECLARE
+    v_patch JSONB := p_patch - ARRAY['id', 'user_id', 'version', 'created_at', 'updated_at'];
+    v_current BIGINT;
+    v_new BIGINT;
+    v_result JSONB;
+BEGIN
+    -- 锁住该用户的偏好版本号行，同一用户的并发写入在此排队
+    INSERT INTO user_data_versions AS v (user_id, scope, version)
+    VALUES (p_user_id, 'preferences', 0)
+    ON CONFLICT (user_id, scope) DO UPDATE SET version = v.version
+    RETURNING v.version INTO v_current;
+
+    IF p_if_version IS NOT NULL AND p_if_version <> v_current THEN
+        RETURN jsonb_build_object(
+            'status', 'conflict',
+            'version', v_current,
+            'preferences', (SELECT to_jsonb(p) FROM user_preferences p WHERE p.user_id = p_user_id)
+        );
+    END IF;
+
+    v_new := v_current + 1;
+
+    INSERT INTO user_preferences AS p (
+        user_id, default_address, default_food_type, default_allergies, default_preferences,
+        default_budget, other_allergy_text, other_preference_text, address_suggestion,
+        allergy_mask, preference_mask, version, created_at, updated_at
+    )
+    SELECT
+        p_user_id, COALESCE(r.default_address, ''), r.default_food_type, r.default_allergies, r.default_preferences,
+        r.default_budget, r.other_allergy_text, r.other_preference_text, r.address_suggestion,
+        COALESCE(r.allergy_mask, 0), COALESCE(r.preference_mask, 0), v_new, NOW(), NOW()
+    FROM jsonb_populate_record(NULL::user_preferences, jsonb_merge_patch('{}'::jsonb, v_patch)) r
+    ON CONFLICT (user_id) DO UPDATE SET
+        (default_address, default_food_type, default_allergies, default_preferences,
+         default_budget, other_allergy_text, other_preference_text, address_suggestion,
+         allergy_mask, preference_mask) = (
+            SELECT
+                COALESCE(r.default_address, ''), r.default_food_type, r.default_allergies, r.default_preferences,
+                r.default_budget, r.other_allergy_text, r.other_preference_text, r.address_suggestion,
+                COALESCE(r.allergy_mask, 0), COALESCE(r.preference_mask, 0)
+            FROM jsonb_populate_record(
+                NULL::user_preferences,
+                jsonb_merge_patch(CASE WHEN p_replace THEN '{}'::jsonb ELSE to_jsonb(p) END, v_patch)
+            ) r
+        ),
+        version = v_new,
+        updated_at = NOW()
+    RETURNING to_jsonb(p) INTO v_result;
+
+    UPDATE user_data_versions SET version = v_new
+    WHERE user_id = p_user_id AND scope = 'preferences';
+
+    RETURN jsonb_build_object('status', 'ok', 'version', v_new, 'preferences', v_result);
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,32 @@
+#!/bin/bash
+
+# API服务平滑重载脚本
+# 向主进程发送USR2启动加载新代码的主进程，新进程就绪后TERM旧主进程；
+# 两个主进程共享监听端口，旧进程停止接收新连接并等待进行中的请求完成
+
+PIDFILE="${API_PIDFILE:-gunicorn.pid}"
+WAIT_SECONDS="${API_RELOAD_WAIT:-60}"
+
+if [ ! -f "$PIDFILE" ]; then
+    echo "错误: 找不到 $PIDFILE，服务是否已通过 start_api.sh 启动？"
+    exit 1
+fi
+
+OLD_PID=$(cat "$PIDFILE")
+echo "🔄 平滑重载: 旧主进程 $OLD_PID"
+kill -USR2 "$OLD_PID" || exit 1
+
+# 新主进程加载完应用后写入 <pidfile>.2，旧主进程退出后它会改名为 <pidfile>
+for _ in $(seq "$WAIT_SECONDS"); do
+    sleep 1
+    NEW_PID=$(cat "$PIDFILE.2" 2>/dev/null)
+    if [ -n "$NEW_PID" ] && kill -0 "$NEW_PID" 2>/dev/null; then
+        echo "✅ 新主进程已启动: $NEW_PID"
+        kill -TERM "$OLD_PID"
+        echo "🛑 旧主进程 $OLD_PID 停止接收新请求，等待进行中的请求完成"
+        exit 0
+    fi
+done
+
+echo "❌ 新主进程未在 ${WAIT_SECONDS} 秒内就绪，旧主进程继续运行"
+exit 1
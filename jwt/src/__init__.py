@@ -1,13 +1,28 @@
 """
 主模块入口
+服务和蓝图在第一次访问时才导入对应的子模块，导入src或其中单个子模块时不会加载整个应用。
+config和storage与子包同名，子包导入后会覆盖包属性，所以直接导入（两者导入时都不创建连接）
 """
+import importlib
 from .config import config, db_config
 from .storage import storage
-from .services import auth_service, order_service, invite_service, preferences_service
-from .routes import auth_bp, order_bp, invite_bp, common_bp, preferences_bp
-
-__all__ = [
-    'config', 'db_config', 'storage',
-    'auth_service', 'order_service', 'invite_service', 'preferences_service',
-    'auth_bp', 'order_bp', 'invite_bp', 'common_bp', 'preferences_bp'
-]
\ No newline at end of file
+
+_EXPORTS = {
+    'auth_service': '.services', 'order_service': '.services',
+    'invite_service': '.services', 'preferences_service': '.services',
+    'auth_bp': '.routes', 'order_bp': '.routes', 'invite_bp': '.routes', 'common_bp': '.routes',
+    'preferences_bp': '.routes', 'analytics_bp': '.routes', 'events_bp': '.routes', 'batch_bp': '.routes',
+    'metrics_bp': '.routes'
+}
+
+__all__ = ['config', 'db_config', 'storage'] + list(_EXPORTS)
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,6 @@
+"""
+ASGI模块导出
+"""
+from .app import create_asgi_app
+
+__all__ = ['create_asgi_app']
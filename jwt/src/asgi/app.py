@@ -0,0 +1,82 @@
+"""
+ASGI应用
+热点路由由异步处理函数直接处理，其余路由回退到Flask应用（在有界线程池中执行）
+"""
+import contextlib
+import time
+from flask import Flask
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.routing import Mount, Route
+from a2wsgi import WSGIMiddleware
+from ..config import config
+from ..storage.async_storage import close_async_storage
+from ..utils.sms import close_sms_client
+from ..utils.metrics import record_request
+from . import routes
+
+# 与异步路由同前缀、但只由Flask处理的路径
+FLASK_ONLY_PATHS = ('/orders/search', '/orders/export')
+
+class MetricsMiddleware:
+    """记录异步路由的请求耗时和状态码（回退到Flask的请求由Flask记录）"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+
+        async def send_with_metrics(message):
+            # 路由匹配后Starlette把处理函数写入scope；SSE等流式响应记录到返回响应头为止
+            if message['type'] == 'http.response.start':
+                endpoint = scope.get('endpoint')
+                if getattr(endpoint, '__module__', None) == routes.__name__:
+                    record_request(f"asgi.{endpoint.__name__}", scope['method'], message['status'],
+                                   time.perf_counter() - start)
+            await send(message)
+
+        await self.app(scope, receive, send_with_metrics)
+
+def create_asgi_app(flask_app: Flask) -> Starlette:
+    """构建ASGI应用
+
+    异步路由与Flask路由的请求/响应格式一致；未列出的路由交给Flask处理，
+    因此两种部署方式对客户端是同一套接口。
+    """
+    fallback = WSGIMiddleware(flask_app, workers=config.ASGI_WSGI_THREADS)
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        yield
+        await close_async_storage()
+        await close_sms_client()
+
+    return Starlette(
+        routes=[
+            *[Route(path, fallback) for path in FLASK_ONLY_PATHS],
+            Route('/send-verification-code', routes.send_verification_code, methods=['POST']),
+            Route('/orders/{user_id}', routes.user_orders, methods=['GET']),
+            Route('/preferences/{user_id}/complete', routes.preferences_completeness, methods=['GET']),
+            Route('/preferences/{user_id}/form-data', routes.preferences_form_data, methods=['GET']),
+            Route('/events/{user_id}', routes.user_events, methods=['GET']),
+            Mount('/', app=fallback)
+        ],
+        middleware=[
+            Middleware(MetricsMiddleware),
+            Middleware(
+                CORSMiddleware,
+                allow_origins=config.CORS_ORIGINS,
+                allow_methods=config.CORS_METHODS,
+                allow_headers=config.CORS_ALLOW_HEADERS,
+                expose_headers=config.CORS_EXPOSE_HEADERS,
+                allow_credentials=True
+            )
+        ],
+        lifespan=lifespan
+    )
@@ -0,0 +1,182 @@
+"""
+ASGI异步路由
+请求和响应格式与对应的Flask路由一致，等待存储和短信服务时不占用线程
+"""
+import logging
+import asyncio
+from typing import Any, Dict, Optional
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+from werkzeug.http import parse_accept_header, parse_etags, quote_etag, unquote_etag
+from ..config import config
+from ..services import auth_service, order_service, preferences_service
+from ..storage import get_async_storage
+from ..utils.compression import compress_body, negotiate_encoding
+from ..utils.etag import encoded_etag, is_version_stale, make_etag, matching_etag
+from ..utils.json_provider import dumps_bytes
+from ..utils.pubsub import event_hub, format_sse, user_orders_topic, FREE_DRINKS_TOPIC
+
+logger = logging.getLogger(__name__)
+
+def json_response(body: Dict[str, Any], status_code: int = 200) -> Response:
+    """JSON响应（与jsonify输出一致）"""
+    return Response(dumps_bytes(body) + b'\n', status_code=status_code, media_type='application/json')
+
+def error_response(e: Exception) -> Response:
+    """服务器错误响应"""
+    return json_response({"success": False, "message": f"服务器错误: {str(e)}"}, 500)
+
+def compressed(request: Request, response: Response) -> Response:
+    """按Accept-Encoding压缩响应（阈值、级别和压缩缓存与Flask模式共用）"""
+    response.headers.add_vary_header('Accept-Encoding')
+    if response.status_code != 200 or len(response.body) < config.COMPRESS_MIN_SIZE:
+        return response
+
+    encoding = negotiate_encoding(parse_accept_header(request.headers.get('accept-encoding')))
+    if encoding is None:
+        return response
+
+    etag = response.headers.get('etag')
+    full_path = f"{request.url.path}?{request.url.query}"
+    cache_key = (request.method, full_path, 200, unquote_etag(etag)[0], encoding) if etag else None
+
+    body = compress_body(response.body, encoding, cache_key)
+    if len(body) >= len(response.body):
+        return response
+
+    response.body = body
+    response.headers['Content-Length'] = str(len(body))
+    response.headers['Content-Encoding'] = encoding
+    if etag:
+        tag, weak = unquote_etag(etag)
+        response.headers['ETag'] = quote_etag(encoded_etag(tag, encoding), weak)
+    return response
+
+async def data_version(user_id: str, scope: str) -> Optional[int]:
+    """读取用户数据版本号，失败或版本号递增失败过时返回None（不做条件请求处理）"""
+    if is_version_stale(user_id, scope):
+        return None
+    try:
+        return await get_async_storage().get_data_version(str(user_id), scope)
+    except Exception as e:
+        logger.error("❌ 数据版本号读取失败: %s/%s - %s", user_id, scope, e)
+        return None
+
+def with_etag(response: Response, scope: str, version: Optional[int]) -> Response:
+    """在200/304响应上附加ETag（同etag_versioned）"""
+    if version is not None and response.status_code in (200, 304):
+        response.headers['ETag'] = quote_etag(make_etag(scope, version))
+        response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def not_modified(request: Request, scope: str, version: Optional[int]) -> Optional[Response]:
+    """If-None-Match匹配当前版本时返回304响应，否则返回None"""
+    if version is None:
+        return None
+    matched = matching_etag(parse_etags(request.headers.get('if-none-match')), make_etag(scope, version))
+    if not matched:
+        return None
+    response = with_etag(Response(status_code=304), scope, version)
+    response.headers['ETag'] = quote_etag(matched)
+    return response
+
+async def send_verification_code(request: Request) -> Response:
+    """发送验证码API"""
+    logger.debug("📱 收到发送验证码请求 - Origin: %s", request.headers.get('origin', 'Unknown'))
+    try:
+        data = await request.json()
+        result = await auth_service.send_verification_code_async(data.get('phone_number'))
+        return json_response(result, 200 if result["success"] else 400)
+    except Exception as e:
+        logger.error("❌ 服务器错误: %s", e)
+        return error_response(e)
+
+async def user_orders(request: Request) -> Response:
+    """获取用户订单列表API（查询参数: limit、cursor）"""
+    user_id = request.path_params['user_id']
+    version = await data_version(user_id, 'orders')
+    cached = not_modified(request, 'orders', version)
+    if cached is not None:
+        return cached
+
+    try:
+        limit = request.query_params.get('limit')
+        limit = int(limit) if limit and limit.lstrip('-').isdigit() else None
+        result = await order_service.get_user_orders_async(user_id, request.query_params.get('cursor'), limit)
+        response = json_response(result, 200 if result["success"] else 400)
+        return compressed(request, with_etag(response, 'orders', version))
+    except Exception as e:
+        logger.error("❌ 获取订单API错误: %s", e)
+        return error_response(e)
+
+async def _preferences_read_model(request: Request, field: str) -> Response:
+    """返回偏好读模型中预先序列化的响应体"""
+    user_id = request.path_params['user_id']
+    version = await data_version(user_id, 'preferences')
+    cached = not_modified(request, 'preferences', version)
+    if cached is not None:
+        return cached
+
+    try:
+        entry = await preferences_service.get_read_model_async(user_id, version)
+        response = Response(entry[field], media_type='application/json')
+        return compressed(request, with_etag(response, 'preferences', version))
+    except Exception as e:
+        logger.error("❌ 获取偏好读模型异常: %s", e)
+        return error_response(e)
+
+async def preferences_completeness(request: Request) -> Response:
+    """检查用户偏好是否完整"""
+    return await _preferences_read_model(request, 'complete_json')
+
+async def preferences_form_data(request: Request) -> Response:
+    """获取用户偏好并转换为表单数据格式"""
+    return await _preferences_read_model(request, 'form_data_json')
+
+async def user_events(request: Request) -> Response:
+    """订阅订单状态和免单名额变化的SSE流（每个连接只占用一个协程）"""
+    user_id = request.path_params['user_id']
+    loop = asyncio.get_running_loop()
+    wakeup = asyncio.Event()
+
+    def notify():
+        # 发布方可能在其他线程，通过事件循环唤醒
+        try:
+            loop.call_soon_threadsafe(wakeup.set)
+        except RuntimeError:
+            pass
+
+    subscription = event_hub.subscribe([user_orders_topic(user_id), FREE_DRINKS_TOPIC], notify=notify,
+                                       limit=config.SSE_MAX_SUBSCRIBERS)
+    if subscription is None:
+        return json_response({"success": False, "message": "订阅连接数已满，请稍后重试"}, 503)
+    logger.debug("📡 SSE订阅: %s (当前连接数: %s)", user_id, event_hub.subscriber_count())
+
+    async def stream():
+        try:
+            yield "retry: 5000\n: connected\n\n"
+            while not subscription.closed:
+                message = subscription.get_nowait()
+                if message is None:
+                    # 先清除再检查一次，避免错过清除前到达的事件
+                    wakeup.clear()
+                    message = subscription.get_nowait()
+                if message is not None:
+                    yield format_sse(message)
+                    continue
+                try:
+                    await asyncio.wait_for(wakeup.wait(), config.SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+        finally:
+            event_hub.unsubscribe(subscription)
+            logger.debug("📡 SSE断开: %s", user_id)
+
+    return StreamingResponse(
+        stream(),
+        media_type='text/event-stream',
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
@@ -1,48 +1,66 @@
 """
 数据库连接配置模块
+supabase客户端在第一次使用时才导入和创建；fork出的子进程会丢弃父进程的客户端，
+在子进程中重新创建，不与父进程共享连接。
 """
-try:
-    from supabase import create_client, Client
-    SUPABASE_AVAILABLE = True
-except ImportError:
-    SUPABASE_AVAILABLE = False
-    Client = None
-
+import logging
+import importlib.util
+import os
+import threading
 from .settings import config
 
+logger = logging.getLogger(__name__)
+
+SUPABASE_AVAILABLE = importlib.util.find_spec("supabase") is not None
+
 class DatabaseConfig:
     """数据库配置类"""
-    
+
     def __init__(self):
         self.supabase_client = None
-        self._initialize_database()
-    
+        self._initialized = False
+        self._lock = threading.Lock()
+
     def _initialize_database(self):
         """初始化数据库连接"""
         if not config.is_development_mode and SUPABASE_AVAILABLE:
             try:
-                self.supabase_client: Client = create_client(
-                    config.SUPABASE_URL, 
+                from supabase import create_client
+                self.supabase_client = create_client(
+                    config.SUPABASE_URL,
                     config.SUPABASE_KEY
                 )
-                print("✅ Supabase连接已建立")
+                logger.info("✅ Supabase连接已建立")
             except Exception as e:
-                print(f"❌ Supabase连接失败: {e}")
+                logger.error("❌ Supabase连接失败: %s", e)
                 self.supabase_client = None
         else:
             if not SUPABASE_AVAILABLE:
-                print("⚠️  Supabase模块未安装，将使用开发模式")
+                logger.warning("⚠️  Supabase模块未安装，将使用开发模式")
             else:
-                print("⚠️  开发模式：未配置真实的Supabase，将使用模拟数据")
+                logger.warning("⚠️  开发模式：未配置真实的Supabase，将使用模拟数据")
             self.supabase_client = None
-    
+
     def get_client(self):
-        """获取Supabase客户端"""
+        """获取Supabase客户端（当前进程首次调用时创建）"""
+        if not self._initialized:
+            with self._lock:
+                if not self._initialized:
+                    self._initialize_database()
+                    self._initialized = True
         return self.supabase_client
-    
+
     def is_connected(self):
         """检查是否已连接数据库"""
-        return self.supabase_client is not None
+        return self.get_client() is not None
+
+    def reset(self):
+        """丢弃当前客户端，下次使用时重新创建（fork后在子进程中调用）"""
+        self.supabase_client = None
+        self._initialized = False
+        self._lock = threading.Lock()
 
 # 全局数据库配置实例
-db_config = DatabaseConfig()
\ No newline at end of file
+db_config = DatabaseConfig()
+
+os.register_at_fork(after_in_child=db_config.reset)
@@ -26,6 +26,12 @@ class Config:
         "http://localhost:3000", 
         "http://localhost:19006"
     ]
+    CORS_METHODS = ["GET", "POST", "PUT", "DELETE", "OPTIONS"]
+    CORS_ALLOW_HEADERS = ["Content-Type", "Authorization", "Idempotency-Key", "If-None-Match", "If-Match"]
+    CORS_EXPOSE_HEADERS = ["Idempotent-Replayed", "ETag"]
+    
+    # 管理接口令牌（批量状态转换、导出、检索、分析）；为空时这些接口一律返回403
+    ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN", "")
     
     # API配置
     API_HOST = "0.0.0.0"
@@ -39,6 +45,86 @@ class Config:
     DEV_VERIFICATION_CODE = "100000"
     DEV_INVITE_CODES = ['1234', 'WELCOME', 'LANDE', 'OMNILAZE', 'ADVX2025']
     
+    # 用户序号分段租用配置（每个进程每次从计数器租用的序号数量）
+    USER_SEQUENCE_BLOCK_SIZE = int(os.getenv("USER_SEQUENCE_BLOCK_SIZE", "20"))
+    
+    # 用户序号缓存容量（创建订单时避免回查users表）
+    USER_SEQUENCE_CACHE_SIZE = int(os.getenv("USER_SEQUENCE_CACHE_SIZE", "100000"))
+    
+    # 偏好读模型缓存容量（预先序列化的 /complete 和 /form-data 响应）
+    PREFERENCES_READ_MODEL_SIZE = int(os.getenv("PREFERENCES_READ_MODEL_SIZE", "100000"))
+    
+    # 幂等键配置：已完成响应的保存时间；处理中请求的租约（需大于工作进程超时，过期后重试可接管）
+    IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+    IDEMPOTENCY_LEASE_SECONDS = int(os.getenv("IDEMPOTENCY_LEASE_SECONDS", "90"))
+    IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "10000"))
+    
+    # 批量订单状态转换的单次上限
+    ORDER_BULK_TRANSITION_MAX = int(os.getenv("ORDER_BULK_TRANSITION_MAX", "500"))
+    
+    # 用户订单列表分页
+    ORDER_PAGE_SIZE = int(os.getenv("ORDER_PAGE_SIZE", "50"))
+    ORDER_PAGE_MAX = int(os.getenv("ORDER_PAGE_MAX", "200"))
+    
+    # 订单归档：已完成/已取消订单保留在热表的天数，以及每批移动的行数
+    ORDER_ARCHIVE_AFTER_DAYS = int(os.getenv("ORDER_ARCHIVE_AFTER_DAYS", "180"))
+    ORDER_ARCHIVE_BATCH_SIZE = int(os.getenv("ORDER_ARCHIVE_BATCH_SIZE", "500"))
+    
+    # 订单导出每页读取的行数
+    ORDER_EXPORT_PAGE_SIZE = int(os.getenv("ORDER_EXPORT_PAGE_SIZE", "1000"))
+    
+    # 订单分析快照的最短增量刷新间隔（秒）
+    ANALYTICS_REFRESH_SECONDS = float(os.getenv("ANALYTICS_REFRESH_SECONDS", "30"))
+    
+    # 客服订单检索索引的最短增量刷新间隔（秒）
+    SEARCH_REFRESH_SECONDS = float(os.getenv("SEARCH_REFRESH_SECONDS", "2"))
+    
+    # 地址联想：每个前缀缓存的地址数量，以及前缀树的增量同步间隔（秒）
+    ADDRESS_SUGGEST_TOP_K = int(os.getenv("ADDRESS_SUGGEST_TOP_K", "10"))
+    ADDRESS_REFRESH_SECONDS = float(os.getenv("ADDRESS_REFRESH_SECONDS", "10"))
+    
+    # 检索/分析/地址索引增量同步时，从水位线往前重读的秒数：
+    # 晚提交的事务（时间戳取事务开始时刻）和应用服务器时钟偏慢时写入的行，时间戳会落在水位线之前
+    INDEX_SYNC_OVERLAP_SECONDS = float(os.getenv("INDEX_SYNC_OVERLAP_SECONDS", "120"))
+    
+    # SSE事件推送配置：每个工作进程的连接上限（默认值按asgi模式设定，wsgi模式由gunicorn.conf.py限制为线程数的1/4）
+    SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+    SSE_MAX_SUBSCRIBERS = int(os.getenv("SSE_MAX_SUBSCRIBERS", "5000"))
+    
+    # 跨进程事件转发：Postgres连接串（为空表示只在进程内分发）、NOTIFY频道、待发送事件的队列长度
+    EVENTS_DATABASE_URL = os.getenv("EVENTS_DATABASE_URL", "")
+    EVENTS_CHANNEL = os.getenv("EVENTS_CHANNEL", "app_events")
+    EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "10000"))
+    
+    # 响应压缩：小于该字节数的响应不压缩；按ETag缓存的压缩结果条数
+    COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+    COMPRESS_CACHE_SIZE = int(os.getenv("COMPRESS_CACHE_SIZE", "1024"))
+    
+    # 批量请求：单次最多子请求数，以及并发执行子请求的线程数
+    BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "20"))
+    BATCH_MAX_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", "8"))
+    
+    # ASGI模式：回退到Flask路由的线程数，以及没有异步实现的存储方法使用的线程数
+    ASGI_WSGI_THREADS = int(os.getenv("ASGI_WSGI_THREADS", "32"))
+    ASGI_BLOCKING_THREADS = int(os.getenv("ASGI_BLOCKING_THREADS", "32"))
+
+    # 日志配置：级别、输出格式（text或json）、队列长度（队列满时丢弃而不阻塞请求）
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+    LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+    # DEBUG日志按路由采样的比例，以及按路由覆盖的比例（格式: order.get_user_orders=0.01,auth.login=1）
+    LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1"))
+    LOG_ROUTE_SAMPLE_RATES = {
+        route.strip(): float(rate)
+        for route, _, rate in (item.partition("=") for item in os.getenv("LOG_ROUTE_SAMPLE_RATES", "").split(","))
+        if route.strip() and rate
+    }
+
+    # 指标：多进程部署时各工作进程写入快照的目录（为空表示单进程），以及写入间隔（秒）
+    METRICS_DIR = os.getenv("METRICS_DIR", "")
+    METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+
     @property
     def is_development_mode(self):
         """判断是否为开发模式"""
@@ -6,5 +6,9 @@ from .order_routes import order_bp
 from .invite_routes import invite_bp
 from .common_routes import common_bp
 from .preferences_routes import preferences_bp
+from .analytics_routes import analytics_bp
+from .events_routes import events_bp
+from .batch_routes import batch_bp
+from .metrics_routes import metrics_bp
 
-__all__ = ['auth_bp', 'order_bp', 'invite_bp', 'common_bp', 'preferences_bp']
\ No newline at end of file
+__all__ = ['auth_bp', 'order_bp', 'invite_bp', 'common_bp', 'preferences_bp', 'analytics_bp', 'events_bp', 'batch_bp', 'metrics_bp']
\ No newline at end of file
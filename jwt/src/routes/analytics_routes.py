@@ -0,0 +1,83 @@
+"""
+订单分析相关API路由
+"""
+import logging
+from flask import Blueprint, request, jsonify
+from ..services import analytics_service
+from ..utils.admin import admin_required
+
+logger = logging.getLogger(__name__)
+
+# 创建分析蓝图
+analytics_bp = Blueprint('analytics', __name__)
+
+def _query_params():
+    """读取通用的过滤参数"""
+    return {
+        'start_date': request.args.get('start_date'),
+        'end_date': request.args.get('end_date'),
+        'status': request.args.get('status'),
+        'allergy': request.args.get('allergy'),
+        'no_allergy': request.args.get('no_allergy'),
+        'preference': request.args.get('preference'),
+        'no_preference': request.args.get('no_preference')
+    }
+
+@analytics_bp.route('/analytics/orders/rollup', methods=['GET'])
+@admin_required
+def api_order_rollup():
+    """订单分组汇总API（group_by: day,status,rating 任意组合；可按 allergy/no_allergy/preference/no_preference 筛选）"""
+    try:
+        group_by = [field for field in request.args.get('group_by', 'day').split(',') if field]
+        result = analytics_service.order_rollup(group_by, _query_params())
+        
+        status_code = 200 if result["success"] else 400
+        return jsonify(result), status_code
+        
+    except Exception as e:
+        logger.error("❌ 订单汇总API错误: %s", e)
+        return jsonify({"success": False, "message": f"服务器错误: {str(e)}"}), 500
+
+@analytics_bp.route('/analytics/orders/budget', methods=['GET'])
+@admin_required
+def api_budget_distribution():
+    """预算分布API"""
+    try:
+        bins = min(max(int(request.args.get('bins', 10)), 1), 100)
+        result = analytics_service.budget_distribution(_query_params(), bins)
+        
+        status_code = 200 if result["success"] else 400
+        return jsonify(result), status_code
+        
+    except Exception as e:
+        logger.error("❌ 预算分布API错误: %s", e)
+        return jsonify({"success": False, "message": f"服务器错误: {str(e)}"}), 500
+
+@analytics_bp.route('/analytics/orders/tags', methods=['GET'])
+@admin_required
+def api_tag_frequencies():
+    """忌口和偏好频次API"""
+    try:
+        result = analytics_service.tag_frequencies(_query_params())
+        
+        status_code = 200 if result["success"] else 400
+        return jsonify(result), status_code
+        
+    except Exception as e:
+        logger.error("❌ 标签频次API错误: %s", e)
+        return jsonify({"success": False, "message": f"服务器错误: {str(e)}"}), 500
+
+@analytics_bp.route('/analytics/users/cohort', methods=['GET'])
+@admin_required
+def api_user_cohort():
+    """按忌口/偏好筛选用户API（allergy、no_allergy、preference、no_preference，逗号分隔）"""
+    try:
+        limit = min(max(int(request.args.get('limit', 100)), 1), 1000)
+        result = analytics_service.user_cohort(_query_params(), limit)
+        
+        status_code = 200 if result["success"] else 400
+        return jsonify(result), status_code
+        
+    except Exception as e:
+        logger.error("❌ 用户人群API错误: %s", e)
+        return jsonify({"success": False, "message": f"服务器错误: {str(e)}"}), 500
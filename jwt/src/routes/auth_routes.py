@@ -1,30 +1,31 @@
 """
 认证相关API路由
 """
+import logging
 from flask import Blueprint, request, jsonify
 from ..services import auth_service
 
+logger = logging.getLogger(__name__)
+
 # 创建认证蓝图
 auth_bp = Blueprint('auth', __name__)
 
 @auth_bp.route('/send-verification-code', methods=['POST'])
 def api_send_verification_code():
     """发送验证码API"""
-    print(f"📱 收到发送验证码请求 - Origin: {request.headers.get('Origin', 'Unknown')}")
+    logger.debug("📱 收到发送验证码请求 - Origin: %s", request.headers.get('Origin', 'Unknown'))
     
     try:
         data = request.get_json()
         phone_number = data.get('phone_number')
         
-        print(f"📱 手机号: {phone_number}")
-        
         result = auth_service.send_verification_code(phone_number)
         
         status_code = 200 if result["success"] else 400
         return jsonify(result), status_code
         
     except Exception as e:
-        print(f"❌ 服务器错误: {str(e)}")
+        logger.error("❌ 服务器错误: %s", e)
         return jsonify({"success": False, "message": f"服务器错误: {str(e)}"}), 500
 
 @auth_bp.route('/login-with-phone', methods=['POST'])
@@ -41,7 +42,7 @@ def api_login_with_phone():
         return jsonify(result), status_code
         
     except Exception as e:
-        print(f"❌ 登录API错误: {str(e)}")
+        logger.error("❌ 登录API错误: %s", e)
         return jsonify({"success": False, "message": f"服务器错误: {str(e)}"}), 500
 
 @auth_bp.route('/verify-invite-code', methods=['POST'])
@@ -58,5 +59,5 @@ def api_verify_invite_code():
         return jsonify(result), status_code
         
     except Exception as e:
-        print(f"❌ 邀请码验证API错误: {str(e)}")
+        logger.error("❌ 邀请码验证API错误: %s", e)
         return jsonify({"success": False, "message": f"服务器错误: {str(e)}"}), 500
\ No newline at end of file
@@ -0,0 +1,133 @@
+"""
+批量请求API路由
+一次HTTP请求执行多个子请求：子请求在进程内分发给已有路由，
+连续的GET并发执行，写请求按顺序执行并作为分隔点
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from flask import Blueprint, Flask, request, jsonify, current_app
+from werkzeug.test import EnvironBuilder
+from ..config import config
+
+logger = logging.getLogger(__name__)
+
+# 创建批量请求蓝图
+batch_bp = Blueprint('batch', __name__)
+
+# 子请求允许的方法
+BATCH_METHODS = ('GET', 'POST', 'PUT', 'DELETE')
+
+# 不能放进批量请求的路径（流式响应和嵌套批量）
+BATCH_EXCLUDED_PREFIXES = ('/batch', '/events/', '/orders/export')
+
+# 从外层请求转发给子请求的请求头
+FORWARDED_HEADERS = ('Authorization', 'Origin')
+
+# 子请求可以自带的请求头
+SUB_REQUEST_HEADERS = ('If-None-Match', 'If-Match', 'Idempotency-Key')
+
+# 子请求线程池（子请求在独立线程中有自己的请求上下文）
+batch_executor = ThreadPoolExecutor(max_workers=config.BATCH_MAX_WORKERS, thread_name_prefix='batch')
+
+def _validate_sub_requests(items: Any) -> Optional[str]:
+    """校验子请求列表，返回错误信息或None"""
+    if not isinstance(items, list) or not items:
+        return "requests必须是非空数组"
+    if len(items) > config.BATCH_MAX_REQUESTS:
+        return f"单次最多{config.BATCH_MAX_REQUESTS}个子请求"
+
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            return f"第{index + 1}个子请求格式无效"
+        path = item.get('path')
+        if not isinstance(path, str) or not path.startswith('/'):
+            return f"第{index + 1}个子请求缺少有效的path"
+        if path.startswith(BATCH_EXCLUDED_PREFIXES):
+            return f"不支持批量调用: {path}"
+        if str(item.get('method', 'GET')).upper() not in BATCH_METHODS:
+            return f"第{index + 1}个子请求方法无效"
+        if item.get('headers') is not None and not isinstance(item.get('headers'), dict):
+            return f"第{index + 1}个子请求headers格式无效"
+    return None
+
+def _dispatch(app: Flask, item: Dict[str, Any], forwarded: Dict[str, str]) -> Dict[str, Any]:
+    """在独立的请求上下文中执行一个子请求"""
+    headers = dict(forwarded)
+    for name, value in (item.get('headers') or {}).items():
+        if name in SUB_REQUEST_HEADERS:
+            headers[name] = str(value)
+
+    path, _, query_string = item['path'].partition('?')
+    builder = EnvironBuilder(
+        path=path,
+        query_string=query_string,
+        method=str(item.get('method', 'GET')).upper(),
+        headers=headers,
+        json=item.get('body')
+    )
+    try:
+        environ = builder.get_environ()
+    finally:
+        builder.close()
+
+    result = {'id': item.get('id'), 'status': 500, 'body': None}
+    try:
+        with app.request_context(environ):
+            response = app.full_dispatch_request()
+            result['status'] = response.status_code
+            if response.is_json:
+                result['body'] = response.get_json()
+            elif response.status_code != 304:
+                result['body'] = response.get_data(as_text=True)
+            if response.headers.get('ETag'):
+                result['etag'] = response.headers['ETag']
+    except Exception as e:
+        logger.error("❌ 批量子请求异常: %s - %s", item['path'], e)
+        result['body'] = {"success": False, "message": f"服务器错误: {str(e)}"}
+    return result
+
+def run_batch(app: Flask, items: List[Dict[str, Any]], forwarded: Dict[str, str]) -> List[Dict[str, Any]]:
+    """执行子请求：连续的GET并发执行，遇到写请求先等前面的读完成再单独执行"""
+    results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+    pending = []
+
+    def drain():
+        for index, future in pending:
+            results[index] = future.result()
+        pending.clear()
+
+    for index, item in enumerate(items):
+        if str(item.get('method', 'GET')).upper() == 'GET':
+            pending.append((index, batch_executor.submit(_dispatch, app, item, forwarded)))
+            continue
+        drain()
+        results[index] = batch_executor.submit(_dispatch, app, item, forwarded).result()
+    drain()
+
+    return results
+
+@batch_bp.route('/batch', methods=['POST'])
+def api_batch():
+    """批量请求API
+
+    请求体: {"requests": [{"id": "stats", "method": "GET", "path": "/get-user-invite-stats?user_id=..."}, ...]}
+    返回: {"success": true, "responses": [{"id", "status", "body", "etag"}, ...]}，顺序与请求一致
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        items = data.get('requests')
+
+        error = _validate_sub_requests(items)
+        if error:
+            return jsonify({"success": False, "message": error}), 400
+
+        forwarded = {name: request.headers[name] for name in FORWARDED_HEADERS if name in request.headers}
+        responses = run_batch(current_app._get_current_object(), items, forwarded)
+        logger.debug("📦 批量请求: %s 个子请求", len(items))
+
+        return jsonify({"success": True, "responses": responses}), 200
+
+    except Exception as e:
+        logger.error("❌ 批量请求异常: %s", e)
+        return jsonify({"success": False, "message": f"服务器错误: {str(e)}"}), 500
@@ -1,9 +1,13 @@
 """
 通用API路由
 """
-from flask import Blueprint, jsonify
+import logging
+from flask import Blueprint, request, jsonify
 from ..config import config
 from ..storage import storage
+from ..services import address_service
+
+logger = logging.getLogger(__name__)
 
 # 创建通用蓝图
 common_bp = Blueprint('common', __name__)
@@ -17,4 +21,18 @@ def health_check():
         "cors_origins": config.CORS_ORIGINS,
         "development_mode": config.is_development_mode,
         "free_drinks_remaining": storage.get_free_drinks_remaining() if config.is_development_mode else "unknown"
-    }), 200
\ No newline at end of file
+    }), 200
+
+@common_bp.route('/addresses/suggest', methods=['GET'])
+def api_suggest_addresses():
+    """地址联想API（user_id: 当前用户；q: 输入的地址前缀；只返回该用户用过的地址，按使用频率和新近程度排序）"""
+    try:
+        limit = min(max(request.args.get('limit', 8, type=int), 1), config.ADDRESS_SUGGEST_TOP_K)
+        result = address_service.suggest(request.args.get('user_id'), request.args.get('q', ''), limit)
+        
+        status_code = 200 if result["success"] else 400
+        return jsonify(result), status_code
+        
+    except Exception as e:
+        logger.error("❌ 地址联想API错误: %s", e)
+        return jsonify({"success": False, "message": f"服务器错误: {str(e)}"}), 500
@@ -0,0 +1,49 @@
+"""
+服务端事件推送（SSE）API路由
+"""
+import logging
+from flask import Blueprint, jsonify, Response, stream_with_context
+from ..config import config
+from ..utils.pubsub import event_hub, format_sse, user_orders_topic, FREE_DRINKS_TOPIC
+
+logger = logging.getLogger(__name__)
+
+# 创建事件蓝图
+events_bp = Blueprint('events', __name__)
+
+@events_bp.route('/events/<user_id>', methods=['GET'])
+def api_user_events(user_id):
+    """订阅订单状态和免单名额变化的SSE流
+
+    事件类型: order_created, order_status, order_updated, free_drink_claimed, free_drinks_quota
+    空闲时每隔SSE_HEARTBEAT_SECONDS发送一行注释保持连接
+    """
+    subscription = event_hub.subscribe([user_orders_topic(user_id), FREE_DRINKS_TOPIC],
+                                       limit=config.SSE_MAX_SUBSCRIBERS)
+    if subscription is None:
+        return jsonify({"success": False, "message": "订阅连接数已满，请稍后重试"}), 503
+    logger.debug("📡 SSE订阅: %s (当前连接数: %s)", user_id, event_hub.subscriber_count())
+    
+    def stream():
+        try:
+            # 告诉客户端断线后的重连间隔，并立即发出首个字节
+            yield "retry: 5000\n: connected\n\n"
+            # 订阅被关闭（进程退出）时结束响应，客户端按retry间隔重连
+            while not subscription.closed:
+                message = subscription.get(config.SSE_HEARTBEAT_SECONDS)
+                if message:
+                    yield format_sse(message)
+                elif not subscription.closed:
+                    yield ": heartbeat\n\n"
+        finally:
+            event_hub.unsubscribe(subscription)
+            logger.debug("📡 SSE断开: %s", user_id)
+    
+    return Response(
+        stream_with_context(stream()),
+        mimetype='text/event-stream',
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
@@ -1,8 +1,12 @@
 """
 邀请和免单相关API路由
 """
+import logging
 from flask import Blueprint, request, jsonify
 from ..services import invite_service
+from ..utils.idempotency import idempotent
+
+logger = logging.getLogger(__name__)
 
 # 创建邀请蓝图
 invite_bp = Blueprint('invite', __name__)
@@ -18,7 +22,7 @@ def api_get_user_invite_stats():
         return jsonify(result), status_code
         
     except Exception as e:
-        print(f"❌ 获取邀请统计错误: {e}")
+        logger.error("❌ 获取邀请统计错误: %s", e)
         return jsonify({"success": False, "message": str(e)}), 500
 
 @invite_bp.route('/get-invite-progress', methods=['GET'])
@@ -32,10 +36,11 @@ def api_get_invite_progress():
         return jsonify(result), status_code
         
     except Exception as e:
-        print(f"❌ 获取邀请进度错误: {e}")
+        logger.error("❌ 获取邀请进度错误: %s", e)
         return jsonify({"success": False, "message": str(e)}), 500
 
 @invite_bp.route('/claim-free-drink', methods=['POST'])
+@idempotent
 def api_claim_free_drink():
     """领取免单奶茶API"""
     try:
@@ -48,7 +53,7 @@ def api_claim_free_drink():
         return jsonify(result), status_code
         
     except Exception as e:
-        print(f"❌ 领取免单错误: {e}")
+        logger.error("❌ 领取免单错误: %s", e)
         return jsonify({"success": False, "message": str(e)}), 500
 
 @invite_bp.route('/free-drinks-remaining', methods=['GET'])
@@ -61,5 +66,5 @@ def api_free_drinks_remaining():
         return jsonify(result), status_code
         
     except Exception as e:
-        print(f"❌ 获取免单剩余数量错误: {e}")
+        logger.error("❌ 获取免单剩余数量错误: %s", e)
         return jsonify({"success": False, "message": str(e)}), 500
\ No newline at end of file
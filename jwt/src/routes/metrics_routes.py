@@ -0,0 +1,13 @@
+"""
+指标API路由
+"""
+from flask import Blueprint, Response
+from ..utils.metrics import CONTENT_TYPE, render
+
+# 创建指标蓝图
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def api_metrics():
+    """Prometheus文本格式的指标（多进程部署时汇总所有工作进程）"""
+    return Response(render(), content_type=CONTENT_TYPE)
@@ -1,16 +1,26 @@
 """
 订单相关API路由
 """
-from flask import Blueprint, request, jsonify
-from ..services import order_service
+import logging
+from datetime import datetime
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from ..config import config
+from ..services import order_service, export_service, search_service
+from ..services.export_service import EXPORT_FORMATS
+from ..utils.admin import admin_required
+from ..utils.idempotency import idempotent
+from ..utils.etag import etag_versioned
+
+logger = logging.getLogger(__name__)
 
 # 创建订单蓝图
 order_bp = Blueprint('order', __name__)
 
 @order_bp.route('/create-order', methods=['POST'])
+@idempotent
 def api_create_order():
     """创建订单API"""
-    print(f"📋 收到创建订单请求")
+    logger.debug("📋 收到创建订单请求")
     
     try:
         data = request.get_json()
@@ -24,19 +34,20 @@ def api_create_order():
         return jsonify(result), status_code
         
     except Exception as e:
-        print(f"❌ 创建订单API错误: {str(e)}")
+        logger.error("❌ 创建订单API错误: %s", e)
         return jsonify({"success": False, "message": f"服务器错误: {str(e)}"}), 500
 
 @order_bp.route('/submit-order', methods=['POST'])
+@idempotent
 def api_submit_order():
     """提交订单API"""
-    print(f"📤 收到提交订单请求")
+    logger.debug("📤 收到提交订单请求")
     
     try:
         data = request.get_json()
         order_id = data.get('order_id')
         
-        print(f"📤 提交订单: {order_id}")
+        logger.debug("📤 提交订单: %s", order_id)
         
         result = order_service.submit_order(order_id)
         
@@ -44,13 +55,59 @@ def api_submit_order():
         return jsonify(result), status_code
         
     except Exception as e:
-        print(f"❌ 提交订单API错误: {str(e)}")
+        logger.error("❌ 提交订单API错误: %s", e)
+        return jsonify({"success": False, "message": f"服务器错误: {str(e)}"}), 500
+
+@order_bp.route('/quick-order', methods=['POST'])
+@idempotent
+def api_quick_order():
+    """按保存的偏好一键下单API（创建并提交）"""
+    logger.debug("⚡ 收到快速下单请求")
+    
+    try:
+        data = request.get_json()
+        result = order_service.quick_order(data.get('user_id'), data.get('phone_number'))
+        
+        status_code = 200 if result["success"] else 400
+        return jsonify(result), status_code
+        
+    except Exception as e:
+        logger.error("❌ 快速下单API错误: %s", e)
+        return jsonify({"success": False, "message": f"服务器错误: {str(e)}"}), 500
+
+@order_bp.route('/orders/transitions', methods=['POST'])
+@admin_required
+def api_transition_orders():
+    """批量转换订单状态API
+
+    请求体二选一：
+    - {"transitions": [{"order_id": ..., "to_status": ...}, ...]}
+    - {"order_ids": [...], "to_status": ...}
+    """
+    try:
+        data = request.get_json() or {}
+        transitions = data.get('transitions')
+        if transitions is None:
+            transitions = [
+                {'order_id': order_id, 'to_status': data.get('to_status')}
+                for order_id in data.get('order_ids', [])
+            ]
+        
+        logger.debug("🔄 收到批量订单状态转换请求: %s 个订单", len(transitions))
+        
+        result = order_service.transition_orders(transitions)
+        
+        status_code = 200 if result["success"] else 400
+        return jsonify(result), status_code
+        
+    except Exception as e:
+        logger.error("❌ 批量订单状态转换API错误: %s", e)
         return jsonify({"success": False, "message": f"服务器错误: {str(e)}"}), 500
 
 @order_bp.route('/order-feedback', methods=['POST'])
 def api_order_feedback():
     """订单反馈API"""
-    print(f"⭐ 收到订单反馈请求")
+    logger.debug("⭐ 收到订单反馈请求")
     
     try:
         data = request.get_json()
@@ -58,7 +115,7 @@ def api_order_feedback():
         rating = data.get('rating')
         feedback = data.get('feedback', '')
         
-        print(f"⭐ 订单反馈: {order_id} - 评分: {rating}")
+        logger.debug("⭐ 订单反馈: %s - 评分: %s", order_id, rating)
         
         result = order_service.update_order_feedback(order_id, rating, feedback)
         
@@ -66,18 +123,80 @@ def api_order_feedback():
         return jsonify(result), status_code
         
     except Exception as e:
-        print(f"❌ 订单反馈API错误: {str(e)}")
+        logger.error("❌ 订单反馈API错误: %s", e)
+        return jsonify({"success": False, "message": f"服务器错误: {str(e)}"}), 500
+
+@order_bp.route('/orders/export', methods=['GET'])
+@admin_required
+def api_export_orders():
+    """流式导出订单API
+
+    查询参数: start_date, end_date (YYYY-MM-DD), status, format (ndjson|csv), include_deleted
+    """
+    try:
+        export_format = request.args.get('format', 'ndjson').lower()
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({"success": False, "message": "导出格式仅支持ndjson或csv"}), 400
+        
+        is_valid, filters = export_service.build_filters(
+            request.args.get('start_date'),
+            request.args.get('end_date'),
+            request.args.get('status'),
+            request.args.get('include_deleted', 'false').lower() == 'true'
+        )
+        if not is_valid:
+            return jsonify({"success": False, "message": filters}), 400
+        
+        filename = f"orders_{datetime.now().strftime('%Y%m%d%H%M%S')}.{export_format}"
+        return Response(
+            stream_with_context(export_service.stream_orders(export_format, filters)),
+            mimetype=EXPORT_FORMATS[export_format],
+            headers={"Content-Disposition": f"attachment; filename={filename}"}
+        )
+        
+    except Exception as e:
+        logger.error("❌ 导出订单API错误: %s", e)
+        return jsonify({"success": False, "message": f"服务器错误: {str(e)}"}), 500
+
+@order_bp.route('/orders/search', methods=['GET'])
+@admin_required
+def api_search_orders():
+    """客服订单检索API
+
+    查询参数: order_number, phone_suffix, start_date, end_date (YYYY-MM-DD), status, address, include_deleted, limit
+    多个条件同时满足（AND）
+    """
+    try:
+        params = {
+            key: request.args.get(key)
+            for key in ('order_number', 'phone_suffix', 'start_date', 'end_date', 'status', 'address')
+        }
+        params['include_deleted'] = request.args.get('include_deleted', 'false').lower() == 'true'
+        limit = min(max(request.args.get('limit', 50, type=int), 1), config.ORDER_PAGE_MAX)
+        result = search_service.search_orders(params, limit)
+        
+        status_code = 200 if result["success"] else 400
+        return jsonify(result), status_code
+        
+    except Exception as e:
+        logger.error("❌ 订单检索API错误: %s", e)
         return jsonify({"success": False, "message": f"服务器错误: {str(e)}"}), 500
 
 @order_bp.route('/orders/<user_id>', methods=['GET'])
+@etag_versioned('orders')
 def api_get_user_orders(user_id):
-    """获取用户订单列表API"""
+    """获取用户订单列表API
+
+    查询参数: limit（每页条数）、cursor（上一页返回的next_cursor）
+    """
     try:
-        result = order_service.get_user_orders(user_id)
+        limit = request.args.get('limit', type=int)
+        cursor = request.args.get('cursor')
+        result = order_service.get_user_orders(user_id, cursor, limit)
         
         status_code = 200 if result["success"] else 400
         return jsonify(result), status_code
         
     except Exception as e:
-        print(f"❌ 获取订单API错误: {str(e)}")
+        logger.error("❌ 获取订单API错误: %s", e)
         return jsonify({"success": False, "message": f"服务器错误: {str(e)}"}), 500
\ No newline at end of file
@@ -1,16 +1,21 @@
 """
 用户偏好相关API路由
 """
-from flask import Blueprint, request, jsonify
+import logging
+from flask import Blueprint, request, jsonify, make_response, Response, g
 from ..services.preferences_service import preferences_service
 from ..utils import validate_request_data
+from ..utils.etag import etag_versioned, make_etag, parse_etag_version
+
+logger = logging.getLogger(__name__)
 
 preferences_bp = Blueprint('preferences', __name__)
 
 @preferences_bp.route('/preferences/<user_id>', methods=['GET'])
+@etag_versioned('preferences')
 def get_user_preferences(user_id):
     """获取用户偏好设置"""
-    print(f"🔍 获取用户偏好: {user_id}")
+    logger.debug("🔍 获取用户偏好: %s", user_id)
     
     try:
         result = preferences_service.get_user_preferences(user_id)
@@ -21,7 +26,7 @@ def get_user_preferences(user_id):
             return jsonify(result), 404
             
     except Exception as e:
-        print(f"❌ 获取用户偏好异常: {str(e)}")
+        logger.error("❌ 获取用户偏好异常: %s", e)
         return jsonify({"success": False, "message": f"服务器错误: {str(e)}"}), 500
 
 @preferences_bp.route('/preferences', methods=['POST'])
@@ -41,7 +46,7 @@ def save_user_preferences():
         user_id = data['user_id']
         form_data = data['form_data']
         
-        print(f"💾 保存用户偏好请求: {user_id}")
+        logger.debug("💾 保存用户偏好请求: %s", user_id)
         
         result = preferences_service.save_user_preferences(user_id, form_data)
         
@@ -51,35 +56,66 @@ def save_user_preferences():
             return jsonify(result), 400
             
     except Exception as e:
-        print(f"❌ 保存用户偏好异常: {str(e)}")
+        logger.error("❌ 保存用户偏好异常: %s", e)
         return jsonify({"success": False, "message": f"服务器错误: {str(e)}"}), 500
 
 @preferences_bp.route('/preferences/<user_id>', methods=['PUT'])
 def update_user_preferences(user_id):
-    """更新用户偏好设置"""
+    """更新用户偏好设置
+
+    请求体按JSON merge-patch合并（null清除字段）；
+    带If-Match时，列出的强ETag中任一与当前版本一致（*为当前存在偏好）才写入，否则返回412和当前偏好。
+    """
     try:
         data = request.get_json()
         
         if not data:
             return jsonify({"success": False, "message": "请求体不能为空"}), 400
         
-        print(f"🔄 更新用户偏好请求: {user_id}")
-        
-        result = preferences_service.update_user_preferences(user_id, data)
+        expected_version = None
+        if request.if_match:
+            # If-Match按强比较，弱ETag不参与匹配；匹配后以读到的版本作为写入条件，
+            # 读取之后的并发修改仍由存储层返回conflict
+            current = preferences_service.get_user_preferences(user_id).get("preferences")
+            if current and (request.if_match.star_tag or current["version"] in {
+                parse_etag_version('preferences', etag) for etag in request.if_match.as_set()
+            }):
+                expected_version = current["version"]
+            else:
+                response = make_response(jsonify({
+                    "success": False,
+                    "conflict": True,
+                    "message": "偏好设置已被修改，请刷新后重试" if current else "用户暂无保存的偏好设置",
+                    "preferences": current
+                }), 412)
+                if current:
+                    response.set_etag(make_etag('preferences', current["version"]))
+                return response
+        
+        logger.debug("🔄 更新用户偏好请求: %s", user_id)
+        
+        result = preferences_service.update_user_preferences(user_id, data, expected_version)
         
         if result["success"]:
-            return jsonify(result), 200
+            status_code = 200
+        elif result.get("conflict"):
+            status_code = 412
         else:
-            return jsonify(result), 400
+            status_code = 400
+        
+        response = make_response(jsonify(result), status_code)
+        if "version" in result:
+            response.set_etag(make_etag('preferences', result["version"]))
+        return response
             
     except Exception as e:
-        print(f"❌ 更新用户偏好异常: {str(e)}")
+        logger.error("❌ 更新用户偏好异常: %s", e)
         return jsonify({"success": False, "message": f"服务器错误: {str(e)}"}), 500
 
 @preferences_bp.route('/preferences/<user_id>', methods=['DELETE'])
 def delete_user_preferences(user_id):
     """删除用户偏好设置"""
-    print(f"🗑️  删除用户偏好请求: {user_id}")
+    logger.debug("🗑️  删除用户偏好请求: %s", user_id)
     
     try:
         result = preferences_service.delete_user_preferences(user_id)
@@ -90,73 +126,35 @@ def delete_user_preferences(user_id):
             return jsonify(result), 404
             
     except Exception as e:
-        print(f"❌ 删除用户偏好异常: {str(e)}")
+        logger.error("❌ 删除用户偏好异常: %s", e)
         return jsonify({"success": False, "message": f"服务器错误: {str(e)}"}), 500
 
 @preferences_bp.route('/preferences/<user_id>/complete', methods=['GET'])
+@etag_versioned('preferences')
 def check_preferences_completeness(user_id):
-    """检查用户偏好是否完整（用于判断是否可以快速下单）"""
-    print(f"✅ 检查偏好完整性: {user_id}")
-    
+    """检查用户偏好是否完整（用于判断是否可以快速下单）
+
+    直接返回读模型中预先序列化的响应体
+    """
     try:
-        # 获取用户偏好
-        preferences_result = preferences_service.get_user_preferences(user_id)
-        
-        if not preferences_result["success"]:
-            return jsonify({
-                "success": True,
-                "has_preferences": False,
-                "is_complete": False,
-                "can_quick_order": False,
-                "message": "用户暂无保存的偏好设置"
-            }), 200
-        
-        preferences = preferences_result.get("preferences")
-        has_preferences = preferences_result.get("has_preferences", False)
-        
-        # 检查偏好完整性
-        is_complete = preferences_service.has_complete_preferences(preferences)
-        
-        return jsonify({
-            "success": True,
-            "has_preferences": has_preferences,
-            "is_complete": is_complete,
-            "can_quick_order": is_complete,
-            "preferences": preferences if has_preferences else None
-        }), 200
+        entry = preferences_service.get_read_model(user_id, g.get('data_version'))
+        return Response(entry["complete_json"], status=200, mimetype='application/json')
         
     except Exception as e:
-        print(f"❌ 检查偏好完整性异常: {str(e)}")
+        logger.error("❌ 检查偏好完整性异常: %s", e)
         return jsonify({"success": False, "message": f"服务器错误: {str(e)}"}), 500
 
 @preferences_bp.route('/preferences/<user_id>/form-data', methods=['GET'])
+@etag_versioned('preferences')
 def get_preferences_as_form_data(user_id):
-    """获取用户偏好并转换为表单数据格式"""
-    print(f"📋 获取偏好表单数据: {user_id}")
-    
+    """获取用户偏好并转换为表单数据格式
+
+    直接返回读模型中预先序列化的响应体
+    """
     try:
-        # 获取用户偏好
-        preferences_result = preferences_service.get_user_preferences(user_id)
-        
-        if not preferences_result["success"] or not preferences_result.get("has_preferences"):
-            return jsonify({
-                "success": True,
-                "has_preferences": False,
-                "form_data": {}
-            }), 200
-        
-        preferences = preferences_result["preferences"]
-        
-        # 转换为表单数据格式
-        form_data = preferences_service.prepare_form_data_from_preferences(preferences)
-        
-        return jsonify({
-            "success": True,
-            "has_preferences": True,
-            "form_data": form_data,
-            "can_quick_order": preferences_service.has_complete_preferences(preferences)
-        }), 200
+        entry = preferences_service.get_read_model(user_id, g.get('data_version'))
+        return Response(entry["form_data_json"], status=200, mimetype='application/json')
         
     except Exception as e:
-        print(f"❌ 获取偏好表单数据异常: {str(e)}")
-        return jsonify({"success": False, "message": f"服务器错误: {str(e)}"}), 500
\ No newline at end of file
+        logger.error("❌ 获取偏好表单数据异常: %s", e)
+        return jsonify({"success": False, "message": f"服务器错误: {str(e)}"}), 500
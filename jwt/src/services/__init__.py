@@ -5,5 +5,14 @@ from .auth_service import auth_service
 from .order_service import order_service
 from .invite_service import invite_service
 from .preferences_service import preferences_service
+from .export_service import export_service
+from .analytics_service import analytics_service
+from .archive_service import archive_service
+from .search_service import search_service
+from .address_service import address_service
 
-__all__ = ['auth_service', 'order_service', 'invite_service', 'preferences_service']
\ No newline at end of file
+__all__ = [
+    'auth_service', 'order_service', 'invite_service', 'preferences_service', 'export_service',
+    'analytics_service', 'archive_service', 'search_service',
+    'address_service'
+]
\ No newline at end of file
@@ -0,0 +1,277 @@
+"""
+地址联想服务模块
+用历史订单的配送地址和用户保存的默认地址为每个用户构建前缀树，
+每个节点缓存该前缀下得分最高的若干地址，每次按键只需沿前缀走一遍树。
+配送地址精确到门牌和房间号，只向地址的所属用户联想，不在用户之间共享
+"""
+import logging
+import math
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+from ..config import config
+from ..storage import storage
+from ..utils.orders import advance_watermark, sync_key, sync_start
+from .search_service import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# 地址从这些字符之后的位置也建立索引，输入"科技园"即可匹配"深圳市南山区科技园"
+SEGMENT_BOUNDARIES = '省市区县镇'
+
+# 得分的时间衰减半衰期（天）
+RECENCY_HALF_LIFE_DAYS = 30
+
+def recency_weight(timestamp: Optional[str]) -> float:
+    """一次使用在对数得分中的权重：越新的使用权重越高
+
+    得分为 log2(Σ 2^(t_i / 半衰期))，与查询时刻无关，不需要定期衰减已有得分。
+    """
+    try:
+        moment = datetime.fromisoformat(str(timestamp).replace('Z', '+00:00')).timestamp()
+    except (TypeError, ValueError):
+        moment = time.time()
+    return moment / 86400 / RECENCY_HALF_LIFE_DAYS
+
+class TrieNode:
+    """前缀树节点"""
+
+    __slots__ = ('children', 'top')
+
+    def __init__(self):
+        self.children: Dict[str, 'TrieNode'] = {}
+        # 该前缀下得分最高的地址 [(score, address)]，按得分降序
+        self.top: List[Tuple[float, str]] = []
+
+class AddressTrie:
+    """按使用频率和新近程度排序的地址前缀树
+
+    得分只增不减，所以每次使用时沿路径更新各节点的top列表即可保持正确。
+    """
+
+    def __init__(self, top_k: int):
+        self.top_k = top_k
+        self.root = TrieNode()
+        self.lock = threading.Lock()
+        # 规范化地址 -> [原始地址, 得分, 使用次数, 最近使用时间]
+        self.addresses: Dict[str, List[Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self.addresses)
+
+    def add(self, address: Optional[str], timestamp: Optional[str] = None) -> None:
+        """记录一次地址使用"""
+        key = normalize_text(address)
+        if len(key) < 2:
+            return
+
+        weight = recency_weight(timestamp)
+        with self.lock:
+            entry = self.addresses.get(key)
+            if entry is None:
+                entry = self.addresses[key] = [address.strip(), weight, 0, timestamp]
+            else:
+                entry[1] = max(entry[1], weight) + math.log2(1 + 2 ** -abs(entry[1] - weight))
+                if timestamp and (not entry[3] or str(timestamp) > str(entry[3])):
+                    entry[3] = timestamp
+            entry[2] += 1
+
+            for start in self._segment_starts(key):
+                node = self.root
+                for char in key[start:]:
+                    node = node.children.setdefault(char, TrieNode())
+                    self._promote(node, key, entry[1])
+
+    def _segment_starts(self, key: str) -> List[int]:
+        """地址开头以及每个行政区划字符之后的位置"""
+        starts = [0]
+        for index, char in enumerate(key[:-1]):
+            if char in SEGMENT_BOUNDARIES:
+                starts.append(index + 1)
+        return starts
+
+    def _promote(self, node: TrieNode, key: str, score: float) -> None:
+        """更新节点的top列表"""
+        top = node.top
+        for index, (_, existing) in enumerate(top):
+            if existing == key:
+                del top[index]
+                break
+        else:
+            if len(top) >= self.top_k and top[-1][0] >= score:
+                return
+
+        top.append((score, key))
+        top.sort(key=lambda item: item[0], reverse=True)
+        del top[self.top_k:]
+
+    def suggest(self, prefix: str, limit: int) -> List[Dict[str, Any]]:
+        """按前缀返回得分最高的地址"""
+        key = normalize_text(prefix)
+        with self.lock:
+            node = self.root
+            for char in key:
+                node = node.children.get(char)
+                if node is None:
+                    return []
+
+            suggestions = []
+            for _, address_key in node.top[:limit]:
+                address, _, count, last_used = self.addresses[address_key]
+                suggestions.append({'address': address, 'count': count, 'last_used': last_used})
+            return suggestions
+
+class AddressService:
+    """地址联想服务类"""
+
+    # 每次增量同步读取的行数
+    REFRESH_PAGE_SIZE = 1000
+
+    def __init__(self):
+        self.storage = storage
+        self._refreshing = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """丢弃前缀树，下次同步时从头读取"""
+        # user_id -> 该用户的地址前缀树
+        self.tries: Dict[str, AddressTrie] = {}
+        # user_id -> 已计入的默认地址（规范化），默认地址变化时才计一次使用
+        self._preference_addresses: Dict[str, str] = {}
+        self._order_watermark: Optional[Tuple[str, str]] = None
+        # 重读窗口内已计入的订单（order_id -> created_at），重读时不再重复计数
+        self._recent_orders: Dict[str, str] = {}
+        self._archive_loaded = False
+        self._preferences_watermark: Optional[Tuple[str, str]] = None
+        self._last_refreshed_at = 0.0
+
+    def _add(self, user_id: Optional[str], address: Optional[str], timestamp: Optional[str]) -> None:
+        """在用户自己的前缀树中记录一次地址使用"""
+        if not user_id:
+            return
+        trie = self.tries.get(str(user_id))
+        if trie is None:
+            trie = self.tries.setdefault(str(user_id), AddressTrie(config.ADDRESS_SUGGEST_TOP_K))
+        trie.add(address, timestamp)
+
+    def _add_preference_address(self, preferences: Dict[str, Any]) -> None:
+        """默认地址与上次计入的不同时才记录（修改预算等其他字段也会更新updated_at）"""
+        user_id = str(preferences.get('user_id') or '')
+        key = normalize_text(preferences.get('default_address'))
+        if not user_id or self._preference_addresses.get(user_id) == key:
+            return
+        self._preference_addresses[user_id] = key
+        self._add(user_id, preferences.get('default_address'), preferences.get('updated_at'))
+
+    def refresh(self) -> int:
+        """增量读取新订单地址和变更的默认地址（首次同步时先读取归档表）
+
+        每次从水位线往前重读INDEX_SYNC_OVERLAP_SECONDS（见SearchService.refresh）；
+        窗口内已计入的订单和未变化的默认地址不会重复计数。
+        """
+        refreshed = 0
+        if not self._archive_loaded:
+            # 之后归档的订单已经从热表计入过，只在首次同步时读取归档表，避免重复计数
+            archive_watermark = None
+            while True:
+                page = self.storage.get_orders_page({'include_deleted': True}, archive_watermark, self.REFRESH_PAGE_SIZE,
+                                                    sort_field='archived_at', archived=True)
+                for order in page:
+                    self._add(order.get('user_id'), order.get('delivery_address'), order.get('created_at'))
+                refreshed += len(page)
+                if page:
+                    archive_watermark = (page[-1]['archived_at'], str(page[-1]['id']))
+                if len(page) < self.REFRESH_PAGE_SIZE:
+                    break
+            self._archive_loaded = True
+
+        after = sync_start(self._order_watermark, config.INDEX_SYNC_OVERLAP_SECONDS)
+        while True:
+            page = self.storage.get_orders_page({'include_deleted': True}, after, self.REFRESH_PAGE_SIZE)
+            for order in page:
+                order_id = str(order['id'])
+                if order_id in self._recent_orders:
+                    continue
+                self._recent_orders[order_id] = order['created_at']
+                self._add(order.get('user_id'), order.get('delivery_address'), order.get('created_at'))
+                self._order_watermark = advance_watermark(self._order_watermark, (order['created_at'], order_id))
+                refreshed += 1
+            if page:
+                after = (page[-1]['created_at'], str(page[-1]['id']))
+            if len(page) < self.REFRESH_PAGE_SIZE:
+                break
+
+        # 只保留下次重读窗口内的订单
+        start = sync_start(self._order_watermark, config.INDEX_SYNC_OVERLAP_SECONDS)
+        if start:
+            self._recent_orders = {
+                order_id: created_at for order_id, created_at in self._recent_orders.items()
+                if sync_key((created_at, order_id)) >= sync_key(start)
+            }
+
+        previous = self._preferences_watermark
+        after = sync_start(previous, config.INDEX_SYNC_OVERLAP_SECONDS)
+        while True:
+            page = self.storage.get_preferences_page(after, self.REFRESH_PAGE_SIZE)
+            for preferences in page:
+                self._add_preference_address(preferences)
+                key = (preferences['updated_at'], str(preferences['user_id']))
+                if previous is None or sync_key(key) > sync_key(previous):
+                    refreshed += 1
+                self._preferences_watermark = advance_watermark(self._preferences_watermark, key)
+            if page:
+                after = (page[-1]['updated_at'], str(page[-1]['user_id']))
+            if len(page) < self.REFRESH_PAGE_SIZE:
+                break
+
+        self._last_refreshed_at = time.monotonic()
+        if refreshed:
+            logger.debug("📍 地址前缀树增量同步: %s 行，共 %s 个用户", refreshed, len(self.tries))
+        return refreshed
+
+    def _refresh_in_background(self) -> None:
+        """同步到期时在后台线程刷新，联想请求不等待存储"""
+        if time.monotonic() - self._last_refreshed_at < config.ADDRESS_REFRESH_SECONDS:
+            return
+        if not self._refreshing.acquire(blocking=False):
+            return
+
+        def run():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error("❌ 地址前缀树同步失败: %s", e)
+            finally:
+                self._last_refreshed_at = time.monotonic()
+                self._refreshing.release()
+
+        threading.Thread(target=run, name='address-trie-refresh', daemon=True).start()
+
+    def suggest(self, user_id: Optional[str], query: str, limit: int = 8) -> Dict[str, Any]:
+        """按用户自己的历史地址联想，返回格式与前端 AddressSearchResponse 一致"""
+        if not user_id:
+            return {"success": False, "message": "用户ID不能为空", "predictions": []}
+        if len(normalize_text(query)) < 2:
+            return {"success": False, "message": "请至少输入2个字符", "predictions": []}
+
+        self._refresh_in_background()
+        trie = self.tries.get(str(user_id))
+        suggestions = trie.suggest(query, limit) if trie else []
+        predictions = [
+            {
+                'place_id': f"history:{index}",
+                'description': item['address'],
+                'structured_formatting': {
+                    'main_text': item['address'],
+                    'secondary_text': f"历史地址 · 使用{item['count']}次"
+                },
+                'count': item['count'],
+                'last_used': item['last_used']
+            }
+            for index, item in enumerate(suggestions)
+        ]
+        return {"success": True, "message": "搜索成功", "predictions": predictions}
+
+# 全局地址联想服务实例
+address_service = AddressService()
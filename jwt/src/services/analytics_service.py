@@ -0,0 +1,514 @@
+"""
+订单分析服务模块
+把订单快照成按列存储的NumPy数组，按created_at/updated_at增量刷新，
+分组统计全部使用向量化计算，不扫描业务表
+"""
+import logging
+import threading
+import time
+from datetime import date, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    np = None
+
+from ..config import config
+from ..storage import storage
+from ..utils.tags import encode_tags, parse_tag_filter
+from ..utils.order_codec import decode_tag_list
+from ..utils.orders import ORDER_SYNC_SOURCES, advance_watermark, sync_key, sync_start
+
+# 订单状态编码（列存储中用int8保存）
+STATUS_CODES = ['draft', 'submitted', 'processing', 'completed', 'cancelled']
+UNKNOWN_STATUS = len(STATUS_CODES)
+
+# 支持的分组维度
+GROUP_BY_FIELDS = ('day', 'status', 'rating')
+
+# 位掩码筛选参数 -> (词表, 条件)；all表示包含全部选项，none表示不包含任何选项
+TAG_FILTER_PARAMS = {
+    'allergy': ('allergies', 'all'),
+    'no_allergy': ('allergies', 'none'),
+    'preference': ('preferences', 'all'),
+    'no_preference': ('preferences', 'none')
+}
+
+EPOCH = date(1970, 1, 1)
+
+def day_number(value: Optional[str]) -> int:
+    """把ISO日期/时间转换为自1970-01-01起的天数"""
+    if not value:
+        return 0
+    return (date.fromisoformat(str(value)[:10]) - EPOCH).days
+
+def day_string(number: int) -> str:
+    """把天数转换回ISO日期"""
+    return (EPOCH + timedelta(days=int(number))).isoformat()
+
+def tag_mask_filter(allergy_column, preference_column, tag_filters: Dict[str, int]):
+    """按位掩码筛选行：包含全部指定选项 / 不包含任何指定选项"""
+    mask = np.ones(len(allergy_column), dtype=np.bool_)
+    columns = {'allergies': allergy_column, 'preferences': preference_column}
+    for param, bits in tag_filters.items():
+        if not bits:
+            continue
+        field, condition = TAG_FILTER_PARAMS[param]
+        selected = columns[field] & bits
+        mask &= (selected == bits) if condition == 'all' else (selected == 0)
+    return mask
+
+class OrderColumnStore:
+    """订单列存储
+
+    每列是一个预分配的NumPy数组，容量不足时倍增；
+    order_id -> 行号的字典用于增量刷新时原地更新已有订单。
+    忌口/偏好以 (行号, 标签编号) 两列的形式追加保存，用bincount统计频次。
+    """
+
+    INITIAL_CAPACITY = 1024
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._size = 0
+        self._capacity = 0
+        self._row_index: Dict[str, int] = {}
+        self.columns: Dict[str, Any] = {}
+        self._tag_rows: Dict[str, List[int]] = {'allergies': [], 'preferences': []}
+        self._tag_ids: Dict[str, List[int]] = {'allergies': [], 'preferences': []}
+        self._tag_vocab: Dict[str, Dict[str, int]] = {'allergies': {}, 'preferences': {}}
+        # 热表和归档表各自的水位线，键为是否归档表
+        self.watermarks: Dict[bool, Optional[Tuple[str, str]]] = {False: None, True: None}
+        self.last_refreshed_at = 0.0
+        self._grow(self.INITIAL_CAPACITY)
+
+    def _grow(self, capacity: int) -> None:
+        """扩容所有列"""
+        dtypes = {
+            'day': np.int32,
+            'status': np.int8,
+            'budget': np.float64,
+            'rating': np.int8,
+            'deleted': np.bool_,
+            'allergy_mask': np.uint8,
+            'preference_mask': np.uint8
+        }
+        for name, dtype in dtypes.items():
+            column = np.zeros(capacity, dtype=dtype)
+            if name in self.columns:
+                column[:self._size] = self.columns[name][:self._size]
+            self.columns[name] = column
+        self._capacity = capacity
+
+    def __len__(self) -> int:
+        return self._size
+
+    def upsert(self, order: Dict[str, Any]) -> None:
+        """写入或更新一行订单"""
+        with self.lock:
+            order_id = str(order['id'])
+            row = self._row_index.get(order_id)
+            is_new = row is None
+            if is_new:
+                if self._size >= self._capacity:
+                    self._grow(self._capacity * 2)
+                row = self._size
+                self._row_index[order_id] = row
+                self._size += 1
+
+            status = order.get('status')
+            # 按下单的本地营业日统计（created_at是UTC时间，凌晨的订单日期会差一天）
+            self.columns['day'][row] = day_number(order.get('order_date') or order.get('created_at'))
+            self.columns['status'][row] = STATUS_CODES.index(status) if status in STATUS_CODES else UNKNOWN_STATUS
+            self.columns['budget'][row] = float(order.get('budget_amount') or 0)
+            self.columns['rating'][row] = int(order.get('user_rating') or 0)
+            self.columns['deleted'][row] = bool(order.get('is_deleted', False))
+            
+            # 位掩码列缺失（迁移前的订单）时从JSON字段编码
+            allergy_mask = order.get('allergy_mask')
+            if allergy_mask is None:
+                allergy_mask = encode_tags('allergies', decode_tag_list(order.get('dietary_restrictions')))
+            preference_mask = order.get('preference_mask')
+            if preference_mask is None:
+                preference_mask = encode_tags('preferences', decode_tag_list(order.get('food_preferences')))
+            self.columns['allergy_mask'][row] = allergy_mask
+            self.columns['preference_mask'][row] = preference_mask
+
+            # 忌口/偏好在下单后不会改变，只在首次写入时记录
+            if is_new:
+                self._append_tags('allergies', row, decode_tag_list(order.get('dietary_restrictions')))
+                self._append_tags('preferences', row, decode_tag_list(order.get('food_preferences')))
+
+    def _append_tags(self, field: str, row: int, tags: List[str]) -> None:
+        """追加一行的标签"""
+        vocab = self._tag_vocab[field]
+        for tag in tags:
+            tag_id = vocab.setdefault(tag, len(vocab))
+            self._tag_rows[field].append(row)
+            self._tag_ids[field].append(tag_id)
+
+    def mask(self, start_day: Optional[int] = None, end_day: Optional[int] = None,
+             status: Optional[str] = None, include_deleted: bool = False,
+             tag_filters: Optional[Dict[str, int]] = None):
+        """按条件生成行掩码"""
+        size = self._size
+        mask = np.ones(size, dtype=np.bool_)
+        if tag_filters:
+            mask &= tag_mask_filter(
+                self.columns['allergy_mask'][:size], self.columns['preference_mask'][:size], tag_filters
+            )
+        if not include_deleted:
+            mask &= ~self.columns['deleted'][:size]
+        if start_day is not None:
+            mask &= self.columns['day'][:size] >= start_day
+        if end_day is not None:
+            mask &= self.columns['day'][:size] <= end_day
+        if status:
+            code = STATUS_CODES.index(status) if status in STATUS_CODES else UNKNOWN_STATUS
+            mask &= self.columns['status'][:size] == code
+        return mask
+
+    def group_by(self, fields: List[str], mask) -> List[Dict[str, Any]]:
+        """按维度分组，计算订单数、预算合计/均值和评分均值"""
+        size = self._size
+        day = self.columns['day'][:size][mask].astype(np.int64)
+        status = self.columns['status'][:size][mask].astype(np.int64)
+        rating = self.columns['rating'][:size][mask].astype(np.int64)
+        budget = self.columns['budget'][:size][mask]
+
+        if len(day) == 0:
+            return []
+
+        # 把各维度组合成一个int64分组键
+        dimensions = {'day': day, 'status': status, 'rating': rating}
+        key = np.zeros(len(day), dtype=np.int64)
+        for field in fields:
+            key = key * 100000 + (dimensions[field] - (day.min() if field == 'day' else 0))
+
+        unique_keys, first_rows, inverse = np.unique(key, return_index=True, return_inverse=True)
+        groups = len(unique_keys)
+        counts = np.bincount(inverse, minlength=groups)
+        budget_sum = np.bincount(inverse, weights=budget, minlength=groups)
+        rated = rating > 0
+        rated_counts = np.bincount(inverse[rated], minlength=groups)
+        rating_sum = np.bincount(inverse[rated], weights=rating[rated], minlength=groups)
+
+        # 每组取第一行还原维度值
+        results = []
+        for group in range(groups):
+            row = first_rows[group]
+            item = {}
+            for field in fields:
+                value = int(dimensions[field][row])
+                if field == 'day':
+                    item['day'] = day_string(value)
+                elif field == 'status':
+                    item['status'] = STATUS_CODES[value] if value < len(STATUS_CODES) else 'unknown'
+                else:
+                    item['rating'] = value or None
+            item.update({
+                'count': int(counts[group]),
+                'budget_sum': round(float(budget_sum[group]), 2),
+                'budget_avg': round(float(budget_sum[group] / counts[group]), 2),
+                'rated_count': int(rated_counts[group]),
+                'rating_avg': round(float(rating_sum[group] / rated_counts[group]), 2) if rated_counts[group] else None
+            })
+            results.append(item)
+        return results
+
+    def budget_distribution(self, mask, bins: int) -> Dict[str, Any]:
+        """预算分布：直方图和分位数"""
+        budget = self.columns['budget'][:self._size][mask]
+        if len(budget) == 0:
+            return {'count': 0, 'histogram': [], 'percentiles': {}}
+
+        counts, edges = np.histogram(budget, bins=bins)
+        percentiles = np.percentile(budget, [25, 50, 75, 90, 99])
+        return {
+            'count': int(len(budget)),
+            'mean': round(float(budget.mean()), 2),
+            'histogram': [
+                {'from': round(float(edges[i]), 2), 'to': round(float(edges[i + 1]), 2), 'count': int(counts[i])}
+                for i in range(len(counts))
+            ],
+            'percentiles': {
+                f'p{p}': round(float(v), 2) for p, v in zip([25, 50, 75, 90, 99], percentiles)
+            }
+        }
+
+    def tag_frequencies(self, field: str, mask) -> List[Dict[str, Any]]:
+        """统计忌口/偏好标签出现次数（按次数降序）"""
+        vocab = self._tag_vocab[field]
+        if not vocab:
+            return []
+
+        rows = np.asarray(self._tag_rows[field], dtype=np.int64)
+        tag_ids = np.asarray(self._tag_ids[field], dtype=np.int64)
+        counts = np.bincount(tag_ids[mask[rows]], minlength=len(vocab))
+
+        names = list(vocab)
+        order = np.argsort(-counts, kind='stable')
+        return [
+            {'tag': names[i], 'count': int(counts[i])}
+            for i in order if counts[i] > 0
+        ]
+
+class UserTagIndex:
+    """按用户保存忌口/偏好位掩码的内存索引
+
+    每个用户一行，两列uint8；人群查询是对整列的一次按位运算。
+    偏好被删除的用户用最后一行填补其位置，保持各列紧凑。
+    """
+
+    INITIAL_CAPACITY = 1024
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._size = 0
+        self._row_index: Dict[str, int] = {}
+        self.user_ids: List[str] = []
+        self.allergy_mask = np.zeros(self.INITIAL_CAPACITY, dtype=np.uint8)
+        self.preference_mask = np.zeros(self.INITIAL_CAPACITY, dtype=np.uint8)
+        self.watermark: Optional[Tuple[str, str]] = None
+        # 偏好删除记录的水位线 (deleted_at, user_id)
+        self.deletion_watermark: Optional[Tuple[str, str]] = None
+        self.last_refreshed_at = 0.0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def remove(self, user_id: str) -> None:
+        """移除一个用户（把最后一行移到该用户的位置）"""
+        with self.lock:
+            row = self._row_index.pop(user_id, None)
+            if row is None:
+                return
+            last = self._size - 1
+            if row != last:
+                moved = self.user_ids[last]
+                self.user_ids[row] = moved
+                self._row_index[moved] = row
+                self.allergy_mask[row] = self.allergy_mask[last]
+                self.preference_mask[row] = self.preference_mask[last]
+            self.user_ids.pop()
+            self._size = last
+
+    def upsert(self, user_id: str, allergy_mask: int, preference_mask: int) -> None:
+        """写入或更新一个用户的掩码"""
+        with self.lock:
+            row = self._row_index.get(user_id)
+            if row is None:
+                if self._size >= len(self.allergy_mask):
+                    self.allergy_mask = np.resize(self.allergy_mask, self._size * 2)
+                    self.preference_mask = np.resize(self.preference_mask, self._size * 2)
+                row = self._size
+                self._row_index[user_id] = row
+                self.user_ids.append(user_id)
+                self._size += 1
+            self.allergy_mask[row] = allergy_mask
+            self.preference_mask[row] = preference_mask
+
+    def query(self, tag_filters: Dict[str, int], limit: int) -> Tuple[int, List[str]]:
+        """返回 (匹配人数, 前limit个用户ID)"""
+        with self.lock:
+            size = self._size
+            mask = tag_mask_filter(self.allergy_mask[:size], self.preference_mask[:size], tag_filters)
+            rows = np.flatnonzero(mask)
+            return int(len(rows)), [self.user_ids[row] for row in rows[:limit]]
+
+class AnalyticsService:
+    """订单分析服务类"""
+
+    # 每次增量刷新读取的行数
+    REFRESH_PAGE_SIZE = 1000
+
+    def __init__(self):
+        self.storage = storage
+        self._refresh_lock = threading.Lock()
+        self._user_tags_lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """丢弃列存快照和用户掩码索引，下次刷新时从头同步"""
+        self.store = OrderColumnStore() if NUMPY_AVAILABLE else None
+        self.user_tags = UserTagIndex() if NUMPY_AVAILABLE else None
+
+    def refresh(self, force: bool = False) -> int:
+        """按 (updated_at, id) 增量拉取热表变更的订单，按 (archived_at, id) 拉取新归档的订单
+
+        每次从水位线往前重读INDEX_SYNC_OVERLAP_SECONDS（见SearchService.refresh），upsert按订单ID覆盖。
+
+        Returns:
+            本次刷新读到的水位线之后的新行数
+        """
+        store = self.store
+        if not force and time.monotonic() - store.last_refreshed_at < config.ANALYTICS_REFRESH_SECONDS:
+            return 0
+
+        with self._refresh_lock:
+            refreshed = 0
+            filters = {'include_deleted': True}
+            for archived, sort_field in ORDER_SYNC_SOURCES:
+                previous = store.watermarks[archived]
+                after = sync_start(previous, config.INDEX_SYNC_OVERLAP_SECONDS)
+                while True:
+                    page = self.storage.get_orders_page(
+                        filters, after, self.REFRESH_PAGE_SIZE, sort_field=sort_field, archived=archived
+                    )
+                    for order in page:
+                        store.upsert(order)
+                        key = (order.get(sort_field) or order['created_at'], str(order['id']))
+                        if previous is None or sync_key(key) > sync_key(previous):
+                            refreshed += 1
+                        store.watermarks[archived] = advance_watermark(store.watermarks[archived], key)
+
+                    if page:
+                        after = (page[-1].get(sort_field) or page[-1]['created_at'], str(page[-1]['id']))
+                    if len(page) < self.REFRESH_PAGE_SIZE:
+                        break
+
+            store.last_refreshed_at = time.monotonic()
+            if refreshed:
+                logger.debug("📊 分析快照增量刷新: %s 行，共 %s 行", refreshed, len(store))
+            return refreshed
+
+    def refresh_user_tags(self, force: bool = False) -> int:
+        """按 (updated_at, user_id) 增量同步用户偏好掩码，按 (deleted_at, user_id) 移除偏好已删除的用户"""
+        index = self.user_tags
+        if not force and time.monotonic() - index.last_refreshed_at < config.ANALYTICS_REFRESH_SECONDS:
+            return 0
+
+        with self._user_tags_lock:
+            refreshed = 0
+            previous = index.watermark
+            after = sync_start(previous, config.INDEX_SYNC_OVERLAP_SECONDS)
+            while True:
+                page = self.storage.get_preferences_page(after, self.REFRESH_PAGE_SIZE)
+                for preferences in page:
+                    index.upsert(
+                        str(preferences['user_id']),
+                        preferences.get('allergy_mask') or 0,
+                        preferences.get('preference_mask') or 0
+                    )
+                    key = (preferences['updated_at'], str(preferences['user_id']))
+                    if previous is None or sync_key(key) > sync_key(previous):
+                        refreshed += 1
+                    index.watermark = advance_watermark(index.watermark, key)
+
+                if page:
+                    after = (page[-1]['updated_at'], str(page[-1]['user_id']))
+                if len(page) < self.REFRESH_PAGE_SIZE:
+                    break
+
+            previous = index.deletion_watermark
+            after = sync_start(previous, config.INDEX_SYNC_OVERLAP_SECONDS)
+            while True:
+                page = self.storage.get_deleted_preferences_page(after, self.REFRESH_PAGE_SIZE)
+                for deletion in page:
+                    index.remove(str(deletion['user_id']))
+                    key = (deletion['deleted_at'], str(deletion['user_id']))
+                    if previous is None or sync_key(key) > sync_key(previous):
+                        refreshed += 1
+                    index.deletion_watermark = advance_watermark(index.deletion_watermark, key)
+
+                if page:
+                    after = (page[-1]['deleted_at'], str(page[-1]['user_id']))
+                if len(page) < self.REFRESH_PAGE_SIZE:
+                    break
+
+            index.last_refreshed_at = time.monotonic()
+            if refreshed:
+                logger.debug("📊 用户偏好掩码增量同步: %s 行，共 %s 个用户", refreshed, len(index))
+            return refreshed
+
+    def _parse_tag_filters(self, params: Dict[str, Any]) -> Dict[str, int]:
+        """解析位掩码筛选参数（逗号分隔的选项ID或中文标签）"""
+        return {
+            param: parse_tag_filter(field, params[param])
+            for param, (field, _) in TAG_FILTER_PARAMS.items()
+            if params.get(param)
+        }
+
+    def _parse_filters(self, params: Dict[str, Any]) -> Tuple[bool, Any]:
+        """解析查询参数，并在查询前增量刷新快照"""
+        if not NUMPY_AVAILABLE:
+            return False, "分析模块需要安装numpy"
+
+        try:
+            filters = {
+                'start_day': day_number(params['start_date']) if params.get('start_date') else None,
+                'end_day': day_number(params['end_date']) if params.get('end_date') else None,
+                'status': params.get('status')
+            }
+        except ValueError:
+            return False, "日期格式应为YYYY-MM-DD"
+
+        try:
+            filters['tag_filters'] = self._parse_tag_filters(params)
+        except ValueError as e:
+            return False, str(e)
+
+        self.refresh()
+        return True, filters
+
+    def order_rollup(self, group_by: List[str], params: Dict[str, Any]) -> Dict[str, Any]:
+        """按维度汇总订单"""
+        invalid = [field for field in group_by if field not in GROUP_BY_FIELDS]
+        if not group_by or invalid:
+            return {"success": False, "message": f"分组维度仅支持: {', '.join(GROUP_BY_FIELDS)}"}
+
+        ok, filters = self._parse_filters(params)
+        if not ok:
+            return {"success": False, "message": filters}
+
+        with self.store.lock:
+            rows = self.store.group_by(group_by, self.store.mask(**filters))
+        return {"success": True, "group_by": group_by, "rows": rows}
+
+    def budget_distribution(self, params: Dict[str, Any], bins: int = 10) -> Dict[str, Any]:
+        """预算分布"""
+        ok, filters = self._parse_filters(params)
+        if not ok:
+            return {"success": False, "message": filters}
+
+        with self.store.lock:
+            distribution = self.store.budget_distribution(self.store.mask(**filters), bins)
+        return {"success": True, **distribution}
+
+    def tag_frequencies(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """忌口和偏好频次"""
+        ok, filters = self._parse_filters(params)
+        if not ok:
+            return {"success": False, "message": filters}
+
+        with self.store.lock:
+            mask = self.store.mask(**filters)
+            return {
+                "success": True,
+                "allergies": self.store.tag_frequencies('allergies', mask),
+                "preferences": self.store.tag_frequencies('preferences', mask)
+            }
+
+    def user_cohort(self, params: Dict[str, Any], limit: int = 100) -> Dict[str, Any]:
+        """按忌口/偏好筛选用户，例如对海鲜过敏且喜欢香辣的用户"""
+        if not NUMPY_AVAILABLE:
+            return {"success": False, "message": "分析模块需要安装numpy"}
+
+        try:
+            tag_filters = self._parse_tag_filters(params)
+        except ValueError as e:
+            return {"success": False, "message": str(e)}
+        if not tag_filters:
+            return {"success": False, "message": "至少需要一个忌口或偏好条件"}
+
+        self.refresh_user_tags()
+        count, user_ids = self.user_tags.query(tag_filters, limit)
+        return {"success": True, "count": count, "user_ids": user_ids}
+
+# 全局分析服务实例
+analytics_service = AnalyticsService()
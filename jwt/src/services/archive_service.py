@@ -0,0 +1,63 @@
+"""
+订单归档服务模块
+把已软删除的订单和超过保留期的已完成/已取消订单分批移入归档表，
+保持热表的行数和索引深度有界
+"""
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Optional
+from ..config import config
+from ..storage import storage
+from ..utils.etag import bump_version
+
+logger = logging.getLogger(__name__)
+
+class ArchiveService:
+    """订单归档服务类"""
+    
+    def __init__(self):
+        self.storage = storage
+    
+    def archive_orders(self, older_than_days: Optional[int] = None, batch_size: Optional[int] = None,
+                       max_batches: Optional[int] = None, pause_seconds: float = 0) -> Dict[str, Any]:
+        """分批归档订单，直到没有可归档的行或达到批次上限
+
+        每批是一个独立的短事务，pause_seconds用于在批次之间让出数据库。
+        用户订单列表据ORDER_ARCHIVE_AFTER_DAYS判断是否需要读取归档表，
+        因此older_than_days不能小于它，否则保留期内的订单会从列表中漏掉。
+        """
+        older_than_days = config.ORDER_ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+        if older_than_days < config.ORDER_ARCHIVE_AFTER_DAYS:
+            return {"success": False, "message": f"归档天数不能小于 {config.ORDER_ARCHIVE_AFTER_DAYS} 天", "archived": 0}
+        batch_size = batch_size or config.ORDER_ARCHIVE_BATCH_SIZE
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=older_than_days)).isoformat()
+        logger.info("🗄️ 开始归档订单: 早于 %s 的已完成/已取消订单及所有已删除订单", cutoff)
+        
+        archived = 0
+        batches = 0
+        user_ids = set()
+        while max_batches is None or batches < max_batches:
+            try:
+                result = self.storage.archive_orders(cutoff, batch_size)
+            except Exception as e:
+                logger.error("❌ 订单归档失败: %s", e)
+                return {"success": False, "message": f"订单归档失败: {str(e)}", "archived": archived}
+            
+            batches += 1
+            archived += result['archived']
+            user_ids.update(result['user_ids'])
+            if result['archived'] < batch_size:
+                break
+            if pause_seconds:
+                time.sleep(pause_seconds)
+        
+        # 订单在两张表之间移动会改变分页结果，使这些用户的订单ETag失效
+        for user_id in user_ids:
+            bump_version(user_id, 'orders')
+        
+        logger.info("🗄️ 归档完成: %s 个订单，%s 批，涉及 %s 个用户", archived, batches, len(user_ids))
+        return {"success": True, "archived": archived, "batches": batches, "users": len(user_ids)}
+
+# 全局归档服务实例
+archive_service = ArchiveService()
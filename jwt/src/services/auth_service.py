@@ -2,13 +2,19 @@
 认证服务模块
 处理用户认证相关的业务逻辑
 """
+import logging
 from typing import Dict, Any
 from ..storage import storage
+from ..storage.async_storage import get_async_storage
 from ..utils import (
     generate_verification_code, get_code_expiry_time, is_code_expired,
     validate_phone_number, validate_verification_code, validate_required_fields,
-    send_sms
+    send_sms, send_sms_async
 )
+from ..utils.cache import user_sequence_cache
+from ..utils.log import mask_phone
+
+logger = logging.getLogger(__name__)
 
 class AuthService:
     """认证服务类"""
@@ -34,11 +40,33 @@ class AuthService:
         # 发送短信
         sms_result = send_sms(phone_number, code)
         
-        print(f"📱 验证码发送请求: {phone_number} -> {code}")
+        logger.debug("📱 验证码发送请求: %s", mask_phone(phone_number))
         if sms_result["success"]:
-            print(f"✅ 验证码发送成功: {phone_number}")
+            logger.info("✅ 验证码发送成功: %s", mask_phone(phone_number))
         else:
-            print(f"❌ 验证码发送失败: {sms_result['message']}")
+            logger.warning("❌ 验证码发送失败: %s", sms_result['message'])
+        
+        return sms_result
+    
+    async def send_verification_code_async(self, phone_number: str) -> Dict[str, Any]:
+        """发送验证码（ASGI模式：存储和短信请求都是异步I/O）"""
+        if not validate_phone_number(phone_number):
+            return {"success": False, "message": "请输入正确的11位手机号码"}
+        
+        code = generate_verification_code()
+        expires_at = get_code_expiry_time()
+        
+        store_result = await get_async_storage().store_verification_code(phone_number, code, expires_at)
+        if not store_result.get("success"):
+            return {"success": False, "message": "验证码存储失败"}
+        
+        sms_result = await send_sms_async(phone_number, code)
+        
+        logger.debug("📱 验证码发送请求: %s", mask_phone(phone_number))
+        if sms_result["success"]:
+            logger.info("✅ 验证码发送成功: %s", mask_phone(phone_number))
+        else:
+            logger.warning("❌ 验证码发送失败: %s", sms_result['message'])
         
         return sms_result
     
@@ -67,7 +95,7 @@ class AuthService:
     
     def login_with_phone(self, phone_number: str, verification_code: str) -> Dict[str, Any]:
         """手机号登录"""
-        print(f"🔐 开始登录验证: {phone_number}")
+        logger.debug("🔐 开始登录验证: %s", mask_phone(phone_number))
         
         # 验证输入格式
         is_valid, error_msg = validate_required_fields(
@@ -86,10 +114,10 @@ class AuthService:
         # 验证验证码
         verify_result = self.verify_code(phone_number, verification_code)
         if not verify_result["success"]:
-            print(f"❌ 验证码验证失败: {verify_result['message']}")
+            logger.warning("❌ 验证码验证失败: %s", verify_result['message'])
             return verify_result
         
-        print(f"✅ 验证码验证成功: {phone_number}")
+        logger.debug("✅ 验证码验证成功: %s", mask_phone(phone_number))
         
         # 检查用户是否存在
         user_data = self.storage.get_user(phone_number)
@@ -99,11 +127,13 @@ class AuthService:
             # 新用户，等待邀请码验证
             user_id = None
             user_sequence = None
-            print(f"🆕 检测到新用户: {phone_number}")
+            logger.info("🆕 检测到新用户: %s", mask_phone(phone_number))
         else:
             user_id = user_data['id']
             user_sequence = user_data.get('user_sequence', 0)
-            print(f"👤 老用户登录: {phone_number} (ID: {user_id}, 序号: {user_sequence})")
+            if user_sequence:
+                user_sequence_cache.set(user_id, user_sequence)
+            logger.debug("👤 老用户登录: %s (ID: %s, 序号: %s)", mask_phone(phone_number), user_id, user_sequence)
         
         result = {
             "success": True,
@@ -117,12 +147,11 @@ class AuthService:
         if not is_new_user and user_sequence:
             result["user_sequence"] = user_sequence
         
-        print(f"📤 返回结果: {result}")
         return result
     
     def verify_invite_code_and_create_user(self, phone_number: str, invite_code: str) -> Dict[str, Any]:
         """验证邀请码并创建新用户"""
-        print(f"🔑 验证邀请码: {phone_number} -> {invite_code}")
+        logger.debug("🔑 验证邀请码: %s", mask_phone(phone_number))
         
         # 验证输入格式
         is_valid, error_msg = validate_required_fields(
@@ -137,11 +166,14 @@ class AuthService:
         
         # 验证邀请码
         if not self.storage.verify_invite_code(invite_code):
-            print(f"❌ 邀请码无效: {invite_code}")
+            logger.warning("❌ 邀请码无效: %s", mask_phone(phone_number))
             return {"success": False, "message": "邀请码无效"}
         
         # 创建新用户
-        return self.storage.create_user(phone_number, invite_code)
+        result = self.storage.create_user(phone_number, invite_code)
+        if result.get("success") and result.get("user_sequence"):
+            user_sequence_cache.set(result["user_id"], result["user_sequence"])
+        return result
 
 # 全局认证服务实例
 auth_service = AuthService()
\ No newline at end of file
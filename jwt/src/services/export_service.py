@@ -0,0 +1,120 @@
+"""
+订单导出服务模块
+按页从存储层读取订单，逐行生成NDJSON或CSV，内存占用与导出行数无关
+"""
+import logging
+import csv
+import io
+import json
+from datetime import date, timedelta
+from typing import Dict, Any, Iterator, Optional, Tuple
+from ..config import config
+from ..storage import storage
+from ..utils.order_codec import ORDER_FIELD_CODECS, decode_order
+from ..utils.json_provider import dumps_bytes
+
+logger = logging.getLogger(__name__)
+
+# 导出格式 -> 响应类型
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+# CSV导出的列
+CSV_COLUMNS = [
+    'id', 'order_number', 'user_id', 'phone_number', 'status', 'order_date',
+    'created_at', 'submitted_at', 'delivery_address', 'dietary_restrictions',
+    'food_preferences', 'budget_amount', 'budget_currency', 'user_rating',
+    'user_feedback', 'user_sequence', 'is_deleted'
+]
+
+# 首页只读少量行，尽快发出第一个字节
+FIRST_PAGE_SIZE = 100
+
+class ExportService:
+    """订单导出服务类"""
+
+    def __init__(self):
+        self.storage = storage
+
+    def build_filters(self, start_date: Optional[str], end_date: Optional[str],
+                      status: Optional[str], include_deleted: bool = False) -> Tuple[bool, Any]:
+        """校验导出参数并构建过滤条件
+
+        Returns:
+            tuple: (is_valid, filters 或 error_message)
+        """
+        filters = {'include_deleted': include_deleted}
+
+        try:
+            if start_date:
+                filters['created_from'] = date.fromisoformat(start_date).isoformat()
+            if end_date:
+                # 结束日期包含当天
+                filters['created_before'] = (date.fromisoformat(end_date) + timedelta(days=1)).isoformat()
+        except ValueError:
+            return False, "日期格式应为YYYY-MM-DD"
+
+        if start_date and end_date and filters['created_from'] >= filters['created_before']:
+            return False, "开始日期不能晚于结束日期"
+
+        if status:
+            filters['status'] = status
+
+        return True, filters
+
+    def iter_orders(self, filters: Dict[str, Any], page_size: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """按 (created_at, id) 键集分页逐行读取订单：先读热表，再读归档表
+
+        导出期间被归档的订单可能在两张表中各出现一次，但不会遗漏。
+        """
+        page_size = page_size or config.ORDER_EXPORT_PAGE_SIZE
+        limit = min(FIRST_PAGE_SIZE, page_size)
+
+        for archived in (False, True):
+            after = None
+            while True:
+                page = self.storage.get_orders_page(filters, after, limit, archived=archived)
+                for order in page:
+                    yield order
+
+                if len(page) < limit:
+                    break
+
+                last = page[-1]
+                after = (last['created_at'], str(last['id']))
+                limit = page_size
+
+    def stream_ndjson(self, filters: Dict[str, Any]) -> Iterator[bytes]:
+        """以NDJSON格式逐行导出订单"""
+        for order in self.iter_orders(filters):
+            yield dumps_bytes(decode_order(order)) + b'\n'
+
+    def stream_csv(self, filters: Dict[str, Any]) -> Iterator[str]:
+        """以CSV格式逐行导出订单（先输出表头）"""
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=CSV_COLUMNS, extrasaction='ignore')
+
+        writer.writeheader()
+        yield buffer.getvalue()
+
+        for order in self.iter_orders(filters):
+            buffer.seek(0)
+            buffer.truncate(0)
+            # 列表字段在CSV单元格中写为JSON数组
+            order = decode_order(order)
+            for field in ORDER_FIELD_CODECS:
+                order[field] = json.dumps(order.get(field) or [], ensure_ascii=False)
+            writer.writerow(order)
+            yield buffer.getvalue()
+
+    def stream_orders(self, export_format: str, filters: Dict[str, Any]) -> Iterator[Any]:
+        """按格式导出订单"""
+        logger.info("📦 导出订单: 格式 %s, 条件 %s", export_format, filters)
+        if export_format == 'csv':
+            return self.stream_csv(filters)
+        return self.stream_ndjson(filters)
+
+# 全局导出服务实例
+export_service = ExportService()
@@ -2,8 +2,12 @@
 邀请和免单服务模块
 处理用户邀请和免单相关的业务逻辑
 """
+import logging
 from typing import Dict, Any
 from ..storage import storage
+from ..utils.pubsub import event_hub, user_orders_topic, FREE_DRINKS_TOPIC
+
+logger = logging.getLogger(__name__)
 
 class InviteService:
     """邀请服务类"""
@@ -23,7 +27,7 @@ class InviteService:
                 **stats
             }
         except Exception as e:
-            print(f"❌ 获取邀请统计错误: {e}")
+            logger.error("❌ 获取邀请统计错误: %s", e)
             return {"success": False, "message": str(e)}
     
     def get_invite_progress(self, user_id: str) -> Dict[str, Any]:
@@ -38,7 +42,7 @@ class InviteService:
                 **progress
             }
         except Exception as e:
-            print(f"❌ 获取邀请进度错误: {e}")
+            logger.error("❌ 获取邀请进度错误: %s", e)
             return {"success": False, "message": str(e)}
     
     def claim_free_drink(self, user_id: str) -> Dict[str, Any]:
@@ -49,12 +53,18 @@ class InviteService:
         try:
             result = self.storage.claim_free_drink(user_id)
             if result["success"]:
-                print(f"🎉 用户 {user_id} 成功领取免单")
+                logger.info("🎉 用户 %s 成功领取免单", user_id)
+                event_hub.publish(FREE_DRINKS_TOPIC, 'free_drinks_quota', {
+                    'free_drinks_remaining': result.get('free_drinks_remaining')
+                })
+                event_hub.publish(user_orders_topic(user_id), 'free_drink_claimed', {
+                    'free_drinks_remaining': result.get('free_drinks_remaining')
+                })
             else:
-                print(f"❌ 用户 {user_id} 领取免单失败: {result['message']}")
+                logger.warning("❌ 用户 %s 领取免单失败: %s", user_id, result['message'])
             return result
         except Exception as e:
-            print(f"❌ 领取免单错误: {e}")
+            logger.error("❌ 领取免单错误: %s", e)
             return {"success": False, "message": str(e)}
     
     def get_free_drinks_remaining(self) -> Dict[str, Any]:
@@ -67,7 +77,7 @@ class InviteService:
                 "message": f"还有 {remaining} 个免单名额"
             }
         except Exception as e:
-            print(f"❌ 获取免单剩余数量错误: {e}")
+            logger.error("❌ 获取免单剩余数量错误: %s", e)
             return {"success": False, "message": str(e)}
 
 # 全局邀请服务实例
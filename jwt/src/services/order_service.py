@@ -2,11 +2,28 @@
 订单服务模块
 处理订单相关的业务逻辑
 """
-import json
-from typing import Dict, Any, List
-from datetime import datetime, timezone
+import heapq
+import logging
+from itertools import islice
+from typing import Dict, Any, List, Optional
+from datetime import datetime, timedelta, timezone
 from ..storage import storage
-from ..utils import prepare_order_data, validate_budget, validate_required_fields
+from ..storage.async_storage import get_async_storage
+from ..config import config
+from ..utils import (
+    prepare_order_data, validate_budget, validate_required_fields,
+    allowed_source_statuses, build_transition_update,
+    encode_order_cursor, decode_order_cursor, order_position
+)
+from ..utils.orders import ORDER_TRANSITION_TARGETS, parse_timestamp
+from ..utils.cache import user_sequence_cache
+from ..utils.tags import encode_tags
+from ..utils.order_codec import decode_order
+from ..utils.etag import bump_version
+from ..utils.pubsub import event_hub, user_orders_topic
+from .preferences_service import preferences_service
+
+logger = logging.getLogger(__name__)
 
 class OrderService:
     """订单服务类"""
@@ -14,10 +31,13 @@ class OrderService:
     def __init__(self):
         self.storage = storage
     
-    def create_order(self, user_id: str, phone_number: str, form_data: Dict[str, Any]) -> Dict[str, Any]:
-        """创建订单"""
-        print(f"📋 创建订单: 用户 {user_id}")
-        print(f"📋 订单数据: 用户{user_id}, 地址{form_data.get('address', '')[:20]}...")
+    def create_order(self, user_id: str, phone_number: str, form_data: Dict[str, Any],
+                     submit: bool = False) -> Dict[str, Any]:
+        """创建订单
+
+        submit为True时直接以submitted状态写入，创建和提交在同一次插入中完成。
+        """
+        logger.debug("📋 创建订单: 用户 %s", user_id)
         
         # 验证必填字段
         is_valid, error_msg = validate_required_fields(
@@ -37,53 +57,189 @@ class OrderService:
         # 准备订单数据
         order_data = prepare_order_data(user_id, phone_number, form_data)
         
-        # 处理复杂字段（过敏和偏好）
-        order_data['dietary_restrictions'] = json.dumps(
-            form_data.get('allergies', []), 
-            ensure_ascii=False
-        )
-        order_data['food_preferences'] = json.dumps(
-            form_data.get('preferences', []), 
-            ensure_ascii=False
-        )
+        # 忌口/偏好位掩码，人群筛选按位运算，不需要解析JSON
+        order_data['allergy_mask'] = encode_tags('allergies', order_data['dietary_restrictions'])
+        order_data['preference_mask'] = encode_tags('preferences', order_data['food_preferences'])
+        
+        # 用户注册序号随插入一起写入，不再依赖插入后的触发器回填
+        order_data['user_sequence'] = self._get_user_sequence(user_id, phone_number)
+        
+        if submit:
+            order_data.update(build_transition_update('submitted', order_data['created_at']))
         
         # 创建订单
-        return self.storage.create_order(order_data)
+        result = self.storage.create_order(order_data)
+        if result.get("success"):
+            bump_version(user_id, 'orders')
+            event_hub.publish(user_orders_topic(user_id), 'order_created', {
+                'order_id': result['order_id'],
+                'order_number': result['order_number'],
+                'status': order_data['status']
+            })
+        return result
+    
+    def quick_order(self, user_id: str, phone_number: str) -> Dict[str, Any]:
+        """按保存的偏好一键下单
+
+        服务端读取偏好并组装表单，订单直接以已提交状态写入：
+        一次偏好读取 + 一次订单插入，替代 complete → form-data → create-order → submit-order 四次请求。
+        """
+        logger.debug("⚡ 快速下单: 用户 %s", user_id)
+        
+        if not user_id:
+            return {"success": False, "message": "用户ID不能为空"}
+        
+        preferences = self.storage.get_user_preferences(user_id)
+        if not preferences_service.has_complete_preferences(preferences):
+            return {"success": False, "message": "偏好设置不完整，无法快速下单", "has_complete_preferences": False}
+        
+        preference_form = preferences_service.prepare_form_data_from_preferences(preferences)
+        form_data = {
+            'address': preference_form['address'],
+            'allergies': preference_form['selectedAllergies'],
+            'preferences': preference_form['selectedPreferences'],
+            'budget': preference_form['budget'],
+            'foodType': preference_form['selectedFoodType']
+        }
+        
+        result = self.create_order(user_id, phone_number, form_data, submit=True)
+        if result.get("success"):
+            logger.info("✅ 快速下单成功: %s", result['order_number'])
+            result = {**result, "message": "订单提交成功", "status": "submitted"}
+        return result
+    
+    def _get_user_sequence(self, user_id: str, phone_number: str) -> Optional[int]:
+        """获取用户注册序号（优先读缓存，未命中时按手机号回查一次）"""
+        user_sequence = user_sequence_cache.get(user_id)
+        if user_sequence is not None:
+            return user_sequence
+        
+        user_data = self.storage.get_user(phone_number)
+        if not user_data or str(user_data.get('id')) != str(user_id):
+            return None
+        
+        user_sequence = user_data.get('user_sequence')
+        if user_sequence:
+            user_sequence_cache.set(user_id, user_sequence)
+        return user_sequence
     
     def submit_order(self, order_id: str) -> Dict[str, Any]:
         """提交订单"""
-        print(f"📤 提交订单: {order_id}")
+        logger.debug("📤 提交订单: %s", order_id)
         
         if not order_id:
             return {"success": False, "message": "订单ID不能为空"}
         
-        # 检查订单是否存在
-        order = self.storage.get_order(order_id)
-        if not order:
-            return {"success": False, "message": "订单不存在"}
+        # 一次条件更新完成检查和状态转换
+        result = self.transition_orders([{'order_id': order_id, 'to_status': 'submitted'}])
+        order_result = result["results"][0]
         
-        # 更新订单状态
-        update_data = {
-            'status': 'submitted',
-            'submitted_at': datetime.now(timezone.utc).isoformat()
-        }
-        
-        update_result = self.storage.update_order(order_id, update_data)
-        
-        if update_result["success"]:
-            print(f"✅ 订单提交成功: {order['order_number']}")
+        if order_result["success"] or order_result.get("status") == 'submitted':
+            logger.info("✅ 订单提交成功: %s", order_result['order_number'])
             return {
                 "success": True,
                 "message": "订单提交成功",
-                "order_number": order['order_number']
+                "order_number": order_result['order_number']
             }
         else:
-            print(f"❌ 订单提交失败: {update_result['message']}")
-            return update_result
+            logger.warning("❌ 订单提交失败: %s", order_result['message'])
+            return {"success": False, "message": order_result['message']}
+    
+    def transition_orders(self, transitions: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """批量转换订单状态
+
+        按状态机校验后，在一次存储往返中应用所有转换，逐个订单返回结果。
+
+        Args:
+            transitions: 每项包含 order_id 和 to_status
+        """
+        if not transitions:
+            return {"success": False, "message": "没有需要转换的订单"}
+        
+        if len(transitions) > config.ORDER_BULK_TRANSITION_MAX:
+            return {
+                "success": False,
+                "message": f"单次最多转换{config.ORDER_BULK_TRANSITION_MAX}个订单"
+            }
+        
+        now = datetime.now(timezone.utc).isoformat()
+        results = [None] * len(transitions)
+        storage_transitions = []
+        request_indexes = []
+        seen_order_ids = set()
+        
+        for index, transition in enumerate(transitions):
+            order_id = transition.get('order_id')
+            target = transition.get('to_status')
+            
+            if not order_id:
+                results[index] = {"order_id": order_id, "success": False, "message": "订单ID不能为空"}
+            elif target not in ORDER_TRANSITION_TARGETS:
+                results[index] = {"order_id": order_id, "success": False, "message": f"无效的目标状态: {target}"}
+            elif order_id in seen_order_ids:
+                results[index] = {"order_id": order_id, "success": False, "message": "重复的订单ID"}
+            else:
+                seen_order_ids.add(order_id)
+                storage_transitions.append({
+                    'order_id': order_id,
+                    'from_statuses': allowed_source_statuses(target),
+                    'update': build_transition_update(target, now)
+                })
+                request_indexes.append(index)
+        
+        if storage_transitions:
+            try:
+                applied = self.storage.transition_orders(storage_transitions)
+            except Exception as e:
+                logger.error("❌ 批量转换订单状态失败: %s", e)
+                return {"success": False, "message": f"订单状态转换失败: {str(e)}"}
+            
+            for index, outcome in zip(request_indexes, applied):
+                target = transitions[index]['to_status']
+                results[index] = {
+                    "order_id": outcome['order_id'],
+                    "success": outcome['success'],
+                    "status": outcome['status'],
+                    "order_number": outcome['order_number'],
+                    "message": self._transition_message(outcome, target)
+                }
+        
+            # 每个受影响的用户只递增一次版本号
+            for user_id in {outcome.get('user_id') for outcome in applied if outcome['success']}:
+                bump_version(user_id, 'orders')
+            
+            for outcome in applied:
+                if outcome['success'] and outcome.get('user_id'):
+                    event_hub.publish(user_orders_topic(outcome['user_id']), 'order_status', {
+                        'order_id': outcome['order_id'],
+                        'order_number': outcome['order_number'],
+                        'status': outcome['status'],
+                        'is_deleted': outcome.get('is_deleted', False)
+                    })
+        
+        succeeded = sum(1 for result in results if result["success"])
+        logger.info("🔄 订单状态转换: 成功 %s/%s", succeeded, len(results))
+        
+        return {
+            "success": True,
+            "results": results,
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded
+        }
+    
+    def _transition_message(self, outcome: Dict[str, Any], target: str) -> str:
+        """生成单个订单状态转换的结果说明"""
+        if outcome['success']:
+            return "订单状态更新成功"
+        if outcome['status'] is None:
+            return "订单不存在"
+        if outcome.get('is_deleted'):
+            return "订单已删除"
+        return f"订单状态为{outcome['status']}，不能转换为{target}"
     
     def update_order_feedback(self, order_id: str, rating: int, feedback: str) -> Dict[str, Any]:
         """更新订单反馈"""
-        print(f"⭐ 更新订单反馈: {order_id} - 评分: {rating}")
+        logger.debug("⭐ 更新订单反馈: %s - 评分: %s", order_id, rating)
         
         # 验证必填字段
         if not order_id:
@@ -107,31 +263,101 @@ class OrderService:
         update_result = self.storage.update_order(order_id, feedback_data)
         
         if update_result["success"]:
-            print(f"✅ 反馈更新成功")
+            bump_version(order.get('user_id'), 'orders')
+            event_hub.publish(user_orders_topic(order.get('user_id')), 'order_updated', {
+                'order_id': order_id,
+                'order_number': order.get('order_number'),
+                'user_rating': rating
+            })
+            logger.debug("✅ 反馈更新成功")
             return {"success": True, "message": "反馈提交成功"}
         else:
-            print(f"❌ 反馈更新失败: {update_result['message']}")
+            logger.warning("❌ 反馈更新失败: %s", update_result['message'])
             return update_result
     
-    def get_user_orders(self, user_id: str) -> Dict[str, Any]:
-        """获取用户订单列表"""
-        print(f"📋 获取用户订单: {user_id}")
+    def get_user_orders(self, user_id: str, cursor: Optional[str] = None,
+                        limit: Optional[int] = None) -> Dict[str, Any]:
+        """分页获取用户订单列表
+
+        先按 (created_at, id) 倒序键集分页读取热表；只有这一页翻到了保留期之外
+        （归档订单可能插入的位置）才读取归档表，并按同一顺序合并。
+        游标记录上一页最后一行的 (created_at, id)。
+        """
+        flow = self._user_orders_flow(user_id, cursor, limit)
+        try:
+            page_args = next(flow)
+            while True:
+                try:
+                    page = self.storage.get_user_orders_page(*page_args)
+                except Exception as e:
+                    page_args = flow.throw(e)
+                    continue
+                page_args = flow.send(page)
+        except StopIteration as stop:
+            return stop.value
+    
+    async def get_user_orders_async(self, user_id: str, cursor: Optional[str] = None,
+                                    limit: Optional[int] = None) -> Dict[str, Any]:
+        """分页获取用户订单列表（ASGI模式：异步读取存储）"""
+        async_storage = get_async_storage()
+        flow = self._user_orders_flow(user_id, cursor, limit)
+        try:
+            page_args = next(flow)
+            while True:
+                try:
+                    page = await async_storage.get_user_orders_page(*page_args)
+                except Exception as e:
+                    page_args = flow.throw(e)
+                    continue
+                page_args = flow.send(page)
+        except StopIteration as stop:
+            return stop.value
+    
+    def _user_orders_flow(self, user_id: str, cursor: Optional[str], limit: Optional[int]):
+        """用户订单分页逻辑（同步和异步接口共用）
+
+        需要读取一页时yield get_user_orders_page的参数，由调用方读取后send回结果
+        （读取异常通过throw传回），最终结果作为生成器的返回值。
+        """
+        logger.debug("📋 获取用户订单: %s", user_id)
         
         if not user_id:
             return {"success": False, "message": "用户ID不能为空"}
         
+        limit = min(max(int(limit or config.ORDER_PAGE_SIZE), 1), config.ORDER_PAGE_MAX)
         try:
-            user_orders = self.storage.get_user_orders(user_id)
-            print(f"📋 找到 {len(user_orders)} 个订单")
-            
-            return {
-                "success": True,
-                "orders": user_orders,
-                "count": len(user_orders)
-            }
-        except Exception as e:
-            print(f"❌ 获取订单失败: {str(e)}")
-            return {"success": False, "message": f"获取订单失败: {str(e)}"}
+            before = decode_order_cursor(cursor) if cursor else None
+        except ValueError as e:
+            return {"success": False, "message": str(e)}
+        
+        # 存储读取失败时异常向上抛出，由路由返回5xx（空列表会带着当前ETag被缓存）
+        # 多读一行判断是否还有下一页
+        merged = yield (user_id, before, limit + 1)
+        
+        # 未删除的归档订单都早于归档时的保留期起点，热表这一页（含多读的一行）都在保留期内时
+        # 归档表不会有排在这一页里的订单，不必读取；否则两张表按 (created_at, id) 合并，
+        # 因为未归档的旧草稿/已提交订单可能比归档订单更早，不能先后拼接
+        horizon = datetime.now(timezone.utc) - timedelta(days=config.ORDER_ARCHIVE_AFTER_DAYS)
+        if len(merged) <= limit or parse_timestamp(merged[-1]['created_at']) < horizon:
+            archived = yield (user_id, before, limit + 1, True)
+            merged = list(islice(heapq.merge(merged, archived, key=order_position, reverse=True), limit + 1))
+        
+        user_orders = merged[:limit]
+        next_cursor = None
+        if len(merged) > limit:
+            last = user_orders[-1]
+            next_cursor = encode_order_cursor(last['created_at'], str(last['id']))
+        
+        for order in user_orders:
+            decode_order(order)
+        logger.debug("📋 找到 %s 个订单", len(user_orders))
+        
+        return {
+            "success": True,
+            "orders": user_orders,
+            "count": len(user_orders),
+            "next_cursor": next_cursor
+        }
 
 # 全局订单服务实例
 order_service = OrderService()
\ No newline at end of file
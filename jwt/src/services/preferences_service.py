@@ -2,46 +2,58 @@
 用户偏好服务模块
 处理用户偏好相关的业务逻辑
 """
+import logging
+import threading
 from typing import Dict, Any, Optional
 from ..storage import storage
+from ..storage.async_storage import get_async_storage
 from ..utils import validate_required_fields
+from ..utils.cache import preferences_read_models
+from ..utils.etag import bump_version
+from ..utils.json_provider import dumps_bytes
+from ..utils.tags import encode_tags
+
+logger = logging.getLogger(__name__)
+
+# 可以通过merge-patch更新的偏好字段
+PREFERENCE_FIELDS = (
+    'default_address', 'default_food_type', 'default_allergies', 'default_preferences',
+    'default_budget', 'other_allergy_text', 'other_preference_text', 'address_suggestion'
+)
 
 class PreferencesService:
     """用户偏好服务类"""
     
     def __init__(self):
         self.storage = storage
+        self._read_model_lock = threading.Lock()
     
     def get_user_preferences(self, user_id: str) -> Dict[str, Any]:
-        """获取用户偏好设置"""
+        """获取用户偏好设置（存储读取失败时抛出异常，由路由返回5xx）"""
         if not user_id:
             return {"success": False, "message": "用户ID不能为空"}
         
-        try:
-            preferences = self.storage.get_user_preferences(user_id)
-            
-            if preferences:
-                print(f"✅ 获取用户偏好成功: {user_id}")
-                return {
-                    "success": True,
-                    "preferences": preferences,
-                    "has_preferences": True
-                }
-            else:
-                print(f"ℹ️  用户无保存偏好: {user_id}")
-                return {
-                    "success": True,
-                    "preferences": None,
-                    "has_preferences": False,
-                    "message": "用户暂无保存的偏好设置"
-                }
-        except Exception as e:
-            print(f"❌ 获取用户偏好失败: {str(e)}")
-            return {"success": False, "message": f"获取偏好设置失败: {str(e)}"}
+        preferences = self.storage.get_user_preferences(user_id)
+        
+        if preferences:
+            logger.debug("✅ 获取用户偏好成功: %s", user_id)
+            return {
+                "success": True,
+                "preferences": preferences,
+                "has_preferences": True
+            }
+        else:
+            logger.debug("ℹ️  用户无保存偏好: %s", user_id)
+            return {
+                "success": True,
+                "preferences": None,
+                "has_preferences": False,
+                "message": "用户暂无保存的偏好设置"
+            }
     
     def save_user_preferences(self, user_id: str, form_data: Dict[str, Any]) -> Dict[str, Any]:
         """保存用户偏好设置"""
-        print(f"💾 保存用户偏好: {user_id}")
+        logger.debug("💾 保存用户偏好: %s", user_id)
         
         # 验证必填字段
         is_valid, error_msg = validate_required_fields(
@@ -65,46 +77,66 @@ class PreferencesService:
             }
             
             # 过滤空值
+            # 忌口/偏好为null时掩码同样写为0，整体替换后不会留下旧的掩码
+            masks = self._tag_masks(preferences)
             preferences = {k: v for k, v in preferences.items() if v is not None}
+            preferences.update(masks)
             
-            return self.storage.save_user_preferences(user_id, preferences)
+            # 存储层在同一次写入中递增行版本号和ETag版本号
+            result = self.storage.save_user_preferences(user_id, preferences)
+            if result.get("success"):
+                self._refresh_read_model(user_id, result["preferences"], result["version"])
+            return result
             
         except Exception as e:
-            print(f"❌ 保存用户偏好失败: {str(e)}")
+            logger.error("❌ 保存用户偏好失败: %s", e)
             return {"success": False, "message": f"保存偏好设置失败: {str(e)}"}
     
-    def update_user_preferences(self, user_id: str, updates: Dict[str, Any]) -> Dict[str, Any]:
-        """更新用户偏好设置"""
-        print(f"🔄 更新用户偏好: {user_id}")
+    def update_user_preferences(self, user_id: str, updates: Dict[str, Any],
+                                expected_version: Optional[int] = None) -> Dict[str, Any]:
+        """按JSON merge-patch更新用户偏好设置
+
+        值为null的字段被清除；expected_version来自If-Match，与当前版本不一致时返回conflict。
+        """
+        logger.debug("🔄 更新用户偏好: %s", user_id)
         
         if not user_id:
             return {"success": False, "message": "用户ID不能为空"}
         
+        if not updates:
+            return {"success": False, "message": "没有有效的更新数据"}
+        
+        unknown_fields = [field for field in updates if field not in PREFERENCE_FIELDS]
+        if unknown_fields:
+            return {"success": False, "message": f"不支持的偏好字段: {', '.join(unknown_fields)}"}
+        
         try:
-            # 过滤空值
-            filtered_updates = {k: v for k, v in updates.items() if v is not None}
-            
-            if not filtered_updates:
-                return {"success": False, "message": "没有有效的更新数据"}
-            
-            return self.storage.update_user_preferences(user_id, filtered_updates)
+            updates = {**updates, **self._tag_masks(updates)}
+            result = self.storage.update_user_preferences(user_id, updates, expected_version)
+            if result.get("success"):
+                self._refresh_read_model(user_id, result["preferences"], result["version"])
+            return result
             
         except Exception as e:
-            print(f"❌ 更新用户偏好失败: {str(e)}")
+            logger.error("❌ 更新用户偏好失败: %s", e)
             return {"success": False, "message": f"更新偏好设置失败: {str(e)}"}
     
     def delete_user_preferences(self, user_id: str) -> Dict[str, Any]:
         """删除用户偏好设置"""
-        print(f"🗑️  删除用户偏好: {user_id}")
+        logger.debug("🗑️  删除用户偏好: %s", user_id)
         
         if not user_id:
             return {"success": False, "message": "用户ID不能为空"}
         
         try:
-            return self.storage.delete_user_preferences(user_id)
+            result = self.storage.delete_user_preferences(user_id)
+            if result.get("success"):
+                bump_version(user_id, 'preferences')
+                preferences_read_models.delete(user_id)
+            return result
             
         except Exception as e:
-            print(f"❌ 删除用户偏好失败: {str(e)}")
+            logger.error("❌ 删除用户偏好失败: %s", e)
             return {"success": False, "message": f"删除偏好设置失败: {str(e)}"}
     
     def prepare_form_data_from_preferences(self, preferences: Dict[str, Any]) -> Dict[str, Any]:
@@ -121,7 +153,7 @@ class PreferencesService:
                 'selectedAddressSuggestion': preferences.get('address_suggestion', None)
             }
         except Exception as e:
-            print(f"❌ 转换偏好数据失败: {str(e)}")
+            logger.error("❌ 转换偏好数据失败: %s", e)
             return {}
     
     def has_complete_preferences(self, preferences: Optional[Dict[str, Any]]) -> bool:
@@ -148,5 +180,95 @@ class PreferencesService:
         
         return True
 
+    def _tag_masks(self, fields: Dict[str, Any]) -> Dict[str, int]:
+        """根据本次写入的忌口/偏好列表计算位掩码（字段被清除时掩码为0）"""
+        masks = {}
+        if 'default_allergies' in fields:
+            masks['allergy_mask'] = encode_tags('allergies', fields['default_allergies'] or [])
+        if 'default_preferences' in fields:
+            masks['preference_mask'] = encode_tags('preferences', fields['default_preferences'] or [])
+        return masks
+    
+    def get_read_model(self, user_id: str, version: Optional[int] = None) -> Dict[str, Any]:
+        """获取偏好读模型（预先序列化的 /complete 和 /form-data 响应体）
+
+        缓存的版本号与当前数据版本号一致时直接返回；否则读取一次偏好重新构建。
+        version为None（版本号不可用）时不使用也不写入缓存；偏好读取失败时抛出异常，不缓存。
+        """
+        entry = preferences_read_models.get(user_id)
+        if entry is not None and version is not None and entry['version'] == version:
+            return entry
+        
+        preferences = self.storage.get_user_preferences(user_id)
+        entry = self._build_read_model(preferences, version)
+        if version is not None:
+            self._store_read_model(user_id, entry)
+        return entry
+    
+    async def get_read_model_async(self, user_id: str, version: Optional[int] = None) -> Dict[str, Any]:
+        """获取偏好读模型（ASGI模式：缓存未命中时异步读取偏好）"""
+        entry = preferences_read_models.get(user_id)
+        if entry is not None and version is not None and entry['version'] == version:
+            return entry
+        
+        preferences = await get_async_storage().get_user_preferences(user_id)
+        entry = self._build_read_model(preferences, version)
+        if version is not None:
+            self._store_read_model(user_id, entry)
+        return entry
+    
+    def _refresh_read_model(self, user_id: str, preferences: Dict[str, Any], version: int) -> None:
+        """写入成功后立即重建读模型，后续GET无需再读存储"""
+        self._store_read_model(user_id, self._build_read_model(preferences, version))
+    
+    def _store_read_model(self, user_id: str, entry: Dict[str, Any]) -> None:
+        """只保留版本号更新的读模型，避免并发写入时旧版本覆盖新版本"""
+        with self._read_model_lock:
+            current = preferences_read_models.get(user_id)
+            if current is None or current['version'] < entry['version']:
+                preferences_read_models.set(user_id, entry)
+    
+    def _build_read_model(self, preferences: Optional[Dict[str, Any]], version: Optional[int]) -> Dict[str, Any]:
+        """构建读模型：完整性标记、表单数据和两个路由的响应字节"""
+        has_preferences = bool(preferences)
+        is_complete = self.has_complete_preferences(preferences)
+        form_data = self.prepare_form_data_from_preferences(preferences) if has_preferences else {}
+        
+        if has_preferences:
+            complete_body = {
+                "success": True,
+                "has_preferences": True,
+                "is_complete": is_complete,
+                "can_quick_order": is_complete,
+                "preferences": preferences
+            }
+            form_data_body = {
+                "success": True,
+                "has_preferences": True,
+                "form_data": form_data,
+                "can_quick_order": is_complete
+            }
+        else:
+            complete_body = {
+                "success": True,
+                "has_preferences": False,
+                "is_complete": False,
+                "can_quick_order": False,
+                "message": "用户暂无保存的偏好设置"
+            }
+            form_data_body = {
+                "success": True,
+                "has_preferences": False,
+                "form_data": {}
+            }
+        
+        return {
+            "version": version,
+            "is_complete": is_complete,
+            "form_data": form_data,
+            "complete_json": dumps_bytes(complete_body),
+            "form_data_json": dumps_bytes(form_data_body)
+        }
+
 # 全局偏好服务实例
 preferences_service = PreferencesService()
\ No newline at end of file
@@ -0,0 +1,257 @@
+"""
+订单检索服务模块
+为客服查询维护进程内的订单倒排索引：订单号哈希、手机号后缀、按天日期桶、
+状态以及地址二元分词，多个条件通过倒排列表求交集完成，不再向Supabase发送无索引的过滤
+"""
+import logging
+import bisect
+import re
+import threading
+import time
+from typing import Dict, Any, List, Optional, Set, Tuple
+from ..config import config
+from ..storage import storage
+from ..utils.orders import ORDER_SYNC_SOURCES, advance_watermark, sync_key, sync_start
+
+logger = logging.getLogger(__name__)
+
+# 手机号后缀最短长度
+MIN_PHONE_SUFFIX = 3
+
+# 地址关键词最短长度（按相邻两个字符切分）
+MIN_ADDRESS_FRAGMENT = 2
+
+def normalize_text(value: Optional[str]) -> str:
+    """去掉空白并转小写"""
+    return re.sub(r'\s+', '', value or '').lower()
+
+def address_tokens(value: Optional[str]) -> Set[str]:
+    """把地址切分为相邻两个字符的分词（中文地址没有空格分隔）"""
+    text = normalize_text(value)
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+class OrderSearchIndex:
+    """订单检索索引
+
+    每个条件对应一张 值 -> 订单ID集合 的倒排表；订单更新时先移除旧的倒排项再写入。
+    日期桶的键另外维护一个有序列表，日期范围查询用二分定位。
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.documents: Dict[str, Dict[str, Any]] = {}
+        self.by_order_number: Dict[str, str] = {}
+        self.by_phone_suffix: Dict[str, Set[str]] = {}
+        self.by_day: Dict[str, Set[str]] = {}
+        self.days: List[str] = []
+        self.by_status: Dict[str, Set[str]] = {}
+        self.by_address_token: Dict[str, Set[str]] = {}
+        # 热表和归档表各自的水位线，键为是否归档表
+        self.watermarks: Dict[bool, Optional[Tuple[str, str]]] = {False: None, True: None}
+        self.last_refreshed_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    @staticmethod
+    def _add(postings: Dict[str, Set[str]], key: str, order_id: str) -> None:
+        postings.setdefault(key, set()).add(order_id)
+
+    @staticmethod
+    def _discard(postings: Dict[str, Set[str]], key: str, order_id: str) -> None:
+        ids = postings.get(key)
+        if ids is not None:
+            ids.discard(order_id)
+            if not ids:
+                del postings[key]
+
+    def upsert(self, order: Dict[str, Any]) -> None:
+        """写入或更新一个订单的索引项"""
+        order_id = str(order['id'])
+        document = {
+            'id': order['id'],
+            'order_number': order.get('order_number'),
+            'user_id': order.get('user_id'),
+            'phone_number': order.get('phone_number') or '',
+            'status': order.get('status'),
+            'delivery_address': order.get('delivery_address') or '',
+            'budget_amount': order.get('budget_amount'),
+            'created_at': order.get('created_at') or '',
+            # 日期桶按下单的本地营业日（order_date），created_at是UTC时间，凌晨的订单日期会差一天
+            'order_date': order.get('order_date') or (order.get('created_at') or '')[:10],
+            'is_deleted': bool(order.get('is_deleted', False))
+        }
+
+        with self.lock:
+            self.remove(order_id)
+            self.documents[order_id] = document
+
+            if document['order_number']:
+                self.by_order_number[document['order_number']] = order_id
+
+            phone = document['phone_number']
+            for length in range(MIN_PHONE_SUFFIX, len(phone) + 1):
+                self._add(self.by_phone_suffix, phone[-length:], order_id)
+
+            day = document['order_date']
+            if day not in self.by_day:
+                bisect.insort(self.days, day)
+            self._add(self.by_day, day, order_id)
+
+            self._add(self.by_status, document['status'], order_id)
+
+            for token in address_tokens(document['delivery_address']):
+                self._add(self.by_address_token, token, order_id)
+
+    def remove(self, order_id: str) -> None:
+        """移除一个订单的全部索引项"""
+        with self.lock:
+            document = self.documents.pop(order_id, None)
+            if document is None:
+                return
+
+            if self.by_order_number.get(document['order_number']) == order_id:
+                del self.by_order_number[document['order_number']]
+
+            phone = document['phone_number']
+            for length in range(MIN_PHONE_SUFFIX, len(phone) + 1):
+                self._discard(self.by_phone_suffix, phone[-length:], order_id)
+
+            day = document['order_date']
+            self._discard(self.by_day, day, order_id)
+            if day not in self.by_day:
+                position = bisect.bisect_left(self.days, day)
+                if position < len(self.days) and self.days[position] == day:
+                    del self.days[position]
+
+            self._discard(self.by_status, document['status'], order_id)
+
+            for token in address_tokens(document['delivery_address']):
+                self._discard(self.by_address_token, token, order_id)
+
+    def _day_range(self, start_date: Optional[str], end_date: Optional[str]) -> Set[str]:
+        """合并日期范围内所有日期桶"""
+        low = bisect.bisect_left(self.days, start_date) if start_date else 0
+        high = bisect.bisect_right(self.days, end_date) if end_date else len(self.days)
+        ids: Set[str] = set()
+        for day in self.days[low:high]:
+            ids.update(self.by_day[day])
+        return ids
+
+    def search(self, filters: Dict[str, Any], limit: int) -> Tuple[int, List[Dict[str, Any]]]:
+        """按条件求倒排列表交集，返回 (命中总数, 按创建时间倒序的前limit条)"""
+        with self.lock:
+            postings: List[Set[str]] = []
+
+            if filters.get('order_number'):
+                order_id = self.by_order_number.get(filters['order_number'])
+                postings.append({order_id} if order_id else set())
+            if filters.get('phone_suffix'):
+                postings.append(self.by_phone_suffix.get(filters['phone_suffix'], set()))
+            if filters.get('status'):
+                postings.append(self.by_status.get(filters['status'], set()))
+            if filters.get('start_date') or filters.get('end_date'):
+                postings.append(self._day_range(filters.get('start_date'), filters.get('end_date')))
+
+            fragment = normalize_text(filters.get('address'))
+            if fragment:
+                for token in address_tokens(fragment):
+                    postings.append(self.by_address_token.get(token, set()))
+
+            # 从最短的倒排列表开始求交集
+            postings.sort(key=len)
+            matched = set(postings[0]) if postings else set(self.documents)
+            for ids in postings[1:]:
+                if not matched:
+                    break
+                matched &= ids
+
+            documents = [self.documents[order_id] for order_id in matched]
+
+        # 二元分词可能误命中（分词都出现但不连续），用原文校验
+        if fragment:
+            documents = [doc for doc in documents if fragment in normalize_text(doc['delivery_address'])]
+        if not filters.get('include_deleted'):
+            documents = [doc for doc in documents if not doc['is_deleted']]
+
+        documents.sort(key=lambda doc: (doc['created_at'], str(doc['id'])), reverse=True)
+        return len(documents), documents[:limit]
+
+class SearchService:
+    """订单检索服务类"""
+
+    # 每次增量刷新读取的行数
+    REFRESH_PAGE_SIZE = 1000
+
+    def __init__(self):
+        self.storage = storage
+        self._refresh_lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """丢弃索引，下次刷新时从头同步"""
+        self.index = OrderSearchIndex()
+
+    def refresh(self, force: bool = False) -> int:
+        """按 (updated_at, id) 增量拉取热表变更的订单，按 (archived_at, id) 拉取新归档的订单
+
+        每次从水位线往前重读INDEX_SYNC_OVERLAP_SECONDS，补上时间戳落在水位线之前的晚提交的行；
+        upsert按订单ID覆盖，重读不会重复。返回水位线之后的新行数。
+        """
+        index = self.index
+        if not force and time.monotonic() - index.last_refreshed_at < config.SEARCH_REFRESH_SECONDS:
+            return 0
+
+        with self._refresh_lock:
+            refreshed = 0
+            filters = {'include_deleted': True}
+            for archived, sort_field in ORDER_SYNC_SOURCES:
+                previous = index.watermarks[archived]
+                after = sync_start(previous, config.INDEX_SYNC_OVERLAP_SECONDS)
+                while True:
+                    page = self.storage.get_orders_page(
+                        filters, after, self.REFRESH_PAGE_SIZE, sort_field=sort_field, archived=archived
+                    )
+                    for order in page:
+                        index.upsert(order)
+                        key = (order.get(sort_field) or order['created_at'], str(order['id']))
+                        if previous is None or sync_key(key) > sync_key(previous):
+                            refreshed += 1
+                        index.watermarks[archived] = advance_watermark(index.watermarks[archived], key)
+
+                    if page:
+                        after = (page[-1].get(sort_field) or page[-1]['created_at'], str(page[-1]['id']))
+                    if len(page) < self.REFRESH_PAGE_SIZE:
+                        break
+
+            index.last_refreshed_at = time.monotonic()
+            if refreshed:
+                logger.debug("🔎 检索索引增量刷新: %s 行，共 %s 行", refreshed, len(index))
+            return refreshed
+
+    def search_orders(self, params: Dict[str, Any], limit: int = 50) -> Dict[str, Any]:
+        """按订单号、手机号后缀、日期范围、状态和地址关键词检索订单"""
+        filters = {
+            'order_number': (params.get('order_number') or '').strip().upper(),
+            'phone_suffix': (params.get('phone_suffix') or '').strip(),
+            'start_date': params.get('start_date'),
+            'end_date': params.get('end_date'),
+            'status': params.get('status'),
+            'address': params.get('address'),
+            'include_deleted': params.get('include_deleted', False)
+        }
+
+        if not any(filters[key] for key in ('order_number', 'phone_suffix', 'start_date', 'end_date', 'status', 'address')):
+            return {"success": False, "message": "至少需要一个检索条件"}
+        if filters['phone_suffix'] and (not filters['phone_suffix'].isdigit() or len(filters['phone_suffix']) < MIN_PHONE_SUFFIX):
+            return {"success": False, "message": f"手机号后缀至少{MIN_PHONE_SUFFIX}位数字"}
+        if filters['address'] and len(normalize_text(filters['address'])) < MIN_ADDRESS_FRAGMENT:
+            return {"success": False, "message": f"地址关键词至少{MIN_ADDRESS_FRAGMENT}个字符"}
+
+        self.refresh()
+        total, orders = self.index.search(filters, limit)
+        logger.debug("🔎 订单检索: %s 个结果", total)
+        return {"success": True, "orders": orders, "count": len(orders), "total": total}
+
+# 全局检索服务实例
+search_service = SearchService()
@@ -4,6 +4,7 @@
 from .base import BaseStorage
 from .dev_storage import DevStorage
 from .production_storage import ProductionStorage
-from .factory import storage
+from .factory import storage, get_storage
+from .async_storage import AsyncStorage, get_async_storage
 
-__all__ = ['BaseStorage', 'DevStorage', 'ProductionStorage', 'storage']
\ No newline at end of file
+__all__ = ['BaseStorage', 'DevStorage', 'ProductionStorage', 'storage', 'get_storage', 'AsyncStorage', 'get_async_storage']
\ No newline at end of file
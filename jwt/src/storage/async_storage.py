@@ -0,0 +1,153 @@
+"""
+异步存储适配（ASGI模式使用）
+生产模式下热点读取和验证码写入走异步PostgREST客户端，等待网络时不占用线程；
+其余方法在有界线程池中执行同步实现。开发模式的内存存储直接在事件循环中调用。
+"""
+import logging
+import asyncio
+import functools
+import importlib.util
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from .base import BaseStorage
+from .dev_storage import DevStorage
+from .production_storage import or_filter
+from ..config import config
+from ..utils.metrics import instrument_storage
+
+logger = logging.getLogger(__name__)
+
+POSTGREST_AVAILABLE = importlib.util.find_spec("postgrest") is not None
+
+class AsyncStorage:
+    """同步存储的异步包装：未单独实现的方法在线程池中执行"""
+
+    def __init__(self, storage: BaseStorage, executor: Optional[ThreadPoolExecutor] = None):
+        self._storage = storage
+        self._executor = executor
+
+    def __getattr__(self, name: str) -> Any:
+        method = getattr(self._storage, name)
+        if not callable(method):
+            return method
+
+        async def call(*args: Any, **kwargs: Any) -> Any:
+            # 没有线程池时（内存存储）直接调用
+            if self._executor is None:
+                return method(*args, **kwargs)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(method, *args, **kwargs))
+
+        return call
+
+    async def aclose(self) -> None:
+        """释放资源"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+class AsyncSupabaseStorage(AsyncStorage):
+    """生产模式：查询条件与ProductionStorage一致，改用异步客户端发送"""
+
+    def __init__(self, storage: BaseStorage, executor: ThreadPoolExecutor):
+        super().__init__(storage, executor)
+        from postgrest import AsyncPostgrestClient
+        self.client = AsyncPostgrestClient(
+            f"{config.SUPABASE_URL}/rest/v1",
+            headers={
+                'apikey': config.SUPABASE_KEY,
+                'Authorization': f"Bearer {config.SUPABASE_KEY}",
+                'Accept': 'application/json',
+                'Content-Type': 'application/json'
+            }
+        )
+        logger.info("✅ 异步存储客户端已初始化")
+
+    async def store_verification_code(self, phone_number: str, code: str, expires_at: str) -> Dict[str, Any]:
+        """存储验证码"""
+        try:
+            await self.client.table('verification_codes').upsert({
+                'phone_number': phone_number,
+                'code': code,
+                'expires_at': expires_at,
+                'used': False
+            }).execute()
+            return {"success": True}
+        except Exception as e:
+            return {"success": False, "message": str(e)}
+
+    async def get_user_orders_page(self, user_id: str, before: Optional[Tuple[str, str]], limit: int,
+                                   archived: bool = False) -> List[Dict[str, Any]]:
+        """按 (created_at, id) 降序分页读取用户订单"""
+        table = 'orders_archive' if archived else 'orders'
+        query = self.client.table(table).select('*').eq('user_id', user_id).eq('is_deleted', False)
+        if before:
+            created_at, order_id = before
+            query = or_filter(
+                query,
+                f'created_at.lt."{created_at}",'
+                f'and(created_at.eq."{created_at}",id.lt.{order_id})'
+            )
+
+        result = await query.order('created_at.desc,id.desc').limit(limit).execute()
+        return result.data
+
+    async def get_user_preferences(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """获取用户偏好设置（读取失败时抛出异常，不能当作"无偏好"缓存）"""
+        result = await self.client.table('user_preferences').select('*').eq('user_id', user_id).execute()
+        return result.data[0] if result.data else None
+
+    async def get_data_version(self, user_id: str, scope: str) -> int:
+        """获取用户数据版本号"""
+        result = await self.client.table('user_data_versions').select('version').eq(
+            'user_id', user_id
+        ).eq('scope', scope).execute()
+        return result.data[0]['version'] if result.data else 0
+
+    async def aclose(self) -> None:
+        """关闭异步客户端和线程池"""
+        await self.client.aclose()
+        await super().aclose()
+
+# AsyncSupabaseStorage通过异步客户端实现的存储方法
+ASYNC_STORAGE_METHODS = ('store_verification_code', 'get_user_orders_page', 'get_user_preferences', 'get_data_version')
+
+_async_storage: Optional[AsyncStorage] = None
+_async_storage_lock = threading.Lock()
+
+def get_async_storage() -> AsyncStorage:
+    """获取当前进程的异步存储实例（首次调用时创建）"""
+    global _async_storage
+    if _async_storage is None:
+        with _async_storage_lock:
+            if _async_storage is None:
+                from .factory import get_storage
+                storage = get_storage()
+                if isinstance(storage, DevStorage):
+                    _async_storage = AsyncStorage(storage)
+                else:
+                    executor = ThreadPoolExecutor(max_workers=config.ASGI_BLOCKING_THREADS, thread_name_prefix='storage')
+                    if POSTGREST_AVAILABLE:
+                        # 异步客户端实现的方法单独计时；其余方法在线程池中调用已计时的同步方法
+                        _async_storage = instrument_storage(
+                            AsyncSupabaseStorage(storage, executor), ASYNC_STORAGE_METHODS
+                        )
+                    else:
+                        _async_storage = AsyncStorage(storage, executor)
+    return _async_storage
+
+def _reset_async_storage() -> None:
+    """fork后在子进程中丢弃父进程的异步存储和线程池"""
+    global _async_storage, _async_storage_lock
+    _async_storage = None
+    _async_storage_lock = threading.Lock()
+
+os.register_at_fork(after_in_child=_reset_async_storage)
+
+async def close_async_storage() -> None:
+    """关闭异步存储（ASGI应用退出时调用）"""
+    global _async_storage
+    if _async_storage is not None:
+        await _async_storage.aclose()
+        _async_storage = None
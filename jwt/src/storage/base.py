@@ -3,7 +3,7 @@
 定义统一的存储接口
 """
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 
 class BaseStorage(ABC):
     """存储抽象基类"""
@@ -28,6 +28,11 @@ class BaseStorage(ABC):
         """创建用户"""
         pass
     
+    @abstractmethod
+    def lease_user_sequence_block(self, block_size: int) -> int:
+        """原子租用一段用户序号，返回租用后计数器的值（即本段最大序号）"""
+        pass
+    
     @abstractmethod
     def get_user(self, phone_number: str) -> Optional[Dict[str, Any]]:
         """获取用户信息"""
@@ -48,6 +53,18 @@ class BaseStorage(ABC):
         """更新订单"""
         pass
     
+    @abstractmethod
+    def transition_orders(self, transitions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """批量转换订单状态（一次存储往返）
+
+        Args:
+            transitions: 每项包含 order_id、from_statuses（允许的当前状态）、update（要写入的字段）
+
+        Returns:
+            每项包含 order_id、success、status、order_number、is_deleted、user_id；订单不存在时status为None
+        """
+        pass
+    
     @abstractmethod
     def get_order(self, order_id: str) -> Optional[Dict[str, Any]]:
         """获取订单"""
@@ -58,6 +75,40 @@ class BaseStorage(ABC):
         """获取用户订单列表"""
         pass
     
+    @abstractmethod
+    def get_orders_page(self, filters: Dict[str, Any], after: Optional[Tuple[str, str]], limit: int,
+                        sort_field: str = 'created_at', archived: bool = False) -> List[Dict[str, Any]]:
+        """按 (sort_field, id) 升序分页读取订单（键集分页）
+
+        Args:
+            filters: 可选 created_from / created_before（ISO时间，左闭右开）、status、include_deleted
+            after: 上一页最后一行的 (sort_field, id)，首页为None
+            limit: 每页行数
+            sort_field: 排序字段，created_at、updated_at 或 archived_at（后两者用于增量同步）
+            archived: True时读取归档表
+        """
+        pass
+    
+    @abstractmethod
+    def get_user_orders_page(self, user_id: str, before: Optional[Tuple[str, str]], limit: int,
+                             archived: bool = False) -> List[Dict[str, Any]]:
+        """按 (created_at, id) 降序分页读取用户未删除的订单
+
+        Args:
+            before: 上一页最后一行的 (created_at, id)，首页为None
+            archived: True时读取归档表
+        """
+        pass
+    
+    @abstractmethod
+    def archive_orders(self, cutoff: str, batch_size: int) -> Dict[str, Any]:
+        """把一批已软删除或早于cutoff的已完成/已取消订单移入归档表
+
+        Returns:
+            archived: 本批移动的行数；user_ids: 受影响的用户
+        """
+        pass
+    
     @abstractmethod
     def get_user_invite_stats(self, user_id: str) -> Dict[str, Any]:
         """获取用户邀请统计"""
@@ -84,17 +135,74 @@ class BaseStorage(ABC):
         """获取用户偏好设置"""
         pass
     
+    @abstractmethod
+    def get_preferences_page(self, after: Optional[Tuple[str, str]], limit: int) -> List[Dict[str, Any]]:
+        """按 (updated_at, user_id) 升序分页读取用户偏好（用于增量同步）"""
+        pass
+    
+    @abstractmethod
+    def get_deleted_preferences_page(self, after: Optional[Tuple[str, str]], limit: int) -> List[Dict[str, Any]]:
+        """按 (deleted_at, user_id) 升序分页读取偏好已删除的用户（用于增量同步；重新保存偏好后不再返回）"""
+        pass
+    
     @abstractmethod
     def save_user_preferences(self, user_id: str, preferences: Dict[str, Any]) -> Dict[str, Any]:
-        """保存用户偏好设置"""
+        """保存用户偏好设置（整体替换偏好字段，保留created_at，行版本号加1）"""
         pass
     
     @abstractmethod
-    def update_user_preferences(self, user_id: str, updates: Dict[str, Any]) -> Dict[str, Any]:
-        """更新用户偏好设置"""
+    def update_user_preferences(self, user_id: str, updates: Dict[str, Any],
+                                expected_version: Optional[int] = None) -> Dict[str, Any]:
+        """按JSON merge-patch更新用户偏好设置，不存在时创建
+
+        Args:
+            updates: merge-patch，值为None的字段被清除
+            expected_version: 期望的当前行版本号；不一致时不写入，返回conflict=True和当前偏好
+
+        Returns:
+            成功时包含 preferences 和新的 version；行版本号与preferences数据版本号一致
+        """
         pass
     
     @abstractmethod
     def delete_user_preferences(self, user_id: str) -> Dict[str, Any]:
         """删除用户偏好设置"""
+        pass
+    
+    # 幂等键相关方法
+    @abstractmethod
+    def reserve_idempotency_key(self, key: str, fingerprint: str, lease_seconds: int) -> Optional[Dict[str, Any]]:
+        """原子占用幂等键
+
+        处理中的记录只在lease_seconds内有效，过期后（处理的进程已退出）允许重新占用
+
+        Returns:
+            占用成功返回None；键已存在（处理中或已完成）返回已有记录
+        """
+        pass
+    
+    @abstractmethod
+    def get_idempotency_record(self, key: str) -> Optional[Dict[str, Any]]:
+        """获取幂等键记录"""
+        pass
+    
+    @abstractmethod
+    def complete_idempotency_key(self, key: str, status_code: int, response_body: str, ttl_seconds: int) -> bool:
+        """保存幂等键对应的响应，保存ttl_seconds"""
+        pass
+    
+    @abstractmethod
+    def release_idempotency_key(self, key: str) -> bool:
+        """释放处理中的幂等键（请求失败时允许重试）"""
+        pass
+    
+    # 数据版本号相关方法（用于ETag）
+    @abstractmethod
+    def get_data_version(self, user_id: str, scope: str) -> int:
+        """获取用户某类数据（orders/preferences）的版本号，从未写入时为0"""
+        pass
+    
+    @abstractmethod
+    def bump_data_version(self, user_id: str, scope: str) -> int:
+        """原子递增用户某类数据的版本号，返回新版本号"""
         pass
\ No newline at end of file
@@ -1,12 +1,25 @@
 """
 开发模式内存存储实现
 """
+import logging
 import uuid
+import heapq
 import json
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from .base import BaseStorage
 from ..config import config
+from ..utils.orders import generate_order_number, order_position
+from ..utils.sequence import BlockSequenceAllocator
+from ..utils.merge_patch import apply_merge_patch
+from ..utils.log import mask_phone
+
+logger = logging.getLogger(__name__)
+
+# 偏好写入时不允许客户端修改的字段
+PROTECTED_PREFERENCE_FIELDS = ('id', 'user_id', 'version', 'created_at', 'updated_at')
 
 class DevStorage(BaseStorage):
     """开发模式内存存储"""
@@ -16,18 +29,34 @@ class DevStorage(BaseStorage):
         self.verification_codes = {}
         self.users = {}
         self.orders = {}
+        self.orders_archive = {}
+        self._orders_lock = threading.Lock()
         self.user_sequence_counter = 0
+        self.user_sequence_allocator = BlockSequenceAllocator(
+            self.lease_user_sequence_block, config.USER_SEQUENCE_BLOCK_SIZE
+        )
         self.user_invite_stats = {}
         self.invite_progress = {}
         self.free_drinks_remaining = 100
         
         # 新增：用户偏好存储
         self.user_preferences = {}
+        # 偏好已删除的用户（user_id -> {'user_id', 'deleted_at'}），供内存索引增量同步删除
+        self.deleted_preferences = {}
+        
+        # 幂等键存储（有界，按插入顺序淘汰）
+        self.idempotency_keys = OrderedDict()
+        self._idempotency_expiry: List[Tuple[datetime, str]] = []
+        self._idempotency_lock = threading.Lock()
+        
+        # 用户数据版本号（(user_id, scope) -> version）
+        self.data_versions = {}
+        self._versions_lock = threading.Lock()
         
         # 预定义的有效邀请码
         self.valid_invite_codes = set(config.DEV_INVITE_CODES)
         
-        print("🔧 开发模式存储已初始化")
+        logger.info("🔧 开发模式存储已初始化")
     
     def store_verification_code(self, phone_number: str, code: str, expires_at: str) -> Dict[str, Any]:
         """存储验证码"""
@@ -52,8 +81,7 @@ class DevStorage(BaseStorage):
     
     def create_user(self, phone_number: str, invite_code: str) -> Dict[str, Any]:
         """创建用户"""
-        self.user_sequence_counter += 1
-        user_sequence = self.user_sequence_counter
+        user_sequence = self.user_sequence_allocator.next()
         user_id = f"dev_user_{user_sequence}"
         
         user_data = {
@@ -66,7 +94,7 @@ class DevStorage(BaseStorage):
         
         self.users[phone_number] = user_data
         
-        print(f"✅ 开发模式 - 新用户创建成功: {phone_number} (ID: {user_id}, 序号: {user_sequence})")
+        logger.info("✅ 开发模式 - 新用户创建成功: %s (ID: %s, 序号: %s)", mask_phone(phone_number), user_id, user_sequence)
         return {
             "success": True,
             "message": "新用户注册成功",
@@ -75,6 +103,11 @@ class DevStorage(BaseStorage):
             "user_sequence": user_sequence
         }
     
+    def lease_user_sequence_block(self, block_size: int) -> int:
+        """原子租用一段用户序号"""
+        self.user_sequence_counter += block_size
+        return self.user_sequence_counter
+    
     def get_user(self, phone_number: str) -> Optional[Dict[str, Any]]:
         """获取用户信息"""
         return self.users.get(phone_number)
@@ -87,19 +120,23 @@ class DevStorage(BaseStorage):
         """创建订单"""
         order_id = str(uuid.uuid4())
         order_data['id'] = order_id
+        if not order_data.get('order_number'):
+            order_data['order_number'] = generate_order_number()
         
-        # 获取用户的注册序号
-        user_id = order_data['user_id']
-        user_info = None
-        for phone, user in self.users.items():
-            if user['id'] == user_id:
-                user_info = user
-                break
-        order_data['user_sequence_number'] = user_info['user_sequence'] if user_info else None
+        # 用户注册序号由服务层随订单数据带入；缺失时才回查用户（相当于数据库触发器兜底）
+        if order_data.get('user_sequence') is None:
+            user_id = order_data['user_id']
+            user_info = None
+            for phone, user in self.users.items():
+                if user['id'] == user_id:
+                    user_info = user
+                    break
+            order_data['user_sequence'] = user_info['user_sequence'] if user_info else None
+        order_data['user_sequence_number'] = order_data['user_sequence']
         
         self.orders[order_id] = order_data
         
-        print(f"✅ 开发模式 - 订单创建成功: {order_data['order_number']} (用户序号: {order_data['user_sequence_number']})")
+        logger.debug("✅ 开发模式 - 订单创建成功: %s (用户序号: %s)", order_data['order_number'], order_data['user_sequence_number'])
         return {
             "success": True,
             "message": "订单创建成功",
@@ -118,6 +155,32 @@ class DevStorage(BaseStorage):
         
         return {"success": True, "message": "订单更新成功"}
     
+    def transition_orders(self, transitions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """批量转换订单状态"""
+        results = []
+        now = datetime.now(timezone.utc).isoformat()
+        with self._orders_lock:
+            for transition in transitions:
+                order = self.orders.get(transition['order_id'])
+                success = bool(
+                    order
+                    and not order.get('is_deleted', False)
+                    and order.get('status') in transition['from_statuses']
+                )
+                if success:
+                    order.update(transition['update'])
+                    order['updated_at'] = now
+                
+                results.append({
+                    'order_id': transition['order_id'],
+                    'success': success,
+                    'status': order.get('status') if order else None,
+                    'order_number': order.get('order_number') if order else None,
+                    'is_deleted': order.get('is_deleted', False) if order else None,
+                    'user_id': order.get('user_id') if order else None
+                })
+        return results
+    
     def get_order(self, order_id: str) -> Optional[Dict[str, Any]]:
         """获取订单"""
         return self.orders.get(order_id)
@@ -131,6 +194,60 @@ class DevStorage(BaseStorage):
         user_orders.sort(key=lambda x: x['created_at'], reverse=True)
         return user_orders
     
+    def get_user_orders_page(self, user_id: str, before: Optional[Tuple[str, str]], limit: int,
+                             archived: bool = False) -> List[Dict[str, Any]]:
+        """按 (created_at, id) 降序分页读取用户订单"""
+        source = self.orders_archive if archived else self.orders
+        bound = order_position({'created_at': before[0], 'id': before[1]}) if before else None
+        user_orders = [
+            order for order in list(source.values())
+            if order['user_id'] == user_id and not order.get('is_deleted', False)
+            and (not bound or order_position(order) < bound)
+        ]
+        return heapq.nlargest(limit, user_orders, key=order_position)
+    
+    def archive_orders(self, cutoff: str, batch_size: int) -> Dict[str, Any]:
+        """把一批可归档订单移入归档表"""
+        archived_at = datetime.now(timezone.utc).isoformat()
+        with self._orders_lock:
+            candidates = [
+                order for order in self.orders.values()
+                if order.get('is_deleted', False)
+                or (order.get('status') in ('completed', 'cancelled') and order['created_at'] < cutoff)
+            ]
+            candidates.sort(key=lambda x: x['created_at'])
+            
+            user_ids = set()
+            for order in candidates[:batch_size]:
+                self.orders_archive[order['id']] = {**self.orders.pop(order['id']), 'archived_at': archived_at}
+                user_ids.add(order['user_id'])
+        
+        return {"archived": min(len(candidates), batch_size), "user_ids": sorted(user_ids)}
+    
+    def get_orders_page(self, filters: Dict[str, Any], after: Optional[Tuple[str, str]], limit: int,
+                        sort_field: str = 'created_at', archived: bool = False) -> List[Dict[str, Any]]:
+        """按 (sort_field, id) 升序分页读取订单"""
+        def sort_key(order):
+            return (order.get(sort_field) or order['created_at'], str(order['id']))
+        
+        def matches(order):
+            if not filters.get('include_deleted') and order.get('is_deleted', False):
+                return False
+            if filters.get('status') and order.get('status') != filters['status']:
+                return False
+            if filters.get('created_from') and order['created_at'] < filters['created_from']:
+                return False
+            if filters.get('created_before') and order['created_at'] >= filters['created_before']:
+                return False
+            if after and sort_key(order) <= after:
+                return False
+            return True
+        
+        # 只保留最小的limit条（堆），不对全部订单排序
+        source = self.orders_archive if archived else self.orders
+        page = heapq.nsmallest(limit, filter(matches, list(source.values())), key=sort_key)
+        return [dict(order) for order in page]
+    
     def get_user_invite_stats(self, user_id: str) -> Dict[str, Any]:
         """获取用户邀请统计"""
         if user_id not in self.user_invite_stats:
@@ -157,17 +274,17 @@ class DevStorage(BaseStorage):
                     {
                         'phone_number': '138****0001',
                         'masked_phone': '138****0001',
-                        'invited_at': (datetime.now() - timedelta(days=5)).isoformat()
+                        'invited_at': (datetime.now(timezone.utc) - timedelta(days=5)).isoformat()
                     },
                     {
                         'phone_number': '139****0002', 
                         'masked_phone': '139****0002',
-                        'invited_at': (datetime.now() - timedelta(days=3)).isoformat()
+                        'invited_at': (datetime.now(timezone.utc) - timedelta(days=3)).isoformat()
                     },
                     {
                         'phone_number': '182****7609',
                         'masked_phone': '182****7609',
-                        'invited_at': datetime.now().isoformat()
+                        'invited_at': datetime.now(timezone.utc).isoformat()
                     }
                 ],
                 'total_invitations': 3
@@ -195,7 +312,7 @@ class DevStorage(BaseStorage):
         user_stats['free_drink_claimed'] = True
         self.free_drinks_remaining -= 1
         
-        print(f"🎉 用户 {user_id} 成功领取免单，剩余名额: {self.free_drinks_remaining}")
+        logger.info("🎉 用户 %s 成功领取免单，剩余名额: %s", user_id, self.free_drinks_remaining)
         
         return {
             "success": True,
@@ -212,55 +329,181 @@ class DevStorage(BaseStorage):
         """获取用户偏好设置"""
         return self.user_preferences.get(user_id)
     
+    def get_preferences_page(self, after: Optional[Tuple[str, str]], limit: int) -> List[Dict[str, Any]]:
+        """按 (updated_at, user_id) 升序分页读取用户偏好"""
+        def sort_key(preferences):
+            return (preferences['updated_at'], preferences['user_id'])
+        
+        page = [
+            preferences for preferences in list(self.user_preferences.values())
+            if not after or sort_key(preferences) > after
+        ]
+        page.sort(key=sort_key)
+        return page[:limit]
+    
+    def get_deleted_preferences_page(self, after: Optional[Tuple[str, str]], limit: int) -> List[Dict[str, Any]]:
+        """按 (deleted_at, user_id) 升序分页读取偏好已删除的用户"""
+        def sort_key(deletion):
+            return (deletion['deleted_at'], deletion['user_id'])
+        
+        page = [
+            deletion for deletion in list(self.deleted_preferences.values())
+            if not after or sort_key(deletion) > after
+        ]
+        page.sort(key=sort_key)
+        return page[:limit]
+    
     def save_user_preferences(self, user_id: str, preferences: Dict[str, Any]) -> Dict[str, Any]:
         """保存用户偏好设置"""
-        try:
-            preferences['user_id'] = user_id
-            preferences['created_at'] = datetime.now(timezone.utc).isoformat()
-            preferences['updated_at'] = datetime.now(timezone.utc).isoformat()
-            
-            self.user_preferences[user_id] = preferences
-            
-            print(f"✅ 开发模式 - 用户偏好保存成功: {user_id}")
-            return {
-                "success": True,
-                "message": "偏好设置保存成功",
-                "preferences": preferences
-            }
-        except Exception as e:
-            print(f"❌ 用户偏好保存失败: {str(e)}")
-            return {"success": False, "message": f"偏好设置保存失败: {str(e)}"}
+        result = self._merge_user_preferences(user_id, preferences, None, replace=True)
+        if result["success"]:
+            result["message"] = "偏好设置保存成功"
+        return result
+    
+    def update_user_preferences(self, user_id: str, updates: Dict[str, Any],
+                                expected_version: Optional[int] = None) -> Dict[str, Any]:
+        """按merge-patch更新用户偏好设置"""
+        return self._merge_user_preferences(user_id, updates, expected_version)
     
-    def update_user_preferences(self, user_id: str, updates: Dict[str, Any]) -> Dict[str, Any]:
-        """更新用户偏好设置"""
+    def _merge_user_preferences(self, user_id: str, patch: Dict[str, Any], expected_version: Optional[int],
+                                replace: bool = False) -> Dict[str, Any]:
+        """带版本条件的偏好写入（对应数据库函数 merge_user_preferences）"""
         try:
-            if user_id not in self.user_preferences:
-                # 如果不存在，创建新的偏好设置
-                return self.save_user_preferences(user_id, updates)
-            
-            # 更新现有偏好设置
-            self.user_preferences[user_id].update(updates)
-            self.user_preferences[user_id]['updated_at'] = datetime.now(timezone.utc).isoformat()
+            patch = {k: v for k, v in patch.items() if k not in PROTECTED_PREFERENCE_FIELDS}
+            with self._versions_lock:
+                current_version = self.data_versions.get((user_id, 'preferences'), 0)
+                current = self.user_preferences.get(user_id)
+                if expected_version is not None and expected_version != current_version:
+                    return {
+                        "success": False,
+                        "conflict": True,
+                        "message": "偏好设置已被修改，请刷新后重试",
+                        "preferences": current,
+                        "version": current_version
+                    }
+                
+                now = datetime.now(timezone.utc).isoformat()
+                version = current_version + 1
+                merged = apply_merge_patch({} if replace or not current else current, patch)
+                merged.update({
+                    'user_id': user_id,
+                    'version': version,
+                    'created_at': current['created_at'] if current else now,
+                    'updated_at': now
+                })
+                self.user_preferences[user_id] = merged
+                self.deleted_preferences.pop(user_id, None)
+                self.data_versions[(user_id, 'preferences')] = version
             
-            print(f"✅ 开发模式 - 用户偏好更新成功: {user_id}")
+            logger.debug("✅ 开发模式 - 用户偏好更新成功: %s (版本 %s)", user_id, version)
             return {
                 "success": True,
                 "message": "偏好设置更新成功",
-                "preferences": self.user_preferences[user_id]
+                "preferences": merged,
+                "version": version
             }
         except Exception as e:
-            print(f"❌ 用户偏好更新失败: {str(e)}")
+            logger.error("❌ 用户偏好更新失败: %s", e)
             return {"success": False, "message": f"偏好设置更新失败: {str(e)}"}
     
     def delete_user_preferences(self, user_id: str) -> Dict[str, Any]:
         """删除用户偏好设置"""
         try:
             if user_id in self.user_preferences:
-                del self.user_preferences[user_id]
-                print(f"✅ 开发模式 - 用户偏好删除成功: {user_id}")
+                with self._versions_lock:
+                    del self.user_preferences[user_id]
+                    self.deleted_preferences[user_id] = {
+                        'user_id': user_id, 'deleted_at': datetime.now(timezone.utc).isoformat()
+                    }
+                logger.debug("✅ 开发模式 - 用户偏好删除成功: %s", user_id)
                 return {"success": True, "message": "偏好设置删除成功"}
             else:
                 return {"success": False, "message": "偏好设置不存在"}
         except Exception as e:
-            print(f"❌ 用户偏好删除失败: {str(e)}")
-            return {"success": False, "message": f"偏好设置删除失败: {str(e)}"}
\ No newline at end of file
+            logger.error("❌ 用户偏好删除失败: %s", e)
+            return {"success": False, "message": f"偏好设置删除失败: {str(e)}"}
+    
+    # 幂等键相关方法
+    def _schedule_idempotency_expiry(self, record: Dict[str, Any]) -> None:
+        """记录的过期时间放入最小堆（续期时再放一次，旧条目在清理时跳过）"""
+        heapq.heappush(self._idempotency_expiry, (record['expires_at'], record['key']))
+    
+    def _purge_idempotency_keys(self) -> None:
+        """按过期时间从堆顶清理过期的幂等键，并把数量控制在上限以内"""
+        now = datetime.now(timezone.utc)
+        while self._idempotency_expiry and self._idempotency_expiry[0][0] <= now:
+            expires_at, key = heapq.heappop(self._idempotency_expiry)
+            record = self.idempotency_keys.get(key)
+            if record and record['expires_at'] == expires_at:
+                del self.idempotency_keys[key]
+        while len(self.idempotency_keys) >= config.IDEMPOTENCY_MAX_KEYS:
+            self.idempotency_keys.popitem(last=False)
+        if len(self._idempotency_expiry) > 2 * config.IDEMPOTENCY_MAX_KEYS:
+            # 被淘汰或续期的旧条目过多时重建堆
+            self._idempotency_expiry = [(v['expires_at'], k) for k, v in self.idempotency_keys.items()]
+            heapq.heapify(self._idempotency_expiry)
+    
+    def reserve_idempotency_key(self, key: str, fingerprint: str, lease_seconds: int) -> Optional[Dict[str, Any]]:
+        """原子占用幂等键（处理中的记录过期后可被重试接管）"""
+        with self._idempotency_lock:
+            now = datetime.now(timezone.utc)
+            record = self.idempotency_keys.get(key)
+            if record and record['expires_at'] > now:
+                return dict(record)
+            if record:
+                del self.idempotency_keys[key]
+            
+            self._purge_idempotency_keys()
+            record = {
+                'key': key,
+                'fingerprint': fingerprint,
+                'status': 'pending',
+                'status_code': None,
+                'response_body': None,
+                'expires_at': now + timedelta(seconds=lease_seconds)
+            }
+            self.idempotency_keys[key] = record
+            self._schedule_idempotency_expiry(record)
+            return None
+    
+    def get_idempotency_record(self, key: str) -> Optional[Dict[str, Any]]:
+        """获取幂等键记录"""
+        with self._idempotency_lock:
+            record = self.idempotency_keys.get(key)
+            return dict(record) if record else None
+    
+    def complete_idempotency_key(self, key: str, status_code: int, response_body: str, ttl_seconds: int) -> bool:
+        """保存幂等键对应的响应，并把过期时间延长到ttl_seconds"""
+        with self._idempotency_lock:
+            record = self.idempotency_keys.get(key)
+            if not record:
+                return False
+            record.update({
+                'status': 'completed',
+                'status_code': status_code,
+                'response_body': response_body,
+                'expires_at': datetime.now(timezone.utc) + timedelta(seconds=ttl_seconds)
+            })
+            self._schedule_idempotency_expiry(record)
+            return True
+    
+    def release_idempotency_key(self, key: str) -> bool:
+        """释放处理中的幂等键"""
+        with self._idempotency_lock:
+            record = self.idempotency_keys.get(key)
+            if record and record['status'] == 'pending':
+                del self.idempotency_keys[key]
+                return True
+            return False
+    
+    # 数据版本号相关方法
+    def get_data_version(self, user_id: str, scope: str) -> int:
+        """获取用户数据版本号"""
+        return self.data_versions.get((user_id, scope), 0)
+    
+    def bump_data_version(self, user_id: str, scope: str) -> int:
+        """原子递增用户数据版本号"""
+        with self._versions_lock:
+            version = self.data_versions.get((user_id, scope), 0) + 1
+            self.data_versions[(user_id, scope)] = version
+            return version
\ No newline at end of file
@@ -2,14 +2,18 @@
 存储工厂模块
 根据配置返回相应的存储实现
 """
+import os
+import threading
+from typing import Any, Optional
 from .base import BaseStorage
 from .dev_storage import DevStorage
 from .production_storage import ProductionStorage
 from ..config import config
+from ..utils.metrics import instrument_storage
 
 class StorageFactory:
     """存储工厂类"""
-    
+
     @staticmethod
     def create_storage() -> BaseStorage:
         """根据配置创建存储实例"""
@@ -18,5 +22,37 @@ class StorageFactory:
         else:
             return ProductionStorage()
 
+_storage: Optional[BaseStorage] = None
+_storage_lock = threading.Lock()
+
+def get_storage() -> BaseStorage:
+    """获取当前进程的存储实例（首次调用时创建，接口方法记录耗时指标）"""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                _storage = instrument_storage(StorageFactory.create_storage(), sorted(BaseStorage.__abstractmethods__))
+    return _storage
+
+def _reset_storage() -> None:
+    """fork后在子进程中丢弃父进程的存储实例，避免共享数据库连接"""
+    global _storage, _storage_lock
+    _storage = None
+    _storage_lock = threading.Lock()
+
+os.register_at_fork(after_in_child=_reset_storage)
+
+class LazyStorage:
+    """存储实例的代理：导入时不创建存储，第一次访问属性时按当前进程创建"""
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(get_storage(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(get_storage(), name, value)
+
+    def __delattr__(self, name: str) -> None:
+        delattr(get_storage(), name)
+
 # 全局存储实例
-storage = StorageFactory.create_storage()
\ No newline at end of file
+storage = LazyStorage()
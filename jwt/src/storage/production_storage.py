@@ -1,11 +1,20 @@
 """
 生产模式Supabase存储实现
 """
+import logging
 import uuid
-from datetime import datetime, timezone
-from typing import Dict, Any, Optional, List
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Optional, List, Tuple
 from .base import BaseStorage
-from ..config import db_config
+from ..config import config, db_config
+from ..utils.sequence import BlockSequenceAllocator
+
+logger = logging.getLogger(__name__)
+
+def or_filter(query, condition: str):
+    """追加PostgREST的or过滤条件（supabase 2.0依赖的postgrest查询构建器没有or_方法）"""
+    query.params = query.params.add('or', f'({condition})')
+    return query
 
 class ProductionStorage(BaseStorage):
     """生产模式Supabase存储"""
@@ -14,7 +23,10 @@ class ProductionStorage(BaseStorage):
         self.supabase = db_config.get_client()
         if not self.supabase:
             raise RuntimeError("Supabase客户端未初始化")
-        print("✅ 生产模式存储已初始化")
+        self.user_sequence_allocator = BlockSequenceAllocator(
+            self.lease_user_sequence_block, config.USER_SEQUENCE_BLOCK_SIZE
+        )
+        logger.info("✅ 生产模式存储已初始化")
     
     def store_verification_code(self, phone_number: str, code: str, expires_at: str) -> Dict[str, Any]:
         """存储验证码"""
@@ -57,12 +69,21 @@ class ProductionStorage(BaseStorage):
     def create_user(self, phone_number: str, invite_code: str) -> Dict[str, Any]:
         """创建用户"""
         try:
-            # 创建新用户
-            new_user = self.supabase.table('users').insert({
+            user_data = {
                 'phone_number': phone_number,
                 'created_at': datetime.now(timezone.utc).isoformat(),
                 'invite_code': invite_code
-            }).execute()
+            }
+            
+            # 从进程内租用的序号段分配用户序号，插入时直接写入
+            try:
+                user_data['user_sequence'] = self.user_sequence_allocator.next()
+            except Exception as e:
+                # 租用失败时留空，由数据库触发器 trigger_set_user_sequence 兜底分配
+                logger.warning("⚠️  用户序号租用失败，交由数据库分配: %s", e)
+            
+            # 创建新用户
+            new_user = self.supabase.table('users').insert(user_data).execute()
             
             # 标记邀请码为已使用
             self.supabase.table('invite_codes').update({
@@ -74,11 +95,19 @@ class ProductionStorage(BaseStorage):
                 "success": True,
                 "message": "新用户注册成功",
                 "user_id": new_user.data[0]['id'],
-                "phone_number": phone_number
+                "phone_number": phone_number,
+                "user_sequence": new_user.data[0].get('user_sequence')
             }
         except Exception as e:
             return {"success": False, "message": f"用户创建失败: {str(e)}"}
     
+    def lease_user_sequence_block(self, block_size: int) -> int:
+        """原子租用一段用户序号（一次计数器更新）"""
+        result = self.supabase.rpc('lease_user_sequence_block', {
+            'block_size': block_size
+        }).execute()
+        return int(result.data)
+    
     def get_user(self, phone_number: str) -> Optional[Dict[str, Any]]:
         """获取用户信息"""
         try:
@@ -115,11 +144,14 @@ class ProductionStorage(BaseStorage):
             
             order_data['user_sequence_number'] = user_sequence_number
             
+            # 订单号留空，由数据库触发器从按天计数器原子分配
+            order_data.pop('order_number', None)
+            
             result = self.supabase.table('orders').insert(order_data).execute()
             order_id = result.data[0]['id']
             actual_order_number = result.data[0]['order_number']
             
-            print(f"✅ 生产模式 - 订单创建成功: {actual_order_number} (用户序号: {user_sequence_number})")
+            logger.debug("✅ 生产模式 - 订单创建成功: %s (用户序号: %s)", actual_order_number, user_sequence_number)
             return {
                 "success": True,
                 "message": "订单创建成功",
@@ -128,7 +160,7 @@ class ProductionStorage(BaseStorage):
                 "user_sequence_number": user_sequence_number
             }
         except Exception as e:
-            print(f"❌ 订单创建失败: {str(e)}")
+            logger.error("❌ 订单创建失败: %s", e)
             return {"success": False, "message": f"订单创建失败: {str(e)}"}
     
     def update_order(self, order_id: str, update_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -143,6 +175,19 @@ class ProductionStorage(BaseStorage):
         except Exception as e:
             return {"success": False, "message": f"订单更新失败: {str(e)}"}
     
+    def transition_orders(self, transitions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """批量转换订单状态（数据库函数内条件更新，一次往返）"""
+        payload = [
+            {
+                'order_id': str(transition['order_id']),
+                'from_statuses': transition['from_statuses'],
+                'patch': transition['update']
+            }
+            for transition in transitions
+        ]
+        result = self.supabase.rpc('transition_orders', {'transitions': payload}).execute()
+        return result.data or []
+    
     def get_order(self, order_id: str) -> Optional[Dict[str, Any]]:
         """获取订单"""
         try:
@@ -152,14 +197,60 @@ class ProductionStorage(BaseStorage):
             return None
     
     def get_user_orders(self, user_id: str) -> List[Dict[str, Any]]:
-        """获取用户订单列表"""
-        try:
-            result = self.supabase.table('orders').select('*').eq(
-                'user_id', user_id
-            ).eq('is_deleted', False).order('created_at', desc=True).execute()
-            return result.data
-        except Exception:
-            return []
+        """获取用户订单列表（读取失败时抛出异常，不能当作空列表缓存）"""
+        result = self.supabase.table('orders').select('*').eq(
+            'user_id', user_id
+        ).eq('is_deleted', False).order('created_at', desc=True).execute()
+        return result.data
+    
+    def get_user_orders_page(self, user_id: str, before: Optional[Tuple[str, str]], limit: int,
+                             archived: bool = False) -> List[Dict[str, Any]]:
+        """按 (created_at, id) 降序分页读取用户订单（走 user_id, created_at, id 索引）"""
+        table = 'orders_archive' if archived else 'orders'
+        query = self.supabase.table(table).select('*').eq('user_id', user_id).eq('is_deleted', False)
+        if before:
+            created_at, order_id = before
+            query = or_filter(query,
+                f'created_at.lt."{created_at}",'
+                f'and(created_at.eq."{created_at}",id.lt.{order_id})'
+            )
+        
+        # 多列排序放在同一个order参数中
+        result = query.order('created_at.desc,id.desc').limit(limit).execute()
+        return result.data
+    
+    def archive_orders(self, cutoff: str, batch_size: int) -> Dict[str, Any]:
+        """调用数据库函数移动一批订单（DELETE ... RETURNING 写入归档表，一次往返）"""
+        result = self.supabase.rpc('archive_orders', {
+            'p_cutoff': cutoff,
+            'p_batch_size': batch_size
+        }).execute()
+        row = result.data[0] if result.data else {}
+        return {"archived": row.get('archived_count', 0), "user_ids": row.get('user_ids') or []}
+    
+    def get_orders_page(self, filters: Dict[str, Any], after: Optional[Tuple[str, str]], limit: int,
+                        sort_field: str = 'created_at', archived: bool = False) -> List[Dict[str, Any]]:
+        """按 (sort_field, id) 升序分页读取订单（键集分页，不使用OFFSET）"""
+        query = self.supabase.table('orders_archive' if archived else 'orders').select('*')
+        
+        if not filters.get('include_deleted'):
+            query = query.eq('is_deleted', False)
+        if filters.get('status'):
+            query = query.eq('status', filters['status'])
+        if filters.get('created_from'):
+            query = query.gte('created_at', filters['created_from'])
+        if filters.get('created_before'):
+            query = query.lt('created_at', filters['created_before'])
+        if after:
+            cursor_value, order_id = after
+            query = or_filter(query,
+                f'{sort_field}.gt."{cursor_value}",'
+                f'and({sort_field}.eq."{cursor_value}",id.gt.{order_id})'
+            )
+        
+        # 多列排序放在同一个order参数中
+        result = query.order(f'{sort_field},id').limit(limit).execute()
+        return result.data
     
     def get_user_invite_stats(self, user_id: str) -> Dict[str, Any]:
         """获取用户邀请统计"""
@@ -183,55 +274,81 @@ class ProductionStorage(BaseStorage):
     
     # 新增：用户偏好相关方法
     def get_user_preferences(self, user_id: str) -> Optional[Dict[str, Any]]:
-        """获取用户偏好设置"""
-        try:
-            result = self.supabase.table('user_preferences').select('*').eq(
-                'user_id', user_id
-            ).execute()
-            return result.data[0] if result.data else None
-        except Exception:
-            return None
+        """获取用户偏好设置（读取失败时抛出异常，不能当作"无偏好"缓存）"""
+        result = self.supabase.table('user_preferences').select('*').eq(
+            'user_id', user_id
+        ).execute()
+        return result.data[0] if result.data else None
+    
+    def get_preferences_page(self, after: Optional[Tuple[str, str]], limit: int) -> List[Dict[str, Any]]:
+        """按 (updated_at, user_id) 升序分页读取用户偏好（键集分页）"""
+        query = self.supabase.table('user_preferences').select('user_id, default_address, allergy_mask, preference_mask, updated_at')
+        if after:
+            updated_at, user_id = after
+            query = or_filter(query,
+                f'updated_at.gt."{updated_at}",'
+                f'and(updated_at.eq."{updated_at}",user_id.gt."{user_id}")'
+            )
+        
+        # 多列排序放在同一个order参数中
+        result = query.order('updated_at,user_id').limit(limit).execute()
+        return result.data
+    
+    def get_deleted_preferences_page(self, after: Optional[Tuple[str, str]], limit: int) -> List[Dict[str, Any]]:
+        """按 (deleted_at, user_id) 升序分页读取偏好已删除的用户（删除触发器写入，见 tag_masks_setup.sql）"""
+        query = self.supabase.table('user_preferences_deletions').select('user_id, deleted_at')
+        if after:
+            deleted_at, user_id = after
+            query = or_filter(query,
+                f'deleted_at.gt."{deleted_at}",'
+                f'and(deleted_at.eq."{deleted_at}",user_id.gt."{user_id}")'
+            )
+        
+        result = query.order('deleted_at,user_id').limit(limit).execute()
+        return result.data
     
     def save_user_preferences(self, user_id: str, preferences: Dict[str, Any]) -> Dict[str, Any]:
-        """保存用户偏好设置"""
-        try:
-            preferences['user_id'] = user_id
-            preferences['created_at'] = datetime.now(timezone.utc).isoformat()
-            preferences['updated_at'] = datetime.now(timezone.utc).isoformat()
-            
-            result = self.supabase.table('user_preferences').upsert(preferences).execute()
-            
-            print(f"✅ 生产模式 - 用户偏好保存成功: {user_id}")
-            return {
-                "success": True,
-                "message": "偏好设置保存成功",
-                "preferences": result.data[0] if result.data else preferences
-            }
-        except Exception as e:
-            print(f"❌ 用户偏好保存失败: {str(e)}")
-            return {"success": False, "message": f"偏好设置保存失败: {str(e)}"}
+        """保存用户偏好设置（数据库函数内整体替换，保留created_at）"""
+        result = self._merge_user_preferences(user_id, preferences, None, replace=True)
+        if result["success"]:
+            result["message"] = "偏好设置保存成功"
+        return result
+    
+    def update_user_preferences(self, user_id: str, updates: Dict[str, Any],
+                                expected_version: Optional[int] = None) -> Dict[str, Any]:
+        """按merge-patch更新用户偏好设置（带版本条件的upsert，一次往返）"""
+        return self._merge_user_preferences(user_id, updates, expected_version)
     
-    def update_user_preferences(self, user_id: str, updates: Dict[str, Any]) -> Dict[str, Any]:
-        """更新用户偏好设置"""
+    def _merge_user_preferences(self, user_id: str, patch: Dict[str, Any], expected_version: Optional[int],
+                                replace: bool = False) -> Dict[str, Any]:
+        """调用数据库函数 merge_user_preferences"""
         try:
-            updates['updated_at'] = datetime.now(timezone.utc).isoformat()
+            result = self.supabase.rpc('merge_user_preferences', {
+                'p_user_id': user_id,
+                'p_patch': patch,
+                'p_if_version': expected_version,
+                'p_replace': replace
+            }).execute()
+            outcome = result.data
             
-            result = self.supabase.table('user_preferences').update(updates).eq(
-                'user_id', user_id
-            ).execute()
+            if outcome['status'] == 'conflict':
+                return {
+                    "success": False,
+                    "conflict": True,
+                    "message": "偏好设置已被修改，请刷新后重试",
+                    "preferences": outcome.get('preferences'),
+                    "version": outcome['version']
+                }
             
-            if not result.data:
-                # 如果不存在，创建新的偏好设置
-                return self.save_user_preferences(user_id, updates)
-            
-            print(f"✅ 生产模式 - 用户偏好更新成功: {user_id}")
+            logger.debug("✅ 生产模式 - 用户偏好更新成功: %s (版本 %s)", user_id, outcome['version'])
             return {
                 "success": True,
                 "message": "偏好设置更新成功",
-                "preferences": result.data[0]
+                "preferences": outcome['preferences'],
+                "version": outcome['version']
             }
         except Exception as e:
-            print(f"❌ 用户偏好更新失败: {str(e)}")
+            logger.error("❌ 用户偏好更新失败: %s", e)
             return {"success": False, "message": f"偏好设置更新失败: {str(e)}"}
     
     def delete_user_preferences(self, user_id: str) -> Dict[str, Any]:
@@ -242,10 +359,88 @@ class ProductionStorage(BaseStorage):
             ).execute()
             
             if result.data:
-                print(f"✅ 生产模式 - 用户偏好删除成功: {user_id}")
+                logger.debug("✅ 生产模式 - 用户偏好删除成功: %s", user_id)
                 return {"success": True, "message": "偏好设置删除成功"}
             else:
                 return {"success": False, "message": "偏好设置不存在"}
         except Exception as e:
-            print(f"❌ 用户偏好删除失败: {str(e)}")
-            return {"success": False, "message": f"偏好设置删除失败: {str(e)}"}
\ No newline at end of file
+            logger.error("❌ 用户偏好删除失败: %s", e)
+            return {"success": False, "message": f"偏好设置删除失败: {str(e)}"}
+    
+    # 幂等键相关方法
+    def reserve_idempotency_key(self, key: str, fingerprint: str, lease_seconds: int) -> Optional[Dict[str, Any]]:
+        """原子占用幂等键（依赖主键唯一约束，所有worker共享；处理中的记录过期后可被接管）"""
+        now = datetime.now(timezone.utc)
+        record = {
+            'key': key,
+            'fingerprint': fingerprint,
+            'status': 'pending',
+            'created_at': now.isoformat(),
+            'expires_at': (now + timedelta(seconds=lease_seconds)).isoformat()
+        }
+        try:
+            self.supabase.table('idempotency_keys').insert(record).execute()
+            return None
+        except Exception:
+            existing = self.get_idempotency_record(key)
+            if existing is None:
+                raise
+        
+        # 已过期的记录（包括租约过期、处理进程已退出的pending记录）视为不存在：
+        # 按原过期时间条件删除后重新占用，避免误删他人刚占用的键
+        expires_at = datetime.fromisoformat(existing['expires_at'].replace('Z', '+00:00'))
+        if expires_at <= now:
+            self.supabase.table('idempotency_keys').delete().eq(
+                'key', key
+            ).eq('expires_at', existing['expires_at']).execute()
+            return self.reserve_idempotency_key(key, fingerprint, lease_seconds)
+        
+        return existing
+    
+    def get_idempotency_record(self, key: str) -> Optional[Dict[str, Any]]:
+        """获取幂等键记录"""
+        try:
+            result = self.supabase.table('idempotency_keys').select('*').eq('key', key).execute()
+            return result.data[0] if result.data else None
+        except Exception:
+            return None
+    
+    def complete_idempotency_key(self, key: str, status_code: int, response_body: str, ttl_seconds: int) -> bool:
+        """保存幂等键对应的响应，并把过期时间延长到ttl_seconds"""
+        try:
+            result = self.supabase.table('idempotency_keys').update({
+                'status': 'completed',
+                'status_code': status_code,
+                'response_body': response_body,
+                'expires_at': (datetime.now(timezone.utc) + timedelta(seconds=ttl_seconds)).isoformat()
+            }).eq('key', key).execute()
+            return bool(result.data)
+        except Exception as e:
+            logger.error("❌ 幂等响应保存失败: %s", e)
+            return False
+    
+    def release_idempotency_key(self, key: str) -> bool:
+        """释放处理中的幂等键"""
+        try:
+            result = self.supabase.table('idempotency_keys').delete().eq(
+                'key', key
+            ).eq('status', 'pending').execute()
+            return bool(result.data)
+        except Exception:
+            return False
+    
+    # 数据版本号相关方法
+    def get_data_version(self, user_id: str, scope: str) -> int:
+        """获取用户数据版本号（主键点查，只读一个整数）"""
+        result = self.supabase.table('user_data_versions').select('version').eq(
+            'user_id', user_id
+        ).eq('scope', scope).execute()
+        return result.data[0]['version'] if result.data else 0
+    
+    def bump_data_version(self, user_id: str, scope: str) -> int:
+        """原子递增用户数据版本号"""
+        result = self.supabase.rpc('bump_user_data_version', {
+            'p_user_id': user_id,
+            'p_scope': scope
+        }).execute()
+        return int(result.data)
\ No newline at end of file
@@ -2,13 +2,19 @@
 工具模块导出
 """
 from .verification import generate_verification_code, get_code_expiry_time, is_code_expired
-from .orders import generate_order_number, generate_order_id, prepare_order_data
+from .orders import (
+    generate_order_number, format_order_number, generate_order_id, prepare_order_data,
+    allowed_source_statuses, build_transition_update,
+    encode_order_cursor, decode_order_cursor, order_position
+)
 from .validation import validate_phone_number, validate_verification_code, validate_budget, validate_required_fields, validate_request_data
-from .sms import send_sms
+from .sms import send_sms, send_sms_async
 
 __all__ = [
     'generate_verification_code', 'get_code_expiry_time', 'is_code_expired',
-    'generate_order_number', 'generate_order_id', 'prepare_order_data',
+    'generate_order_number', 'format_order_number', 'generate_order_id', 'prepare_order_data',
+    'allowed_source_statuses', 'build_transition_update',
+    'encode_order_cursor', 'decode_order_cursor', 'order_position',
     'validate_phone_number', 'validate_verification_code', 'validate_budget', 'validate_required_fields', 'validate_request_data',
-    'send_sms'
+    'send_sms', 'send_sms_async'
 ]
\ No newline at end of file
@@ -0,0 +1,31 @@
+"""
+管理接口鉴权
+批量状态转换、订单导出、客服检索和分析接口可以读写所有用户的数据，
+在接入完整的用户鉴权之前，要求请求头 Authorization: Bearer <ADMIN_API_TOKEN>；
+未配置令牌时这些接口一律拒绝
+"""
+import hmac
+import logging
+from functools import wraps
+from flask import request, jsonify
+from ..config import config
+
+logger = logging.getLogger(__name__)
+
+def is_admin_request() -> bool:
+    """请求是否携带了正确的管理令牌"""
+    token = config.ADMIN_API_TOKEN
+    scheme, _, supplied = request.headers.get('Authorization', '').partition(' ')
+    if not token or scheme.lower() != 'bearer':
+        return False
+    return hmac.compare_digest(supplied.strip().encode(), token.encode())
+
+def admin_required(view):
+    """管理接口装饰器：令牌缺失或错误时返回403"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not is_admin_request():
+            logger.warning("⚠️  拒绝未授权的管理接口请求: %s %s", request.method, request.path)
+            return jsonify({"success": False, "message": "需要管理员权限"}), 403
+        return view(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,94 @@
+"""
+进程内缓存工具
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from ..config import config
+from .metrics import Counter, Gauge, register_collector
+
+# 按名称登记的缓存，导出指标时读取命中统计
+_named_caches: Dict[str, 'LRUCache'] = {}
+
+class LRUCache:
+    """线程安全的有界LRU缓存，可选过期时间"""
+
+    def __init__(self, maxsize: int = 1024, ttl_seconds: Optional[float] = None, name: Optional[str] = None):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[Any, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if name:
+            _named_caches[name] = self
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        """获取缓存值，未命中或已过期返回default"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Any, value: Any) -> None:
+        """写入缓存，超出容量时淘汰最久未使用的条目"""
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Any) -> None:
+        """删除缓存条目"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """获取命中统计"""
+        with self._lock:
+            return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+cache_hits = Counter('cache_hits_total', '缓存命中次数', ('cache',))
+cache_misses = Counter('cache_misses_total', '缓存未命中次数', ('cache',))
+cache_entries = Gauge('cache_entries', '缓存条目数', ('cache',))
+
+def _cache_samples():
+    """导出时读取各缓存已有的命中计数，读写缓存时不额外记录"""
+    for name, cache in _named_caches.items():
+        stats = cache.stats()
+        yield cache_hits.name, (name,), [stats['hits']]
+        yield cache_misses.name, (name,), [stats['misses']]
+        yield cache_entries.name, (name,), [stats['size']]
+
+register_collector(_cache_samples)
+
+# 用户注册序号缓存（user_id -> user_sequence）
+# 登录和注册时写入，创建订单时直接带入插入语句
+user_sequence_cache = LRUCache(maxsize=config.USER_SEQUENCE_CACHE_SIZE, name='user_sequence')
+
+# 偏好读模型缓存（user_id -> 预先序列化的响应和版本号）
+preferences_read_models = LRUCache(maxsize=config.PREFERENCES_READ_MODEL_SIZE, name='preferences_read_models')
+
+# 压缩响应缓存（(方法, 路径, 状态码, ETag, 编码) -> 压缩后的响应体）
+compressed_responses = LRUCache(maxsize=config.COMPRESS_CACHE_SIZE, name='compressed_responses')
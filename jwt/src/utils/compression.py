@@ -0,0 +1,121 @@
+"""
+响应压缩工具
+按Accept-Encoding协商br/gzip，小响应不压缩，压缩级别随响应大小调整；
+带ETag的响应压缩一次后按 (方法, 路径, 状态码, ETag, 编码) 缓存复用，
+压缩后的ETag追加编码后缀（如 orders-v3-gzip）
+"""
+import logging
+import gzip
+from typing import Optional
+from flask import Flask, Response, request
+from werkzeug.datastructures import Accept
+from ..config import config
+from .cache import compressed_responses
+from .etag import encoded_etag
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+    brotli = None
+
+# 可压缩的响应类型（前缀匹配）
+COMPRESSIBLE_MIMETYPES = ('application/json', 'application/x-ndjson', 'text/')
+
+# 按响应大小选择压缩级别：(大小上限, 级别)，越大的响应级别越低，避免CPU时间随大小线性放大
+COMPRESSION_LEVELS = {
+    'br': ((64 * 1024, 5), (1024 * 1024, 4), (None, 1)),
+    'gzip': ((64 * 1024, 6), (1024 * 1024, 5), (None, 1)),
+}
+
+# 可缓存的响应只压缩一次，使用更高的级别
+CACHED_COMPRESSION_LEVELS = {'br': 9, 'gzip': 9}
+
+# 超过该大小的压缩结果不进入缓存
+COMPRESS_CACHE_MAX_BYTES = 256 * 1024
+
+def negotiate_encoding(accept: Optional[Accept] = None) -> Optional[str]:
+    """按Accept-Encoding选择编码，优先br，都不接受时返回None（默认读取当前Flask请求）"""
+    if accept is None:
+        accept = request.accept_encodings
+    candidates = ('br', 'gzip') if BROTLI_AVAILABLE else ('gzip',)
+    best, best_quality = None, 0
+    for encoding in candidates:
+        quality = accept.quality(encoding)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+def compression_level(encoding: str, size: int, cacheable: bool = False) -> int:
+    """根据编码和响应大小选择压缩级别"""
+    if cacheable and size <= 1024 * 1024:
+        return CACHED_COMPRESSION_LEVELS[encoding]
+    for limit, level in COMPRESSION_LEVELS[encoding]:
+        if limit is None or size <= limit:
+            return level
+    return COMPRESSION_LEVELS[encoding][-1][1]
+
+def compress(data: bytes, encoding: str, level: int) -> bytes:
+    """压缩响应体"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+def compress_body(data: bytes, encoding: str, cache_key: Optional[tuple] = None) -> bytes:
+    """压缩响应体；带cache_key时复用同一版本已压缩的结果"""
+    body = compressed_responses.get(cache_key) if cache_key else None
+    if body is None:
+        body = compress(data, encoding, compression_level(encoding, len(data), cacheable=cache_key is not None))
+        if cache_key and len(body) <= COMPRESS_CACHE_MAX_BYTES:
+            compressed_responses.set(cache_key, body)
+    return body
+
+def _is_compressible(response: Response) -> bool:
+    """判断响应是否需要压缩"""
+    if response.direct_passthrough or response.is_streamed:
+        return False
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return False
+    if 'Content-Encoding' in response.headers:
+        return False
+    if 'no-transform' in response.headers.get('Cache-Control', ''):
+        return False
+    return response.mimetype.startswith(COMPRESSIBLE_MIMETYPES)
+
+def compress_response(response: Response) -> Response:
+    """after_request钩子：按需压缩响应"""
+    if not _is_compressible(response):
+        return response
+
+    # 无论是否压缩，同一URL的表示都随Accept-Encoding变化
+    response.vary.add('Accept-Encoding')
+
+    size = response.content_length or 0
+    if size < config.COMPRESS_MIN_SIZE or request.method == 'HEAD':
+        return response
+
+    encoding = negotiate_encoding()
+    if encoding is None:
+        return response
+
+    # ETag对应数据版本，同一版本的压缩结果可以复用
+    etag, weak = response.get_etag()
+    cache_key = (request.method, request.full_path, response.status_code, etag, encoding) if etag else None
+
+    body = compress_body(response.get_data(), encoding, cache_key)
+    if len(body) >= size:
+        return response
+
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    if etag:
+        response.set_etag(encoded_etag(etag, encoding), weak)
+    return response
+
+def init_compression(app: Flask) -> None:
+    """在应用上注册响应压缩"""
+    app.after_request(compress_response)
+    logger.info("🗜️ 响应压缩: %s (>= %s 字节)", 'br, gzip' if BROTLI_AVAILABLE else 'gzip', config.COMPRESS_MIN_SIZE)
@@ -0,0 +1,118 @@
+"""
+ETag条件请求工具
+按用户数据版本号生成强ETag，版本未变化时直接返回304；
+压缩后的表示在ETag后追加内容编码后缀（强ETag必须区分字节不同的表示）
+"""
+import logging
+from functools import wraps
+from typing import Optional, Set, Tuple
+from flask import g, request, make_response, Response
+from werkzeug.datastructures import ETags
+from ..storage import storage
+
+logger = logging.getLogger(__name__)
+
+# 版本号递增失败的 (user_id, scope)：下次递增成功前，本进程不再为这些数据生成ETag，
+# 避免客户端和压缩缓存在数据已变化后继续使用旧版本号
+_stale_versions: Set[Tuple[str, str]] = set()
+
+# 会出现在ETag后缀中的内容编码
+ETAG_ENCODINGS = ('br', 'gzip')
+
+def make_etag(scope: str, version: int) -> str:
+    """生成ETag值（不含引号）"""
+    return f"{scope}-v{version}"
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """压缩后表示的ETag，例如 orders-v3-gzip"""
+    return f"{etag}-{encoding}"
+
+def strip_etag_encoding(etag: str) -> str:
+    """去掉ETag的内容编码后缀"""
+    for encoding in ETAG_ENCODINGS:
+        if etag.endswith(f"-{encoding}"):
+            return etag[:-len(encoding) - 1]
+    return etag
+
+def matching_etag(etags: ETags, etag: str) -> Optional[str]:
+    """返回If-None-Match中与当前版本匹配的ETag（任一内容编码的表示均可），不匹配时返回None
+
+    304响应带回客户端手中那份表示的ETag。
+    """
+    if etags.star_tag:
+        return etag
+    for candidate in (etag, *(encoded_etag(etag, encoding) for encoding in ETAG_ENCODINGS)):
+        if etags.contains(candidate):
+            return candidate
+    return None
+
+def parse_etag_version(scope: str, etag: str) -> Optional[int]:
+    """从ETag值中解析版本号（忽略内容编码后缀），格式不匹配时返回None"""
+    etag = strip_etag_encoding(etag)
+    prefix = f"{scope}-v"
+    if not etag.startswith(prefix) or not etag[len(prefix):].isdigit():
+        return None
+    return int(etag[len(prefix):])
+
+def bump_version(user_id: str, scope: str) -> None:
+    """写入成功后递增用户数据版本号，使旧的ETag失效
+
+    失败时重试一次，仍失败则抛出异常（由路由返回5xx），
+    并在本进程中停止为该数据生成ETag，直到下次递增成功。
+    """
+    if not user_id:
+        return
+    key = (str(user_id), scope)
+    try:
+        storage.bump_data_version(*key)
+    except Exception as e:
+        logger.warning("⚠️  数据版本号递增失败，重试: %s/%s - %s", user_id, scope, e)
+        try:
+            storage.bump_data_version(*key)
+        except Exception as e:
+            _stale_versions.add(key)
+            logger.error("❌ 数据版本号递增失败: %s/%s - %s", user_id, scope, e)
+            raise
+    _stale_versions.discard(key)
+
+def is_version_stale(user_id: str, scope: str) -> bool:
+    """该数据的版本号是否递增失败过（此时不能用于ETag）"""
+    return (str(user_id), scope) in _stale_versions
+
+def etag_versioned(scope: str):
+    """条件GET装饰器
+
+    先读取版本号再执行路由：If-None-Match匹配时直接返回304，
+    不读取也不序列化数据行；否则在成功响应上附加ETag，并把版本号放在g.data_version。
+    路由必须带有user_id参数。
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            user_id = kwargs.get('user_id')
+            if is_version_stale(user_id, scope):
+                return view(*args, **kwargs)
+            try:
+                version = storage.get_data_version(str(user_id), scope)
+                etag = make_etag(scope, version)
+            except Exception as e:
+                logger.error("❌ 数据版本号读取失败: %s/%s - %s", user_id, scope, e)
+                return view(*args, **kwargs)
+            
+            # 路由可以用g.data_version校验自己的缓存
+            g.data_version = version
+
+            matched = matching_etag(request.if_none_match, etag)
+            if matched:
+                response = Response(status=304)
+                response.set_etag(matched)
+                response.headers['Cache-Control'] = 'private, no-cache'
+                return response
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag)
+                response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
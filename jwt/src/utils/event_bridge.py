@@ -0,0 +1,135 @@
+"""
+跨进程事件转发（Postgres LISTEN/NOTIFY）
+EventHub只在本进程内分发，而多个工作进程时，写请求和订阅该用户的SSE连接常落在不同进程。
+设置EVENTS_DATABASE_URL后，每个工作进程把本进程发布的事件NOTIFY到同一频道，
+并LISTEN该频道，把其他进程发出的事件投递给本进程的订阅者。
+
+发送在后台线程中进行：队列满或数据库不可用时丢弃事件并计数，不阻塞请求；
+监听断线重连期间的事件会丢失，客户端以订单列表接口的数据为准。
+psycopg在启动转发时才导入，未安装时事件只在本进程内分发。
+"""
+import importlib.util
+import json
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+from typing import Any, Dict, Optional
+from ..config import config
+from .metrics import Counter
+from .pubsub import EventHub, event_hub
+
+logger = logging.getLogger(__name__)
+
+PSYCOPG_AVAILABLE = importlib.util.find_spec("psycopg") is not None
+
+# NOTIFY的负载上限为8000字节，超过的事件只在本进程内分发
+MAX_PAYLOAD_BYTES = 7900
+
+# 连接失败后的重连间隔（秒）
+RECONNECT_SECONDS = 2.0
+
+bridge_messages = Counter('event_bridge_messages_total', '跨进程转发的事件数', ('result',))
+
+class PostgresEventBridge:
+    """通过LISTEN/NOTIFY在工作进程之间转发EventHub的事件"""
+
+    def __init__(self, hub: EventHub, dsn: str, channel: str, queue_size: int):
+        self.hub = hub
+        self.dsn = dsn
+        self.channel = channel
+        # 区分本进程发出的通知（LISTEN也会收到自己NOTIFY的事件）
+        self.origin = f"{socket.gethostname()}:{os.getpid()}"
+        self._outbox: queue.Queue = queue.Queue(maxsize=queue_size)
+
+    def start(self) -> None:
+        """启动发送和监听线程"""
+        threading.Thread(target=self._send_loop, name='event-bridge-send', daemon=True).start()
+        threading.Thread(target=self._listen_loop, name='event-bridge-listen', daemon=True).start()
+
+    def forward(self, topic: str, event: str, data: Dict[str, Any]) -> None:
+        """把本进程发布的事件放入发送队列（不阻塞）"""
+        payload = json.dumps({'origin': self.origin, 'topic': topic, 'event': event, 'data': data},
+                             ensure_ascii=False, default=str)
+        if len(payload.encode()) > MAX_PAYLOAD_BYTES:
+            logger.warning("⚠️  事件过大，只在本进程内分发: %s/%s", topic, event)
+            bridge_messages.inc('dropped')
+            return
+        try:
+            self._outbox.put_nowait(payload)
+        except queue.Full:
+            bridge_messages.inc('dropped')
+
+    def receive(self, payload: str) -> int:
+        """投递其他进程发来的事件（忽略本进程自己发出的），返回收到事件的订阅者数量"""
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            return 0
+        if message.get('origin') == self.origin:
+            return 0
+        bridge_messages.inc('received')
+        return self.hub.deliver(message['topic'], message['event'], message['data'])
+
+    def _connect(self) -> Any:
+        import psycopg
+        return psycopg.connect(self.dsn, autocommit=True, connect_timeout=5)
+
+    def _send_loop(self) -> None:
+        connection = None
+        while True:
+            payload = self._outbox.get()
+            try:
+                if connection is None or connection.closed:
+                    connection = self._connect()
+                connection.execute("SELECT pg_notify(%s, %s)", (self.channel, payload))
+                bridge_messages.inc('sent')
+            except Exception as e:
+                bridge_messages.inc('dropped')
+                logger.warning("⚠️  事件转发失败，稍后重连: %s", e)
+                if connection is not None:
+                    connection.close()
+                connection = None
+                time.sleep(RECONNECT_SECONDS)
+
+    def _listen_loop(self) -> None:
+        from psycopg import sql
+        while True:
+            try:
+                with self._connect() as connection:
+                    connection.execute(sql.SQL("LISTEN {}").format(sql.Identifier(self.channel)))
+                    logger.info("📡 工作进程 %s 开始接收跨进程事件: %s", os.getpid(), self.channel)
+                    for notify in connection.notifies():
+                        self.receive(notify.payload)
+            except Exception as e:
+                logger.warning("⚠️  跨进程事件监听断开，稍后重连: %s", e)
+            time.sleep(RECONNECT_SECONDS)
+
+_bridge: Optional[PostgresEventBridge] = None
+
+def init_event_bridge() -> Optional[PostgresEventBridge]:
+    """在当前进程启动跨进程事件转发（gunicorn在每个工作进程fork后调用）
+
+    未配置EVENTS_DATABASE_URL或未安装psycopg时返回None，事件只在本进程内分发。
+    """
+    global _bridge
+    if _bridge is not None or not config.EVENTS_DATABASE_URL:
+        return _bridge
+    if not PSYCOPG_AVAILABLE:
+        logger.warning("⚠️  未安装psycopg，事件只在本进程内分发")
+        return None
+    _bridge = PostgresEventBridge(event_hub, config.EVENTS_DATABASE_URL, config.EVENTS_CHANNEL, config.EVENTS_QUEUE_SIZE)
+    event_hub.set_bridge(_bridge)
+    _bridge.start()
+    return _bridge
+
+def _reset_after_fork() -> None:
+    """父进程的转发线程和连接不存在于子进程中：子进程需重新调用init_event_bridge"""
+    global _bridge
+    if _bridge is not None:
+        _bridge = None
+        event_hub.set_bridge(None)
+
+os.register_at_fork(after_in_child=_reset_after_fork)
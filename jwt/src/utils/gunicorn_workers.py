@@ -0,0 +1,58 @@
+"""
+gunicorn工作进程
+gthread工作进程在退出主循环时会丢弃已accept但还没读到请求的连接；
+这里在退出（TERM、平滑重载、达到max_requests）前先停止accept并关闭SSE连接，
+等待DRAIN_SECONDS让已accept的连接进入线程池，再进入gunicorn原有的优雅退出流程
+
+依赖的gthread内部实现（gunicorn 23，test_gunicorn.py 中有固定这些行为的测试，升级gunicorn时需重新核对）:
+    - 信号处理函数和达到max_requests时通过 self.alive = False 要求退出，主循环为 while self.alive
+    - init_process 创建 self.poller（监听socket注册在其中）和 self._lock（保护poller的注册）
+    - handle_request 对每个响应读取 self.cfg.keepalive，为0时关闭连接
+"""
+import logging
+import threading
+import time
+from gunicorn.workers.gthread import ThreadWorker
+from .pubsub import event_hub
+
+logger = logging.getLogger(__name__)
+
+# 停止accept后继续运行主循环的时间（秒）
+DRAIN_SECONDS = 1.0
+
+class DrainingThreadWorker(ThreadWorker):
+    """先停止accept再退出的gthread工作进程"""
+
+    _alive = False
+    _draining = False
+
+    @property
+    def alive(self) -> bool:
+        return self._alive
+
+    @alive.setter
+    def alive(self, value: bool) -> None:
+        if value or not self._alive:
+            self._alive = value
+            return
+        # 第一次要求退出时不立即结束主循环；信号处理函数中不能获取锁，放到线程中执行
+        if not self._draining:
+            self._draining = True
+            threading.Thread(target=self._drain, name='worker-drain', daemon=True).start()
+
+    def _drain(self) -> None:
+        """停止accept，关闭SSE连接，之后的响应不再保持连接"""
+        with self._lock:
+            for listener in self.sockets:
+                try:
+                    self.poller.unregister(listener)
+                except (KeyError, ValueError):
+                    pass
+        self.cfg.set('keepalive', 0)
+
+        # SSE是长连接，不主动关闭会一直占用到graceful_timeout；客户端会按retry间隔重连到其他进程
+        closed = event_hub.close_all()
+        logger.info("🛑 工作进程 %s 停止接收新连接: 关闭 %s 个SSE连接，等待进行中的请求完成", self.pid, closed)
+
+        time.sleep(DRAIN_SECONDS)
+        self._alive = False
@@ -0,0 +1,124 @@
+"""
+幂等请求工具
+客户端通过Idempotency-Key请求头标识一次逻辑请求，重试时重放首次请求的响应
+"""
+import logging
+import hashlib
+from functools import wraps
+from flask import request, jsonify, make_response, Response
+from ..config import config
+from ..storage import storage
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+
+# 请求体中标识调用方的字段，按顺序取第一个非空值作为幂等键的作用域
+CALLER_FIELDS = ('user_id', 'phone_number', 'order_id')
+MAX_SCOPE_LENGTH = 64
+
+def request_fingerprint() -> str:
+    """计算请求指纹（请求体的SHA-256摘要）"""
+    return hashlib.sha256(request.get_data()).hexdigest()
+
+def caller_scope() -> str:
+    """幂等键的调用方作用域：不同用户使用相同的Idempotency-Key不会互相冲突"""
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        for field in CALLER_FIELDS:
+            value = data.get(field)
+            if value:
+                scope = f"{field}={value}"
+                if len(scope) > MAX_SCOPE_LENGTH:
+                    scope = f"{field}#{hashlib.sha256(str(value).encode()).hexdigest()[:32]}"
+                return scope
+    return '-'
+
+def release_key(key: str) -> None:
+    """释放处理中的键，允许客户端重试；释放失败时由租约过期兜底"""
+    try:
+        storage.release_idempotency_key(key)
+    except Exception as e:
+        logger.error("❌ 释放幂等键失败: %s", e)
+
+def replay_response(record) -> Response:
+    """根据保存的记录重放响应"""
+    response = Response(
+        record['response_body'],
+        status=record['status_code'],
+        mimetype='application/json'
+    )
+    response.headers[REPLAYED_HEADER] = 'true'
+    return response
+
+def idempotent(view):
+    """幂等路由装饰器
+
+    - 未携带Idempotency-Key时按原逻辑处理
+    - 键按请求方法、路径和调用方（用户ID/手机号/订单ID）区分
+    - 首次请求只占用一个短租约（IDEMPOTENCY_LEASE_SECONDS），执行完成后
+      响应按IDEMPOTENCY_TTL_SECONDS保存（5xx不保存，允许客户端重试）
+    - 重复请求直接重放保存的响应；首个请求仍在处理中时立即返回409，由客户端稍后重试；
+      处理中的进程异常退出时，租约过期后的重试会接管该键
+    - 同一个键用于不同的请求体时返回422
+    - 幂等键的存储读写失败时返回500
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        idempotency_key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not idempotency_key:
+            return view(*args, **kwargs)
+
+        if len(idempotency_key) > MAX_KEY_LENGTH:
+            return jsonify({"success": False, "message": "Idempotency-Key过长"}), 400
+
+        key = f"{request.method}:{request.path}:{caller_scope()}:{idempotency_key}"
+        fingerprint = request_fingerprint()
+
+        try:
+            record = storage.reserve_idempotency_key(key, fingerprint, config.IDEMPOTENCY_LEASE_SECONDS)
+        except Exception as e:
+            logger.error("❌ 占用幂等键失败: %s", e)
+            return jsonify({"success": False, "message": f"服务器错误: {str(e)}"}), 500
+
+        if record is None:
+            # 首次请求：执行并保存响应
+            try:
+                response = make_response(view(*args, **kwargs))
+            except Exception:
+                release_key(key)
+                raise
+
+            if response.status_code >= 500:
+                release_key(key)
+                return response
+            try:
+                storage.complete_idempotency_key(
+                    key, response.status_code, response.get_data(as_text=True),
+                    config.IDEMPOTENCY_TTL_SECONDS
+                )
+            except Exception as e:
+                # 响应未保存：重试在租约过期前收到409，之后重新执行
+                logger.error("❌ 保存幂等响应失败: %s", e)
+                return jsonify({"success": False, "message": f"服务器错误: {str(e)}"}), 500
+            return response
+
+        if record['fingerprint'] != fingerprint:
+            return jsonify({
+                "success": False,
+                "message": "Idempotency-Key已用于不同的请求"
+            }), 422
+
+        if record['status'] != 'completed':
+            logger.debug("⏳ 同键请求处理中: %s", idempotency_key)
+            return jsonify({
+                "success": False,
+                "message": "相同请求正在处理中，请稍后重试"
+            }), 409
+
+        logger.debug("🔁 重放幂等请求响应: %s", idempotency_key)
+        return replay_response(record)
+
+    return wrapper
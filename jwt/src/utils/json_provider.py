@@ -0,0 +1,77 @@
+"""
+高性能JSON编解码
+安装了orjson时使用orjson（原生datetime/UUID/numpy，直接输出UTF-8字节），
+否则回退到标准库json；Flask的request.get_json()和jsonify()都经过这里
+"""
+import logging
+import dataclasses
+import decimal
+import json
+from datetime import date, datetime
+from typing import Any
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    orjson = None
+
+def _default(value: Any) -> Any:
+    """orjson/json不能直接序列化的类型"""
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if dataclasses.is_dataclass(value):
+        return dataclasses.asdict(value)
+    if hasattr(value, '__html__'):
+        return str(value.__html__())
+    return str(value)
+
+if ORJSON_AVAILABLE:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps_bytes(obj: Any) -> bytes:
+        """序列化为UTF-8字节"""
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+
+    def loads(data: Any) -> Any:
+        """反序列化（接受str或bytes）"""
+        return orjson.loads(data)
+else:
+    def dumps_bytes(obj: Any) -> bytes:
+        """序列化为UTF-8字节"""
+        return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=_default).encode('utf-8')
+
+    def loads(data: Any) -> Any:
+        """反序列化（接受str或bytes）"""
+        return json.loads(data)
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON提供者：紧凑的UTF-8输出，不转义中文，不排序键"""
+
+    ensure_ascii = False
+    sort_keys = False
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return dumps_bytes(obj).decode('utf-8')
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        return loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        """jsonify()：直接用字节构建响应，省去一次str编解码"""
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj) + b'\n', mimetype=self.mimetype)
+
+def init_json_provider(app: Flask) -> None:
+    """在应用上注册JSON提供者"""
+    app.json = FastJSONProvider(app)
+    logger.info("⚡ JSON编解码: %s", 'orjson' if ORJSON_AVAILABLE else '标准库json')
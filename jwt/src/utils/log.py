@@ -0,0 +1,178 @@
+"""
+日志工具
+请求线程只把日志记录放进有界队列，消息格式化和写出都在后台线程中完成；
+队列满时丢弃日志并计数，不阻塞请求。DEBUG日志按路由采样。
+
+各模块使用 logger = logging.getLogger(__name__)，参数用 %s 占位传入，
+级别未开启时不会格式化；参数会在后台线程中才格式化，不要传入之后还会修改的对象。
+"""
+import atexit
+import itertools
+import logging
+import os
+import queue
+import sys
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+from ..config import config
+
+# 项目日志的根logger（src）
+LOGGER_NAME = __name__.split('.')[0]
+
+# LogRecord自带的属性，JSON格式中只额外输出通过extra传入的字段
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'route'}
+
+def mask_phone(phone_number: Optional[str]) -> str:
+    """手机号脱敏：只保留前3位和后4位"""
+    phone = str(phone_number or '')
+    return f"{phone[:3]}****{phone[-4:]}" if len(phone) >= 7 else '****'
+
+def current_route(record: logging.LogRecord) -> str:
+    """日志所属的路由：请求中为Flask端点，否则为调用的模块和函数"""
+    # 没有导入Flask时不可能处于请求中，不为此导入Flask
+    flask = sys.modules.get('flask')
+    if flask is not None and flask.has_request_context() and flask.request.endpoint:
+        return flask.request.endpoint
+    return f"{record.module}.{record.funcName}"
+
+class RouteFilter(logging.Filter):
+    """在调用线程中记录路由，并对DEBUG日志按路由和消息模板采样（每N条保留1条）"""
+
+    def __init__(self, default_rate: float, route_rates: Dict[str, float]):
+        super().__init__()
+        self.default_rate = default_rate
+        self.route_rates = route_rates
+        self._counters: Dict[tuple, itertools.count] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.route = current_route(record)
+        if record.levelno > logging.DEBUG:
+            return True
+
+        rate = self.route_rates.get(record.route, self.default_rate)
+        if rate >= 1:
+            return True
+        if rate <= 0:
+            return False
+        key = (record.route, record.msg)
+        counter = self._counters.get(key)
+        if counter is None:
+            counter = self._counters.setdefault(key, itertools.count())
+        return next(counter) % round(1 / rate) == 0
+
+class AsyncQueueHandler(QueueHandler):
+    """不在调用线程中格式化的队列handler"""
+
+    _exception_formatter = logging.Formatter()
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 消息和参数原样交给后台线程；异常栈在这里转成文本，避免后台线程持有栈帧
+        if record.exc_info:
+            record.exc_text = self._exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class TextFormatter(logging.Formatter):
+    """文本格式：时间 级别 logger [路由] 消息"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s [%(route)s] %(message)s')
+
+class JSONFormatter(logging.Formatter):
+    """JSON格式：每行一条日志，extra传入的字段原样输出"""
+
+    def __init__(self):
+        super().__init__()
+        from .json_provider import dumps_bytes
+        self._dumps = dumps_bytes
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'route': getattr(record, 'route', None),
+            'pid': record.process,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value if isinstance(value, (str, int, float, bool, list, dict, type(None))) else str(value)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return self._dumps(entry).decode('utf-8')
+
+_handler: Optional[AsyncQueueHandler] = None
+_listener: Optional[QueueListener] = None
+_lock = threading.Lock()
+
+def init_logging(stream=None) -> logging.Logger:
+    """为当前进程配置项目日志（重复调用时保留已有配置）"""
+    global _handler, _listener
+    logger = logging.getLogger(LOGGER_NAME)
+    with _lock:
+        if _listener is not None and stream is None:
+            return logger
+
+        log_queue: queue.Queue = queue.Queue(maxsize=config.LOG_QUEUE_SIZE)
+        output = logging.StreamHandler(stream or sys.stdout)
+        output.setFormatter(JSONFormatter() if config.LOG_FORMAT == 'json' else TextFormatter())
+
+        handler = AsyncQueueHandler(log_queue)
+        handler.addFilter(RouteFilter(config.LOG_SAMPLE_RATE, config.LOG_ROUTE_SAMPLE_RATES))
+        listener = QueueListener(log_queue, output)
+        listener.start()
+
+        previous = _listener
+        if _handler is not None:
+            logger.removeHandler(_handler)
+        logger.addHandler(handler)
+        logger.setLevel(config.LOG_LEVEL)
+        logger.propagate = False
+        _handler, _listener = handler, listener
+    if previous is not None:
+        try:
+            previous.stop()
+        except queue.Full:
+            pass
+    return logger
+
+def dropped_records() -> int:
+    """队列满时丢弃的日志条数"""
+    return _handler.dropped if _handler is not None else 0
+
+def flush_logging() -> None:
+    """等待队列中的日志写出"""
+    if _listener is not None:
+        _listener.queue.join()
+
+@atexit.register
+def _stop_logging() -> None:
+    """进程退出前写出队列中剩余的日志"""
+    if _listener is not None:
+        flush_logging()
+        if dropped_records():
+            _listener.handlers[0].stream.write(f"⚠️  日志队列已满，丢弃 {dropped_records()} 条日志\n")
+
+def _reset_logging() -> None:
+    """fork后父进程的写出线程不存在于子进程中：在子进程中重建队列和线程"""
+    global _listener, _lock
+    _lock = threading.Lock()
+    if _listener is not None:
+        stream = _listener.handlers[0].stream
+        _listener = None
+        init_logging(stream)
+
+os.register_at_fork(after_in_child=_reset_logging)
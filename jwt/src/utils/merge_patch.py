@@ -0,0 +1,20 @@
+"""
+JSON Merge Patch（RFC 7386）工具
+"""
+from typing import Any
+
+def apply_merge_patch(target: Any, patch: Any) -> Any:
+    """把merge-patch应用到目标上，返回新对象（不修改入参）
+
+    patch中值为None的键从结果中删除；值为对象时递归合并；其他值直接替换。
+    """
+    if not isinstance(patch, dict):
+        return patch
+
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = apply_merge_patch(result.get(key), value)
+    return result
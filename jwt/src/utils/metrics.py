@@ -0,0 +1,359 @@
+"""
+进程内指标（Prometheus文本格式）
+记录时只写当前线程自己的缓冲区，不加锁；导出时再汇总所有线程的缓冲区。
+线程退出时它的缓冲区并入进程级合计，缓冲区数量不随创建过的线程数增长。
+多进程部署（设置METRICS_DIR）时，各工作进程定期把快照写到 <METRICS_DIR>/<pid>.json，
+/metrics 汇总目录中所有进程的快照；退出的工作进程由主进程合并到 archived.json。
+"""
+import bisect
+import functools
+import glob
+import inspect
+import json
+import os
+import threading
+import time
+import weakref
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from ..config import config
+
+# 耗时直方图的桶上限（秒）
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+ARCHIVE_FILE = 'archived.json'
+
+Key = Tuple[str, Tuple[str, ...]]
+
+_metrics: Dict[str, 'Metric'] = {}
+_collectors: List[Callable[[], Iterable[Tuple[str, Tuple[str, ...], List[float]]]]] = []
+
+_local = threading.local()
+_buffers: List[Dict[Key, List[float]]] = []
+# 已退出线程的缓冲区合计
+_retired: Dict[Key, List[float]] = {}
+_buffers_lock = threading.RLock()
+_flusher_pid: Optional[int] = None
+
+class _BufferOwner:
+    """放在线程局部变量中：线程退出时被回收，触发把该线程的缓冲区并入_retired"""
+    __slots__ = ('__weakref__',)
+
+def _retire(buffer: Dict[Key, List[float]], pid: int) -> None:
+    """把已退出线程的缓冲区并入进程级合计（fork前父进程的缓冲区在子进程中忽略）"""
+    if pid != os.getpid():
+        return
+    with _buffers_lock:
+        for index, live in enumerate(_buffers):
+            if live is buffer:
+                del _buffers[index]
+                break
+        else:
+            return
+        for key, values in buffer.items():
+            _merge(_retired, key, values)
+
+def _buffer() -> Dict[Key, List[float]]:
+    """当前线程的缓冲区：{(指标名, 标签值): 数值列表}，只有本线程写入"""
+    try:
+        return _local.buffer
+    except AttributeError:
+        buffer: Dict[Key, List[float]] = {}
+        owner = _BufferOwner()
+        weakref.finalize(owner, _retire, buffer, os.getpid()).atexit = False
+        with _buffers_lock:
+            _buffers.append(buffer)
+            if config.METRICS_DIR and _flusher_pid != os.getpid():
+                _start_flusher()
+        _local.buffer = buffer
+        _local.owner = owner
+        return buffer
+
+class Metric:
+    """指标定义；数值保存在各线程的缓冲区中"""
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        _metrics[name] = self
+
+    def _values(self, labels: Tuple[str, ...]) -> List[float]:
+        buffer = _buffer()
+        key = (self.name, labels)
+        values = buffer.get(key)
+        if values is None:
+            values = buffer[key] = self.empty()
+        return values
+
+    def empty(self) -> List[float]:
+        return [0]
+
+    def expose(self, labels: Tuple[str, ...], values: List[float]) -> Iterator[str]:
+        yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(values[0])}"
+
+class Counter(Metric):
+    """只增不减的计数"""
+
+    kind = 'counter'
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values(labels)[0] += amount
+
+class Gauge(Metric):
+    """瞬时值（由采集函数在导出时提供，退出的进程不保留）"""
+
+    kind = 'gauge'
+
+class Histogram(Metric):
+    """按桶计数的分布，用于计算p50/p99"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def empty(self) -> List[float]:
+        # 每个桶（含+Inf）的计数，最后一项为总和
+        return [0] * (len(self.buckets) + 1) + [0.0]
+
+    def observe(self, value: float, *labels: str) -> None:
+        values = self._values(labels)
+        values[bisect.bisect_left(self.buckets, value)] += 1
+        values[-1] += value
+
+    def expose(self, labels: Tuple[str, ...], values: List[float]) -> Iterator[str]:
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), values):
+            cumulative += count
+            bucket_labels = _format_labels(self.labelnames + ('le',), labels + (_format_value(bound),))
+            yield f"{self.name}_bucket{bucket_labels} {_format_value(cumulative)}"
+        yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(values[-1])}"
+        yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {_format_value(cumulative)}"
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{escaped}"')
+    return '{' + ','.join(pairs) + '}'
+
+def register_collector(collector: Callable[[], Iterable[Tuple[str, Tuple[str, ...], List[float]]]]) -> None:
+    """注册导出时调用的采集函数，返回 [(指标名, 标签值, 数值列表)]"""
+    _collectors.append(collector)
+
+# 请求、存储和短信指标
+http_requests = Counter('http_requests_total', '请求次数', ('route', 'method', 'status'))
+http_request_duration = Histogram('http_request_duration_seconds', '请求处理耗时（到返回响应头）', ('route', 'method'))
+storage_calls = Histogram('storage_call_duration_seconds', '存储方法耗时', ('method',))
+storage_errors = Counter('storage_call_errors_total', '存储方法抛出异常的次数', ('method',))
+sms_sends = Counter('sms_sends_total', '短信发送次数', ('mode', 'result'))
+sms_duration = Histogram('sms_send_duration_seconds', '短信发送耗时', ('mode',))
+
+def record_request(route: str, method: str, status: int, seconds: float) -> None:
+    """记录一次请求"""
+    http_requests.inc(route, method, str(status))
+    http_request_duration.observe(seconds, route, method)
+
+def record_sms(mode: str, success: bool, seconds: float) -> None:
+    """记录一次短信发送"""
+    sms_sends.inc(mode, 'success' if success else 'failure')
+    sms_duration.observe(seconds, mode)
+
+def init_metrics(app: Any) -> None:
+    """在Flask应用上记录每个请求的端点、状态码和耗时（应先于其他钩子注册，耗时包含压缩）"""
+    from flask import g, request
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def record_request_metrics(response):
+        start = g.pop('metrics_start', None)
+        if start is not None:
+            record_request(request.endpoint or 'unmatched', request.method, response.status_code,
+                           time.perf_counter() - start)
+        return response
+
+def _timed(method: Callable, label: str) -> Callable:
+    """记录存储方法耗时和异常次数的包装"""
+    if inspect.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def async_call(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return await method(*args, **kwargs)
+            except Exception:
+                storage_errors.inc(label)
+                raise
+            finally:
+                storage_calls.observe(time.perf_counter() - start, label)
+        return async_call
+
+    @functools.wraps(method)
+    def call(*args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        except Exception:
+            storage_errors.inc(label)
+            raise
+        finally:
+            storage_calls.observe(time.perf_counter() - start, label)
+    return call
+
+def instrument_storage(instance: Any, method_names: Iterable[str]) -> Any:
+    """在存储实例上用计时包装替换指定方法"""
+    for name in method_names:
+        method = getattr(instance, name, None)
+        if callable(method):
+            setattr(instance, name, _timed(method, name))
+    return instance
+
+def _merge(totals: Dict[Key, List[float]], key: Key, values: List[float]) -> None:
+    current = totals.get(key)
+    if current is None:
+        totals[key] = list(values)
+    else:
+        for index, value in enumerate(values):
+            current[index] += value
+
+def snapshot() -> Dict[Key, List[float]]:
+    """汇总当前进程所有线程的缓冲区（含已退出线程的合计）和采集函数"""
+    with _buffers_lock:
+        totals = {key: list(values) for key, values in _retired.items()}
+        buffers = list(_buffers)
+    for buffer in buffers:
+        for key, values in list(buffer.items()):
+            _merge(totals, key, values)
+    for collector in _collectors:
+        for name, labels, values in collector():
+            _merge(totals, (name, labels), values)
+    return totals
+
+def _pid_path(pid: int) -> str:
+    return os.path.join(config.METRICS_DIR, f"{pid}.json")
+
+def _write(path: str, totals: Dict[Key, List[float]]) -> None:
+    """原子写入快照，读取方不会读到写了一半的文件"""
+    temporary = f"{path}.tmp"
+    with open(temporary, 'w') as file:
+        json.dump([[name, list(labels), values] for (name, labels), values in totals.items()], file)
+    os.replace(temporary, path)
+
+def _read(path: str) -> Dict[Key, List[float]]:
+    try:
+        with open(path) as file:
+            return {(name, tuple(labels)): values for name, labels, values in json.load(file)}
+    except (OSError, ValueError):
+        return {}
+
+def flush() -> None:
+    """把当前进程的快照写入METRICS_DIR"""
+    if not config.METRICS_DIR:
+        return
+    os.makedirs(config.METRICS_DIR, exist_ok=True)
+    _write(_pid_path(os.getpid()), snapshot())
+
+def _start_flusher() -> None:
+    """启动定期写快照的线程（每个进程一个）"""
+    global _flusher_pid
+    _flusher_pid = os.getpid()
+
+    def run() -> None:
+        while True:
+            time.sleep(config.METRICS_FLUSH_SECONDS)
+            try:
+                flush()
+            except OSError:
+                pass
+
+    threading.Thread(target=run, name='metrics-flush', daemon=True).start()
+
+def collect() -> Dict[Key, List[float]]:
+    """汇总本进程和METRICS_DIR中其他进程的快照"""
+    totals = snapshot()
+    if config.METRICS_DIR and os.path.isdir(config.METRICS_DIR):
+        own = _pid_path(os.getpid())
+        for path in glob.glob(os.path.join(config.METRICS_DIR, '*.json')):
+            if path != own:
+                for key, values in _read(path).items():
+                    _merge(totals, key, values)
+    return totals
+
+def render(totals: Optional[Dict[Key, List[float]]] = None) -> str:
+    """Prometheus文本格式"""
+    by_metric: Dict[str, List[Tuple[Tuple[str, ...], List[float]]]] = {}
+    for (name, labels), values in (collect() if totals is None else totals).items():
+        by_metric.setdefault(name, []).append((labels, values))
+
+    lines = []
+    for name in sorted(by_metric):
+        metric = _metrics.get(name)
+        if metric is None:
+            continue
+        lines.append(f"# HELP {name} {metric.documentation}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        for labels, values in sorted(by_metric[name]):
+            lines.extend(metric.expose(labels, values))
+    return '\n'.join(lines) + '\n'
+
+def mark_process_dead(pid: int) -> None:
+    """把已退出工作进程的快照合并到archived.json（gunicorn主进程调用）
+
+    计数和直方图累加保留，瞬时值丢弃。
+    """
+    path = _pid_path(pid) if config.METRICS_DIR else None
+    if path is None or not os.path.exists(path):
+        return
+    import fcntl
+    with open(os.path.join(config.METRICS_DIR, '.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        archive = os.path.join(config.METRICS_DIR, ARCHIVE_FILE)
+        totals = _read(archive)
+        for key, values in _read(path).items():
+            metric = _metrics.get(key[0])
+            if metric is not None and metric.kind != 'gauge':
+                _merge(totals, key, values)
+        _write(archive, totals)
+        os.remove(path)
+
+def mark_dead_processes() -> None:
+    """合并METRICS_DIR中已不存在的进程留下的快照（主进程启动时调用）"""
+    if not config.METRICS_DIR or not os.path.isdir(config.METRICS_DIR):
+        return
+    for path in glob.glob(os.path.join(config.METRICS_DIR, '*.json')):
+        name = os.path.basename(path)[:-len('.json')]
+        if not name.isdigit():
+            continue
+        try:
+            os.kill(int(name), 0)
+        except ProcessLookupError:
+            mark_process_dead(int(name))
+        except PermissionError:
+            pass
+
+def _reset_after_fork() -> None:
+    """子进程从空的缓冲区开始，避免把父进程的计数重复算一次"""
+    global _local, _buffers, _retired, _buffers_lock, _flusher_pid
+    _local = threading.local()
+    _buffers = []
+    _retired = {}
+    _buffers_lock = threading.RLock()
+    _flusher_pid = None
+
+os.register_at_fork(after_in_child=_reset_after_fork)
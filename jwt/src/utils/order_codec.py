@@ -0,0 +1,42 @@
+"""
+订单字段编解码
+忌口/偏好以原生JSON数组保存（Postgres为jsonb），写入时只做一次类型规整，
+读取时原样返回；仅对迁移前以字符串保存的旧数据解析一次
+"""
+import ast
+import json
+from typing import Any, Callable, Dict, List
+
+def decode_tag_list(value: Any) -> List[str]:
+    """把忌口/偏好字段规整为字符串列表
+
+    接受列表，以及旧数据中的JSON字符串或Python列表字面量（早期用str()写入）。
+    """
+    if not value:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(tag) for tag in value]
+    if isinstance(value, str):
+        try:
+            parsed = json.loads(value)
+        except ValueError:
+            try:
+                parsed = ast.literal_eval(value)
+            except (ValueError, SyntaxError):
+                return []
+        return [str(tag) for tag in parsed] if isinstance(parsed, (list, tuple)) else []
+    return []
+
+# 需要规整类型的订单字段 -> 编解码函数
+ORDER_FIELD_CODECS: Dict[str, Callable[[Any], Any]] = {
+    'dietary_restrictions': decode_tag_list,
+    'food_preferences': decode_tag_list
+}
+
+def decode_order(order: Dict[str, Any]) -> Dict[str, Any]:
+    """规整从存储读出的订单（原地修改并返回）；已经是列表的字段不做任何处理"""
+    for field, codec in ORDER_FIELD_CODECS.items():
+        value = order.get(field)
+        if value is not None and not isinstance(value, list):
+            order[field] = codec(value)
+    return order
@@ -1,41 +1,149 @@
 """
 订单相关工具函数
 """
+import base64
+import json
 import uuid
-import random
-from datetime import datetime
-from typing import Dict, Any
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, Tuple
+from .sequence import DailySequenceAllocator
+from .order_codec import decode_tag_list
+
+# 订单号格式: ORD + 日期(YYYYMMDD) + 固定6位的当天序号（补零），同一天内按字典序即按下单顺序
+ORDER_NUMBER_PREFIX = 'ORD'
+ORDER_SEQUENCE_WIDTH = 6
+
+# 订单状态机：当前状态 -> 允许转换到的目标状态
+# completed 即已送达；deleted 表示软删除（设置is_deleted），不改变status
+ORDER_DELETED = 'deleted'
+ORDER_STATUS_TRANSITIONS = {
+    'draft': {'submitted', 'cancelled', ORDER_DELETED},
+    'submitted': {'processing', 'completed', 'cancelled'},
+    'processing': {'completed', 'cancelled'},
+    'completed': {ORDER_DELETED},
+    'cancelled': {ORDER_DELETED}
+}
+ORDER_TRANSITION_TARGETS = {
+    target for targets in ORDER_STATUS_TRANSITIONS.values() for target in targets
+}
+
+# 进程内的按天订单序号分配器（仅开发模式使用）
+order_sequence_allocator = DailySequenceAllocator()
+
+def format_order_number(day: str, sequence: int) -> str:
+    """根据日期和当天序号格式化订单号"""
+    return f"{ORDER_NUMBER_PREFIX}{day}{sequence:0{ORDER_SEQUENCE_WIDTH}d}"
 
 def generate_order_number() -> str:
-    """生成订单号"""
-    today = datetime.now().strftime('%Y%m%d')
-    # 对于开发模式，这里可以简化
-    # 生产模式会由数据库触发器自动生成更复杂的订单号
-    return f"ORD{today}{random_suffix()}"
+    """生成订单号
 
-def random_suffix() -> str:
-    """生成随机后缀"""
-    return f"{random.randint(1, 999):03d}"
+    按天递增分配，O(1)且同一进程内不会重复。
+    生产模式由数据库的按天计数器（order_number_counters）分配，不调用此函数。
+    """
+    today = datetime.now().strftime('%Y%m%d')
+    return format_order_number(today, order_sequence_allocator.next(today))
 
 def generate_order_id() -> str:
     """生成订单ID"""
     return str(uuid.uuid4())
 
 def prepare_order_data(user_id: str, phone_number: str, form_data: Dict[str, Any]) -> Dict[str, Any]:
-    """准备订单数据"""
-    current_time = datetime.now()
-    
+    """准备订单数据
+
+    订单号不在这里生成，由存储层在写入时分配。
+    忌口/偏好保持为列表，由数据库驱动直接写为jsonb数组，不再单独序列化。
+    """
+    # 时间戳统一写UTC（带时区）；各内存索引按时间字符串比较增量水位，不能混用本地时间
+    created_at = datetime.now(timezone.utc).isoformat()
+
     return {
-        'order_number': generate_order_number(),
         'user_id': user_id,
         'phone_number': phone_number,
         'status': 'draft',
-        'order_date': current_time.date().isoformat(),
-        'created_at': current_time.isoformat(),
+        'order_date': datetime.now().date().isoformat(),
+        'created_at': created_at,
+        'updated_at': created_at,
         'delivery_address': form_data.get('address', ''),
-        'dietary_restrictions': str(form_data.get('allergies', [])),
-        'food_preferences': str(form_data.get('preferences', [])),
+        'dietary_restrictions': decode_tag_list(form_data.get('allergies')),
+        'food_preferences': decode_tag_list(form_data.get('preferences')),
         'budget_amount': float(form_data.get('budget', 0)),
         'budget_currency': 'CNY',
         'is_deleted': False
-    }
\ No newline at end of file
+    }
+
+def allowed_source_statuses(target: str) -> List[str]:
+    """获取可以转换到目标状态的所有当前状态"""
+    return sorted(
+        status for status, targets in ORDER_STATUS_TRANSITIONS.items() if target in targets
+    )
+
+def build_transition_update(target: str, timestamp: str) -> Dict[str, Any]:
+    """构建状态转换需要写入的字段"""
+    if target == ORDER_DELETED:
+        return {'is_deleted': True, 'deleted_at': timestamp}
+
+    update_data = {'status': target}
+    if target == 'submitted':
+        update_data['submitted_at'] = timestamp
+    return update_data
+
+# 索引增量同步读取的 (是否归档表, 递增字段)：热表按updated_at；
+# 归档表按archived_at，刚移入的旧订单updated_at早于水位线，按updated_at会漏读
+ORDER_SYNC_SOURCES = ((False, 'updated_at'), (True, 'archived_at'))
+
+def parse_timestamp(value: str) -> datetime:
+    """解析ISO时间戳（不带时区的按UTC处理）"""
+    parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def sync_start(watermark: Optional[Tuple[str, str]], overlap_seconds: float) -> Optional[Tuple[str, str]]:
+    """增量同步的起始游标：从水位线的时间往前回退overlap_seconds
+
+    重读的行由索引按ID覆盖写入；游标中的ID取'0'，小于任何订单ID和用户ID。
+    """
+    if watermark is None:
+        return None
+    start = parse_timestamp(watermark[0]) - timedelta(seconds=overlap_seconds)
+    return (start.isoformat(), '0')
+
+def advance_watermark(watermark: Optional[Tuple[str, str]], row_key: Tuple[str, str]) -> Tuple[str, str]:
+    """水位线只前进不后退（重读窗口内的行可能早于当前水位线）"""
+    if watermark is None or sync_key(row_key) > sync_key(watermark):
+        return row_key
+    return watermark
+
+def sync_key(key: Tuple[str, str]) -> Tuple[datetime, str]:
+    """把 (时间戳, ID) 转换为可比较的键"""
+    return (parse_timestamp(key[0]), str(key[1]))
+
+def order_position(order: Dict[str, Any]) -> Tuple[datetime, Any]:
+    """订单在用户订单列表中的排序位置 (created_at, id)，用于合并热表和归档表"""
+    order_id = str(order['id'])
+    return (parse_timestamp(order['created_at']), int(order_id) if order_id.isdigit() else order_id)
+
+def encode_order_cursor(created_at: str, order_id: str) -> str:
+    """编码用户订单列表的分页游标（上一页最后一行的 (created_at, id)）"""
+    raw = json.dumps([created_at, order_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_order_cursor(cursor: str) -> Tuple[str, str]:
+    """解码并校验分页游标
+
+    游标内容会拼进存储层的过滤条件，created_at必须是ISO时间戳，
+    id必须是整数（生产库主键）或UUID（开发模式），并按规范格式重新输出。
+
+    Returns:
+        tuple: 上一页最后一行的 (created_at, id)
+
+    Raises:
+        ValueError: 游标格式无效
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, order_id = json.loads(raw)
+        created_at = datetime.fromisoformat(created_at.replace('Z', '+00:00')).isoformat()
+        order_id = str(order_id)
+        order_id = str(int(order_id)) if order_id.isdigit() else str(uuid.UUID(order_id))
+    except (TypeError, ValueError, AttributeError):
+        raise ValueError("分页游标无效")
+    return created_at, order_id
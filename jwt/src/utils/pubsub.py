@@ -0,0 +1,143 @@
+"""
+进程内发布/订阅工具
+服务层写入成功后发布事件，SSE连接订阅对应主题；
+多进程部署时由 event_bridge 把事件转发给其他工作进程的订阅者
+"""
+import itertools
+import json
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+class Subscription:
+    """单个订阅者
+
+    事件放在有界deque中，订阅者消费过慢时丢弃最旧的事件；
+    空闲时只占用一个deque和一个Condition，不占用额外线程。
+    异步消费者传入notify回调，有新事件或关闭时由它唤醒事件循环，再用get_nowait取事件。
+    """
+
+    def __init__(self, topics: Iterable[str], maxsize: int, notify: Optional[Callable[[], None]] = None):
+        self.topics = list(topics)
+        self._events: deque = deque(maxlen=maxsize)
+        self._condition = threading.Condition()
+        self._notify = notify
+        self.closed = False
+
+    def put(self, event: Dict[str, Any]) -> None:
+        """投递事件"""
+        with self._condition:
+            self._events.append(event)
+            self._condition.notify()
+        if self._notify is not None:
+            self._notify()
+
+    def get(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """等待下一个事件，超时返回None"""
+        with self._condition:
+            if not self._events and not self.closed:
+                self._condition.wait(timeout)
+            return self._events.popleft() if self._events else None
+
+    def get_nowait(self) -> Optional[Dict[str, Any]]:
+        """取出下一个事件，没有事件时返回None"""
+        with self._condition:
+            return self._events.popleft() if self._events else None
+
+    def close(self) -> None:
+        """关闭订阅，唤醒等待中的消费者"""
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+        if self._notify is not None:
+            self._notify()
+
+class EventHub:
+    """按主题分发事件的进程内中心"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._topics: Dict[str, Set[Subscription]] = {}
+        self._ids = itertools.count(1)
+        self._subscribers = 0
+        self._bridge: Optional[Any] = None
+
+    def set_bridge(self, bridge: Optional[Any]) -> None:
+        """设置跨进程转发（需提供forward(topic, event, data)），None表示只在本进程内分发"""
+        self._bridge = bridge
+
+    def subscribe(self, topics: List[str], maxsize: int = 100,
+                  notify: Optional[Callable[[], None]] = None,
+                  limit: Optional[int] = None) -> Optional[Subscription]:
+        """订阅一组主题
+
+        limit为本进程的订阅者上限，检查和计数在同一把锁内完成，已满时返回None
+        """
+        subscription = Subscription(topics, maxsize, notify)
+        with self._lock:
+            if limit is not None and self._subscribers >= limit:
+                return None
+            for topic in subscription.topics:
+                self._topics.setdefault(topic, set()).add(subscription)
+            self._subscribers += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """取消订阅"""
+        if subscription.closed:
+            return
+        subscription.close()
+        with self._lock:
+            self._subscribers -= 1
+            for topic in subscription.topics:
+                subscribers = self._topics.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._topics[topic]
+
+    def publish(self, topic: str, event: str, data: Dict[str, Any]) -> int:
+        """发布事件：投递给本进程的订阅者并转发给其他进程，返回本进程收到事件的订阅者数量"""
+        bridge = self._bridge
+        if bridge is not None:
+            bridge.forward(topic, event, data)
+        return self.deliver(topic, event, data)
+
+    def deliver(self, topic: str, event: str, data: Dict[str, Any]) -> int:
+        """只投递给本进程的订阅者，返回收到事件的订阅者数量"""
+        with self._lock:
+            subscribers = list(self._topics.get(topic, ()))
+        if not subscribers:
+            return 0
+
+        message = {'id': next(self._ids), 'event': event, 'data': data}
+        for subscription in subscribers:
+            subscription.put(message)
+        return len(subscribers)
+
+    def close_all(self) -> int:
+        """关闭所有订阅（进程退出前结束SSE长连接），返回关闭的数量"""
+        with self._lock:
+            subscriptions = {subscription for subscribers in self._topics.values() for subscription in subscribers}
+        for subscription in subscriptions:
+            self.unsubscribe(subscription)
+        return len(subscriptions)
+
+    def subscriber_count(self) -> int:
+        """当前订阅者数量"""
+        return self._subscribers
+
+def format_sse(message: Dict[str, Any]) -> str:
+    """把事件格式化为SSE文本"""
+    data = json.dumps(message['data'], ensure_ascii=False, default=str)
+    return f"id: {message['id']}\nevent: {message['event']}\ndata: {data}\n\n"
+
+def user_orders_topic(user_id: str) -> str:
+    """用户订单事件主题"""
+    return f"orders:{user_id}"
+
+# 免单名额事件主题
+FREE_DRINKS_TOPIC = 'free_drinks'
+
+# 全局事件中心实例
+event_hub = EventHub()
@@ -0,0 +1,73 @@
+"""
+序号分配工具函数
+提供O(1)的进程内序号分配器
+"""
+import threading
+from typing import Callable, Dict
+
+class DailySequenceAllocator:
+    """按天递增的序号分配器
+
+    每天的序号从1开始单调递增，分配只是一次加锁自增，
+    耗时与当天已有订单数量无关。
+
+    计数器只存在于当前进程的内存中，多进程部署或重启后会重复分配，
+    因此只用于开发模式；生产模式由数据库的 order_number_counters 表分配。
+    """
+
+    # 只保留最近几天的计数器，避免跨天后无限增长
+    RETAINED_DAYS = 2
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {}
+
+    def next(self, day: str) -> int:
+        """分配指定日期的下一个序号"""
+        with self._lock:
+            if day not in self._counters and len(self._counters) >= self.RETAINED_DAYS:
+                # 新的一天：丢弃最早的计数器
+                oldest = min(self._counters)
+                del self._counters[oldest]
+
+            value = self._counters.get(day, 0) + 1
+            self._counters[day] = value
+            return value
+
+    def current(self, day: str) -> int:
+        """获取指定日期已分配的最大序号"""
+        with self._lock:
+            return self._counters.get(day, 0)
+
+class BlockSequenceAllocator:
+    """分段租用的序号分配器（hi/lo）
+
+    每次向共享计数器原子租用一整段序号，段内的序号在进程内分配，
+    只有段用完时才会再访问一次共享计数器。
+    进程退出时未用完的序号直接丢弃，序号允许出现空洞，
+    多个进程之间的序号也不保证严格按时间先后。
+    """
+
+    def __init__(self, lease_block: Callable[[int], int], block_size: int):
+        """
+        Args:
+            lease_block: 租用函数，参数为段大小，返回租用后计数器的值（即本段最大序号）
+            block_size: 每次租用的段大小
+        """
+        self._lease_block = lease_block
+        self._block_size = max(1, block_size)
+        self._lock = threading.Lock()
+        self._next_value = 0
+        self._block_end = 0
+
+    def next(self) -> int:
+        """分配下一个序号"""
+        with self._lock:
+            if self._next_value == 0 or self._next_value > self._block_end:
+                block_end = self._lease_block(self._block_size)
+                self._next_value = block_end - self._block_size + 1
+                self._block_end = block_end
+
+            value = self._next_value
+            self._next_value += 1
+            return value
@@ -1,8 +1,46 @@
 """
 短信发送工具函数
+HTTP客户端库在生产模式第一次发送时才导入，开发模式和测试不需要加载
 """
-import requests
+import logging
+import importlib.util
+import os
+import time
 from ..config import config
+from .log import mask_phone
+from .metrics import record_sms, sms_sends
+
+logger = logging.getLogger(__name__)
+
+HTTPX_AVAILABLE = importlib.util.find_spec("httpx") is not None
+
+# ASGI模式共用的异步HTTP客户端（首次发送时创建）
+_async_client = None
+
+def _reset_async_client() -> None:
+    """fork后在子进程中丢弃父进程的连接池"""
+    global _async_client
+    _async_client = None
+
+os.register_at_fork(after_in_child=_reset_async_client)
+
+def _dev_result(phone_number: str, code: str) -> dict:
+    """开发模式：不发送真实短信，在控制台显示验证码"""
+    sms_sends.inc('dev', 'success')
+    logger.info("🔧 开发模式 - 固定验证码: %s -> %s (开发测试请使用: %s)", mask_phone(phone_number), code, config.DEV_VERIFICATION_CODE)
+    return {
+        "success": True, 
+        "message": f"验证码发送成功（开发模式，请使用验证码: {config.DEV_VERIFICATION_CODE}）", 
+        "dev_code": code
+    }
+
+def _sms_body(phone_number: str, code: str) -> dict:
+    """短信服务请求体"""
+    return {
+        'name': '验证码', 
+        'code': code, 
+        'targets': phone_number
+    }
 
 def send_sms(phone_number: str, code: str) -> dict:
     """发送短信验证码
@@ -15,29 +53,56 @@ def send_sms(phone_number: str, code: str) -> dict:
         dict: 发送结果
     """
     if config.is_development_mode:
-        # 开发模式：不发送真实短信，在控制台显示验证码
-        print(f"🔧 开发模式 - 固定验证码: {phone_number} -> {code} (开发测试请使用: {config.DEV_VERIFICATION_CODE})")
-        return {
-            "success": True, 
-            "message": f"验证码发送成功（开发模式，请使用验证码: {config.DEV_VERIFICATION_CODE}）", 
-            "dev_code": code
-        }
+        return _dev_result(phone_number, code)
     else:
         # 生产模式：真实发送短信
         if not config.SPUG_URL:
             return {"success": False, "message": "短信服务未配置"}
         
+        start = time.perf_counter()
         try:
-            body = {
-                'name': '验证码', 
-                'code': code, 
-                'targets': phone_number
-            }
-            response = requests.post(config.SPUG_URL, json=body)
+            import requests
+            response = requests.post(config.SPUG_URL, json=_sms_body(phone_number, code))
             
             if response.status_code == 200:
-                return {"success": True, "message": "验证码发送成功"}
+                result = {"success": True, "message": "验证码发送成功"}
             else:
-                return {"success": False, "message": "验证码发送失败"}
+                result = {"success": False, "message": "验证码发送失败"}
         except Exception as e:
-            return {"success": False, "message": f"短信发送异常: {str(e)}"}
\ No newline at end of file
+            result = {"success": False, "message": f"短信发送异常: {str(e)}"}
+        record_sms('sync', result["success"], time.perf_counter() - start)
+        return result
+
+async def send_sms_async(phone_number: str, code: str) -> dict:
+    """发送短信验证码（ASGI模式：等待短信服务响应时不占用线程）"""
+    if config.is_development_mode:
+        return _dev_result(phone_number, code)
+    if not HTTPX_AVAILABLE:
+        return send_sms(phone_number, code)
+    if not config.SPUG_URL:
+        return {"success": False, "message": "短信服务未配置"}
+    
+    global _async_client
+    if _async_client is None:
+        import httpx
+        _async_client = httpx.AsyncClient(timeout=10)
+    
+    start = time.perf_counter()
+    try:
+        response = await _async_client.post(config.SPUG_URL, json=_sms_body(phone_number, code))
+        
+        if response.status_code == 200:
+            result = {"success": True, "message": "验证码发送成功"}
+        else:
+            result = {"success": False, "message": "验证码发送失败"}
+    except Exception as e:
+        result = {"success": False, "message": f"短信发送异常: {str(e)}"}
+    record_sms('async', result["success"], time.perf_counter() - start)
+    return result
+
+async def close_sms_client() -> None:
+    """关闭异步HTTP客户端（ASGI应用退出时调用）"""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
@@ -0,0 +1,61 @@
+"""
+忌口和口味偏好的位掩码编码
+两个词表都很小且固定（与前端 checkboxOptions 一致），每个选项占一位，
+用SMALLINT/uint8保存，人群筛选变为按位运算，不再解析JSON
+"""
+from typing import Iterable, List
+
+# 词表：(选项ID, 中文标签)，位序号即列表下标
+# 位序号已写入数据库，只能在末尾追加，不能调整顺序
+ALLERGY_TAGS = (
+    ('seafood', '海鲜类'),
+    ('nuts', '坚果类'),
+    ('eggs', '蛋类'),
+    ('soy', '大豆类'),
+    ('dairy', '乳制品类'),
+    ('other-allergy', '其他')
+)
+PREFERENCE_TAGS = (
+    ('spicy', '香辣'),
+    ('mild', '清淡'),
+    ('sweet', '甜口'),
+    ('sour-spicy', '酸辣'),
+    ('salty', '咸鲜'),
+    ('other-preference', '其他')
+)
+TAG_VOCABULARIES = {
+    'allergies': ALLERGY_TAGS,
+    'preferences': PREFERENCE_TAGS
+}
+
+# 选项ID和中文标签都映射到同一位
+_TAG_BITS = {
+    field: {alias: 1 << index for index, tag in enumerate(tags) for alias in tag}
+    for field, tags in TAG_VOCABULARIES.items()
+}
+
+def encode_tags(field: str, tags: Iterable[str]) -> int:
+    """把选项列表编码为位掩码（词表外的自由文本忽略）"""
+    bits = _TAG_BITS[field]
+    mask = 0
+    for tag in tags or []:
+        mask |= bits.get(str(tag), 0)
+    return mask
+
+def decode_tags(field: str, mask: int) -> List[str]:
+    """把位掩码还原为选项ID列表"""
+    return [tag_id for index, (tag_id, _) in enumerate(TAG_VOCABULARIES[field]) if mask & (1 << index)]
+
+def parse_tag_filter(field: str, value: str) -> int:
+    """解析逗号分隔的筛选参数
+
+    Raises:
+        ValueError: 包含词表外的选项
+    """
+    bits = _TAG_BITS[field]
+    mask = 0
+    for tag in filter(None, (part.strip() for part in (value or '').split(','))):
+        if tag not in bits:
+            raise ValueError(f"未知的选项: {tag}")
+        mask |= bits[tag]
+    return mask
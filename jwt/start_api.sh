@@ -38,10 +38,15 @@ if [ ! -f ".env" ]; then
     echo ""
 fi
 
-# 启动Flask应用
+# 启动应用：默认使用生产启动器，传入 dev 参数时使用Flask开发服务器
 echo "正在启动API服务..."
 echo "服务将运行在: http://localhost:5001"
 echo "按 Ctrl+C 停止服务"
 echo ""
 
-python app.py
\ No newline at end of file
+if [ "$1" == "dev" ]; then
+    python app.py
+else
+    # 多进程预加载启动，配置见 gunicorn.conf.py；平滑重载使用 ./reload_api.sh
+    exec gunicorn -c gunicorn.conf.py
+fi
\ No newline at end of file
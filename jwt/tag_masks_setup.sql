@@ -0,0 +1,109 @@
+-- 忌口/口味偏好位掩码列
+-- 位序号与 src/utils/tags.py 的词表一致（只能在末尾追加）
+-- 需在 orders_setup.sql 和 preferences_setup.sql 之后执行
+
+-- 把选项数组（ID或中文标签）编码为位掩码，词表外的自由文本忽略
+CREATE OR REPLACE FUNCTION tag_mask(p_tags JSONB, p_field TEXT)
+RETURNS SMALLINT AS $$
+    SELECT COALESCE(bit_or(v.bit), 0)::SMALLINT
+    FROM jsonb_array_elements_text(
+        CASE WHEN jsonb_typeof(p_tags) = 'array' THEN p_tags ELSE '[]'::jsonb END
+    ) AS t(tag)
+    JOIN (VALUES
+        ('allergies', 'seafood', 1), ('allergies', '海鲜类', 1),
+        ('allergies', 'nuts', 2), ('allergies', '坚果类', 2),
+        ('allergies', 'eggs', 4), ('allergies', '蛋类', 4),
+        ('allergies', 'soy', 8), ('allergies', '大豆类', 8),
+        ('allergies', 'dairy', 16), ('allergies', '乳制品类', 16),
+        ('allergies', 'other-allergy', 32), ('allergies', '其他', 32),
+        ('preferences', 'spicy', 1), ('preferences', '香辣', 1),
+        ('preferences', 'mild', 2), ('preferences', '清淡', 2),
+        ('preferences', 'sweet', 4), ('preferences', '甜口', 4),
+        ('preferences', 'sour-spicy', 8), ('preferences', '酸辣', 8),
+        ('preferences', 'salty', 16), ('preferences', '咸鲜', 16),
+        ('preferences', 'other-preference', 32), ('preferences', '其他', 32)
+    ) AS v(field, alias, bit) ON v.field = p_field AND v.alias = t.tag;
+$$ LANGUAGE sql IMMUTABLE;
+
+ALTER TABLE orders ADD COLUMN IF NOT EXISTS allergy_mask SMALLINT NOT NULL DEFAULT 0;
+ALTER TABLE orders ADD COLUMN IF NOT EXISTS preference_mask SMALLINT NOT NULL DEFAULT 0;
+ALTER TABLE user_preferences ADD COLUMN IF NOT EXISTS allergy_mask SMALLINT NOT NULL DEFAULT 0;
+ALTER TABLE user_preferences ADD COLUMN IF NOT EXISTS preference_mask SMALLINT NOT NULL DEFAULT 0;
+
+-- 归档表先于本脚本创建时不会带上掩码列，archive_orders按列名搬运时会丢掉掩码
+ALTER TABLE IF EXISTS orders_archive ADD COLUMN IF NOT EXISTS allergy_mask SMALLINT NOT NULL DEFAULT 0;
+ALTER TABLE IF EXISTS orders_archive ADD COLUMN IF NOT EXISTS preference_mask SMALLINT NOT NULL DEFAULT 0;
+
+-- 把旧的TEXT选项数组安全地转换为JSONB：先按JSON解析，失败再按Python列表字面量（单引号）解析，
+-- 都失败（例如单双引号混用）时返回NULL，不中断整条回填语句
+CREATE OR REPLACE FUNCTION safe_tag_list_jsonb(p_value TEXT)
+RETURNS JSONB AS $$
+BEGIN
+    IF p_value IS NULL OR p_value NOT LIKE '[%' THEN
+        RETURN NULL;
+    END IF;
+    BEGIN
+        RETURN p_value::jsonb;
+    EXCEPTION WHEN invalid_text_representation THEN
+        NULL;
+    END;
+    BEGIN
+        RETURN replace(p_value, '''', '"')::jsonb;
+    EXCEPTION WHEN invalid_text_representation THEN
+        RETURN NULL;
+    END;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+-- 回填历史订单（早期订单以Python列表字面量保存，其余为JSON）
+-- 先转成TEXT，列已改为JSONB后重复执行也能解析
+UPDATE orders SET
+    allergy_mask = tag_mask(safe_tag_list_jsonb(dietary_restrictions::text), 'allergies'),
+    preference_mask = tag_mask(safe_tag_list_jsonb(food_preferences::text), 'preferences');
+
+DO $$
+BEGIN
+    IF to_regclass('orders_archive') IS NOT NULL THEN
+        UPDATE orders_archive SET
+            allergy_mask = tag_mask(safe_tag_list_jsonb(dietary_restrictions::text), 'allergies'),
+            preference_mask = tag_mask(safe_tag_list_jsonb(food_preferences::text), 'preferences');
+    END IF;
+END;
+$$;
+
+UPDATE user_preferences SET
+    allergy_mask = tag_mask(default_allergies, 'allergies'),
+    preference_mask = tag_mask(default_preferences, 'preferences');
+
+-- 人群查询以位运算筛选，例如: 对海鲜过敏且喜欢香辣的用户
+--   SELECT user_id FROM user_preferences WHERE allergy_mask & 1 = 1 AND preference_mask & 1 = 1;
+
+-- 分析服务按 (updated_at, user_id) 增量同步用户偏好掩码
+CREATE INDEX IF NOT EXISTS idx_user_preferences_updated ON user_preferences(updated_at, user_id);
+
+-- 删除的偏好行增量同步读不到：删除时记录墓碑，分析服务按 (deleted_at, user_id) 同步后移除该用户；
+-- 重新保存偏好时清除墓碑
+CREATE TABLE IF NOT EXISTS user_preferences_deletions (
+    user_id VARCHAR(50) PRIMARY KEY,
+    deleted_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+);
+CREATE INDEX IF NOT EXISTS idx_user_preferences_deletions_deleted ON user_preferences_deletions(deleted_at, user_id);
+
+CREATE OR REPLACE FUNCTION track_user_preferences_deletion()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO user_preferences_deletions (user_id, deleted_at) VALUES (OLD.user_id, NOW())
+        ON CONFLICT (user_id) DO UPDATE SET deleted_at = EXCLUDED.deleted_at;
+        RETURN OLD;
+    END IF;
+    DELETE FROM user_preferences_deletions WHERE user_id = NEW.user_id;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_track_user_preferences_deletion ON user_preferences;
+CREATE TRIGGER trigger_track_user_preferences_deletion
+    AFTER INSERT OR DELETE ON user_preferences
+    FOR EACH ROW
+    EXECUTE FUNCTION track_user_preferences_deletion();
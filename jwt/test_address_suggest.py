@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+地址联想测试脚本
+"""
+import sys
+import os
+import time
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from src.services import order_service, address_service, preferences_service
+from src.services.address_service import AddressTrie
+
+app = create_app()
+
+def test_ranking_by_frequency_and_recency():
+    """常用地址排前面；次数相同时较新的排前面"""
+    trie = AddressTrie(top_k=5)
+    trie.add('北京市海淀区中关村大街1号', '2026-01-01T09:00:00')
+    trie.add('北京市海淀区中关村大街1号', '2026-01-02T09:00:00')
+    trie.add('北京市海淀区中关村南大街5号', '2026-01-03T09:00:00')
+    trie.add('北京市海淀区知春路7号', '2025-01-03T09:00:00')
+
+    addresses = [item['address'] for item in trie.suggest('北京市海淀区', 5)]
+    print(f"📍 联想结果: {addresses}")
+    assert addresses[0] == '北京市海淀区中关村大街1号'
+    assert addresses[-1] == '北京市海淀区知春路7号'
+
+    # 从区划之后开始输入也能匹配
+    assert [item['address'] for item in trie.suggest('知春路', 5)] == ['北京市海淀区知春路7号']
+
+def test_suggest_endpoint_uses_order_history():
+    """新订单的配送地址在下一次同步后出现在该用户的联想结果中"""
+    order_service.create_order('dev_user_address', '13200001111', {'address': '上海市浦东新区世纪大道100号', 'budget': 30})
+    address_service.refresh()
+
+    client = app.test_client()
+    start = time.perf_counter()
+    data = client.get('/addresses/suggest?user_id=dev_user_address&q=上海市浦东新区世纪').get_json()
+    print(f"📍 联想接口: {data} ({(time.perf_counter() - start) * 1000:.2f}ms)")
+    assert data['success']
+    assert data['predictions'][0]['description'] == '上海市浦东新区世纪大道100号'
+
+    assert client.get('/addresses/suggest?user_id=dev_user_address&q=上').status_code == 400
+    assert client.get('/addresses/suggest?q=上海市浦东新区').status_code == 400
+
+def test_addresses_are_not_shared_between_users():
+    """其他用户输入相同前缀时看不到该地址"""
+    order_service.create_order('dev_user_address_a', '13200002222', {'address': '广州市天河区体育西路8号1203室', 'budget': 30})
+    address_service.refresh()
+
+    client = app.test_client()
+    own = client.get('/addresses/suggest?user_id=dev_user_address_a&q=广州市天河区').get_json()
+    other = client.get('/addresses/suggest?user_id=dev_user_address_b&q=广州市天河区').get_json()
+    assert [item['description'] for item in own['predictions']] == ['广州市天河区体育西路8号1203室']
+    assert other['success'] and other['predictions'] == []
+
+def test_overlapping_refreshes_count_each_order_once():
+    """重读窗口内的订单不会重复计数"""
+    user_id = 'dev_user_address_overlap'
+    order_service.create_order(user_id, '13200003333', {'address': '天津市和平区南京路1号', 'budget': 30})
+    address_service.refresh()
+    address_service.refresh()
+    order_service.create_order(user_id, '13200003333', {'address': '天津市和平区南京路1号', 'budget': 30})
+    address_service.refresh()
+
+    suggestions = address_service.suggest(user_id, '天津市和平区')['predictions']
+    assert [item['count'] for item in suggestions] == [2]
+
+def test_preference_address_counts_only_changes():
+    """只修改预算时默认地址不重复计数"""
+    user_id = 'dev_user_address_prefs'
+    preferences_service.save_user_preferences(user_id, {'address': '重庆市渝中区解放碑', 'selectedFoodType': ['奶茶'], 'budget': '20'})
+    address_service.refresh()
+    preferences_service.update_user_preferences(user_id, {'default_budget': '30'})
+    preferences_service.update_user_preferences(user_id, {'default_budget': '40'})
+    address_service.refresh()
+
+    suggestions = address_service.suggest(user_id, '重庆市渝中区')['predictions']
+    assert [(item['description'], item['count']) for item in suggestions] == [('重庆市渝中区解放碑', 1)]
+
+    preferences_service.update_user_preferences(user_id, {'default_address': '重庆市渝中区较场口'})
+    address_service.refresh()
+    suggestions = address_service.suggest(user_id, '重庆市渝中区')['predictions']
+    assert sorted(item['description'] for item in suggestions) == ['重庆市渝中区解放碑', '重庆市渝中区较场口']
+
+if __name__ == '__main__':
+    print("🧪 开始测试地址联想...")
+    test_ranking_by_frequency_and_recency()
+    test_suggest_endpoint_uses_order_history()
+    test_addresses_are_not_shared_between_users()
+    test_overlapping_refreshes_count_each_order_once()
+    test_preference_address_counts_only_changes()
+    print("✅ 所有测试通过")
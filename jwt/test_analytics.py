@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+订单分析测试脚本
+"""
+import sys
+import os
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.storage.dev_storage import DevStorage
+from src.services.analytics_service import AnalyticsService
+
+ORDERS = [
+    # (日期, 状态, 预算, 评分, 忌口, 偏好)
+    ('2025-07-25', 'completed', 20, 5, ['坚果类'], ['清淡']),
+    ('2025-07-25', 'completed', 40, 3, ['坚果类', '海鲜类'], ['香辣']),
+    ('2025-07-25', 'cancelled', 30, 0, [], ['清淡']),
+    ('2025-07-26', 'submitted', 50, 0, ['海鲜类'], []),
+    ('2025-07-26', 'draft', 60, 0, [], []),
+]
+
+def build_service():
+    """使用独立的内存存储构建分析服务"""
+    storage = DevStorage()
+    for index, (day, status, budget, rating, allergies, preferences) in enumerate(ORDERS):
+        order_id = f'analytics-{index}'
+        storage.orders[order_id] = {
+            'id': order_id, 'user_id': 'dev_user_analytics', 'status': status,
+            'created_at': f'{day}T10:00:0{index}+00:00', 'updated_at': f'{day}T10:00:0{index}+00:00',
+            'budget_amount': budget, 'user_rating': rating or None, 'is_deleted': False,
+            'dietary_restrictions': allergies, 'food_preferences': preferences
+        }
+    service = AnalyticsService()
+    service.storage = storage
+    return service, storage
+
+def test_rollup_by_day_and_status():
+    """按日期和状态分组统计订单数、预算和评分"""
+    service, _ = build_service()
+    result = service.order_rollup(['day', 'status'], {})
+
+    rows = {(row['day'], row['status']): row for row in result['rows']}
+    completed = rows[('2025-07-25', 'completed')]
+    assert (completed['count'], completed['budget_sum'], completed['budget_avg']) == (2, 60, 30)
+    assert completed['rating_avg'] == 4
+    assert rows[('2025-07-26', 'draft')]['rating_avg'] is None
+    assert sum(row['count'] for row in result['rows']) == 5
+
+    filtered = service.order_rollup(['status'], {'start_date': '2025-07-26', 'status': 'submitted'})
+    assert [(row['status'], row['count']) for row in filtered['rows']] == [('submitted', 1)]
+
+    assert not service.order_rollup(['city'], {})['success']
+    assert not service.order_rollup(['day'], {'start_date': '2025/07/26'})['success']
+
+def test_budget_and_tag_frequencies():
+    """预算分布和忌口/偏好频次"""
+    service, _ = build_service()
+
+    budget = service.budget_distribution({}, bins=5)
+    assert budget['count'] == 5
+    assert budget['mean'] == 40
+    assert budget['percentiles']['p50'] == 40
+    assert sum(item['count'] for item in budget['histogram']) == 5
+
+    tags = service.tag_frequencies({})
+    assert tags['allergies'] == [{'tag': '坚果类', 'count': 2}, {'tag': '海鲜类', 'count': 2}]
+    assert tags['preferences'][0] == {'tag': '清淡', 'count': 2}
+
+    seafood = service.order_rollup(['status'], {'allergy': 'seafood'})
+    assert sorted(row['status'] for row in seafood['rows']) == ['completed', 'submitted']
+
+def test_incremental_refresh_applies_changes():
+    """增量刷新只读取变更的订单，并原地更新已有行"""
+    service, storage = build_service()
+    assert service.refresh(force=True) == 5
+
+    storage.update_order('analytics-3', {'status': 'completed'})
+    storage.update_order('analytics-4', {'is_deleted': True})
+    assert service.refresh(force=True) == 2
+    assert service.refresh(force=True) == 0
+
+    result = service.order_rollup(['day', 'status'], {})
+    rows = {(row['day'], row['status']): row['count'] for row in result['rows']}
+    assert rows == {('2025-07-25', 'completed'): 2, ('2025-07-25', 'cancelled'): 1, ('2025-07-26', 'completed'): 1}
+
+def test_days_follow_order_date():
+    """按本地下单日期分组，UTC日期不同的凌晨订单也计入当天"""
+    service, storage = build_service()
+    storage.orders['analytics-night'] = {
+        'id': 'analytics-night', 'user_id': 'dev_user_analytics', 'status': 'draft', 'order_date': '2025-07-27',
+        'created_at': '2025-07-26T17:30:00+00:00', 'updated_at': '2025-07-26T17:30:00+00:00',
+        'budget_amount': 10, 'is_deleted': False
+    }
+
+    result = service.order_rollup(['day'], {'start_date': '2025-07-27'})
+    assert [(row['day'], row['count']) for row in result['rows']] == [('2025-07-27', 1)]
+
+if __name__ == '__main__':
+    test_rollup_by_day_and_status()
+    test_budget_and_tag_frequencies()
+    test_incremental_refresh_applies_changes()
+    test_days_follow_order_date()
+    print("✅ 订单分析测试完成！")
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+订单归档与分页测试脚本
+"""
+import sys
+import os
+import base64
+import json
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from src.services import order_service, archive_service
+from src.storage import storage
+from src.services.search_service import SearchService
+from src.services.analytics_service import AnalyticsService
+
+app = create_app()
+
+def read_all_pages(user_id, limit=2):
+    """按游标翻完用户的全部订单"""
+    client = app.test_client()
+    seen = []
+    cursor = None
+    while True:
+        query = f'?limit={limit}&cursor={cursor}' if cursor else f'?limit={limit}'
+        data = client.get(f'/orders/{user_id}{query}').get_json()
+        assert data['success']
+        seen.extend(order['id'] for order in data['orders'])
+        cursor = data['next_cursor']
+        if not cursor:
+            return seen
+
+def test_paging_falls_back_to_archive():
+    """翻过热表后继续读取归档订单，且不重复、不遗漏"""
+    user_id = 'dev_user_archive'
+    order_ids = []
+    for index in range(5):
+        created = order_service.create_order(user_id, '13800138003', {'address': f'杭州市西湖区{index}号', 'budget': 20})
+        order_ids.append(created['order_id'])
+
+    # 前三个订单已完成且早于保留期，另一个已删除
+    for order_id in order_ids[:3]:
+        storage.orders[order_id].update({'status': 'completed', 'created_at': '2020-01-01T10:00:00'})
+    order_service.transition_orders([{'order_id': order_ids[3], 'to_status': 'cancelled'}])
+    order_service.transition_orders([{'order_id': order_ids[3], 'to_status': 'deleted'}])
+
+    result = archive_service.archive_orders(batch_size=2)
+    print(f"🗄️ 归档结果: {result}")
+    assert result['success']
+    assert result['archived'] == 4
+    assert order_ids[0] in storage.orders_archive
+    assert order_ids[4] in storage.orders
+
+    seen = read_all_pages(user_id)
+    print(f"📋 分页读取: {seen}")
+    assert seen[0] == order_ids[4]
+    assert sorted(seen) == sorted(order_ids[:3] + order_ids[4:])
+
+def test_hot_and_archive_are_merged_by_time():
+    """未归档的旧草稿早于归档订单时，两张表按 (created_at, id) 合并而不是先热后冷"""
+    user_id = 'dev_user_archive_merge'
+    order_ids = [
+        order_service.create_order(user_id, '13800138004', {'address': f'杭州市滨江区{index}号', 'budget': 20})['order_id']
+        for index in range(4)
+    ]
+    # 0: 2019年的草稿（不可归档，留在热表）；1、2: 2020/2021年已完成（归档）；3: 新订单
+    storage.orders[order_ids[0]]['created_at'] = '2019-06-01T10:00:00+00:00'
+    storage.orders[order_ids[1]].update({'status': 'completed', 'created_at': '2020-06-01T10:00:00+00:00'})
+    storage.orders[order_ids[2]].update({'status': 'completed', 'created_at': '2021-06-01T10:00:00+00:00'})
+    assert archive_service.archive_orders()['success']
+    assert order_ids[0] in storage.orders and order_ids[1] in storage.orders_archive
+
+    assert read_all_pages(user_id) == [order_ids[3], order_ids[2], order_ids[1], order_ids[0]]
+    assert read_all_pages(user_id, limit=1) == [order_ids[3], order_ids[2], order_ids[1], order_ids[0]]
+
+def test_indexes_include_archived_orders():
+    """新建的检索和分析索引包含归档表中的订单"""
+    user_id = 'dev_user_archive_index'
+    order_id = order_service.create_order(user_id, '13800138005', {'address': '杭州市上城区1号', 'budget': 20})['order_id']
+    storage.orders[order_id].update({'status': 'completed', 'order_date': '2020-01-01', 'created_at': '2020-01-01T10:00:00+00:00'})
+    assert archive_service.archive_orders()['success']
+    assert order_id in storage.orders_archive
+
+    search = SearchService()
+    search.refresh(force=True)
+    assert order_id in search.index.documents
+
+    analytics = AnalyticsService()
+    analytics.refresh(force=True)
+    rows = analytics.order_rollup(['status'], {'start_date': '2020-01-01', 'end_date': '2020-01-01'})['rows']
+    assert any(row['status'] == 'completed' for row in rows)
+
+def test_archive_read_only_past_the_retention_window():
+    """热表这一页都在保留期内时不读取归档表，翻到保留期之外或热表读完才读取"""
+    user_id = 'dev_user_archive_reads'
+    order_ids = [
+        order_service.create_order(user_id, '13800138006', {'address': f'杭州市拱墅区{index}号', 'budget': 20})['order_id']
+        for index in range(4)
+    ]
+    storage.orders[order_ids[0]].update({'status': 'completed', 'created_at': '2020-06-01T10:00:00+00:00'})
+    assert archive_service.archive_orders()['archived'] == 1
+    # 超过保留期但未完成的草稿留在热表
+    storage.orders[order_ids[1]]['created_at'] = '2019-06-01T10:00:00+00:00'
+
+    archive_reads = []
+    original = storage.get_user_orders_page
+    def counting_page(user_id, before, limit, archived=False):
+        archive_reads.append(archived)
+        return original(user_id, before, limit, archived)
+    storage.get_user_orders_page = counting_page
+    try:
+        first = order_service.get_user_orders(user_id, limit=1)
+        assert first['orders'][0]['id'] == order_ids[3]
+        assert archive_reads == [False]
+
+        second = order_service.get_user_orders(user_id, cursor=first['next_cursor'], limit=1)
+        assert second['orders'][0]['id'] == order_ids[2]
+        assert archive_reads == [False, False, True]
+    finally:
+        storage.get_user_orders_page = original
+
+    assert read_all_pages(user_id, limit=1) == [order_ids[3], order_ids[2], order_ids[0], order_ids[1]]
+
+def test_archiving_inside_retention_window_is_rejected():
+    """归档天数小于ORDER_ARCHIVE_AFTER_DAYS时拒绝执行"""
+    result = archive_service.archive_orders(older_than_days=30)
+    assert not result['success']
+    assert result['archived'] == 0
+
+def test_invalid_cursor_is_rejected():
+    """无效游标返回400，游标中的值不会拼进查询"""
+    client = app.test_client()
+    assert client.get('/orders/dev_user_archive?cursor=not-a-cursor').status_code == 400
+
+    for created_at, order_id in [
+        ('2020-01-01T10:00:00",id.gt.0', '1'),
+        ('2020-01-01T10:00:00+00:00', '1),or(id.gt.0'),
+    ]:
+        cursor = base64.urlsafe_b64encode(json.dumps([created_at, order_id]).encode()).decode()
+        assert client.get(f'/orders/dev_user_archive?cursor={cursor}').status_code == 400
+
+if __name__ == '__main__':
+    print("🧪 开始测试订单归档...")
+    test_paging_falls_back_to_archive()
+    test_hot_and_archive_are_merged_by_time()
+    test_indexes_include_archived_orders()
+    test_archive_read_only_past_the_retention_window()
+    test_archiving_inside_retention_window_is_rejected()
+    test_invalid_cursor_is_rejected()
+    print("✅ 所有测试通过")
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+ASGI服务模式测试脚本
+"""
+import sys
+import os
+import asyncio
+import threading
+import time
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+from app import create_app
+from src.asgi import create_asgi_app
+from src.config import config
+from src.services import order_service
+from src.storage import get_async_storage
+from src.utils.pubsub import event_hub
+
+flask_app = create_app()
+app = create_asgi_app(flask_app)
+
+USER_ID = 'dev_user_asgi'
+
+def create_orders():
+    """为测试用户创建几个订单"""
+    for index in range(3):
+        order_service.create_order(USER_ID, '13800138006', {'address': f'广州市天河区{index}号', 'budget': 30})
+
+def request(method, path, **kwargs):
+    """向ASGI应用发送一个请求"""
+    async def send():
+        async with httpx.AsyncClient(app=app, base_url='http://testserver') as client:
+            return await client.request(method, path, **kwargs)
+    return asyncio.run(send())
+
+def test_async_routes_match_flask():
+    """异步路由与Flask路由返回相同的数据和ETag"""
+    create_orders()
+    flask_response = flask_app.test_client().get(f'/orders/{USER_ID}')
+    response = request('GET', f'/orders/{USER_ID}', headers={'Accept-Encoding': 'identity'})
+
+    assert response.status_code == 200
+    assert response.json() == flask_response.get_json()
+    assert response.json()['count'] == 3
+    assert response.headers['etag'] == flask_response.headers['ETag']
+
+    cached = request('GET', f'/orders/{USER_ID}', headers={'If-None-Match': response.headers['etag']})
+    assert cached.status_code == 304
+
+    # 压缩后的表示带编码后缀的ETag，同样可以换来304
+    encoded = request('GET', f'/orders/{USER_ID}', headers={'Accept-Encoding': 'gzip'})
+    assert encoded.headers['etag'] == response.headers['etag'][:-1] + '-gzip"'
+    cached = request('GET', f'/orders/{USER_ID}', headers={'Accept-Encoding': 'gzip', 'If-None-Match': encoded.headers['etag']})
+    assert (cached.status_code, cached.headers['etag']) == (304, encoded.headers['etag'])
+
+    form = request('GET', f'/preferences/{USER_ID}/form-data')
+    assert form.json() == flask_app.test_client().get(f'/preferences/{USER_ID}/form-data').get_json()
+
+def test_send_verification_code():
+    """验证码发送走异步路由"""
+    response = request('POST', '/send-verification-code', json={'phone_number': '13800138006'})
+    assert response.status_code == 200
+    assert response.json()['success']
+    assert request('POST', '/send-verification-code', json={'phone_number': '123'}).status_code == 400
+
+def test_other_routes_fall_back_to_flask():
+    """未改写的路由交给Flask处理"""
+    create_orders()
+    assert request('GET', '/health').json()['status'] == 'healthy'
+    assert request('GET', '/orders/search?phone_suffix=38006').status_code == 403
+    config.ADMIN_API_TOKEN = 'test-admin-token'
+    search = request('GET', '/orders/search?phone_suffix=38006', headers={'Authorization': 'Bearer test-admin-token'})
+    assert search.status_code == 200
+    assert search.json()['success']
+
+def test_slow_storage_does_not_hold_threads():
+    """大量并发的慢速存储读取只占用协程，不占用线程"""
+    async_storage = get_async_storage()
+
+    async def slow_page(user_id, before, limit, archived=False):
+        await asyncio.sleep(0.2)
+        return []
+
+    async def run():
+        async with httpx.AsyncClient(app=app, base_url='http://testserver') as client:
+            threads = threading.active_count()
+            start = time.perf_counter()
+            responses = await asyncio.gather(*[
+                client.get(f'/orders/dev_user_asgi_slow_{index}') for index in range(500)
+            ])
+            return responses, time.perf_counter() - start, threading.active_count() - threads
+
+    async_storage.get_user_orders_page = slow_page
+    try:
+        responses, elapsed, extra_threads = asyncio.run(run())
+    finally:
+        del async_storage.get_user_orders_page
+
+    print(f"⏱️ 500个0.2秒的并发读取耗时: {elapsed:.2f}s, 新增线程: {extra_threads}")
+    assert all(response.status_code == 200 for response in responses)
+    assert elapsed < 2
+    assert extra_threads <= 0
+
+def test_async_routes_record_metrics():
+    """异步路由由ASGI中间件记录指标，回退的路由由Flask记录"""
+    request('GET', f'/orders/{USER_ID}')
+    request('GET', '/health')
+    text = request('GET', '/metrics').text
+    assert 'http_requests_total{route="asgi.user_orders",method="GET",status="200"}' in text
+    assert 'http_requests_total{route="common.health_check",method="GET",status="200"}' in text
+
+def test_event_stream():
+    """SSE连接在事件循环中等待事件，断开时取消订阅"""
+    before = event_hub.subscriber_count()
+
+    async def run():
+        received = []
+        disconnected = asyncio.Event()
+
+        async def receive():
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.body' and message.get('body'):
+                received.append(message['body'].decode('utf-8'))
+                if 'order_created' in received[-1]:
+                    disconnected.set()
+
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': '/events/dev_user_asgi_stream', 'raw_path': b'/events/dev_user_asgi_stream',
+            'root_path': '', 'query_string': b'', 'headers': [], 'server': ('testserver', 80), 'client': None
+        }
+        task = asyncio.create_task(app(scope, receive, send))
+        await asyncio.sleep(0.1)
+        assert event_hub.subscriber_count() == before + 1
+
+        # 订单在其他线程中创建（与Flask路由写入时相同）
+        await asyncio.to_thread(order_service.create_order, 'dev_user_asgi_stream', '13800138007',
+                                {'address': '广州市越秀区', 'budget': 20})
+        await asyncio.wait_for(task, 5)
+        return received
+
+    received = asyncio.run(run())
+    print(f"📡 收到: {received}")
+    assert received[0].startswith('retry: 5000')
+    assert any('event: order_created' in chunk for chunk in received)
+    assert event_hub.subscriber_count() == before
+
+if __name__ == '__main__':
+    print("🧪 开始测试ASGI服务模式...")
+    test_async_routes_match_flask()
+    test_send_verification_code()
+    test_other_routes_fall_back_to_flask()
+    test_slow_storage_does_not_hold_threads()
+    test_async_routes_record_metrics()
+    test_event_stream()
+    print("✅ 所有测试通过")
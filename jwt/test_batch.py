@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+批量请求API测试脚本
+"""
+import sys
+import os
+import time
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from src.services import invite_service
+
+app = create_app()
+
+USER_ID = 'dev_user_batch'
+
+def startup_requests():
+    """应用启动时的五个读取请求"""
+    return [
+        {'id': 'stats', 'path': f'/get-user-invite-stats?user_id={USER_ID}'},
+        {'id': 'progress', 'path': f'/get-invite-progress?user_id={USER_ID}'},
+        {'id': 'free_drinks', 'path': '/free-drinks-remaining'},
+        {'id': 'preferences', 'path': f'/preferences/{USER_ID}'},
+        {'id': 'orders', 'path': f'/orders/{USER_ID}'},
+    ]
+
+def test_startup_reads_in_one_round_trip():
+    """五个启动请求一次返回，顺序与请求一致，结果与单独调用相同"""
+    client = app.test_client()
+    response = client.post('/batch', json={'requests': startup_requests()})
+    data = response.get_json()
+
+    print(f"📦 批量结果: {[(item['id'], item['status']) for item in data['responses']]}")
+    assert response.status_code == 200
+    assert [item['id'] for item in data['responses']] == ['stats', 'progress', 'free_drinks', 'preferences', 'orders']
+    assert data['responses'][2]['body'] == client.get('/free-drinks-remaining').get_json()
+    assert data['responses'][4]['status'] == 200
+    assert data['responses'][4]['etag'] == client.get(f'/orders/{USER_ID}').headers['ETag']
+
+def test_reads_run_concurrently():
+    """独立的读取请求并发执行"""
+    original = invite_service.get_free_drinks_remaining
+
+    def slow_remaining():
+        time.sleep(0.2)
+        return original()
+
+    invite_service.get_free_drinks_remaining = slow_remaining
+    try:
+        start = time.perf_counter()
+        response = app.test_client().post('/batch', json={'requests': [{'path': '/free-drinks-remaining'}] * 4})
+        elapsed = time.perf_counter() - start
+    finally:
+        invite_service.get_free_drinks_remaining = original
+
+    print(f"⏱️ 4个0.2秒的读取耗时: {elapsed:.2f}s")
+    assert all(item['status'] == 200 for item in response.get_json()['responses'])
+    assert elapsed < 0.6
+
+def test_reads_after_write_see_the_write():
+    """写请求之后的读取能看到写入结果，并支持条件请求头"""
+    client = app.test_client()
+    response = client.post('/batch', json={'requests': [
+        {'id': 'save', 'method': 'POST', 'path': '/preferences', 'body': {
+            'user_id': USER_ID, 'form_data': {'address': '成都市武侯区', 'selectedFoodType': ['奶茶'], 'budget': '25'}
+        }},
+        {'id': 'read', 'path': f'/preferences/{USER_ID}'},
+    ]})
+    save, read = response.get_json()['responses']
+    assert save['status'] == 200
+    assert read['body']['preferences']['default_address'] == '成都市武侯区'
+
+    cached = client.post('/batch', json={'requests': [
+        {'path': f'/preferences/{USER_ID}', 'headers': {'If-None-Match': read['etag']}}
+    ]}).get_json()['responses'][0]
+    assert cached['status'] == 304
+    assert cached['body'] is None
+
+def test_invalid_batches_are_rejected():
+    """空批量、超出数量和流式路径返回400"""
+    client = app.test_client()
+    assert client.post('/batch', json={'requests': []}).status_code == 400
+    assert client.post('/batch', json={'requests': [{'path': '/health'}] * 100}).status_code == 400
+    assert client.post('/batch', json={'requests': [{'path': f'/events/{USER_ID}'}]}).status_code == 400
+    assert client.post('/batch', json={'requests': [{'path': '/batch', 'method': 'POST'}]}).status_code == 400
+
+if __name__ == '__main__':
+    print("🧪 开始测试批量请求...")
+    test_startup_reads_in_one_round_trip()
+    test_reads_run_concurrently()
+    test_reads_after_write_see_the_write()
+    test_invalid_batches_are_rejected()
+    print("✅ 所有测试通过")
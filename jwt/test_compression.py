@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+响应压缩测试脚本
+"""
+import sys
+import os
+import gzip
+import json
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from src.services import order_service
+from src.utils.cache import compressed_responses
+from src.utils.compression import BROTLI_AVAILABLE, compression_level
+
+app = create_app()
+
+USER_ID = 'dev_user_compression'
+
+def create_orders():
+    """创建足够多的订单，使订单列表超过压缩阈值"""
+    for index in range(20):
+        order_service.create_order(USER_ID, '13800138005', {
+            'address': f'上海市浦东新区张江镇博云路{index}号', 'budget': 30,
+            'allergies': ['花生', '海鲜'], 'preferences': ['川菜', '清淡']
+        })
+
+def test_gzip_round_trip():
+    """协商gzip时响应体解压后与未压缩的一致"""
+    create_orders()
+    client = app.test_client()
+    plain = client.get(f'/orders/{USER_ID}')
+    compressed = client.get(f'/orders/{USER_ID}', headers={'Accept-Encoding': 'gzip'})
+
+    print(f"🗜️ gzip: {len(plain.data)} -> {len(compressed.data)} 字节")
+    assert 'Content-Encoding' not in plain.headers
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in compressed.headers['Vary']
+    assert int(compressed.headers['Content-Length']) == len(compressed.data) < len(plain.data)
+    assert gzip.decompress(compressed.data) == plain.data
+    assert compressed.headers['ETag'] == plain.headers['ETag'][:-1] + '-gzip"'
+
+def test_etag_per_encoding():
+    """压缩表示的ETag带编码后缀，两种ETag都能换来304，且304带回客户端持有的那个"""
+    create_orders()
+    client = app.test_client()
+    plain_etag = client.get(f'/orders/{USER_ID}').headers['ETag']
+    gzip_etag = client.get(f'/orders/{USER_ID}', headers={'Accept-Encoding': 'gzip'}).headers['ETag']
+    assert gzip_etag != plain_etag
+
+    for etag in (plain_etag, gzip_etag):
+        cached = client.get(f'/orders/{USER_ID}', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+        assert cached.status_code == 304
+        assert cached.headers['ETag'] == etag
+
+    order_service.create_order(USER_ID, '13800138005', {'address': '上海市徐汇区', 'budget': 30})
+    stale = client.get(f'/orders/{USER_ID}', headers={'Accept-Encoding': 'gzip', 'If-None-Match': gzip_etag})
+    assert stale.status_code == 200
+
+def test_brotli_preferred():
+    """同时接受br和gzip时优先br"""
+    if not BROTLI_AVAILABLE:
+        print("⚠️ 未安装brotli，跳过")
+        return
+    import brotli
+    create_orders()
+    client = app.test_client()
+    plain = client.get(f'/orders/{USER_ID}')
+    response = client.get(f'/orders/{USER_ID}', headers={'Accept-Encoding': 'gzip, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert brotli.decompress(response.data) == plain.data
+
+def test_small_responses_are_not_compressed():
+    """小于阈值的响应原样返回"""
+    response = app.test_client().get('/health', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+
+def test_versioned_responses_compressed_once():
+    """同一ETag的响应只压缩一次"""
+    create_orders()
+    client = app.test_client()
+    client.get(f'/orders/{USER_ID}', headers={'Accept-Encoding': 'gzip'})
+    hits = compressed_responses.stats()['hits']
+    response = client.get(f'/orders/{USER_ID}', headers={'Accept-Encoding': 'gzip'})
+    assert compressed_responses.stats()['hits'] == hits + 1
+    assert response.headers['Content-Encoding'] == 'gzip'
+
+    # 新订单使版本号变化，重新压缩
+    order_service.create_order(USER_ID, '13800138005', {'address': '上海市徐汇区', 'budget': 30})
+    changed = client.get(f'/orders/{USER_ID}', headers={'Accept-Encoding': 'gzip'})
+    assert changed.headers['ETag'] != response.headers['ETag']
+    assert json.loads(gzip.decompress(changed.data))['orders'][0]['delivery_address'] == '上海市徐汇区'
+
+def test_level_drops_for_large_bodies():
+    """响应越大压缩级别越低"""
+    assert compression_level('gzip', 10 * 1024) > compression_level('gzip', 4 * 1024 * 1024)
+
+if __name__ == '__main__':
+    print("🧪 开始测试响应压缩...")
+    test_gzip_round_trip()
+    test_etag_per_encoding()
+    test_brotli_preferred()
+    test_small_responses_are_not_compressed()
+    test_versioned_responses_compressed_once()
+    test_level_drops_for_large_bodies()
+    print("✅ 所有测试通过")
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+ETag条件请求测试脚本
+"""
+import sys
+import os
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from src.storage import get_storage
+
+app = create_app()
+client = app.test_client()
+
+def create_order(user_id):
+    """为用户创建一个订单"""
+    return client.post('/create-order', json={
+        'user_id': user_id,
+        'phone_number': '13800138012',
+        'form_data': {'address': '北京市朝阳区三里屯', 'budget': 30}
+    })
+
+def test_not_modified_until_write():
+    """版本未变化时返回304，写入后旧ETag失效"""
+    user_id = 'dev_user_etag'
+    first = client.get(f'/orders/{user_id}')
+    etag = first.headers['ETag']
+    assert first.headers['Cache-Control'] == 'private, no-cache'
+
+    cached = client.get(f'/orders/{user_id}', headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.headers['ETag'] == etag
+
+    create_order(user_id)
+    fresh = client.get(f'/orders/{user_id}', headers={'If-None-Match': etag})
+    assert fresh.status_code == 200
+    assert fresh.headers['ETag'] != etag
+    assert fresh.get_json()['count'] == 1
+
+def test_failed_bump_is_not_hidden():
+    """版本号递增失败时写请求返回5xx，且在递增成功前不再返回ETag或304"""
+    user_id = 'dev_user_etag_bump'
+    etag = client.get(f'/orders/{user_id}').headers['ETag']
+
+    storage = get_storage()
+    attempts = []
+
+    def failing_bump(user_id, scope):
+        attempts.append(scope)
+        raise ConnectionError("版本号表不可用")
+
+    original = storage.bump_data_version
+    storage.bump_data_version = failing_bump
+    try:
+        assert create_order(user_id).status_code == 500
+    finally:
+        storage.bump_data_version = original
+    assert attempts == ['orders', 'orders']
+
+    stale = client.get(f'/orders/{user_id}', headers={'If-None-Match': etag})
+    assert stale.status_code == 200
+    assert 'ETag' not in stale.headers
+    assert stale.get_json()['count'] == 1
+
+    create_order(user_id)
+    assert client.get(f'/orders/{user_id}').headers['ETag'] != etag
+
+def test_read_failure_is_not_cached():
+    """存储读取失败时返回5xx而不是带ETag的空列表"""
+    user_id = 'dev_user_etag_read'
+    storage = get_storage()
+
+    def failing_page(*args):
+        raise ConnectionError("数据库不可用")
+
+    original = storage.get_user_orders_page
+    storage.get_user_orders_page = failing_page
+    try:
+        response = client.get(f'/orders/{user_id}')
+    finally:
+        storage.get_user_orders_page = original
+
+    assert response.status_code == 500
+    assert 'ETag' not in response.headers
+
+def test_preferences_read_failure_is_not_cached():
+    """偏好读取失败时返回5xx，不把"无偏好"的读模型缓存到当前版本"""
+    from src.utils.cache import preferences_read_models
+
+    user_id = 'dev_user_etag_prefs'
+    client.post('/preferences', json={'user_id': user_id, 'form_data': {
+        'address': '杭州市西湖区', 'selectedFoodType': ['奶茶'], 'budget': '20'
+    }})
+    preferences_read_models.clear()
+
+    storage = get_storage()
+
+    def failing_read(user_id):
+        raise ConnectionError("数据库不可用")
+
+    original = storage.get_user_preferences
+    storage.get_user_preferences = failing_read
+    try:
+        responses = [client.get(f'/preferences/{user_id}{path}') for path in ('', '/complete', '/form-data')]
+    finally:
+        storage.get_user_preferences = original
+
+    for response in responses:
+        assert response.status_code == 500
+        assert 'ETag' not in response.headers
+    assert preferences_read_models.get(user_id) is None
+    assert client.get(f'/preferences/{user_id}/complete').get_json()['has_preferences'] is True
+
+if __name__ == '__main__':
+    test_not_modified_until_write()
+    test_failed_bump_is_not_hidden()
+    test_read_failure_is_not_cached()
+    test_preferences_read_failure_is_not_cached()
+    print("✅ ETag测试完成！")
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+SSE事件推送测试脚本
+"""
+import sys
+import os
+import threading
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from src.services import order_service
+from src.utils.event_bridge import PostgresEventBridge
+from src.utils.pubsub import EventHub, event_hub, format_sse, user_orders_topic
+
+app = create_app()
+
+def test_submit_order_publishes_status_event():
+    """提交订单后订阅者收到order_status事件"""
+    user_id = 'dev_user_events'
+    subscription = event_hub.subscribe([user_orders_topic(user_id)])
+    try:
+        created = order_service.create_order(user_id, '13800138002', {'address': '上海市徐汇区', 'budget': 25})
+        assert created['success']
+        assert subscription.get(1)['event'] == 'order_created'
+
+        assert order_service.submit_order(created['order_id'])['success']
+        message = subscription.get(1)
+        print(f"📡 收到事件: {format_sse(message).strip()}")
+        assert message['event'] == 'order_status'
+        assert message['data']['status'] == 'submitted'
+        assert message['data']['order_number'] == created['order_number']
+    finally:
+        event_hub.unsubscribe(subscription)
+
+def test_event_stream_endpoint():
+    """/events/<user_id> 推送事件并在断开时取消订阅"""
+    client = app.test_client()
+    before = event_hub.subscriber_count()
+    response = client.get('/events/dev_user_stream', buffered=False)
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+
+    chunks = iter(response.response)
+    assert next(chunks).startswith(b'retry:')
+
+    threading.Timer(0.1, event_hub.publish, args=(
+        user_orders_topic('dev_user_stream'), 'order_status', {'status': 'completed'}
+    )).start()
+    chunk = next(chunks).decode()
+    print(f"📡 收到数据: {chunk.strip()}")
+    assert 'event: order_status' in chunk
+    assert '"completed"' in chunk
+
+    response.close()
+    assert event_hub.subscriber_count() == before
+
+def test_close_all_ends_streams():
+    """进程退出前关闭所有订阅，SSE响应随之结束"""
+    response = app.test_client().get('/events/dev_user_shutdown', buffered=False)
+    chunks = iter(response.response)
+    assert next(chunks).startswith(b'retry:')
+
+    threading.Timer(0.1, event_hub.close_all).start()
+    assert list(chunks) == []
+    assert event_hub.subscriber_count() == 0
+    response.close()
+
+def test_subscriber_limit_is_atomic():
+    """并发订阅时连接数不超过上限，超出的请求收到503"""
+    from src.config import config
+
+    hub = EventHub()
+    barrier = threading.Barrier(20)
+    results = []
+
+    def subscribe():
+        barrier.wait()
+        results.append(hub.subscribe(['topic'], limit=5))
+
+    threads = [threading.Thread(target=subscribe) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len([subscription for subscription in results if subscription]) == 5
+    assert hub.subscriber_count() == 5
+
+    original = config.SSE_MAX_SUBSCRIBERS
+    config.SSE_MAX_SUBSCRIBERS = event_hub.subscriber_count()
+    try:
+        response = app.test_client().get('/events/dev_user_full')
+        assert response.status_code == 503
+        assert response.get_json()['success'] is False
+    finally:
+        config.SSE_MAX_SUBSCRIBERS = original
+
+def test_bridge_forwards_between_processes():
+    """一个进程发布的事件经转发投递给另一个进程的订阅者，自己发出的通知不重复投递"""
+    hubs = [EventHub(), EventHub()]
+    bridges = [PostgresEventBridge(hub, 'postgresql://unused', 'app_events', 10) for hub in hubs]
+    bridges[1].origin = 'other-worker'
+    for hub, bridge in zip(hubs, bridges):
+        hub.set_bridge(bridge)
+
+    topic = user_orders_topic('dev_user_bridge')
+    local, remote = hubs[0].subscribe([topic]), hubs[1].subscribe([topic])
+    assert hubs[0].publish(topic, 'order_status', {'status': 'submitted'}) == 1
+
+    # 模拟NOTIFY：频道中的通知会发给所有监听者，包括发送方自己
+    payload = bridges[0]._outbox.get_nowait()
+    assert bridges[0].receive(payload) == 0
+    assert bridges[1].receive(payload) == 1
+
+    assert local.get_nowait()['data'] == {'status': 'submitted'}
+    assert local.get_nowait() is None
+    message = remote.get_nowait()
+    assert (message['event'], message['data']) == ('order_status', {'status': 'submitted'})
+
+def test_bridge_drops_when_queue_is_full():
+    """发送队列满时丢弃事件而不阻塞发布者，本进程的订阅者照常收到"""
+    hub = EventHub()
+    bridge = PostgresEventBridge(hub, 'postgresql://unused', 'app_events', 1)
+    hub.set_bridge(bridge)
+    subscription = hub.subscribe(['topic'])
+
+    for index in range(3):
+        hub.publish('topic', 'tick', {'index': index})
+    assert bridge._outbox.qsize() == 1
+    assert [subscription.get_nowait()['data']['index'] for _ in range(3)] == [0, 1, 2]
+
+if __name__ == '__main__':
+    print("🧪 开始测试SSE事件推送...")
+    test_submit_order_publishes_status_event()
+    test_event_stream_endpoint()
+    test_close_all_ends_streams()
+    test_subscriber_limit_is_atomic()
+    test_bridge_forwards_between_processes()
+    test_bridge_drops_when_queue_is_full()
+    print("✅ 所有测试通过")
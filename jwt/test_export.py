@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+订单导出测试脚本
+"""
+import sys
+import os
+import csv
+import io
+import json
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from src.config import config
+from src.storage.dev_storage import DevStorage
+from src.services.export_service import ExportService, CSV_COLUMNS
+
+app = create_app()
+client = app.test_client()
+
+PHONE = '13800138011'
+
+# 管理接口需要令牌
+config.ADMIN_API_TOKEN = 'test-admin-token'
+ADMIN_HEADERS = {'Authorization': 'Bearer test-admin-token'}
+
+def create_orders(count):
+    """创建若干订单，返回订单ID（按创建顺序）"""
+    order_ids = []
+    for index in range(count):
+        response = client.post('/create-order', json={
+            'user_id': 'dev_user_export',
+            'phone_number': PHONE,
+            'form_data': {'address': f'北京市朝阳区三里屯{index}号', 'budget': 30,
+                          'allergies': ['花生'], 'preferences': ['清淡']}
+        })
+        order_ids.append(response.get_json()['order_id'])
+    return order_ids
+
+def test_keyset_pages_cover_every_order_once():
+    """键集分页按 (created_at, id) 升序，逐页读取不重不漏"""
+    storage = DevStorage()
+    for index in range(25):
+        storage.orders[f'id-{index:02d}'] = {
+            'id': f'id-{index:02d}', 'user_id': 'u', 'status': 'draft', 'is_deleted': index == 3,
+            'created_at': f'2025-07-26T10:00:{index // 2:02d}+00:00'
+        }
+    service = ExportService()
+    service.storage = storage
+
+    exported = [order['id'] for order in service.iter_orders({'include_deleted': False}, page_size=4)]
+
+    expected = [f'id-{index:02d}' for index in range(25) if index != 3]
+    assert exported == expected
+
+def test_ndjson_export():
+    """NDJSON每行一个订单，列表字段为数组"""
+    order_ids = create_orders(3)
+
+    response = client.get('/orders/export?format=ndjson', headers=ADMIN_HEADERS)
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    mine = [row for row in rows if row['id'] in order_ids]
+    assert [row['id'] for row in mine] == order_ids
+    assert mine[0]['dietary_restrictions'] == ['花生']
+
+def test_csv_export_and_validation():
+    """CSV先输出表头；参数错误时返回400"""
+    create_orders(1)
+
+    response = client.get('/orders/export?format=csv&status=draft', headers=ADMIN_HEADERS)
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert response.mimetype == 'text/csv'
+    assert list(rows[0].keys()) == CSV_COLUMNS
+    assert all(row['status'] == 'draft' for row in rows)
+    assert json.loads(rows[-1]['food_preferences']) == ['清淡']
+
+    assert client.get('/orders/export?format=csv').status_code == 403
+    assert client.get('/orders/export?format=xml', headers=ADMIN_HEADERS).status_code == 400
+    assert client.get('/orders/export?start_date=2025-13-01', headers=ADMIN_HEADERS).status_code == 400
+    assert client.get('/orders/export?start_date=2025-07-27&end_date=2025-07-26', headers=ADMIN_HEADERS).status_code == 400
+
+def test_export_includes_archived_orders():
+    """归档后的订单在热表订单之后导出"""
+    from src.services import archive_service
+    from src.storage import storage
+
+    order_ids = create_orders(2)
+    storage.orders[order_ids[0]].update({'status': 'completed', 'created_at': '2020-01-01T10:00:00+00:00'})
+    assert archive_service.archive_orders()['archived'] == 1
+
+    response = client.get('/orders/export?format=ndjson&start_date=2019-12-31', headers=ADMIN_HEADERS)
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [row['id'] for row in rows if row['id'] in order_ids] == [order_ids[1], order_ids[0]]
+
+    # 日期范围只覆盖归档订单时也能导出
+    response = client.get('/orders/export?format=csv&start_date=2020-01-01&end_date=2020-01-01', headers=ADMIN_HEADERS)
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert [row['id'] for row in rows] == [order_ids[0]]
+
+if __name__ == '__main__':
+    test_keyset_pages_cover_every_order_once()
+    test_ndjson_export()
+    test_csv_export_and_validation()
+    test_export_includes_archived_orders()
+    print("✅ 订单导出测试完成！")
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+gunicorn启动配置测试脚本
+"""
+import sys
+import os
+import inspect
+import json
+import selectors
+import socket
+import subprocess
+import threading
+import time
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from gunicorn.config import Config
+from gunicorn.workers.base import Worker
+from gunicorn.workers.gthread import ThreadWorker
+from src.utils import gunicorn_workers
+from src.utils.gunicorn_workers import DrainingThreadWorker
+from src.utils.pubsub import event_hub
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+def load_config(**env):
+    """在新进程中加载gunicorn.conf.py，返回其中的设置和加载后的环境变量"""
+    code = (
+        "import json, os, runpy\n"
+        "ns = runpy.run_path('gunicorn.conf.py')\n"
+        "print(json.dumps({'threads': ns.get('threads'), 'max_requests': ns['max_requests'],"
+        " 'SSE_MAX_SUBSCRIBERS': os.environ.get('SSE_MAX_SUBSCRIBERS')}))"
+    )
+    environ = {key: value for key, value in os.environ.items() if key != 'SSE_MAX_SUBSCRIBERS'}
+    environ.update(env)
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=environ, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.splitlines()[-1])
+
+def test_sse_connections_capped_below_threads():
+    """gthread模式下SSE连接数限制在线程数的1/4，asgi模式不限制"""
+    assert load_config(API_THREADS='16')['SSE_MAX_SUBSCRIBERS'] == '4'
+    assert load_config(API_THREADS='16', SSE_MAX_SUBSCRIBERS='5000')['SSE_MAX_SUBSCRIBERS'] == '4'
+    assert load_config(API_THREADS='16', SSE_MAX_SUBSCRIBERS='2')['SSE_MAX_SUBSCRIBERS'] == '2'
+    assert load_config(API_THREADS='2')['SSE_MAX_SUBSCRIBERS'] == '1'
+    assert load_config(API_SERVER_MODE='asgi')['SSE_MAX_SUBSCRIBERS'] is None
+
+def test_indexes_warmed_before_fork():
+    """主进程预热索引，之后（工作进程fork后）只增量同步新的变更；默认重启间隔足够大"""
+    assert load_config()['max_requests'] == 50000
+
+    code = (
+        "import runpy\n"
+        "from app import create_app\n"
+        "from src.services import order_service, search_service\n"
+        "create_app()\n"
+        "conf = runpy.run_path('gunicorn.conf.py')\n"
+        "order_service.create_order('dev_user_warm', '13800138020', {'address': '深圳市南山区', 'budget': 30})\n"
+        "conf['refresh_indexes']('主进程')\n"
+        "assert len(search_service.index) == 1\n"
+        "order_service.create_order('dev_user_warm', '13800138020', {'address': '深圳市福田区', 'budget': 30})\n"
+        "refresh = search_service.refresh\n"
+        "counts = []\n"
+        "search_service.refresh = lambda force=False: counts.append(refresh(force)) or counts[-1]\n"
+        "conf['refresh_indexes']('工作进程')\n"
+        "assert (counts, len(search_service.index)) == ([1], 2)\n"
+        "print('ok')"
+    )
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    # 日志在后台线程写出，可能排在print之后
+    assert 'ok' in result.stdout.splitlines()
+
+def test_gthread_internals_still_match():
+    """DrainingThreadWorker依赖的gthread内部实现没有变化（升级gunicorn时失败则需重新核对）"""
+    assert 'self.alive = False' in inspect.getsource(Worker.handle_exit)
+    assert 'self.alive = False' in inspect.getsource(Worker.handle_quit)
+    assert 'while self.alive:' in inspect.getsource(ThreadWorker.run)
+
+    init_process = inspect.getsource(ThreadWorker.init_process)
+    assert 'self.poller = ' in init_process and 'self._lock = ' in init_process
+    assert 'with self._lock:' in inspect.getsource(ThreadWorker.accept)
+
+    handle_request = inspect.getsource(ThreadWorker.handle_request)
+    assert 'self.alive = False' in handle_request
+    assert 'not self.cfg.keepalive' in handle_request
+
+def test_draining_worker_stops_accepting_first():
+    """要求退出后先停止accept、关闭keepalive和SSE连接，等待一段时间后主循环才结束"""
+    cfg = Config()
+    cfg.set('keepalive', 5)
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen()
+    worker = DrainingThreadWorker(0, os.getpid(), [listener], None, 30, cfg, None)
+    worker.poller = selectors.DefaultSelector()
+    worker._lock = threading.RLock()
+    worker.poller.register(listener, selectors.EVENT_READ)
+    subscription = event_hub.subscribe(['drain-test'])
+
+    original = gunicorn_workers.DRAIN_SECONDS
+    gunicorn_workers.DRAIN_SECONDS = 0.2
+    try:
+        worker.alive = True
+        worker.alive = False
+        time.sleep(0.1)
+        # 排空期间主循环继续运行，但不再accept，新的响应不保持连接
+        assert worker.alive
+        assert listener not in [key.fileobj for key in worker.poller.get_map().values()]
+        assert cfg.keepalive == 0
+        assert subscription.closed
+
+        time.sleep(0.3)
+        assert not worker.alive
+    finally:
+        gunicorn_workers.DRAIN_SECONDS = original
+        worker.poller.close()
+        listener.close()
+        worker.tmp.close()
+
+if __name__ == '__main__':
+    print("🧪 开始测试gunicorn配置...")
+    test_sse_connections_capped_below_threads()
+    test_indexes_warmed_before_fork()
+    test_gthread_internals_still_match()
+    test_draining_worker_stops_accepting_first()
+    print("✅ 所有测试通过")
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+幂等请求测试脚本
+"""
+import sys
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from src.config import config
+from src.storage import storage
+
+app = create_app()
+
+ORDER_PAYLOAD = {
+    'user_id': 'dev_user_idem',
+    'phone_number': '13800138001',
+    'form_data': {'address': '北京市朝阳区三里屯', 'budget': 30}
+}
+
+def test_retry_replays_first_response():
+    """相同Idempotency-Key的重试返回同一个订单"""
+    client = app.test_client()
+    headers = {'Idempotency-Key': 'create-order-retry'}
+
+    first = client.post('/create-order', json=ORDER_PAYLOAD, headers=headers)
+    second = client.post('/create-order', json=ORDER_PAYLOAD, headers=headers)
+
+    print(f"📋 首次响应: {first.get_json()}")
+    assert first.status_code == 200
+    assert second.status_code == 200
+    assert second.headers.get('Idempotent-Replayed') == 'true'
+    assert first.get_json()['order_number'] == second.get_json()['order_number']
+
+def test_key_reused_with_different_body_is_rejected():
+    """同一个键用于不同请求体时返回422"""
+    client = app.test_client()
+    headers = {'Idempotency-Key': 'create-order-conflict'}
+
+    client.post('/create-order', json=ORDER_PAYLOAD, headers=headers)
+    other = dict(ORDER_PAYLOAD, phone_number='13800138002')
+    response = client.post('/create-order', json=other, headers=headers)
+
+    assert response.status_code == 422
+
+def test_concurrent_duplicates_execute_once():
+    """并发的重复请求只执行一次，其余请求重放响应或收到409"""
+    headers = {'Idempotency-Key': 'create-order-concurrent'}
+    responses = []
+    lock = threading.Lock()
+
+    def worker():
+        response = app.test_client().post('/create-order', json=ORDER_PAYLOAD, headers=headers)
+        with lock:
+            responses.append((response.status_code, response.headers.get('Idempotent-Replayed'), response.get_json()))
+
+    threads = [threading.Thread(target=worker) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    print(f"📋 并发请求的响应: {[(status, replayed) for status, replayed, _ in responses]}")
+    executed = [body for status, replayed, body in responses if status == 200 and not replayed]
+    assert len(executed) == 1
+    order_number = executed[0]['order_number']
+    for status, replayed, body in responses:
+        assert status in (200, 409)
+        if status == 200:
+            assert body['order_number'] == order_number
+
+    retried = app.test_client().post('/create-order', json=ORDER_PAYLOAD, headers=headers)
+    assert retried.get_json()['order_number'] == order_number
+
+def test_pending_duplicate_returns_conflict_immediately():
+    """首个请求仍在处理中时，重复请求立即返回409而不是等待"""
+    from src.utils.idempotency import request_fingerprint
+
+    key = f"POST:/create-order:user_id={ORDER_PAYLOAD['user_id']}:create-order-pending"
+    with app.test_request_context('/create-order', method='POST', json=ORDER_PAYLOAD):
+        assert storage.reserve_idempotency_key(key, request_fingerprint(), 60) is None
+
+    started = time.monotonic()
+    response = app.test_client().post('/create-order', json=ORDER_PAYLOAD,
+                                      headers={'Idempotency-Key': 'create-order-pending'})
+    assert response.status_code == 409
+    assert response.get_json()['success'] is False
+    assert time.monotonic() - started < 1
+
+def test_storage_errors_return_json_500():
+    """幂等键读写失败时返回JSON格式的500"""
+    client = app.test_client()
+
+    def broken(*args, **kwargs):
+        raise RuntimeError('storage unavailable')
+
+    for method in ('reserve_idempotency_key', 'complete_idempotency_key'):
+        original = getattr(storage, method)
+        setattr(storage, method, broken)
+        try:
+            response = client.post('/create-order', json=ORDER_PAYLOAD, headers={'Idempotency-Key': f'create-order-{method}'})
+        finally:
+            setattr(storage, method, original)
+        assert response.status_code == 500, method
+        assert response.get_json() == {"success": False, "message": "服务器错误: storage unavailable"}
+
+def test_same_key_from_different_callers_does_not_collide():
+    """不同用户使用相同的Idempotency-Key各自执行"""
+    client = app.test_client()
+    headers = {'Idempotency-Key': 'create-order-shared'}
+
+    first = client.post('/create-order', json=ORDER_PAYLOAD, headers=headers)
+    other = dict(ORDER_PAYLOAD, user_id='dev_user_idem_other', phone_number='13800138003')
+    second = client.post('/create-order', json=other, headers=headers)
+
+    assert second.status_code == 200
+    assert second.headers.get('Idempotent-Replayed') is None
+    assert first.get_json()['order_number'] != second.get_json()['order_number']
+
+def test_stale_pending_key_is_taken_over():
+    """处理中的进程退出后，租约过期的键由重试接管，而不是一直返回409"""
+    client = app.test_client()
+    headers = {'Idempotency-Key': 'create-order-crashed'}
+    key = f"POST:/create-order:user_id={ORDER_PAYLOAD['user_id']}:create-order-crashed"
+    # 模拟首个请求占用租约后进程被杀死
+    assert storage.reserve_idempotency_key(key, 'fingerprint', 0) is None
+
+    response = client.post('/create-order', json=ORDER_PAYLOAD, headers=headers)
+
+    assert response.status_code == 200
+    assert response.headers.get('Idempotent-Replayed') is None
+    record = storage.get_idempotency_record(key)
+    assert record['status'] == 'completed'
+    assert (record['expires_at'] - datetime.now(timezone.utc)).total_seconds() > config.IDEMPOTENCY_LEASE_SECONDS
+
+def test_purge_drops_only_expired_keys():
+    """过期清理只移除过期的记录，续期后的旧堆条目被跳过"""
+    storage.reserve_idempotency_key('purge-expired', 'fingerprint', 0)
+    storage.reserve_idempotency_key('purge-renewed', 'fingerprint', 0)
+    storage.reserve_idempotency_key('purge-renewed', 'fingerprint', 60)
+    storage.reserve_idempotency_key('purge-trigger', 'fingerprint', 60)
+
+    assert storage.get_idempotency_record('purge-expired') is None
+    assert storage.get_idempotency_record('purge-renewed')['status'] == 'pending'
+
+if __name__ == '__main__':
+    test_retry_replays_first_response()
+    test_key_reused_with_different_body_is_rejected()
+    test_concurrent_duplicates_execute_once()
+    test_pending_duplicate_returns_conflict_immediately()
+    test_storage_errors_return_json_500()
+    test_same_key_from_different_callers_does_not_collide()
+    test_stale_pending_key_is_taken_over()
+    test_purge_drops_only_expired_keys()
+    print("✅ 幂等请求测试完成！")
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+日志测试脚本
+"""
+import sys
+import os
+import io
+import json
+import logging
+import threading
+import time
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from src.config import config
+from src.utils.log import LOGGER_NAME, AsyncQueueHandler, RouteFilter, init_logging, flush_logging, dropped_records
+
+app = create_app()
+logger = logging.getLogger('src.test_logging')
+
+class SlowStream(io.StringIO):
+    """模拟写入很慢的日志收集端"""
+
+    def write(self, text):
+        time.sleep(0.01)
+        return super().write(text)
+
+class CountingArg:
+    """记录被格式化的次数和所在线程"""
+
+    def __init__(self):
+        self.threads = []
+
+    def __str__(self):
+        self.threads.append(threading.current_thread().name)
+        return 'arg'
+
+def capture(level=logging.INFO):
+    """把项目日志写到内存中，返回输出流"""
+    stream = io.StringIO()
+    init_logging(stream)
+    logging.getLogger(LOGGER_NAME).setLevel(level)
+    return stream
+
+def restore():
+    """恢复输出到标准输出"""
+    init_logging(sys.stdout)
+    logging.getLogger(LOGGER_NAME).setLevel(config.LOG_LEVEL)
+
+def test_slow_output_does_not_block():
+    """输出很慢时记录日志不阻塞，队列满后丢弃"""
+    queue_size = config.LOG_QUEUE_SIZE
+    config.LOG_QUEUE_SIZE = 100
+    try:
+        init_logging(SlowStream())
+        start = time.perf_counter()
+        for index in range(2000):
+            logger.info("📋 记录 %s", index)
+        elapsed = time.perf_counter() - start
+        dropped = dropped_records()
+    finally:
+        config.LOG_QUEUE_SIZE = queue_size
+        restore()
+
+    print(f"⏱️ 2000条日志耗时: {elapsed * 1000:.1f} ms, 丢弃 {dropped} 条")
+    assert elapsed < 0.5
+    assert dropped > 1000
+
+def test_formatting_is_lazy():
+    """级别未开启时不格式化，开启时在后台线程中格式化"""
+    stream = capture(logging.INFO)
+    # 只保留队列handler（pytest会在项目logger上挂自己的handler）
+    project_logger = logging.getLogger(LOGGER_NAME)
+    handlers = project_logger.handlers
+    project_logger.handlers = [handler for handler in handlers if isinstance(handler, AsyncQueueHandler)]
+    try:
+        arg = CountingArg()
+        logger.debug("🔍 调试 %s", arg)
+        assert arg.threads == []
+
+        logger.info("✅ 信息 %s", arg)
+        flush_logging()
+    finally:
+        project_logger.handlers = handlers
+        restore()
+    assert len(arg.threads) == 1
+    assert arg.threads[0] != threading.current_thread().name
+    assert '✅ 信息 arg' in stream.getvalue()
+
+def test_route_sampling():
+    """DEBUG日志按路由采样，其他级别全部保留"""
+    sampler = RouteFilter(0.1, {'order.api_create_order': 1})
+
+    def kept(level, func):
+        record = logging.makeLogRecord({'levelno': level, 'msg': '📋 事件', 'module': 'routes', 'funcName': func})
+        return sampler.filter(record)
+
+    assert sum(kept(logging.DEBUG, 'batch') for _ in range(100)) == 10
+    assert sum(kept(logging.INFO, 'batch') for _ in range(100)) == 100
+
+    with app.test_request_context('/create-order', method='POST'):
+        assert sum(kept(logging.DEBUG, 'batch') for _ in range(100)) == 100
+
+def test_request_logs_hide_secrets():
+    """请求日志带路由，不输出完整手机号和返回结果"""
+    stream = capture(logging.DEBUG)
+    client = app.test_client()
+    client.post('/send-verification-code', json={'phone_number': '13800138008'})
+    client.post('/login-with-phone', json={'phone_number': '13800138008',
+                                           'verification_code': config.DEV_VERIFICATION_CODE})
+    flush_logging()
+    restore()
+
+    output = stream.getvalue()
+    assert '[auth.api_send_verification_code]' in output
+    assert '138****8008' in output
+    assert '13800138008' not in output
+    assert '返回结果' not in output
+
+def test_json_format():
+    """JSON格式每行一条记录，包含路由和extra字段"""
+    log_format = config.LOG_FORMAT
+    config.LOG_FORMAT = 'json'
+    try:
+        stream = capture()
+        logger.info("📦 导出完成: %s 行", 12, extra={'export_format': 'csv'})
+        flush_logging()
+    finally:
+        config.LOG_FORMAT = log_format
+        restore()
+
+    entry = json.loads(stream.getvalue().splitlines()[-1])
+    assert entry['message'] == '📦 导出完成: 12 行'
+    assert entry['level'] == 'INFO'
+    assert entry['route'] == 'test_logging.test_json_format'
+    assert entry['export_format'] == 'csv'
+
+if __name__ == '__main__':
+    print("🧪 开始测试日志...")
+    test_slow_output_does_not_block()
+    test_formatting_is_lazy()
+    test_route_sampling()
+    test_request_logs_hide_secrets()
+    test_json_format()
+    print("✅ 所有测试通过")
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+指标测试脚本
+"""
+import sys
+import os
+import shutil
+import tempfile
+import threading
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from src.config import config
+from src.utils import metrics
+from src.utils.metrics import Counter, collect, flush, mark_process_dead, render
+
+app = create_app()
+client = app.test_client()
+
+USER_ID = 'dev_user_metrics'
+
+def sample(name):
+    """读取/metrics中一行指标的值，不存在时为0"""
+    for line in client.get('/metrics').get_data(as_text=True).splitlines():
+        if line.startswith(name + ' '):
+            return float(line.rsplit(' ', 1)[1])
+    return 0
+
+def test_route_metrics():
+    """按端点、方法和状态码记录请求次数和耗时分布"""
+    count = 'http_requests_total{route="common.health_check",method="GET",status="200"}'
+    histogram = 'http_request_duration_seconds_count{route="common.health_check",method="GET"}'
+    before, before_histogram = sample(count), sample(histogram)
+    for _ in range(5):
+        client.get('/health')
+
+    assert sample(count) == before + 5
+    assert sample(histogram) == before_histogram + 5
+    response = client.get('/metrics')
+    assert response.content_type.startswith('text/plain; version=0.0.4')
+    assert 'http_request_duration_seconds_bucket{route="common.health_check",method="GET",le="+Inf"}' in response.get_data(as_text=True)
+
+def test_storage_sms_and_cache_metrics():
+    """存储方法、短信发送和缓存命中都有指标"""
+    storage_count = 'storage_call_duration_seconds_count{method="get_user_orders_page"}'
+    sms_count = 'sms_sends_total{mode="dev",result="success"}'
+    cache_hits = 'cache_hits_total{cache="preferences_read_models"}'
+    before = [sample(storage_count), sample(sms_count), sample(cache_hits)]
+
+    client.get(f'/orders/{USER_ID}')
+    client.post('/send-verification-code', json={'phone_number': '13800138009'})
+    client.get(f'/preferences/{USER_ID}/form-data')
+    client.get(f'/preferences/{USER_ID}/form-data')
+
+    assert sample(storage_count) >= before[0] + 1
+    assert sample(sms_count) == before[1] + 1
+    assert sample(cache_hits) >= before[2] + 1
+
+def test_thread_buffers():
+    """多线程并发记录不丢计数"""
+    counter = Counter('test_thread_events_total', '测试计数', ('kind',))
+
+    def record():
+        for _ in range(10000):
+            counter.inc('a')
+
+    threads = [threading.Thread(target=record) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert collect()[('test_thread_events_total', ('a',))] == [80000]
+
+def test_exited_thread_buffers_are_folded():
+    """线程退出后缓冲区并入进程级合计，缓冲区数量不随线程数增长"""
+    counter = Counter('test_short_lived_events_total', '测试计数')
+    counter.inc()
+    buffers_before = len(metrics._buffers)
+
+    for _ in range(50):
+        thread = threading.Thread(target=counter.inc, kwargs={'amount': 2})
+        thread.start()
+        thread.join()
+
+    assert len(metrics._buffers) == buffers_before
+    assert collect()[('test_short_lived_events_total', ())] == [101]
+
+def test_prefork_aggregation():
+    """多进程时汇总各工作进程的快照，退出进程的计数并入归档"""
+    counter = Counter('test_worker_events_total', '测试计数')
+    directory = tempfile.mkdtemp()
+    config.METRICS_DIR = directory
+    try:
+        pids = []
+        for amount in (3, 4):
+            pid = os.fork()
+            if pid == 0:
+                counter.inc(amount=amount)
+                flush()
+                os._exit(0)
+            pids.append(pid)
+        for pid in pids:
+            os.waitpid(pid, 0)
+
+        counter.inc(amount=5)
+        assert collect()[('test_worker_events_total', ())] == [12]
+
+        mark_process_dead(pids[0])
+        assert not os.path.exists(os.path.join(directory, f'{pids[0]}.json'))
+        assert 'test_worker_events_total 12' in render()
+    finally:
+        config.METRICS_DIR = ''
+        shutil.rmtree(directory)
+
+if __name__ == '__main__':
+    print("🧪 开始测试指标...")
+    test_route_metrics()
+    test_storage_sms_and_cache_metrics()
+    test_thread_buffers()
+    test_exited_thread_buffers_are_folded()
+    test_prefork_aggregation()
+    print("✅ 所有测试通过")
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+订单字段编解码测试脚本
+"""
+import sys
+import os
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from src.services import order_service
+from src.storage import storage
+from src.utils.order_codec import decode_order, decode_tag_list
+
+app = create_app()
+
+def test_orders_store_native_lists():
+    """新订单的忌口/偏好以列表保存，列表接口原样返回"""
+    created = order_service.create_order('dev_user_codec', '13100001111', {
+        'address': '重庆市渝中区解放碑', 'budget': 30, 'allergies': ['nuts', '乳制品类'], 'preferences': ['spicy']
+    })
+    order = storage.get_order(created['order_id'])
+    assert order['dietary_restrictions'] == ['nuts', '乳制品类']
+    assert order['food_preferences'] == ['spicy']
+
+    data = app.test_client().get('/orders/dev_user_codec').get_json()
+    print(f"📋 订单列表: {data['orders'][0]['dietary_restrictions']}")
+    assert data['orders'][0]['dietary_restrictions'] == ['nuts', '乳制品类']
+
+def test_legacy_strings_are_decoded_once():
+    """迁移前的JSON字符串和Python列表字面量都能解析"""
+    assert decode_tag_list('["海鲜类"]') == ['海鲜类']
+    assert decode_tag_list("['seafood', 'nuts']") == ['seafood', 'nuts']
+    assert decode_tag_list('not a list') == []
+    assert decode_order({'dietary_restrictions': "['eggs']", 'food_preferences': None}) == {
+        'dietary_restrictions': ['eggs'], 'food_preferences': None
+    }
+
+if __name__ == '__main__':
+    print("🧪 开始测试订单字段编解码...")
+    test_orders_store_native_lists()
+    test_legacy_strings_are_decoded_once()
+    print("✅ 所有测试通过")
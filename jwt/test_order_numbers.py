@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+订单号分配测试脚本
+"""
+import sys
+import os
+import threading
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.utils.sequence import DailySequenceAllocator
+from src.utils.orders import format_order_number
+
+def test_sequence_is_unique_under_concurrency():
+    """并发分配的序号唯一且连续"""
+    allocator = DailySequenceAllocator()
+    results = []
+    lock = threading.Lock()
+
+    def worker():
+        values = [allocator.next('20250726') for _ in range(500)]
+        with lock:
+            results.extend(values)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    print(f"📋 分配序号数量: {len(results)}")
+    assert sorted(results) == list(range(1, 4001))
+
+def test_sequence_resets_per_day():
+    """每天的序号从1开始"""
+    allocator = DailySequenceAllocator()
+    assert allocator.next('20250726') == 1
+    assert allocator.next('20250726') == 2
+    assert allocator.next('20250727') == 1
+    assert allocator.current('20250726') == 2
+
+def test_order_number_supports_more_than_999():
+    """序号固定6位补零，超过999单后订单号仍按字典序排列"""
+    assert format_order_number('20250726', 7) == 'ORD20250726000007'
+    assert format_order_number('20250726', 999) == 'ORD20250726000999'
+    assert format_order_number('20250726', 1000) == 'ORD20250726001000'
+
+    numbers = [format_order_number('20250726', sequence) for sequence in range(1, 2001)]
+    assert sorted(numbers) == numbers
+
+if __name__ == '__main__':
+    test_sequence_is_unique_under_concurrency()
+    test_sequence_resets_per_day()
+    test_order_number_supports_more_than_999()
+    print("✅ 订单号分配测试完成！")
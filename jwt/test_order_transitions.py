@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+订单状态机与批量状态转换测试脚本
+"""
+import sys
+import os
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from src.config import config
+from src.storage import storage
+from src.utils.orders import allowed_source_statuses, build_transition_update
+
+app = create_app()
+client = app.test_client()
+
+USER_ID = 'dev_user_transitions'
+
+# 管理接口需要令牌
+config.ADMIN_API_TOKEN = 'test-admin-token'
+ADMIN_HEADERS = {'Authorization': 'Bearer test-admin-token'}
+
+def create_order():
+    """创建一个草稿订单，返回订单ID"""
+    response = client.post('/create-order', json={
+        'user_id': USER_ID,
+        'phone_number': '13800138010',
+        'form_data': {'address': '北京市朝阳区三里屯', 'budget': 30}
+    })
+    return response.get_json()['order_id']
+
+def test_state_machine():
+    """只有状态机允许的当前状态可以转换到目标状态"""
+    assert allowed_source_statuses('submitted') == ['draft']
+    assert allowed_source_statuses('completed') == ['processing', 'submitted']
+    assert allowed_source_statuses('deleted') == ['cancelled', 'completed', 'draft']
+
+    assert build_transition_update('submitted', 'T') == {'status': 'submitted', 'submitted_at': 'T'}
+    assert build_transition_update('deleted', 'T') == {'is_deleted': True, 'deleted_at': 'T'}
+
+def test_bulk_transitions_report_each_order():
+    """批量转换逐个订单返回结果，非法转换不影响其他订单"""
+    draft, submitted = create_order(), create_order()
+    client.post('/submit-order', json={'order_id': submitted})
+
+    response = client.post('/orders/transitions', headers=ADMIN_HEADERS, json={'transitions': [
+        {'order_id': draft, 'to_status': 'completed'},
+        {'order_id': submitted, 'to_status': 'processing'},
+        {'order_id': 'missing', 'to_status': 'cancelled'},
+        {'order_id': submitted, 'to_status': 'completed'},
+        {'order_id': draft, 'to_status': 'shipped'},
+    ]})
+    data = response.get_json()
+
+    assert response.status_code == 200
+    assert [result['success'] for result in data['results']] == [False, True, False, False, False]
+    assert data['results'][0]['message'] == '订单状态为draft，不能转换为completed'
+    assert data['results'][1]['status'] == 'processing'
+    assert data['results'][2]['message'] == '订单不存在'
+    assert data['results'][3]['message'] == '重复的订单ID'
+    assert data['results'][4]['message'] == '无效的目标状态: shipped'
+    assert (data['succeeded'], data['failed']) == (1, 4)
+
+def test_order_ids_with_single_target():
+    """order_ids + to_status 的简写形式；软删除后不能再转换"""
+    orders = [create_order() for _ in range(3)]
+
+    response = client.post('/orders/transitions', headers=ADMIN_HEADERS, json={'order_ids': orders, 'to_status': 'deleted'})
+    assert response.get_json()['succeeded'] == 3
+
+    again = client.post('/orders/transitions', headers=ADMIN_HEADERS, json={'order_ids': orders[:1], 'to_status': 'cancelled'}).get_json()
+    assert again['results'][0]['message'] == '订单已删除'
+
+def test_bulk_limit():
+    """超过单次上限时整批拒绝"""
+    transitions = [{'order_id': str(index), 'to_status': 'cancelled'} for index in range(config.ORDER_BULK_TRANSITION_MAX + 1)]
+    response = client.post('/orders/transitions', headers=ADMIN_HEADERS, json={'transitions': transitions})
+
+    assert response.status_code == 400
+
+def test_bulk_transitions_require_admin_token():
+    """缺少或带错管理令牌时返回403"""
+    order_id = create_order()
+    body = {'order_ids': [order_id], 'to_status': 'cancelled'}
+    for headers in ({}, {'Authorization': 'Bearer wrong-token'}, {'Authorization': 'test-admin-token'}):
+        response = client.post('/orders/transitions', json=body, headers=headers)
+        assert response.status_code == 403, headers
+        assert response.get_json() == {"success": False, "message": "需要管理员权限"}
+
+    # 未配置令牌时一律拒绝
+    config.ADMIN_API_TOKEN = ''
+    try:
+        assert client.post('/orders/transitions', json=body, headers={'Authorization': 'Bearer '}).status_code == 403
+    finally:
+        config.ADMIN_API_TOKEN = 'test-admin-token'
+
+    # 被拒绝的批量转换没有改动订单
+    assert storage.get_order(order_id)['status'] == 'draft'
+
+if __name__ == '__main__':
+    test_state_machine()
+    test_bulk_transitions_report_each_order()
+    test_order_ids_with_single_target()
+    test_bulk_limit()
+    test_bulk_transitions_require_admin_token()
+    print("✅ 订单状态转换测试完成！")
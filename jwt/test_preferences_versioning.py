@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+用户偏好版本控制与merge-patch测试脚本
+"""
+import sys
+import os
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from src.utils.merge_patch import apply_merge_patch
+
+app = create_app()
+
+def test_merge_patch_semantics():
+    """null删除键，对象递归合并"""
+    target = {'a': 1, 'b': {'c': 2, 'd': 3}}
+    patched = apply_merge_patch(target, {'a': None, 'b': {'d': 4, 'e': 5}})
+    assert patched == {'b': {'c': 2, 'd': 4, 'e': 5}}
+    assert target == {'a': 1, 'b': {'c': 2, 'd': 3}}
+
+def test_if_match_prevents_lost_update():
+    """两台设备基于同一版本修改时，后写入的一方收到412"""
+    client = app.test_client()
+    user_id = 'dev_user_prefs_versioned'
+    client.post('/preferences', json={'user_id': user_id, 'form_data': {
+        'address': '南京市鼓楼区', 'selectedFoodType': ['奶茶'], 'budget': '30',
+        'selectedAddressSuggestion': {'label': '鼓楼', 'city': '南京'}
+    }})
+
+    etag = client.get(f'/preferences/{user_id}').headers['ETag']
+
+    first = client.put(f'/preferences/{user_id}', json={'default_budget': '40'}, headers={'If-Match': etag})
+    print(f"🔄 第一台设备: {first.status_code} {first.headers.get('ETag')}")
+    assert first.status_code == 200
+    assert first.headers['ETag'] != etag
+
+    second = client.put(f'/preferences/{user_id}', json={'default_address': '南京市玄武区'}, headers={'If-Match': etag})
+    print(f"🔄 第二台设备: {second.status_code}")
+    assert second.status_code == 412
+    assert second.get_json()['preferences']['default_budget'] == '40'
+
+    # 基于最新版本重试，并用merge-patch修改嵌套字段
+    retried = client.put(f'/preferences/{user_id}', json={
+        'default_address': '南京市玄武区', 'address_suggestion': {'city': None}
+    }, headers={'If-Match': first.headers['ETag']})
+    assert retried.status_code == 200
+    preferences = retried.get_json()['preferences']
+    assert preferences['default_budget'] == '40'
+    assert preferences['address_suggestion'] == {'label': '鼓楼'}
+
+    # GET返回的ETag与写入后的版本一致
+    assert client.get(f'/preferences/{user_id}').headers['ETag'] == retried.headers['ETag']
+
+def test_unparseable_if_match_is_rejected():
+    """只有弱ETag或无法解析的ETag时返回412，偏好存在时*不限制版本"""
+    client = app.test_client()
+    user_id = 'dev_user_prefs_if_match'
+    client.post('/preferences', json={'user_id': user_id, 'form_data': {
+        'address': '成都市武侯区', 'selectedFoodType': ['奶茶'], 'budget': '20'
+    }})
+    etag = client.get(f'/preferences/{user_id}').headers['ETag']
+
+    for if_match in [f'W/{etag}', '"orders-v1"', 'W/"x", "y"']:
+        response = client.put(f'/preferences/{user_id}', json={'default_budget': '35'}, headers={'If-Match': if_match})
+        assert response.status_code == 412, if_match
+
+    starred = client.put(f'/preferences/{user_id}', json={'default_budget': '35'}, headers={'If-Match': '*'})
+    assert starred.status_code == 200
+
+    # 弱ETag和强ETag混在一起时只比较强ETag
+    response = client.put(f'/preferences/{user_id}', json={'default_budget': '40'},
+                          headers={'If-Match': f'W/"x", {starred.headers["ETag"]}'})
+    assert response.status_code == 200
+
+def test_if_match_any_listed_etag():
+    """列出的强ETag中任一与当前版本一致即可写入，更新的旧版本不影响匹配"""
+    client = app.test_client()
+    user_id = 'dev_user_prefs_if_match_list'
+    client.post('/preferences', json={'user_id': user_id, 'form_data': {
+        'address': '西安市雁塔区', 'selectedFoodType': ['奶茶'], 'budget': '20'
+    }})
+    etag = client.get(f'/preferences/{user_id}').headers['ETag']
+    newer = client.put(f'/preferences/{user_id}', json={'default_budget': '25'}, headers={'If-Match': etag})
+    assert newer.status_code == 200
+
+    # 当前版本和一个不存在的更新版本同时列出
+    response = client.put(f'/preferences/{user_id}', json={'default_budget': '30'},
+                          headers={'If-Match': f'{newer.headers["ETag"]}, "preferences-v999"'})
+    assert response.status_code == 200
+
+    response = client.put(f'/preferences/{user_id}', json={'default_budget': '35'},
+                          headers={'If-Match': f'{etag}, "preferences-v999"'})
+    assert response.status_code == 412
+    assert response.get_json()['preferences']['default_budget'] == '30'
+
+def test_if_match_star_requires_existing_preferences():
+    """*表示当前存在偏好，用户没有偏好时返回412且不创建"""
+    client = app.test_client()
+    user_id = 'dev_user_prefs_if_match_star'
+    response = client.put(f'/preferences/{user_id}', json={'default_budget': '35'}, headers={'If-Match': '*'})
+    assert response.status_code == 412
+    assert client.get(f'/preferences/{user_id}').get_json()['has_preferences'] is False
+
+def test_read_model_serves_prebuilt_responses():
+    """写入时构建读模型，GET直接返回预先序列化的字节"""
+    from src.storage import storage
+
+    client = app.test_client()
+    user_id = 'dev_user_prefs_read_model'
+    assert client.get(f'/preferences/{user_id}/complete').get_json()['has_preferences'] is False
+
+    client.post('/preferences', json={'user_id': user_id, 'form_data': {
+        'address': '武汉市洪山区', 'selectedFoodType': ['果汁'], 'budget': '25'
+    }})
+
+    reads = []
+    original = storage.get_user_preferences
+    storage.get_user_preferences = lambda uid: reads.append(uid) or original(uid)
+    try:
+        complete = client.get(f'/preferences/{user_id}/complete').get_json()
+        form = client.get(f'/preferences/{user_id}/form-data').get_json()
+    finally:
+        storage.get_user_preferences = original
+
+    print(f"📋 读模型: {complete} {form}")
+    assert reads == []
+    assert complete['can_quick_order'] is True
+    assert form['form_data']['address'] == '武汉市洪山区'
+
+    client.put(f'/preferences/{user_id}', json={'default_budget': None})
+    assert client.get(f'/preferences/{user_id}/complete').get_json()['is_complete'] is False
+
+def test_unknown_field_is_rejected():
+    """不支持的字段返回400"""
+    response = app.test_client().put('/preferences/dev_user_prefs_versioned', json={'user_id': 'someone_else'})
+    assert response.status_code == 400
+
+if __name__ == '__main__':
+    print("🧪 开始测试偏好版本控制...")
+    test_merge_patch_semantics()
+    test_if_match_prevents_lost_update()
+    test_unparseable_if_match_is_rejected()
+    test_if_match_any_listed_etag()
+    test_if_match_star_requires_existing_preferences()
+    test_read_model_serves_prebuilt_responses()
+    test_unknown_field_is_rejected()
+    print("✅ 所有测试通过")
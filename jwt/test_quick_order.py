@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+快速下单测试脚本
+"""
+import sys
+import os
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from src.services import preferences_service
+from src.storage import storage
+
+app = create_app()
+
+def test_quick_order_creates_submitted_order():
+    """按保存的偏好一次请求创建并提交订单"""
+    user_id = 'dev_user_quick'
+    preferences_service.save_user_preferences(user_id, {
+        'address': '成都市锦江区春熙路',
+        'selectedFoodType': ['咖啡'],
+        'selectedAllergies': ['nuts'],
+        'selectedPreferences': ['sweet'],
+        'budget': '35'
+    })
+
+    response = app.test_client().post('/quick-order', json={'user_id': user_id, 'phone_number': '13500001234'})
+    data = response.get_json()
+    print(f"⚡ 快速下单结果: {data}")
+    assert response.status_code == 200
+    assert data['status'] == 'submitted'
+
+    order = storage.get_order(data['order_id'])
+    assert order['status'] == 'submitted'
+    assert order['submitted_at']
+    assert order['delivery_address'] == '成都市锦江区春熙路'
+    assert order['budget_amount'] == 35.0
+
+def test_quick_order_requires_complete_preferences():
+    """没有完整偏好时返回400"""
+    response = app.test_client().post('/quick-order', json={'user_id': 'dev_user_no_prefs', 'phone_number': '13500004321'})
+    assert response.status_code == 400
+    assert response.get_json()['has_complete_preferences'] is False
+
+if __name__ == '__main__':
+    print("🧪 开始测试快速下单...")
+    test_quick_order_creates_submitted_order()
+    test_quick_order_requires_complete_preferences()
+    print("✅ 所有测试通过")
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+客服订单检索测试脚本
+"""
+import sys
+import os
+from datetime import date, datetime, timedelta
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from src.config import config
+from src.services import order_service, search_service
+
+app = create_app()
+
+# 管理接口需要令牌
+config.ADMIN_API_TOKEN = 'test-admin-token'
+ADMIN_HEADERS = {'Authorization': 'Bearer test-admin-token'}
+
+def test_combined_filters_intersect():
+    """手机号后缀、状态和地址关键词同时生效"""
+    first = order_service.create_order('dev_user_search_a', '13912345678', {'address': '深圳市南山区 科技园南区', 'budget': 30})
+    second = order_service.create_order('dev_user_search_b', '13700005678', {'address': '深圳市福田区华强北', 'budget': 30})
+    order_service.submit_order(first['order_id'])
+
+    client = app.test_client()
+    search_service.refresh(force=True)
+
+    data = client.get('/orders/search?phone_suffix=5678&address=南山区 科技园', headers=ADMIN_HEADERS).get_json()
+    print(f"🔎 检索结果: {data}")
+    assert data['success']
+    assert [order['order_number'] for order in data['orders']] == [first['order_number']]
+
+    data = client.get('/orders/search?phone_suffix=5678&status=draft', headers=ADMIN_HEADERS).get_json()
+    assert [order['order_number'] for order in data['orders']] == [second['order_number']]
+
+    today = date.today().isoformat()
+    data = client.get(f"/orders/search?order_number={second['order_number'].lower()}&start_date={today}",
+                      headers=ADMIN_HEADERS).get_json()
+    assert data['total'] == 1
+
+def test_index_follows_status_changes():
+    """订单状态变化后旧的倒排项被移除"""
+    created = order_service.create_order('dev_user_search_c', '13600001111', {'address': '广州市天河区', 'budget': 20})
+    search_service.refresh(force=True)
+    order_service.submit_order(created['order_id'])
+    search_service.refresh(force=True)
+
+    total, _ = search_service.index.search({'phone_suffix': '1111', 'status': 'draft'}, 10)
+    assert total == 0
+    total, _ = search_service.index.search({'phone_suffix': '1111', 'status': 'submitted'}, 10)
+    assert total == 1
+
+def test_order_timestamps_share_one_clock():
+    """创建和更新时间都是UTC，插入时写入updated_at，增量水位按字符串比较不会错位"""
+    created = order_service.create_order('dev_user_search_d', '13636002222', {'address': '广州市海珠区', 'budget': 20})
+    order = search_service.storage.get_order(created['order_id'])
+    assert order['created_at'].endswith('+00:00')
+    assert order['updated_at'] == order['created_at']
+
+    order_service.submit_order(created['order_id'])
+    updated = search_service.storage.get_order(created['order_id'])
+    assert updated['updated_at'].endswith('+00:00')
+    assert updated['updated_at'] > order['created_at']
+
+def test_day_buckets_follow_order_date():
+    """日期桶按本地下单日期，UTC日期不同的凌晨订单也落在当天"""
+    from src.services.search_service import OrderSearchIndex
+
+    index = OrderSearchIndex()
+    index.upsert({'id': 1, 'order_number': 'ORD20250726000001', 'phone_number': '13600003333', 'status': 'draft',
+                  'order_date': '2025-07-26', 'created_at': '2025-07-25T17:30:00+00:00'})
+
+    total, _ = index.search({'start_date': '2025-07-26', 'end_date': '2025-07-26'}, 10)
+    assert total == 1
+    total, _ = index.search({'start_date': '2025-07-25', 'end_date': '2025-07-25'}, 10)
+    assert total == 0
+
+    index.upsert({'id': 1, 'order_number': 'ORD20250726000001', 'phone_number': '13600003333', 'status': 'submitted',
+                  'order_date': '2025-07-26', 'created_at': '2025-07-25T17:30:00+00:00'})
+    assert index.days == ['2025-07-26']
+
+def test_late_commits_behind_the_watermark_are_indexed():
+    """时间戳早于水位线的晚提交订单在重读窗口内被补上"""
+    created = order_service.create_order('dev_user_search_e', '13636004444', {'address': '广州市越秀区', 'budget': 20})
+    search_service.refresh(force=True)
+    watermark = search_service.index.watermarks[False]
+
+    # 模拟事务开始较早、提交较晚的订单：updated_at比已同步的最新订单早30秒
+    late = dict(search_service.storage.get_order(created['order_id']))
+    late.update({'id': 'late-order', 'order_number': 'ORD20250726999999', 'phone_number': '13636005555',
+                 'updated_at': (datetime.fromisoformat(watermark[0]) - timedelta(seconds=30)).isoformat()})
+    search_service.storage.orders['late-order'] = late
+
+    assert search_service.refresh(force=True) == 0
+    total, _ = search_service.index.search({'phone_suffix': '36005555'}, 10)
+    assert total == 1
+    assert search_service.index.watermarks[False] == watermark
+
+def test_requires_a_filter():
+    """没有检索条件时返回400，没有管理令牌时返回403"""
+    response = app.test_client().get('/orders/search', headers=ADMIN_HEADERS)
+    assert response.status_code == 400
+    response = app.test_client().get('/orders/search?phone_suffix=5678')
+    assert response.status_code == 403
+
+if __name__ == '__main__':
+    print("🧪 开始测试订单检索...")
+    test_combined_filters_intersect()
+    test_index_follows_status_changes()
+    test_order_timestamps_share_one_clock()
+    test_day_buckets_follow_order_date()
+    test_late_commits_behind_the_watermark_are_indexed()
+    test_requires_a_filter()
+    print("✅ 所有测试通过")
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+启动和延迟初始化测试脚本
+"""
+import sys
+import os
+import subprocess
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from src.config import db_config
+from src.storage import storage, get_storage
+
+app = create_app()
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+def loaded_modules(code, names):
+    """在新进程中执行代码，返回names中已被导入的模块"""
+    check = f"{code}\nimport sys\nprint(' '.join(name for name in {names!r} if name in sys.modules))"
+    result = subprocess.run([sys.executable, '-c', check], cwd=ROOT, capture_output=True, text=True, check=True)
+    lines = result.stdout.splitlines()
+    return lines[-1].split() if lines else []
+
+def test_import_src_is_lazy():
+    """导入src不加载Flask、路由和服务，也不创建存储"""
+    code = "import src\nfrom src.storage import factory\nassert factory._storage is None"
+    assert loaded_modules(code, ['flask', 'src.services', 'src.routes']) == []
+
+def test_dev_mode_skips_client_libraries():
+    """开发模式启动并处理请求时不导入数据库和HTTP客户端库"""
+    code = "from app import create_app\ncreate_app().test_client().get('/health')"
+    assert loaded_modules(code, ['supabase', 'postgrest', 'httpx', 'requests']) == []
+
+def test_storage_proxy():
+    """全局storage转发到当前进程的存储实例"""
+    instance = get_storage()
+    assert get_storage() is instance
+    assert storage.get_verification_code is instance.get_verification_code
+
+    storage.marker = 'proxy'
+    assert instance.marker == 'proxy'
+    del storage.marker
+    assert not hasattr(instance, 'marker')
+
+def test_fork_recreates_storage():
+    """fork出的子进程丢弃父进程的存储和数据库客户端，使用时重新创建"""
+    parent = get_storage()
+    db_config.get_client()
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        ok = not db_config._initialized and get_storage() is not parent and get_storage() is get_storage()
+        os.write(write_fd, b'1' if ok else b'0')
+        os._exit(0)
+    os.close(write_fd)
+    result = os.read(read_fd, 1)
+    os.close(read_fd)
+    os.waitpid(pid, 0)
+    assert result == b'1'
+    assert get_storage() is parent
+
+if __name__ == '__main__':
+    print("🧪 开始测试启动和延迟初始化...")
+    test_import_src_is_lazy()
+    test_dev_mode_skips_client_libraries()
+    test_storage_proxy()
+    test_fork_recreates_storage()
+    print("✅ 所有测试通过")
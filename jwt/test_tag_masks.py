@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+忌口/偏好位掩码测试脚本
+"""
+import sys
+import os
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from src.config import config
+from src.services import order_service, preferences_service, analytics_service
+from src.utils.tags import encode_tags, decode_tags
+
+app = create_app()
+
+# 管理接口需要令牌
+config.ADMIN_API_TOKEN = 'test-admin-token'
+ADMIN_HEADERS = {'Authorization': 'Bearer test-admin-token'}
+
+def test_codec_accepts_ids_and_labels():
+    """选项ID和中文标签编码为同一位，自由文本忽略"""
+    assert encode_tags('allergies', ['seafood', '坚果类', '花生']) == 0b11
+    assert decode_tags('preferences', encode_tags('preferences', ['香辣', 'salty'])) == ['spicy', 'salty']
+
+def test_user_cohort_and_order_filters():
+    """按位掩码筛选用户和订单"""
+    preferences_service.save_user_preferences('dev_user_mask_a', {
+        'address': '西安市雁塔区', 'selectedFoodType': ['吃饭'], 'budget': '30',
+        'selectedAllergies': ['seafood'], 'selectedPreferences': ['spicy', 'salty']
+    })
+    preferences_service.save_user_preferences('dev_user_mask_b', {
+        'address': '西安市碑林区', 'selectedFoodType': ['吃饭'], 'budget': '30',
+        'selectedAllergies': ['seafood', 'nuts'], 'selectedPreferences': ['mild']
+    })
+    analytics_service.refresh_user_tags(force=True)
+
+    client = app.test_client()
+    data = client.get('/analytics/users/cohort?allergy=seafood&preference=spicy', headers=ADMIN_HEADERS).get_json()
+    print(f"📊 人群: {data}")
+    assert 'dev_user_mask_a' in data['user_ids']
+    assert 'dev_user_mask_b' not in data['user_ids']
+
+    # 清除忌口后掩码随之清零
+    preferences_service.update_user_preferences('dev_user_mask_a', {'default_allergies': None})
+    analytics_service.refresh_user_tags(force=True)
+    data = client.get('/analytics/users/cohort?allergy=seafood', headers=ADMIN_HEADERS).get_json()
+    assert 'dev_user_mask_a' not in data['user_ids']
+
+    order_service.create_order('dev_user_mask_b', '13300001111', {
+        'address': '西安市碑林区', 'budget': 30, 'allergies': ['nuts'], 'preferences': ['mild']
+    })
+    analytics_service.refresh(force=True)
+    with_nuts = client.get('/analytics/orders/rollup?group_by=status&allergy=nuts', headers=ADMIN_HEADERS).get_json()
+    without_nuts = client.get('/analytics/orders/rollup?group_by=status&no_allergy=nuts', headers=ADMIN_HEADERS).get_json()
+    everything = client.get('/analytics/orders/rollup?group_by=status', headers=ADMIN_HEADERS).get_json()
+    total = lambda data: sum(row['count'] for row in data['rows'])
+    assert total(with_nuts) >= 1
+    assert total(with_nuts) + total(without_nuts) == total(everything)
+
+    assert client.get('/analytics/users/cohort?allergy=unknown', headers=ADMIN_HEADERS).status_code == 400
+    assert client.get('/analytics/orders/rollup?group_by=status').status_code == 403
+
+def test_cohort_drops_deleted_and_cleared_preferences():
+    """删除偏好的用户从人群中移除，清空忌口/偏好的用户掩码清零"""
+    for user_id in ('dev_user_mask_deleted', 'dev_user_mask_cleared', 'dev_user_mask_kept'):
+        preferences_service.save_user_preferences(user_id, {
+            'address': '西安市未央区', 'selectedFoodType': ['吃饭'], 'budget': '30',
+            'selectedAllergies': ['eggs'], 'selectedPreferences': ['sweet']
+        })
+    analytics_service.refresh_user_tags(force=True)
+    assert analytics_service.user_cohort({'allergy': 'eggs'})['count'] == 3
+
+    preferences_service.delete_user_preferences('dev_user_mask_deleted')
+    preferences_service.save_user_preferences('dev_user_mask_cleared', {
+        'address': '西安市未央区', 'selectedFoodType': ['吃饭'], 'budget': '30',
+        'selectedAllergies': None, 'selectedPreferences': []
+    })
+    analytics_service.refresh_user_tags(force=True)
+
+    data = analytics_service.user_cohort({'allergy': 'eggs'})
+    assert data['user_ids'] == ['dev_user_mask_kept']
+    data = analytics_service.user_cohort({'no_allergy': 'eggs'}, limit=1000)
+    assert 'dev_user_mask_cleared' in data['user_ids']
+    assert 'dev_user_mask_deleted' not in data['user_ids']
+
+    # 重新保存偏好后重新计入
+    preferences_service.save_user_preferences('dev_user_mask_deleted', {
+        'address': '西安市未央区', 'selectedFoodType': ['吃饭'], 'budget': '30', 'selectedAllergies': ['eggs']
+    })
+    analytics_service.refresh_user_tags(force=True)
+    assert analytics_service.user_cohort({'allergy': 'eggs'})['count'] == 2
+
+if __name__ == '__main__':
+    print("🧪 开始测试位掩码...")
+    test_codec_accepts_ids_and_labels()
+    test_user_cohort_and_order_filters()
+    test_cohort_drops_deleted_and_cleared_preferences()
+    print("✅ 所有测试通过")
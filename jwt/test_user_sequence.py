@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+用户序号分段租用测试脚本
+"""
+import sys
+import os
+import threading
+
+# 添加项目路径到sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from src.storage import get_storage
+from src.utils.cache import user_sequence_cache
+from src.utils.sequence import BlockSequenceAllocator
+from src.storage.dev_storage import DevStorage
+
+app = create_app()
+
+class CountingCounter:
+    """模拟共享计数器，记录租用次数"""
+
+    def __init__(self):
+        self.value = 0
+        self.leases = 0
+        self._lock = threading.Lock()
+
+    def lease(self, block_size):
+        with self._lock:
+            self.value += block_size
+            self.leases += 1
+            return self.value
+
+def test_block_is_leased_once_per_block_size():
+    """段内分配不访问计数器，用完后才再租用一段"""
+    counter = CountingCounter()
+    allocator = BlockSequenceAllocator(counter.lease, 20)
+
+    values = [allocator.next() for _ in range(45)]
+
+    assert values == list(range(1, 46))
+    assert counter.leases == 3
+
+def test_processes_get_disjoint_blocks():
+    """多个分配器共用计数器时序号不重复（允许空洞）"""
+    counter = CountingCounter()
+    allocators = [BlockSequenceAllocator(counter.lease, 10) for _ in range(3)]
+    results = []
+    lock = threading.Lock()
+
+    def worker(allocator):
+        values = [allocator.next() for _ in range(25)]
+        with lock:
+            results.extend(values)
+
+    threads = [threading.Thread(target=worker, args=(allocator,)) for allocator in allocators for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    print(f"📋 分配序号数量: {len(results)}, 租用次数: {counter.leases}")
+    assert len(results) == len(set(results)) == 150
+    assert counter.leases == 15
+
+def test_failed_lease_can_be_retried():
+    """租用失败时抛出异常，下次分配重新租用"""
+    calls = []
+
+    def flaky_lease(block_size):
+        calls.append(block_size)
+        if len(calls) == 1:
+            raise ConnectionError("计数器不可用")
+        return 5
+
+    allocator = BlockSequenceAllocator(flaky_lease, 5)
+    try:
+        allocator.next()
+        assert False, "租用失败时应抛出异常"
+    except ConnectionError:
+        pass
+    assert [allocator.next() for _ in range(5)] == [1, 2, 3, 4, 5]
+
+def test_signup_writes_sequence_with_insert():
+    """注册时直接写入用户序号"""
+    storage = DevStorage()
+    first = storage.create_user('13900000001', 'WELCOME')
+    second = storage.create_user('13900000002', 'WELCOME')
+
+    assert (first['user_sequence'], second['user_sequence']) == (1, 2)
+    assert storage.get_user('13900000002')['user_sequence'] == 2
+
+def test_order_insert_carries_user_sequence():
+    """订单插入时直接带上用户序号，注册后缓存命中不再回查用户"""
+    client = app.test_client()
+    signup = client.post('/verify-invite-code', json={'phone_number': '13900000003', 'invite_code': 'WELCOME'}).get_json()
+    assert user_sequence_cache.get(signup['user_id']) == signup['user_sequence']
+
+    storage = get_storage()
+    lookups = []
+    original = storage.get_user
+    storage.get_user = lambda phone_number: lookups.append(phone_number)
+    try:
+        created = client.post('/create-order', json={
+            'user_id': signup['user_id'],
+            'phone_number': '13900000003',
+            'form_data': {'address': '北京市朝阳区三里屯', 'budget': 30}
+        }).get_json()
+    finally:
+        storage.get_user = original
+
+    assert lookups == []
+    assert created['user_sequence_number'] == signup['user_sequence']
+    assert storage.orders[created['order_id']]['user_sequence'] == signup['user_sequence']
+
+def test_cache_miss_reads_user_once():
+    """缓存未命中时按手机号回查一次并写入缓存"""
+    client = app.test_client()
+    signup = client.post('/verify-invite-code', json={'phone_number': '13900000004', 'invite_code': 'WELCOME'}).get_json()
+    user_sequence_cache.delete(signup['user_id'])
+
+    created = client.post('/create-order', json={
+        'user_id': signup['user_id'],
+        'phone_number': '13900000004',
+        'form_data': {'address': '北京市朝阳区三里屯', 'budget': 30}
+    }).get_json()
+
+    assert created['user_sequence_number'] == signup['user_sequence']
+    assert user_sequence_cache.get(signup['user_id']) == signup['user_sequence']
+
+if __name__ == '__main__':
+    test_block_is_leased_once_per_block_size()
+    test_processes_get_disjoint_blocks()
+    test_failed_lease_can_be_retried()
+    test_signup_writes_sequence_with_insert()
+    test_order_insert_carries_user_sequence()
+    test_cache_miss_reads_user_once()
+    print("✅ 用户序号测试完成！")
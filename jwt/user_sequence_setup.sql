@@ -0,0 +1,99 @@
+-- 用户序号分段分配（hi/lo）
+-- 应用进程每次从计数器原子租用一段序号，在插入用户时直接写入user_sequence，
+-- 注册不再需要触发器对计数器和新用户行的两次额外更新
+
+-- 为users表添加用户序号字段
+ALTER TABLE users ADD COLUMN IF NOT EXISTS user_sequence INTEGER;
+
+-- 创建序列计数器表
+CREATE TABLE IF NOT EXISTS user_sequence_counter (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    current_sequence INTEGER NOT NULL DEFAULT 0
+);
+
+-- 初始化序列计数器到当前最大值
+INSERT INTO user_sequence_counter (id, current_sequence)
+SELECT 1, COALESCE(MAX(user_sequence), 0) FROM users
+ON CONFLICT (id) DO UPDATE
+SET current_sequence = GREATEST(user_sequence_counter.current_sequence, EXCLUDED.current_sequence);
+
+-- 创建序号段租用函数：一次原子自增，返回本段最大序号
+-- 计数器行锁只在这一条语句内持有，与注册请求的数量无关，只与租用次数有关
+CREATE OR REPLACE FUNCTION lease_user_sequence_block(block_size INTEGER)
+RETURNS INTEGER AS $$
+    UPDATE user_sequence_counter
+    SET current_sequence = current_sequence + block_size
+    WHERE id = 1
+    RETURNING current_sequence;
+$$ LANGUAGE sql;
+
+-- 兜底触发器：应用租用失败、插入时未带user_sequence时，单独租用一个序号
+-- 使用BEFORE INSERT直接修改NEW，不会产生第二次写入
+CREATE OR REPLACE FUNCTION set_user_sequence_fallback()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.user_sequence IS NULL THEN
+        NEW.user_sequence := lease_user_sequence_block(1);
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_set_user_sequence ON users;
+CREATE TRIGGER trigger_set_user_sequence
+    BEFORE INSERT ON users
+    FOR EACH ROW
+    EXECUTE FUNCTION set_user_sequence_fallback();
+
+-- 序号允许空洞但不允许重复
+CREATE UNIQUE INDEX IF NOT EXISTS idx_users_user_sequence ON users(user_sequence);
+
+-- 订单冗余存储用户序号：应用在插入订单时直接写入user_sequence
+ALTER TABLE orders ADD COLUMN IF NOT EXISTS user_sequence INTEGER;
+
+-- 兜底触发器：只有插入时未带user_sequence才回查users表
+-- 使用BEFORE INSERT直接修改NEW，不会产生第二次写入
+CREATE OR REPLACE FUNCTION set_order_user_sequence_fallback()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.user_sequence IS NULL THEN
+        SELECT user_sequence INTO NEW.user_sequence
+        FROM users
+        WHERE users.id::TEXT = NEW.user_id;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_set_order_user_sequence ON orders;
+CREATE TRIGGER trigger_set_order_user_sequence
+    BEFORE INSERT ON orders
+    FOR EACH ROW
+    EXECUTE FUNCTION set_order_user_sequence_fallback();
+
+CREATE INDEX IF NOT EXISTS idx_orders_user_sequence ON orders(user_sequence);
+
+-- 一致性校验：返回与users表不一致的订单数量，repair为TRUE时顺带修复
+CREATE OR REPLACE FUNCTION verify_order_user_sequence(repair BOOLEAN DEFAULT FALSE)
+RETURNS INTEGER AS $$
+DECLARE
+    mismatched INTEGER;
+BEGIN
+    SELECT COUNT(*) INTO mismatched
+    FROM orders o
+    JOIN users u ON u.id::TEXT = o.user_id
+    WHERE o.user_sequence IS DISTINCT FROM u.user_sequence;
+    
+    IF repair AND mismatched > 0 THEN
+        UPDATE orders o
+        SET user_sequence = u.user_sequence
+        FROM users u
+        WHERE u.id::TEXT = o.user_id
+        AND o.user_sequence IS DISTINCT FROM u.user_sequence;
+    END IF;
+    
+    RETURN mismatched;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT verify_order_user_sequence(TRUE) AS repaired_orders;
@@ -0,0 +1,29 @@
+-- 校验并修复订单冗余的用户序号
+-- 执行时间: 2026-10-19
+-- 订单插入时已直接写入user_sequence，set_order_user_sequence触发器只在未写入时兜底
+
+-- 修复前：输出与users表不一致的订单数量
+SELECT COUNT(*) AS mismatched_orders
+FROM orders
+JOIN users ON users.id = orders.user_id
+WHERE orders.user_sequence IS NOT users.user_sequence;
+
+-- 修复不一致的订单
+UPDATE orders
+SET user_sequence = (
+    SELECT user_sequence
+    FROM users
+    WHERE users.id = orders.user_id
+)
+WHERE EXISTS (
+    SELECT 1
+    FROM users
+    WHERE users.id = orders.user_id
+    AND orders.user_sequence IS NOT users.user_sequence
+);
+
+-- 修复后：应为0
+SELECT COUNT(*) AS mismatched_orders
+FROM orders
+JOIN users ON users.id = orders.user_id
+WHERE orders.user_sequence IS NOT users.user_sequence;
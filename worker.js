@@ -389,6 +389,41 @@ async function handleLoginWithPhone(request, env) {
   });
 }
 
+// 用户序号分段租用（hi/lo）：每个Worker实例一次从计数器原子租用一段序号，
+// 注册时直接写入user_sequence，不再触发assign_user_sequence对计数器和新用户行的两次更新。
+// 实例回收时未用完的序号直接丢弃，序号允许出现空洞。
+const USER_SEQUENCE_BLOCK_SIZE = 20;
+let userSequenceNext = 0;
+let userSequenceEnd = 0;
+let userSequenceLease = null;
+
+async function leaseUserSequenceBlock(env) {
+  const row = await env.DB.prepare(`
+    UPDATE user_sequence_counter
+    SET current_sequence = current_sequence + ?
+    WHERE id = 1
+    RETURNING current_sequence
+  `).bind(USER_SEQUENCE_BLOCK_SIZE).first();
+  if (!row) {
+    throw new Error('user_sequence_counter未初始化');
+  }
+  userSequenceEnd = row.current_sequence;
+  userSequenceNext = userSequenceEnd - USER_SEQUENCE_BLOCK_SIZE + 1;
+}
+
+async function nextUserSequence(env) {
+  while (userSequenceNext === 0 || userSequenceNext > userSequenceEnd) {
+    // 同一实例内并发的注册共用一次租用
+    if (!userSequenceLease) {
+      userSequenceLease = leaseUserSequenceBlock(env).finally(() => {
+        userSequenceLease = null;
+      });
+    }
+    await userSequenceLease;
+  }
+  return userSequenceNext++;
+}
+
 // 验证邀请码并创建新用户
 async function handleVerifyInviteCode(request, env) {
   if (request.method !== 'POST') {
@@ -426,20 +461,31 @@ async function handleVerifyInviteCode(request, env) {
     // 为新用户生成唯一邀请码
     const userInviteCode = await generateUniqueInviteCode(env);
     
-    // 创建新用户（user_sequence会通过触发器自动分配）
+    // 从租用的序号段分配用户序号，插入时直接写入
+    let userSequence = null;
+    try {
+      userSequence = await nextUserSequence(env);
+    } catch (error) {
+      // 租用失败时留空，由assign_user_sequence触发器兜底分配
+      console.error('用户序号租用失败，交由触发器分配:', error);
+    }
+
+    // 创建新用户
     const userId = crypto.randomUUID();
     const createUserQuery = `
-      INSERT INTO users (id, phone_number, created_at, invite_code, user_invite_code) 
-      VALUES (?, ?, ?, ?, ?)
+      INSERT INTO users (id, phone_number, created_at, invite_code, user_invite_code, user_sequence) 
+      VALUES (?, ?, ?, ?, ?, ?)
     `;
     await env.DB.prepare(createUserQuery)
-      .bind(userId, phoneNumber, new Date().toISOString(), inviteCode, userInviteCode)
+      .bind(userId, phoneNumber, new Date().toISOString(), inviteCode, userInviteCode, userSequence)
       .run();
     
-    // 获取新创建用户的序号
-    const getUserQuery = `SELECT user_sequence FROM users WHERE id = ?`;
-    const newUser = await env.DB.prepare(getUserQuery).bind(userId).first();
-    const userSequence = newUser?.user_sequence;
+    if (userSequence === null) {
+      // 获取触发器分配的序号
+      const getUserQuery = `SELECT user_sequence FROM users WHERE id = ?`;
+      const newUser = await env.DB.prepare(getUserQuery).bind(userId).first();
+      userSequence = newUser?.user_sequence;
+    }
 
     // 为新用户创建邀请码记录
     const createUserInviteQuery = `
@@ -570,8 +616,8 @@ async function handleCreateOrder(request, env) {
         id, order_number, user_id, phone_number, status, order_date, 
         created_at, delivery_address, dietary_restrictions, 
         food_preferences, budget_amount, budget_currency, metadata, 
-        user_sequence_number, is_deleted
-      ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        user_sequence_number, user_sequence, is_deleted
+      ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
     `;
 
     await env.DB.prepare(createOrderQuery).bind(
@@ -589,6 +635,7 @@ async function handleCreateOrder(request, env) {
       'CNY',
       JSON.stringify(metadata),
       userSequenceNumber,
+      userSequenceNumber,
       0
     ).run();
 
@@ -1038,8 +1085,8 @@ async function handleClaimFreeDrink(request, env) {
         INSERT INTO orders (
           id, order_number, user_id, phone_number, status, order_date,
           created_at, delivery_address, dietary_restrictions, food_preferences,
-          budget_amount, budget_currency, metadata, user_sequence_number, is_deleted
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+          budget_amount, budget_currency, metadata, user_sequence_number, user_sequence, is_deleted
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
       `;
 
       await env.DB.prepare(createFreeOrderQuery).bind(
@@ -1057,6 +1104,7 @@ async function handleClaimFreeDrink(request, env) {
         'CNY',
         JSON.stringify(metadata),
         userSequenceNumber,
+        userSequenceNumber,
         0
       ).run();
 